@@ -0,0 +1,213 @@
+"""
+管理查询的准入控制
+
+每条发往 ptp4l UDS 的管理查询都要先通过该 UDS 路径的准入闸门，避免大量页面或脚本
+同时轮询时与 ptp4l 的事件循环争抢、恶化同步偏差：
+
+- 令牌桶: 每秒补充 rate 个令牌，最多积攒 burst 个，每次查询消耗一个
+- 有界队列: 没有令牌时排队等待，队列已满则拒绝；内部采样任务的查询排在接口请求之前，
+  队列满时可以挤掉排在最后的低优先级请求
+- 截止时间: 按排在前面的请求数估算等待时间，超过 max_wait 的直接拒绝，
+  排队等待超过 max_wait 的也拒绝，不让调用方无限期等待
+
+查询在线程池中执行，闸门用线程条件变量实现。优先级通过 ContextVar 传递：采样任务
+设置一次 INTERNAL，之后经 asyncio.to_thread 发出的查询都继承它。
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 优先级，数值越小越优先
+INTERNAL = 0
+API = 1
+
+query_priority: ContextVar[int] = ContextVar("query_priority", default=API)
+
+
+class AdmissionRejected(RuntimeError):
+    """
+    查询未被准入
+
+    Attributes:
+        reason: queue_full（队列已满）/ deadline（预计或实际等待超过截止时间）/
+            evicted（被更高优先级的请求挤出队列）
+    """
+
+    def __init__(self, key: str, reason: str):
+        super().__init__(f"{key} 的管理查询过多，请求被拒绝（{reason}）")
+        self.key = key
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "rejected")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.rejected: Optional[str] = None
+
+    @property
+    def order(self):
+        return self.priority, self.seq
+
+
+class AdmissionGate:
+    """
+    单个 UDS 路径的准入闸门
+
+    Attributes:
+        admitted: 累计准入次数
+        queued_total: 累计排队次数（没有立即拿到令牌）
+        rejected: 按原因统计的累计拒绝次数
+    """
+
+    def __init__(self, key: str, rate: float, burst: int, queue_size: int, max_wait: float,
+                 clock=time.monotonic):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._seq = 0
+        self._waiters: List[_Waiter] = []
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.queued_total = 0
+        self.queued_peak = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "deadline": 0, "evicted": 0}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reject(self, reason: str, priority: int):
+        self.rejected[reason] += 1
+        logger.debug("拒绝 %s 的管理查询: %s (优先级%s)", self.key, reason, priority)
+        raise AdmissionRejected(self.key, reason)
+
+    def _head(self) -> Optional[_Waiter]:
+        return min(self._waiters, key=lambda w: w.order) if self._waiters else None
+
+    def acquire(self, priority: Optional[int] = None) -> float:
+        """
+        等待准入
+
+        Args:
+            priority: 默认取 query_priority 的当前值
+
+        Returns:
+            float: 排队等待的秒数
+
+        Raises:
+            AdmissionRejected: 队列已满、预计或实际等待超过 max_wait、被挤出队列
+        """
+        if priority is None:
+            priority = query_priority.get()
+        with self._cond:
+            start = self._clock()
+            self._refill(start)
+            if not self._waiters and self._tokens >= 1:
+                self._tokens -= 1
+                self.admitted += 1
+                return 0.0
+
+            ahead = sum(1 for w in self._waiters if w.priority <= priority)
+            if max(0.0, ahead + 1 - self._tokens) / self.rate > self.max_wait:
+                self._reject("deadline", priority)
+            if len(self._waiters) >= self.queue_size:
+                last = max(self._waiters, key=lambda w: w.order)
+                if last.priority <= priority:
+                    self._reject("queue_full", priority)
+                last.rejected = "evicted"
+                self._waiters.remove(last)
+                self._cond.notify_all()
+
+            self._seq += 1
+            waiter = _Waiter(priority, self._seq)
+            self._waiters.append(waiter)
+            self.queued_total += 1
+            self.queued_peak = max(self.queued_peak, len(self._waiters))
+            deadline = start + self.max_wait
+            while True:
+                if waiter.rejected:
+                    self._reject(waiter.rejected, priority)
+                now = self._clock()
+                self._refill(now)
+                head = self._head() is waiter
+                if head and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._waiters.remove(waiter)
+                    self.admitted += 1
+                    # 让下一个排队者重新计算等待时间
+                    self._cond.notify_all()
+                    return now - start
+                if now >= deadline:
+                    self._waiters.remove(waiter)
+                    self._cond.notify_all()
+                    self._reject("deadline", priority)
+                timeout = deadline - now
+                if head:
+                    timeout = min(timeout, (1 - self._tokens) / self.rate)
+                self._cond.wait(timeout)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            self._refill(self._clock())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "queued": len(self._waiters),
+                "queued_peak": self.queued_peak,
+                "queued_total": self.queued_total,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+
+class AdmissionControl:
+    """按 UDS 路径分别准入，闸门在第一次查询时创建"""
+
+    def __init__(self, rate: float = 20.0, burst: int = 10, queue_size: int = 16, max_wait: float = 2.0):
+        self.rate = rate
+        self.burst = burst
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self._gates: Dict[str, AdmissionGate] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def gate(self, key: str) -> AdmissionGate:
+        with self._lock:
+            gate = self._gates.get(key)
+            if gate is None:
+                gate = self._gates[key] = AdmissionGate(key, self.rate, self.burst, self.queue_size, self.max_wait)
+            return gate
+
+    def admit(self, key: str, priority: Optional[int] = None) -> float:
+        """
+        等待 key 对应的闸门准入，rate 为0时不限制
+
+        Raises:
+            AdmissionRejected: 未被准入
+        """
+        if not self.enabled:
+            return 0.0
+        return self.gate(key).acquire(priority)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            gates = list(self._gates.values())
+        return {gate.key: gate.stats() for gate in gates}
@@ -0,0 +1,482 @@
+"""
+告警规则引擎
+
+对每个新采样或状态转换增量地评估声明式规则，不需要外部轮询各 JSON 接口。规则有三类：
+
+- threshold: 数值指标（可取绝对值、在滑动窗口内取平均/最大/最小）与阈值比较，
+  条件持续 for 秒后触发；触发后按 clear 阈值恢复（滞回），恢复后重新布防
+- state: 状态字段不在 in 列表中（或在 not_in 列表中）持续 for 秒后触发，例如 portState 离开 SLAVE；
+  实例查询失败时 portState 为 UNREACHABLE、gmPresent 为 false（见 instance_alert_values）
+- change: 字段值变化时立即通知一次，例如 gmIdentity 变化
+
+同一条规则对同一个实例触发后只通知一次（去重），直到恢复；repeat 大于 0 时持续触发期间
+每隔 repeat 秒重复通知。通知放入有界队列，由后台任务异步投递到 webhook 或本地文件，
+队列满时丢弃最旧的通知——评估在采样路径上执行，只做内存计算，不等待投递。
+
+规则文件为 JSON 列表，例如：
+
+    [
+        {"name": "offset-high", "metric": "offsetFromMaster", "abs": true, "op": ">", "value": 1000,
+         "clear": 500, "for": 10, "severity": "critical"},
+        {"name": "port-not-slave", "kind": "state", "metric": "portState", "in": ["SLAVE"], "for": 5},
+        {"name": "gm-changed", "kind": "change", "metric": "gmIdentity", "instances": ["ptp4l"]}
+    ]
+"""
+
+import asyncio
+import json
+import logging
+import operator
+import os
+import time
+import urllib.request
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ptp_instances import CURRENT_DATA_SET_FIELDS
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+AGGREGATES = ("last", "avg", "max", "min")
+SEVERITIES = ("info", "warning", "critical")
+# 实例的 PORT_DATA_SET 查询失败或没有应答（ptp4l 未运行、UDS 无应答）时代入的 portState
+PORT_UNREACHABLE = "UNREACHABLE"
+
+# 没有规则文件时使用的规则
+DEFAULT_RULES = [
+    {"name": "offset-high", "metric": "offsetFromMaster", "abs": True, "op": ">", "value": 1000,
+     "clear": 500, "for": 10, "severity": "critical"},
+    {"name": "port-not-slave", "kind": "state", "metric": "portState", "in": ["SLAVE"], "for": 5,
+     "severity": "warning"},
+    {"name": "gm-changed", "kind": "change", "metric": "gmIdentity", "severity": "warning"},
+]
+
+
+def instance_alert_values(snapshot: Dict) -> Dict[str, Any]:
+    """
+    把PTP实例的状态快照整理为告警指标
+
+    查询失败或没有应答的数据集不会让状态规则停止评估：portState 代入 PORT_UNREACHABLE，
+    gmPresent 代入 False，因此 port-not-slave 这类规则在 ptp4l 停止应答时照常触发。
+    数值指标和 gmIdentity 没有值时跳过。
+    """
+    time_status = snapshot.get("time_status") or {}
+    port_status = snapshot.get("port_status") or {}
+    current_data = snapshot.get("current_data") or {}
+    gm_present = time_status.get("gmPresent")
+    return {
+        **{key: current_data.get(key) for key in CURRENT_DATA_SET_FIELDS},
+        "portState": port_status.get("portState") or PORT_UNREACHABLE,
+        "gmIdentity": time_status.get("gmIdentity"),
+        "gmPresent": False if gm_present is None else gm_present,
+    }
+
+
+class AlertRule:
+    """
+    一条告警规则
+
+    Attributes:
+        instances: 适用的实例名，None 表示全部
+        window: 滑动窗口（秒），0 表示只看最新值
+        for_seconds: 条件需持续的秒数
+        repeat: 持续触发期间重复通知的间隔（秒），0 表示不重复
+    """
+
+    def __init__(self, name: str, metric: str, kind: str = "threshold", instances: Optional[List[str]] = None,
+                 op: str = ">", value: Optional[float] = None, clear: Optional[float] = None,
+                 use_abs: bool = False, window: float = 0.0, aggregate: str = "last",
+                 allowed: Optional[List] = None, denied: Optional[List] = None,
+                 for_seconds: float = 0.0, repeat: float = 0.0, severity: str = "warning"):
+        self.name = name
+        self.metric = metric
+        self.kind = kind
+        self.instances = instances
+        self.op = op
+        self.value = value
+        self.clear = value if clear is None else clear
+        self.use_abs = use_abs
+        self.window = window
+        self.aggregate = aggregate
+        self.allowed = allowed
+        self.denied = denied
+        self.for_seconds = for_seconds
+        self.repeat = repeat
+        self.severity = severity
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AlertRule":
+        """
+        从规则文件中的一项创建
+
+        Raises:
+            ValueError: 缺少字段或取值不合法
+        """
+        unknown = set(data) - {"name", "metric", "kind", "instances", "op", "value", "clear", "abs", "window",
+                               "aggregate", "in", "not_in", "for", "repeat", "severity"}
+        if unknown:
+            raise ValueError(f"未知的规则字段: {', '.join(sorted(unknown))}")
+        try:
+            name, metric = str(data["name"]), str(data["metric"])
+        except KeyError as e:
+            raise ValueError(f"规则缺少字段: {e.args[0]}") from None
+        kind = data.get("kind", "threshold")
+        rule = cls(
+            name, metric, kind,
+            instances=data.get("instances"),
+            op=data.get("op", ">"),
+            value=data.get("value"),
+            clear=data.get("clear"),
+            use_abs=bool(data.get("abs", False)),
+            window=float(data.get("window", 0)),
+            aggregate=data.get("aggregate", "last" if not data.get("window") else "avg"),
+            allowed=data.get("in"),
+            denied=data.get("not_in"),
+            for_seconds=float(data.get("for", 0)),
+            repeat=float(data.get("repeat", 0)),
+            severity=data.get("severity", "warning"),
+        )
+        if kind == "threshold":
+            if rule.op not in OPERATORS:
+                raise ValueError(f"规则 {name}: 不支持的比较运算 {rule.op}")
+            if not isinstance(rule.value, (int, float)) or not isinstance(rule.clear, (int, float)):
+                raise ValueError(f"规则 {name}: value/clear 必须是数值")
+            if rule.aggregate not in AGGREGATES:
+                raise ValueError(f"规则 {name}: 不支持的聚合方式 {rule.aggregate}")
+        elif kind == "state":
+            if (rule.allowed is None) == (rule.denied is None):
+                raise ValueError(f"规则 {name}: in 和 not_in 需给出且只给出一个")
+        elif kind != "change":
+            raise ValueError(f"规则 {name}: 不支持的规则类型 {kind}")
+        if rule.severity not in SEVERITIES:
+            raise ValueError(f"规则 {name}: 不支持的级别 {rule.severity}")
+        if rule.window < 0 or rule.for_seconds < 0 or rule.repeat < 0:
+            raise ValueError(f"规则 {name}: window/for/repeat 不能为负数")
+        return rule
+
+    def applies_to(self, instance: str) -> bool:
+        return self.instances is None or instance in self.instances
+
+    def violated(self, value: Any, firing: bool) -> bool:
+        """条件是否成立；已触发的阈值规则按 clear 阈值判断，实现滞回"""
+        if self.kind == "state":
+            return value not in self.allowed if self.allowed is not None else value in self.denied
+        return OPERATORS[self.op](value, self.clear if firing else self.value)
+
+    def to_dict(self) -> Dict:
+        data = {"name": self.name, "kind": self.kind, "metric": self.metric, "instances": self.instances,
+                "for": self.for_seconds, "repeat": self.repeat, "severity": self.severity}
+        if self.kind == "threshold":
+            data.update({"op": self.op, "value": self.value, "clear": self.clear, "abs": self.use_abs,
+                         "window": self.window, "aggregate": self.aggregate})
+        elif self.kind == "state":
+            data.update({"in": self.allowed, "not_in": self.denied})
+        return data
+
+
+def load_rules(path: str) -> List[AlertRule]:
+    """
+    读取规则文件，文件不存在时返回默认规则
+
+    Raises:
+        ValueError: 文件内容不是规则列表、规则不合法或规则名重复
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = DEFAULT_RULES
+    if not isinstance(data, list):
+        raise ValueError("规则文件应为JSON列表")
+    rules = [AlertRule.from_dict(item) for item in data]
+    names = [rule.name for rule in rules]
+    duplicated = {name for name in names if names.count(name) > 1}
+    if duplicated:
+        raise ValueError(f"规则名重复: {', '.join(sorted(duplicated))}")
+    return rules
+
+
+class SlidingAggregate:
+    """
+    滑动窗口内的平均/最大/最小值，每个样本均摊 O(1)
+
+    平均值用累加和；最大/最小值用单调队列，队首即窗口内的最值。
+    """
+
+    def __init__(self, window: float, aggregate: str):
+        self.window = window
+        self.aggregate = aggregate
+        self._samples: Deque[Tuple[float, float]] = deque()
+        self._sum = 0.0
+
+    def add(self, t: float, value: float) -> float:
+        """加入一个样本，返回加入后窗口内的聚合值"""
+        if self.aggregate == "avg":
+            self._samples.append((t, value))
+            self._sum += value
+            while self._samples[0][0] <= t - self.window:
+                self._sum -= self._samples.popleft()[1]
+            return self._sum / len(self._samples)
+        better = operator.ge if self.aggregate == "max" else operator.le
+        while self._samples and better(value, self._samples[-1][1]):
+            self._samples.pop()
+        self._samples.append((t, value))
+        while self._samples[0][0] <= t - self.window:
+            self._samples.popleft()
+        return self._samples[0][1]
+
+
+class _RuleState:
+    __slots__ = ("status", "since", "fired_at", "notified_at", "value", "aggregate", "last")
+
+    def __init__(self, rule: AlertRule):
+        # ok / pending / firing
+        self.status = "ok"
+        self.since: Optional[float] = None
+        self.fired_at: Optional[float] = None
+        self.notified_at: Optional[float] = None
+        self.value: Any = None
+        self.aggregate = SlidingAggregate(rule.window, rule.aggregate) \
+            if rule.kind == "threshold" and rule.window > 0 and rule.aggregate != "last" else None
+        # change 规则上一次的值
+        self.last: Any = None
+
+
+class AlertEngine:
+    """
+    增量评估告警规则
+
+    Attributes:
+        rules: 规则列表
+        recent: 最近的通知
+    """
+
+    def __init__(self, rules: List[AlertRule], notify: Callable[[Dict], None] = lambda notification: None,
+                 recent_size: int = 100, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            notify: 产生通知时调用（在评估路径上，不应阻塞）
+            clock: 单调时钟，用于持续时间判断
+        """
+        self.rules = rules
+        self.recent: Deque[Dict] = deque(maxlen=recent_size)
+        self._notify = notify
+        self._clock = clock
+        self._by_name = {rule.name: rule for rule in rules}
+        self._by_metric: Dict[str, List[AlertRule]] = {}
+        for rule in rules:
+            self._by_metric.setdefault(rule.metric, []).append(rule)
+        self._states: Dict[Tuple[str, str], _RuleState] = {}
+
+    def _emit(self, rule: AlertRule, instance: str, status: str, state: _RuleState, now: float, **extra) -> Dict:
+        notification = {
+            "rule": rule.name,
+            "instance": instance,
+            "status": status,
+            "severity": rule.severity,
+            "metric": rule.metric,
+            "value": state.value,
+            "time": time.time(),
+            "duration": round(now - state.fired_at, 3) if state.fired_at is not None else None,
+            **extra,
+        }
+        state.notified_at = now
+        self.recent.append(notification)
+        logger.info("告警 %s %s: %s=%s (%s)", rule.name, status, rule.metric, state.value, instance,
+                    extra={"rate_limit": False})
+        self._notify(notification)
+        return notification
+
+    def observe(self, instance: str, values: Dict[str, Any], now: Optional[float] = None) -> List[Dict]:
+        """
+        用实例的一组新值评估相关规则，值为None的指标跳过
+
+        Returns:
+            list: 本次产生的通知
+        """
+        if now is None:
+            now = self._clock()
+        notifications = []
+        for metric, value in values.items():
+            if value is None:
+                continue
+            for rule in self._by_metric.get(metric, ()):
+                if not rule.applies_to(instance):
+                    continue
+                state = self._states.get((rule.name, instance))
+                if state is None:
+                    state = self._states[(rule.name, instance)] = _RuleState(rule)
+                notification = self._evaluate(rule, instance, state, value, now)
+                if notification:
+                    notifications.append(notification)
+        return notifications
+
+    def _evaluate(self, rule: AlertRule, instance: str, state: _RuleState, value: Any, now: float) -> Optional[Dict]:
+        if rule.kind == "change":
+            previous, state.last = state.last, value
+            state.value = value
+            if previous is not None and previous != value:
+                return self._emit(rule, instance, "changed", state, now, previous=previous)
+            return None
+
+        if rule.kind == "threshold":
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return None
+            value = abs(value) if rule.use_abs else value
+            if state.aggregate is not None:
+                value = state.aggregate.add(now, value)
+        state.value = value
+
+        firing = state.status == "firing"
+        if not rule.violated(value, firing):
+            state.status, state.since = "ok", None
+            if firing:
+                notification = self._emit(rule, instance, "resolved", state, now)
+                state.fired_at = None
+                return notification
+            return None
+        if state.status == "ok":
+            state.status, state.since = "pending", now
+        return self._advance(rule, instance, state, now)
+
+    def _advance(self, rule: AlertRule, instance: str, state: _RuleState, now: float) -> Optional[Dict]:
+        """条件成立期间: pending 满 for 秒转为 firing，firing 按 repeat 重复通知"""
+        if state.status == "pending" and now - state.since >= rule.for_seconds:
+            state.status, state.fired_at = "firing", now
+            return self._emit(rule, instance, "firing", state, now)
+        if state.status == "firing" and rule.repeat and now - state.notified_at >= rule.repeat:
+            return self._emit(rule, instance, "firing", state, now, repeated=True)
+        return None
+
+    def tick(self, now: Optional[float] = None) -> List[Dict]:
+        """
+        没有新值时推进持续时间
+
+        状态类指标（如时钟源状态）只在变化时才有新值，定期调用 tick 让 for 和 repeat 按时生效。
+
+        Returns:
+            list: 本次产生的通知
+        """
+        if now is None:
+            now = self._clock()
+        notifications = []
+        for (name, instance), state in list(self._states.items()):
+            if state.status != "ok":
+                notification = self._advance(self._by_name[name], instance, state, now)
+                if notification:
+                    notifications.append(notification)
+        return notifications
+
+    def active(self) -> List[Dict]:
+        """处于 pending 或 firing 的规则，since 为条件开始成立的时间（Unix秒）"""
+        offset = time.time() - self._clock()
+        return [
+            {"rule": name, "instance": instance, "status": state.status, "severity": self._by_name[name].severity,
+             "value": state.value, "since": state.since + offset}
+            for (name, instance), state in self._states.items() if state.status != "ok"
+        ]
+
+
+class WebhookSink:
+    """以 JSON POST 投递到 webhook"""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def __str__(self):
+        return f"webhook {self.url}"
+
+    def send(self, notification: Dict):
+        request = urllib.request.Request(
+            self.url, data=json.dumps(notification, ensure_ascii=False).encode(),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink:
+    """追加写入本地文件，每行一条 JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __str__(self):
+        return f"file {self.path}"
+
+    def send(self, notification: Dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(notification, ensure_ascii=False) + "\n")
+
+
+class AlertNotifier:
+    """
+    通知的异步投递
+
+    submit() 只把通知放入有界队列，run() 作为后台任务在线程中逐个投递到各目标，
+    失败时按 retry_delay 的倍数退避重试 retries 次。
+
+    Attributes:
+        delivered: 累计投递成功次数（按目标计）
+        failed: 累计重试后仍失败的次数（按目标计）
+        dropped: 队列满时丢弃的通知数
+    """
+
+    def __init__(self, sinks: List, queue_size: int = 256, retries: int = 3, retry_delay: float = 1.0):
+        self.sinks = sinks
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # 在事件循环中创建
+        if self._queue is None:
+            self._queue = asyncio.Queue(self._queue_size)
+        return self._queue
+
+    def submit(self, notification: Dict):
+        """放入投递队列，不等待；没有投递目标时忽略"""
+        if not self.sinks:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(notification)
+
+    async def _deliver(self, sink, notification: Dict):
+        for attempt in range(self.retries + 1):
+            try:
+                await asyncio.to_thread(sink.send, notification)
+                self.delivered += 1
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += 1
+                    logger.error("投递告警到%s失败: %s", sink, e)
+                    return
+                await asyncio.sleep(self.retry_delay * (attempt + 1))
+
+    async def run(self):
+        while True:
+            notification = await self.queue.get()
+            for sink in self.sinks:
+                await self._deliver(sink, notification)
+
+    def stats(self) -> Dict:
+        return {
+            "sinks": [str(sink) for sink in self.sinks],
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,171 @@
+"""
+状态、配置和历史接口的响应模型
+
+声明了 response_model 的接口由 pydantic-core 校验并序列化返回值，不再经过 FastAPI 逐层递归的
+jsonable_encoder；同时生成准确的 OpenAPI 文档。pmc 数据集字段的取值类型由 pmc_parser.convert_value 决定
+（布尔、整数、浮点或字符串），模型按原样保留，不做类型转换。
+
+网卡列表等对象数组在聚合接口（/api/bootstrap）中按列返回：每个字段一个数组，字段名只出现一次，
+JSON 和 MessagePack 都更小、编码更快。历史采样本来就是列式（每个指标一组 t/v 数组）。
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import BaseModel, Field
+
+# pmc 数据集中单个字段的取值
+PmcValue = Union[bool, int, float, str, None]
+
+NETWORK_INTERFACE_FIELDS = ["index", "name", "is_up", "mac", "ip", "kind", "virtual", "phc_index", "timestamping"]
+
+
+class TimeStatus(BaseModel):
+    master_offset: PmcValue = None
+    ingress_time: PmcValue = None
+    cumulativeScaledRateOffset: PmcValue = None
+    scaledLastGmPhaseChange: PmcValue = None
+    gmTimeBaseIndicator: PmcValue = None
+    lastGmPhaseChange: PmcValue = None
+    gmPresent: PmcValue = None
+    gmIdentity: PmcValue = None
+    responders: Dict[str, Dict[str, PmcValue]] = Field(default_factory=dict, description="以端口ID为键的全部应答")
+
+
+class PortStatus(BaseModel):
+    portIdentity: PmcValue = None
+    portState: PmcValue = None
+    logMinDelayReqInterval: PmcValue = None
+    peerMeanPathDelay: PmcValue = None
+    logAnnounceInterval: PmcValue = None
+    announceReceiptTimeout: PmcValue = None
+    logSyncInterval: PmcValue = None
+    delayMechanism: PmcValue = None
+    logMinPdelayReqInterval: PmcValue = None
+    versionNumber: PmcValue = None
+    responders: Dict[str, Dict[str, PmcValue]] = Field(default_factory=dict, description="以端口ID为键的全部应答")
+
+
+class CurrentData(BaseModel):
+    stepsRemoved: PmcValue = None
+    offsetFromMaster: PmcValue = None
+    meanPathDelay: PmcValue = None
+    responders: Dict[str, Dict[str, PmcValue]] = Field(default_factory=dict, description="以端口ID为键的全部应答")
+
+
+class TimeStatusResponse(TimeStatus):
+    success: bool = True
+
+
+class PortStatusResponse(PortStatus):
+    success: bool = True
+
+
+class CurrentDataResponse(CurrentData):
+    success: bool = True
+
+
+class PtpConfigResponse(BaseModel):
+    success: bool = True
+    config: Dict[str, str] = Field(..., description="配置文件的全局配置")
+
+
+class ServiceInterfacesResponse(BaseModel):
+    success: bool = True
+    interfaces: List[str]
+
+
+class ClockSource(BaseModel):
+    current_source: Optional[str] = None
+    last_update: Optional[str] = None
+    status: str
+    last_sync_age: Optional[float] = None
+
+
+class ClockSourceTransition(BaseModel):
+    seq: int
+    event: str
+    time: str
+    monotonic: float
+    source: Optional[str] = None
+    status: str
+
+
+class ClockSourceTransitionsResponse(BaseModel):
+    transitions: List[ClockSourceTransition]
+
+
+class InstanceSnapshot(BaseModel):
+    """单个PTP实例的配置、网卡和三类数据集，获取失败的项为null，错误在errors中"""
+    service: str
+    config_file: str
+    uds_path: str
+    domain: int
+    config: Optional[Dict[str, str]] = None
+    interfaces: List[str] = Field(default_factory=list)
+    time_status: Optional[TimeStatus] = None
+    port_status: Optional[PortStatus] = None
+    current_data: Optional[CurrentData] = None
+    errors: Dict[str, str] = Field(default_factory=dict)
+
+
+class NetworkInterfaceColumns(BaseModel):
+    """网卡列表的列式表示，第 i 个网卡的各字段为各数组的第 i 项"""
+    index: List[Optional[int]]
+    name: List[str]
+    is_up: List[bool]
+    mac: List[Optional[str]]
+    ip: List[Optional[str]]
+    kind: List[Optional[str]]
+    virtual: List[bool]
+    phc_index: List[int]
+    timestamping: List[Optional[Dict[str, Any]]]
+
+
+class SyncMode(BaseModel):
+    mode: str
+    phc2sys_running: bool
+
+
+class BootstrapResponse(BaseModel):
+    success: bool = True
+    network_interfaces: NetworkInterfaceColumns
+    sync_mode: SyncMode
+    clock_source: ClockSource
+    instances: Dict[str, InstanceSnapshot]
+    errors: Dict[str, str] = Field(default_factory=dict)
+
+
+class SystemSyncStatusResponse(BaseModel):
+    success: bool = True
+    mode: str
+    phc2sys_running: bool
+    clock_source: Optional[ClockSource] = None
+    lock_status: Optional[str] = None
+    instance: Optional[str] = None
+    mapped: bool = False
+    uds_path: Optional[str] = None
+    domain: Optional[int] = None
+    gmIdentity: PmcValue = None
+    gmPresent: PmcValue = None
+    portState: PmcValue = None
+    offsetFromMaster: PmcValue = None
+    meanPathDelay: PmcValue = None
+    errors: Dict[str, str] = Field(default_factory=dict)
+
+
+class HistorySeries(BaseModel):
+    t: List[float] = Field(..., description="时间戳（Unix秒）")
+    v: List[float] = Field(..., description="数值")
+
+
+class HistoryResponse(BaseModel):
+    success: bool = True
+    instance: str
+    now: float
+    series: Dict[str, HistorySeries]
+
+
+class PhcOffsetsResponse(BaseModel):
+    success: bool = True
+    interval: float
+    instances: Dict[str, Dict[str, Any]]
@@ -0,0 +1,199 @@
+"""
+phc2sys 时钟源状态
+
+由 phc2sys 日志驱动：选择时钟源（update）和每条 CLOCK_REALTIME phc offset（sync_seen）。
+所有超时判断使用单调时钟——phc2sys 会步进系统时间，wall-clock 间隔不可靠。
+
+watch() 作为后台任务运行，在截止时间到达的那一刻判定超时，而不是等到有人查询；
+超时后需要连续收到 recover_samples 次同步（相邻间隔都在截止时间内）才恢复，避免
+同步时断时续时状态来回跳变。每次状态转换（source_changed / failed / timeout /
+recovered）记录到有界日志，并立即推送给所有订阅者。
+
+多 worker 部署时只有 leader 运行状态机，其他 worker 通过 export()/load() 镜像 leader
+发布的状态（mirrored），不自行判定超时，新的转换记录同样推送给本进程的订阅者。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 超时后显示的时钟源
+NO_CLOCK_AVAILABLE = "noClockAvailable"
+
+
+class ClockSourceState:
+    """
+    时钟源状态机
+
+    Attributes:
+        version: 状态快照版本号，每次更新或转换时递增，用于生成ETag
+        transitions: 最近的状态转换记录
+        mirrored: 状态来自 leader 发布的快照，本地不判定超时
+    """
+
+    def __init__(self, deadline: float = 3.0, recover_samples: int = 3, log_size: int = 256):
+        self.deadline = deadline
+        self.recover_samples = recover_samples
+        self.current_source: Optional[str] = None
+        self.last_update: Optional[datetime] = None
+        self.is_failed: bool = False
+        self.timed_out: bool = False
+        # 最近一次同步的单调时钟时间
+        self.last_sync: Optional[float] = None
+        self.version: int = 0
+        self.transitions: Deque[Dict] = deque(maxlen=log_size)
+        self.mirrored = False
+        self._seq = 0
+        self._recover_count = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def status(self) -> str:
+        if self.timed_out:
+            return "timeout"
+        return "failed" if self.is_failed else "normal"
+
+    def _record(self, event: str):
+        """记录一次状态转换并推送给订阅者（调用方持有锁）"""
+        self.version += 1
+        self._seq += 1
+        entry = {
+            "seq": self._seq,
+            "event": event,
+            "time": datetime.now().isoformat(),
+            "monotonic": time.monotonic(),
+            "source": self.current_source,
+            "status": self.status,
+        }
+        self.transitions.append(entry)
+        logger.info("时钟源状态转换: %s (%s, %s)", event, self.current_source, entry["status"],
+                    extra={"event": event, "clock_source": self.current_source, "rate_limit": False})
+        self._notify(entry)
+
+    def _notify(self, entry: Dict):
+        for queue in self._subscribers:
+            if queue.full():
+                # 订阅者处理不过来时丢弃其最旧的一条，保证最新的转换能送达
+                queue.get_nowait()
+            queue.put_nowait(entry)
+
+    def _sync(self, now: float):
+        # 上一次同步已超过截止时间，说明同步曾中断，恢复计数重新开始
+        if self.last_sync is not None and now - self.last_sync > self.deadline:
+            self._recover_count = 0
+        self.last_sync = now
+        if self.timed_out:
+            self._recover_count += 1
+            if self._recover_count >= self.recover_samples:
+                self.timed_out = False
+                self._recover_count = 0
+                self._record("recovered")
+
+    def _check_deadline(self, now: float) -> float:
+        """到达截止时间时转入超时；返回距下一次需要检查的秒数"""
+        if self.last_sync is None:
+            return self.deadline
+        remaining = self.last_sync + self.deadline - now
+        if remaining > 0:
+            return remaining
+        if not self.timed_out:
+            self.timed_out = True
+            self._recover_count = 0
+            self._record("timeout")
+        return self.deadline
+
+    async def update(self, source: str, is_failed: bool = False):
+        """phc2sys 选择了时钟源；选择成功同时视为一次同步"""
+        async with self._lock:
+            previous_source, previous_failed = self.current_source, self.is_failed
+            self.version += 1
+            self.current_source = source
+            self.last_update = datetime.now()
+            self.is_failed = is_failed
+            if is_failed and not previous_failed:
+                self._record("failed")
+            elif source != previous_source:
+                self._record("source_changed")
+            elif previous_failed and not is_failed:
+                self._record("recovered")
+            if not is_failed:
+                self._sync(time.monotonic())
+
+    async def sync_seen(self) -> Optional[str]:
+        """
+        收到一条同步日志
+
+        Returns:
+            str: 当前时钟源
+        """
+        async with self._lock:
+            if self.is_failed:
+                self.is_failed = False
+                self._record("recovered")
+            self._sync(time.monotonic())
+            return self.current_source
+
+    async def get_state(self) -> Dict:
+        async with self._lock:
+            now = time.monotonic()
+            if not self.mirrored:
+                self._check_deadline(now)
+            return {
+                "current_source": NO_CLOCK_AVAILABLE if self.timed_out else self.current_source,
+                "last_update": self.last_update.isoformat() if self.last_update else None,
+                "status": self.status,
+                "last_sync_age": round(now - self.last_sync, 3) if self.last_sync is not None else None,
+            }
+
+    def export(self) -> Dict:
+        """导出完整状态供其他 worker 镜像；last_sync 为单调时钟，同一台机器上各进程通用"""
+        return {
+            "current_source": self.current_source,
+            "last_update": self.last_update.isoformat() if self.last_update else None,
+            "is_failed": self.is_failed,
+            "timed_out": self.timed_out,
+            "last_sync": self.last_sync,
+            "version": self.version,
+            "transitions": list(self.transitions),
+        }
+
+    async def load(self, data: Dict):
+        """采用 export() 导出的状态，序号比本地新的转换记录推送给订阅者"""
+        async with self._lock:
+            self.current_source = data["current_source"]
+            self.last_update = datetime.fromisoformat(data["last_update"]) if data["last_update"] else None
+            self.is_failed = data["is_failed"]
+            self.timed_out = data["timed_out"]
+            self.last_sync = data["last_sync"]
+            self.version = data["version"]
+            self._recover_count = 0
+            for entry in data["transitions"]:
+                if entry["seq"] > self._seq:
+                    self._seq = entry["seq"]
+                    self.transitions.append(entry)
+                    self._notify(entry)
+
+    def get_transitions(self, since: int = 0) -> List[Dict]:
+        """返回序号大于 since 的转换记录"""
+        return [entry for entry in self.transitions if entry["seq"] > since]
+
+    def subscribe(self, maxsize: int = 100) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def watch(self):
+        """后台看门狗：睡到截止时间再检查，有新的同步时截止时间自然后移"""
+        while True:
+            async with self._lock:
+                remaining = self._check_deadline(time.monotonic())
+            await asyncio.sleep(remaining)
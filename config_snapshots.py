@@ -0,0 +1,294 @@
+"""
+受管理文件集合的内容寻址快照
+
+每次通过接口修改配置后，把全部受管理的文件（各 ptp4l 配置文件、unit 文件、drop-in 和环境文件）
+记录为一个快照：
+
+- objects/<sha256>: 文件内容，按内容哈希存放，相同内容只存一份
+- manifests/<id>.json: 快照清单 {路径: 内容哈希}，文件不存在时为 null；id 为清单本身的哈希，
+  内容完全相同的两次记录得到同一个 id
+- index.jsonl: 按时间追加的快照记录 {seq, id, time, reason}，与最近一条的 id 相同时不追加（去重）
+
+回滚时先把要恢复的文件全部写入同目录下的临时文件并 fsync，全部成功后才逐个 rename 覆盖、
+删除快照中不存在的文件，任何一个文件准备失败都不会修改任何文件；rename 阶段失败时抛出
+PartialRestore，其中列出已经恢复的文件。返回实际变化的文件，调用方只重启这些文件所属的 unit。多个 worker 写同一个目录时，记录和回滚用 index 文件的 flock 串行化。
+"""
+
+import contextlib
+import difflib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 清单中表示文件不存在
+ABSENT = None
+# 快照引用的最短前缀
+MIN_PREFIX = 6
+
+
+class SnapshotNotFound(KeyError):
+    """快照不存在或前缀不唯一"""
+
+
+class PartialRestore(OSError):
+    """
+    回滚在替换阶段失败，部分文件已经恢复
+
+    Attributes:
+        applied: 已恢复为快照内容的文件（其余文件未被修改）
+    """
+
+    def __init__(self, error: OSError, applied: List[str]):
+        super().__init__(*error.args)
+        self.applied = applied
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_state(data: Optional[bytes]) -> Optional[str]:
+    """清单中记录的文件状态: 内容哈希，不存在时为 ABSENT"""
+    return ABSENT if data is None else content_hash(data)
+
+
+def read_file(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+class SnapshotStore:
+    """
+    配置快照库
+
+    Attributes:
+        files: 受管理的文件路径 -> 所属 unit
+    """
+
+    def __init__(self, root: str, files: Dict[str, str]):
+        self.root = root
+        self.files = files
+        self._objects = os.path.join(root, "objects")
+        self._manifests = os.path.join(root, "manifests")
+        self._index = os.path.join(root, "index.jsonl")
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(self._index, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _write_once(self, directory: str, name: str, data: bytes):
+        """内容寻址的对象已存在时不再写入"""
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".", dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def current(self) -> Dict[str, Optional[bytes]]:
+        """受管理文件的当前内容，不存在的为None"""
+        return {path: read_file(path) for path in sorted(self.files)}
+
+    def records(self) -> List[Dict]:
+        """全部快照记录，按时间从旧到新"""
+        try:
+            with open(self._index, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def capture(self, reason: str) -> Tuple[Dict, bool]:
+        """
+        记录受管理文件的当前内容
+
+        Returns:
+            tuple: (快照记录, 是否新增了记录)；与最近一次快照完全相同时返回最近的记录和False
+
+        Raises:
+            OSError: 快照目录无法写入
+        """
+        with self._locked():
+            manifest = {}
+            for path, data in self.current().items():
+                manifest[path] = file_state(data)
+                if data is not None:
+                    self._write_once(self._objects, manifest[path], data)
+            encoded = json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode()
+            snapshot_id = content_hash(encoded)
+            records = self.records()
+            if records and records[-1]["id"] == snapshot_id:
+                return records[-1], False
+            self._write_once(self._manifests, f"{snapshot_id}.json", encoded)
+            record = {"seq": records[-1]["seq"] + 1 if records else 1, "id": snapshot_id,
+                      "time": time.time(), "reason": reason}
+            with open(self._index, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            logger.info("记录配置快照 #%s %s（%s）", record["seq"], snapshot_id[:12], reason)
+            return record, True
+
+    def resolve(self, ref: str) -> str:
+        """
+        把完整 id 或唯一前缀（至少 MIN_PREFIX 位）解析为快照 id
+
+        Raises:
+            SnapshotNotFound: 不存在或前缀不唯一
+        """
+        if len(ref) < MIN_PREFIX:
+            raise SnapshotNotFound(ref)
+        ids = {record["id"] for record in self.records() if record["id"].startswith(ref)}
+        if len(ids) != 1:
+            raise SnapshotNotFound(ref)
+        return ids.pop()
+
+    def manifest(self, snapshot_id: str) -> Dict[str, Optional[str]]:
+        with open(os.path.join(self._manifests, f"{snapshot_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def content(self, digest: Optional[str]) -> Optional[bytes]:
+        if digest is ABSENT:
+            return None
+        with open(os.path.join(self._objects, digest), "rb") as f:
+            return f.read()
+
+    def history(self, limit: int = 50) -> List[Dict]:
+        """最近的快照记录（从新到旧），附带与上一个快照相比变化的文件"""
+        records = self.records()
+        result = []
+        for index in range(len(records) - 1, max(len(records) - 1 - limit, -1), -1):
+            record = dict(records[index])
+            manifest = self.manifest(record["id"])
+            previous = self.manifest(records[index - 1]["id"]) if index > 0 else {}
+            record["changed"] = sorted(path for path in manifest if manifest[path] != previous.get(path, ABSENT))
+            result.append(record)
+        return result
+
+    def diff(self, old_id: str, new_id: Optional[str] = None, context: int = 3) -> List[Dict]:
+        """
+        两个快照之间（new_id 为None时与当前文件）变化的文件及统一格式差异
+
+        Returns:
+            list: [{"path", "unit", "status": added/removed/modified, "diff"}]
+        """
+        old = self.manifest(old_id)
+        if new_id is None:
+            new = {path: file_state(data) for path, data in self.current().items()}
+            load_new = read_file
+        else:
+            new = self.manifest(new_id)
+            load_new = lambda path: self.content(new[path])
+        changes = []
+        for path in sorted(set(old) | set(new)):
+            before, after = old.get(path, ABSENT), new.get(path, ABSENT)
+            if before == after:
+                continue
+            old_text = (self.content(before) or b"").decode("utf-8", "replace").splitlines(keepends=True)
+            new_text = (load_new(path) or b"").decode("utf-8", "replace").splitlines(keepends=True)
+            changes.append({
+                "path": path,
+                "unit": self.files.get(path),
+                "status": "added" if before is ABSENT else "removed" if after is ABSENT else "modified",
+                "diff": "".join(difflib.unified_diff(old_text, new_text, f"a{path}", f"b{path}", n=context)),
+            })
+        return changes
+
+    def restore(self, snapshot_id: str) -> List[str]:
+        """
+        把受管理的文件恢复为快照中的内容
+
+        先在各文件所在目录写好临时文件，全部成功后再 rename 覆盖和删除；准备阶段失败时不修改任何文件。
+
+        Returns:
+            list: 实际变化的文件路径
+
+        Raises:
+            PartialRestore: 替换阶段失败，部分文件已恢复（见 applied）
+            OSError: 准备阶段文件无法写入，已清理临时文件，没有修改任何文件
+        """
+        with self._locked():
+            manifest = self.manifest(snapshot_id)
+            current = self.current()
+            # 快照之后才加入管理的文件不在清单中，保持不动
+            changed = [path for path in sorted(manifest) if manifest[path] != file_state(current.get(path))]
+            staged: List[Tuple[str, Optional[str]]] = []
+            try:
+                for path in changed:
+                    digest = manifest.get(path, ABSENT)
+                    staged.append((path, None if digest is ABSENT else self._stage(path, self.content(digest))))
+            except BaseException:
+                for _, tmp_path in staged:
+                    if tmp_path:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.unlink(tmp_path)
+                raise
+            applied: List[str] = []
+            try:
+                for path, tmp_path in staged:
+                    if tmp_path is None:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.unlink(path)
+                    else:
+                        os.replace(tmp_path, path)
+                    applied.append(path)
+                for directory in {os.path.dirname(path) for path in changed if os.path.isdir(os.path.dirname(path))}:
+                    dir_fd = os.open(directory, os.O_RDONLY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
+            except OSError as e:
+                for path, tmp_path in staged[len(applied):]:
+                    if tmp_path:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.unlink(tmp_path)
+                logger.error("恢复配置快照 %s 中途失败，已恢复的文件: %s", snapshot_id[:12], applied)
+                raise PartialRestore(e, applied) from e
+            logger.info("恢复配置快照 %s，变化的文件: %s", snapshot_id[:12], changed)
+            return changed
+
+    @staticmethod
+    def _stage(path: str, data: bytes) -> str:
+        """在目标文件所在目录写好临时文件，沿用原文件的权限"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o644
+        fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, mode)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+        return tmp_path
+
+    def units(self, paths: List[str]) -> List[str]:
+        """文件所属的 unit（去重，保持顺序）"""
+        return list(dict.fromkeys(self.files[path] for path in paths if path in self.files))
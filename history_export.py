@@ -0,0 +1,170 @@
+"""
+历史采样批量导出
+
+把一个来源（PTP实例）若干指标在时间范围内的采样按块从 SampleStore 读出并编码，
+生成器逐块产出字节，配合流式响应发送：无论时间范围多大，进程内只保留一块数据。
+
+- CSV: 长表格式 time,metric,value，按指标依次输出，每个指标内按时间排序
+- Arrow IPC 流: 同样的三列（metric 为字典编码），每块一个 record batch；需要安装 pyarrow
+
+分块以上一块最后一个时间戳为下一块的起点（含该时间戳，跳过上一块已输出的同一时间戳的点），
+时间戳相同的点不会在块边界丢失；读取期间环形缓冲区被覆盖也不会重复或错位，只会缺少导出过程中
+被覆盖掉的最旧的点。读取与写入冲突时稍后重试，仍失败则抛出 ReadConflict 中断导出，不会静默截断。
+gzip_chunks 对任意一种输出增量压缩。
+"""
+
+import logging
+import math
+import time
+import zlib
+from bisect import bisect_left
+from typing import Iterable, Iterator, List
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+from sample_store import ReadConflict, SampleStore
+
+logger = logging.getLogger(__name__)
+
+# 每块读取的点数
+CHUNK_POINTS = 8192
+# 读取与写入冲突时的重试次数和间隔（秒）
+CONFLICT_RETRIES = 5
+CONFLICT_BACKOFF = 0.05
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def _query_retrying(store: SampleStore, source: str, metric: str, since: float, end: float, limit: int) -> tuple:
+    """读取一块，与写入冲突时退避重试（导出在线程池中执行，可以阻塞）"""
+    for attempt in range(CONFLICT_RETRIES):
+        try:
+            return store.query(source, metric, since, end, limit)
+        except ReadConflict:
+            if attempt == CONFLICT_RETRIES - 1:
+                logger.error("导出历史采样 %s/%s 时读取持续与写入冲突，中断导出", source, metric)
+                raise
+            time.sleep(CONFLICT_BACKOFF * (attempt + 1))
+
+
+def iter_chunks(store: SampleStore, source: str, metric: str, start: float = -math.inf, end: float = math.inf,
+                chunk_points: int = CHUNK_POINTS) -> Iterator[tuple]:
+    """
+    逐块读取 start < t <= end 的点
+
+    Yields:
+        tuple: (时间戳列表, 数值列表)，每块最多 chunk_points 个点
+
+    Raises:
+        ReadConflict: 重试后读取仍与写入冲突
+    """
+    since = start
+    # 已输出的、时间戳等于最后输出时间戳的点数，下一块从该时间戳（含）开始读并跳过它们
+    skip, last = 0, None
+    while True:
+        times, values = _query_retrying(store, source, metric, since, end, chunk_points + skip)
+        complete = len(times) < chunk_points + skip
+        times, values = times[skip:], values[skip:]
+        if not times:
+            return
+        yield times, values
+        if complete:
+            return
+        skip = (skip if times[-1] == last else 0) + len(times) - bisect_left(times, times[-1])
+        last = times[-1]
+        since = math.nextafter(last, -math.inf)
+
+
+def format_value(value: float) -> str:
+    """整数值（纳秒偏差等）不带小数点输出"""
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def csv_chunks(store: SampleStore, source: str, metrics: List[str], start: float = -math.inf,
+               end: float = math.inf, chunk_points: int = CHUNK_POINTS) -> Iterator[bytes]:
+    """以CSV输出，第一块为表头"""
+    yield b"time,metric,value\n"
+    for metric in metrics:
+        for times, values in iter_chunks(store, source, metric, start, end, chunk_points):
+            yield "".join(f"{t:.6f},{metric},{format_value(v)}\n" for t, v in zip(times, values)).encode()
+
+
+class _BufferSink:
+    """收集 IPC 写入的字节，每写完一个 record batch 取走一次"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def arrow_chunks(store: SampleStore, source: str, metrics: List[str], start: float = -math.inf,
+                 end: float = math.inf, chunk_points: int = CHUNK_POINTS) -> Iterator[bytes]:
+    """以 Arrow IPC 流格式输出（需要 pyarrow，由 export_chunks 检查）"""
+    metric_type = pyarrow.dictionary(pyarrow.int16(), pyarrow.string())
+    schema = pyarrow.schema([("time", pyarrow.float64()), ("metric", metric_type), ("value", pyarrow.float64())])
+    sink = _BufferSink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        # 所有块共用同一个指标字典，IPC 流中只发送一次
+        dictionary = pyarrow.array(metrics, pyarrow.string())
+        for index, metric in enumerate(metrics):
+            for times, values in iter_chunks(store, source, metric, start, end, chunk_points):
+                indices = pyarrow.array([index] * len(times), pyarrow.int16())
+                writer.write_batch(pyarrow.record_batch([
+                    pyarrow.array(times, pyarrow.float64()),
+                    pyarrow.DictionaryArray.from_arrays(indices, dictionary),
+                    pyarrow.array(values, pyarrow.float64()),
+                ], schema=schema))
+                yield sink.drain()
+    yield sink.drain()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """对逐块产出的字节做增量 gzip 压缩"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(store: SampleStore, source: str, metrics: List[str], fmt: str, start: float = -math.inf,
+                  end: float = math.inf, compress: bool = False,
+                  chunk_points: int = CHUNK_POINTS) -> Iterator[bytes]:
+    """
+    按格式导出，compress 为True时gzip压缩
+
+    Raises:
+        ValueError: 不支持的格式
+        RuntimeError: Arrow 格式但没有安装 pyarrow
+    """
+    if fmt == "csv":
+        chunks = csv_chunks(store, source, metrics, start, end, chunk_points)
+    elif fmt == "arrow":
+        if pyarrow is None:
+            raise RuntimeError("Arrow 格式需要安装 pyarrow")
+        chunks = arrow_chunks(store, source, metrics, start, end, chunk_points)
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,231 @@
+"""
+频率趋势拟合与守时（holdover）误差预测
+
+时钟源丢失后，phc2sys 不再调整系统时钟，时钟保持最后一次的频率调整量自由运行；
+ptp4l 的 PHC 同样保持最后的频率。守时期间的时间误差由两部分决定：
+
+- 频率偏差: 振荡器实际需要的频率修正与保持的修正之差（ppb，1 ppb 每秒累积 1 ns）
+- 频率漂移: 振荡器频率随温度、老化的线性变化（ppb/s），误差按时长的平方增长
+
+在滑动窗口内对 (时间, 频率) 做最小二乘直线拟合，得到当前频率和漂移率，预测守时
+τ 秒后的误差 TE(τ) = x0 + (f - f_held)·τ + ½·D·τ²，并用拟合残差的均方根 σ 给出
+误差界 |x0| + |f - f_held|·τ + ½·|D|·τ² + σ·τ。
+
+拟合所需的累加和随样本进出窗口增减，每个样本 O(1)。时间以窗口内的一个基准点为原点，
+基准点离最新样本太远时（超过 4 个窗口）以窗口内最早的样本为新原点重新累加，
+避免大时间值下 Σt² 的相消误差；重新累加的代价分摊到之间的样本上仍为 O(1)。
+时间一律使用单调时钟——phc2sys 会步进系统时间。
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认给出预测的守时时长（秒）
+DEFAULT_HORIZONS = (1, 10, 60, 300, 900, 3600, 14400, 86400)
+
+
+def rate_offset_to_ppb(value) -> Optional[float]:
+    """
+    pmc 输出的 cumulativeScaledRateOffset 换算为 ppb
+
+    ptp4l 内部按 (rateRatio - 1) * 2^41 保存，pmc 打印前已除以 2^41（%+.9f），
+    pmc_parser 解析得到的是 rateRatio - 1 本身。非数值（含布尔）返回 None。
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value * 1e9
+
+
+def record_ptp4l_frequency(model: "HoldoverModel", t: float, snapshot: Dict) -> bool:
+    """
+    端口处于SLAVE且GM存在时，把 cumulativeScaledRateOffset 作为PHC相对GM的频率样本加入模型
+
+    Args:
+        t: 单调时间（秒）
+        snapshot: 实例快照，含 time_status、port_status、current_data（dataset_fields 的返回格式，可为None）
+
+    Returns:
+        bool: 是否加入了样本
+    """
+    time_status = snapshot.get("time_status") or {}
+    port_status = snapshot.get("port_status") or {}
+    current_data = snapshot.get("current_data") or {}
+    freq = rate_offset_to_ppb(time_status.get("cumulativeScaledRateOffset"))
+    if freq is None or time_status.get("gmPresent") is not True or port_status.get("portState") != "SLAVE":
+        return False
+    model.add(t, freq, current_data.get("offsetFromMaster"), reference=time_status.get("gmIdentity"))
+    return True
+
+
+class FrequencyTrend:
+    """
+    滑动窗口内频率对时间的增量最小二乘直线拟合
+
+    Attributes:
+        window: 窗口长度（秒），早于最新样本 window 秒的样本移出窗口
+        max_samples: 窗口内最多保留的样本数
+        min_span: 窗口内样本的时间跨度不足该值（秒）时不给出拟合，避免积压日志集中到达时算出失真的漂移率
+    """
+
+    def __init__(self, window: float = 600.0, max_samples: int = 3600, min_span: float = 10.0):
+        self.window = window
+        self.max_samples = max_samples
+        self.min_span = min_span
+        self._samples: Deque[Tuple[float, float]] = deque()
+        self.reset()
+
+    def reset(self):
+        self._samples.clear()
+        self._origin: Optional[float] = None
+        self._st = self._sy = self._stt = self._sty = self._syy = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def _accumulate(self, t: float, y: float, sign: int):
+        t -= self._origin
+        self._st += sign * t
+        self._sy += sign * y
+        self._stt += sign * t * t
+        self._sty += sign * t * y
+        self._syy += sign * y * y
+
+    def _rebase(self):
+        """以窗口内最早的样本为原点重新累加"""
+        self._origin = self._samples[0][0]
+        self._st = self._sy = self._stt = self._sty = self._syy = 0.0
+        for t, y in self._samples:
+            self._accumulate(t, y, 1)
+
+    def add(self, t: float, freq: float):
+        """
+        加入一个样本
+
+        Args:
+            t: 单调时钟时间（秒），需单调不减
+            freq: 频率（ppb）
+        """
+        if self._origin is None:
+            self._origin = t
+        self._samples.append((t, freq))
+        self._accumulate(t, freq, 1)
+        while self._samples and (len(self._samples) > self.max_samples or self._samples[0][0] < t - self.window):
+            old_t, old_y = self._samples.popleft()
+            self._accumulate(old_t, old_y, -1)
+        if t - self._origin > 4 * self.window:
+            self._rebase()
+
+    def fit(self) -> Optional[Dict]:
+        """
+        当前窗口的拟合结果，样本不足 3 个或时间跨度不足 min_span 时返回None
+
+        Returns:
+            dict: frequency（最新样本时刻的拟合频率，ppb）、drift（ppb/s）、residual（残差均方根，ppb）、
+                samples、span（窗口时间跨度，秒）
+        """
+        n = len(self._samples)
+        if n < 3:
+            return None
+        denominator = n * self._stt - self._st * self._st
+        span = self._samples[-1][0] - self._samples[0][0]
+        if span < self.min_span or span <= 0 or denominator <= 0:
+            return None
+        slope = (n * self._sty - self._st * self._sy) / denominator
+        intercept = (self._sy - slope * self._st) / n
+        # 残差平方和 = Σy² - a·Σy - b·Σty，相消误差可能使其略小于0
+        sse = self._syy - intercept * self._sy - slope * self._sty
+        residual = math.sqrt(max(sse, 0.0) / (n - 2))
+        latest = self._samples[-1][0] - self._origin
+        return {
+            "frequency": intercept + slope * latest,
+            "drift": slope,
+            "residual": residual,
+            "samples": n,
+            "span": span,
+        }
+
+
+class HoldoverModel:
+    """
+    一个时钟（phc2sys 跟踪的系统时钟或 ptp4l 的 PHC）的守时误差模型
+
+    Attributes:
+        trend: 频率趋势拟合
+        held_frequency: 最近一次的频率调整量，守时期间保持该值（ppb）
+        offset: 最近一次的时间偏差，守时开始时的初始误差（ns）
+        last_sample: 最近一次样本的单调时钟时间
+        reference: 频率所相对的参考（时钟源网卡或GM），参考变化时之前的历史作废
+    """
+
+    def __init__(self, window: float = 600.0, max_samples: int = 3600):
+        self.trend = FrequencyTrend(window, max_samples)
+        self.held_frequency: Optional[float] = None
+        self.offset: Optional[float] = None
+        self.last_sample: Optional[float] = None
+        self.reference: Optional[str] = None
+
+    def add(self, t: float, freq: float, offset: Optional[float] = None, reference: Optional[str] = None):
+        """加入一个锁定状态下的样本（单调时钟时间、频率 ppb、时间偏差 ns、参考）"""
+        if reference != self.reference:
+            if self.reference is not None:
+                logger.info("频率参考由 %s 变为 %s，重新拟合", self.reference, reference)
+            self.reset()
+            self.reference = reference
+        self.trend.add(t, freq)
+        self.held_frequency = freq
+        if offset is not None:
+            self.offset = offset
+        self.last_sample = t
+
+    def reset(self):
+        """时钟被步进、伺服失锁或时钟源切换后，之前的频率历史不再适用"""
+        self.trend.reset()
+        self.held_frequency = self.offset = self.last_sample = None
+        self.reference = None
+
+    def snapshot(self, horizons: Sequence[float] = DEFAULT_HORIZONS) -> Dict:
+        """
+        拟合结果及守时误差预测
+
+        Args:
+            horizons: 给出预测的守时时长（秒）
+
+        Returns:
+            dict: reference、fit（见 FrequencyTrend.fit，样本不足时为None）、held_frequency、offset、last_sample、
+                predictions（[{"holdover": 秒, "error": 预测误差 ns, "bound": 误差界 ns}, ...]）
+        """
+        fit = self.trend.fit()
+        return {
+            "reference": self.reference,
+            "fit": fit,
+            "held_frequency": self.held_frequency,
+            "offset": self.offset,
+            "last_sample": self.last_sample,
+            "predictions": [predict(fit, self.held_frequency, self.offset, tau) for tau in horizons] if fit else [],
+        }
+
+
+def predict(fit: Dict, held_frequency: float, offset: Optional[float], tau: float) -> Dict:
+    """
+    守时 tau 秒后的时间误差
+
+    Returns:
+        dict: holdover（秒）、error（预测误差，ns）、bound（误差界，ns）
+    """
+    x0 = offset or 0.0
+    frequency_error = fit["frequency"] - held_frequency
+    error = x0 + frequency_error * tau + 0.5 * fit["drift"] * tau * tau
+    bound = abs(x0) + abs(frequency_error) * tau + 0.5 * abs(fit["drift"]) * tau * tau + fit["residual"] * tau
+    return {"holdover": tau, "error": round(error, 1), "bound": round(bound, 1)}
+
+
+def holdover_horizons(text: str) -> List[float]:
+    """解析逗号分隔的守时时长（秒）"""
+    horizons = sorted(float(item) for item in text.split(",") if item.strip())
+    if not horizons or horizons[0] <= 0:
+        raise ValueError("守时时长必须为正数")
+    return horizons
@@ -0,0 +1,177 @@
+"""
+服务日志的流式读取
+
+启动 `journalctl -o json` 并逐行读取，每条日志解析后立即交给调用方（接口以 NDJSON
+分块返回），不在内存中缓存整页日志；读够一页后直接结束 journalctl 进程。翻页使用
+journal 游标：
+
+- before=<游标>: 比游标更早的日志，从新到旧（`--after-cursor` 配合 `--reverse`，
+  journalctl 在反向模式下从游标往前跳过游标本身）
+- after=<游标>: 比游标更新的日志，从旧到新
+- 都不提供: 最新的一页，从新到旧
+
+优先级和时间范围由 journalctl 过滤，子串和正则在这里对 MESSAGE 过滤。
+"""
+
+import asyncio
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+
+PRIORITY_NAMES = ["emerg", "alert", "crit", "err", "warning", "notice", "info", "debug"]
+# 单条日志的最大长度（asyncio StreamReader 的行缓冲上限）
+MAX_LINE_BYTES = 1 << 20
+
+
+def parse_priority(value: str) -> str:
+    """
+    校验优先级：数字或名称，也可以是 "err..warning" 形式的范围
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    parts = value.split("..")
+    if len(parts) > 2:
+        raise ValueError(f"无效的优先级: {value}")
+    for part in parts:
+        if part not in PRIORITY_NAMES and not (part.isdigit() and int(part) < len(PRIORITY_NAMES)):
+            raise ValueError(f"无效的优先级: {value}")
+    return value
+
+
+def parse_time(value: str) -> str:
+    """
+    把 ISO 8601 时间或 Unix 秒转换为 journalctl 的 "@秒" 格式（无时区时按本地时间）
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    try:
+        timestamp = float(value)
+    except ValueError:
+        try:
+            timestamp = datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            raise ValueError(f"无效的时间: {value}") from None
+    return f"@{timestamp:.6f}"
+
+
+def build_command(unit: str, before: Optional[str] = None, after: Optional[str] = None,
+                  since: Optional[str] = None, until: Optional[str] = None,
+                  priority: Optional[str] = None, follow: bool = False, lines: int = 0) -> List[str]:
+    """
+    构造 journalctl 命令行
+
+    Args:
+        lines: 跟随模式下没有游标和起始时间时先输出的最近日志条数
+    """
+    command = ["journalctl", "-u", unit, "-o", "json", "--no-pager"]
+    if before:
+        command += [f"--after-cursor={before}", "--reverse"]
+    elif after:
+        command.append(f"--after-cursor={after}")
+    elif follow and not since:
+        command.append(f"--lines={lines}")
+    elif not since:
+        command.append("--reverse")
+    if since:
+        command.append(f"--since={since}")
+    if until:
+        command.append(f"--until={until}")
+    if priority:
+        command.append(f"--priority={priority}")
+    if follow:
+        command.append("--follow")
+    return command
+
+
+def _text(value) -> str:
+    # 非UTF-8的字段在JSON输出中是字节数组
+    if isinstance(value, list):
+        return bytes(value).decode(errors="replace")
+    return value if value is not None else ""
+
+
+def parse_entry(line: bytes) -> Optional[Dict]:
+    """把一行 journalctl JSON 输出转换为接口返回的日志条目"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    try:
+        timestamp = int(record["__REALTIME_TIMESTAMP"]) / 1e6
+    except (KeyError, ValueError):
+        timestamp = None
+    priority = record.get("PRIORITY")
+    return {
+        "type": "entry",
+        "cursor": record.get("__CURSOR"),
+        "time": timestamp,
+        "priority": int(priority) if isinstance(priority, str) and priority.isdigit() else None,
+        "identifier": _text(record.get("SYSLOG_IDENTIFIER")) or None,
+        "pid": _text(record.get("_PID")) or None,
+        "message": _text(record.get("MESSAGE")),
+    }
+
+
+class MessageFilter:
+    """按子串（不区分大小写）和正则过滤日志内容"""
+
+    def __init__(self, contains: Optional[str] = None, regex: Optional[str] = None):
+        self.contains = contains.lower() if contains else None
+        # 无效的正则在这里抛出 re.error，由调用方转换为400
+        self.pattern = re.compile(regex) if regex else None
+
+    def __call__(self, entry: Dict) -> bool:
+        message = entry["message"]
+        if self.contains and self.contains not in message.lower():
+            return False
+        if self.pattern and not self.pattern.search(message):
+            return False
+        return True
+
+
+async def stream_entries(command: List[str], limit: Optional[int],
+                         matches=lambda entry: True) -> AsyncIterator[Dict]:
+    """
+    运行 journalctl 并逐条产出匹配的日志，最后产出一条结束记录
+
+    结束记录: {"type": "end", "count", "cursor", "more", "error"}。cursor 为最后一条
+    被检查过的日志（不一定匹配过滤条件），下一页从这里继续即可，不会重复扫描。
+
+    Args:
+        limit: 最多产出的条数，None 表示不限（跟随模式）
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, limit=MAX_LINE_BYTES
+    )
+    count = 0
+    cursor = None
+    more = False
+    try:
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            entry = parse_entry(line)
+            if entry is None:
+                continue
+            if limit is not None and count >= limit:
+                # 已读够一页，多读到的这一条说明还有更多
+                more = True
+                break
+            cursor = entry["cursor"] or cursor
+            if matches(entry):
+                count += 1
+                yield entry
+        error = None
+        if not more:
+            await process.wait()
+            if process.returncode:
+                error = (await process.stderr.read()).decode(errors="replace").strip() or f"journalctl退出码{process.returncode}"
+        yield {"type": "end", "count": count, "cursor": cursor, "more": more, "error": error}
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
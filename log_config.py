@@ -0,0 +1,186 @@
+"""
+日志配置
+
+所有日志先经过限速过滤器，再由 QueueHandler 投递到队列，由后台线程中的
+QueueListener 完成格式化和输出，事件循环线程只付出一次入队的代价。
+
+环境变量:
+    PTPCONF_LOG_LEVEL: 根日志级别，默认 INFO
+    PTPCONF_LOG_LEVELS: 按子系统（logger 名称）设置级别，如
+        "ptpconfigurator.journal=WARNING,ptp_status=DEBUG"
+    PTPCONF_LOG_FORMAT: text（默认）或 json（结构化输出）
+    PTPCONF_LOG_RATE_WINDOW: 限速窗口秒数，默认 60，0 表示不限速
+    PTPCONF_LOG_RATE_BURST: 每个窗口内同一条日志（WARNING 及以上按格式化后的消息区分）最多输出的次数，默认 5
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord 的标准属性，JSON 输出时其余属性视为结构化字段
+_STANDARD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message", "asctime", "suppressed", "rate_limit"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    对重复日志限速
+
+    以 (logger名, 级别, 消息) 为键，每个窗口内最多放行 burst 条，其余丢弃并计数；
+    下一个窗口放行的第一条记录上带有 suppressed 属性，由格式化器输出被抑制的条数。
+    INFO 及以下的消息取未格式化的模板：使用惰性格式化（% 占位符）时同一调用点的模板保持不变，
+    参数不同的重复日志也归为一类。WARNING 及以上取格式化后的消息，同一调用点报告的不同事件
+    （如不同规则、不同实例的告警）各自计数，只有完全相同的重复才被抑制。
+    本身就是低频状态变化的日志（告警触发、时钟源转换）以 extra={"rate_limit": False} 记录，不限速。
+    """
+
+    def __init__(self, window: float = 60.0, burst: int = 5):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self._state: Dict[Tuple[str, int, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0 or not getattr(record, "rate_limit", True):
+            return True
+        message = record.getMessage() if record.levelno >= logging.WARNING else str(record.msg)
+        key = (record.name, record.levelno, message)
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._state[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._state) > 4096:
+                    self._prune(now)
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+    def _prune(self, now: float):
+        for key in [k for k, v in self._state.items() if now - v[0] >= self.window and not v[2]]:
+            del self._state[key]
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，附带被抑制的重复日志条数"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" [已抑制{suppressed}条重复日志]"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化JSON格式，一条日志一行，extra 中的字段原样输出"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "subsystem": record.name,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    把日志记录原样入队
+
+    标准 QueueHandler 在入队前会格式化消息，这里把格式化推迟到后台线程。
+    记录只在进程内传递，不需要为序列化提前合并参数。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """解析 "name=LEVEL,name2=LEVEL" 形式的子系统级别配置"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    levels: Optional[str] = None,
+    fmt: Optional[str] = None,
+    rate_window: Optional[float] = None,
+    rate_burst: Optional[int] = None,
+) -> logging.handlers.QueueListener:
+    """
+    配置基于队列的日志管道，参数为空时从环境变量读取
+
+    Returns:
+        QueueListener: 后台输出线程，进程退出时自动停止
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = level or os.environ.get("PTPCONF_LOG_LEVEL", "INFO")
+    levels = levels if levels is not None else os.environ.get("PTPCONF_LOG_LEVELS", "")
+    fmt = fmt or os.environ.get("PTPCONF_LOG_FORMAT", "text")
+    if rate_window is None:
+        rate_window = float(os.environ.get("PTPCONF_LOG_RATE_WINDOW", "60"))
+    if rate_burst is None:
+        rate_burst = int(os.environ.get("PTPCONF_LOG_RATE_BURST", "5"))
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_window, rate_burst))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+    for name, subsystem_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """停止后台输出线程并输出队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -8,25 +8,126 @@ import pwd
 import grp
 import logging
 import subprocess
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+import hashlib
+import math
+import time
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 import asyncio
-from datetime import datetime
 from contextlib import asynccontextmanager
+from ptp_status import PmcCommandError, query_dataset
+from ptp_topology import TopologyDiscovery
+from holdover import HoldoverModel, holdover_horizons, predict
+from holdover import record_ptp4l_frequency as _record_ptp4l_frequency
+from alerts import DEFAULT_RULES, AlertEngine, AlertNotifier, AlertRule, FileSink, WebhookSink, instance_alert_values, load_rules
+from log_config import setup_logging
+from sample_store import MappedSampleStore, ReadConflict, SampleStore
+from history_export import FORMATS, export_chunks
+from config_snapshots import PartialRestore, SnapshotNotFound, SnapshotStore
+from ptp_instances import (
+    CURRENT_DATA_SET_FIELDS,
+    DEFAULT_SNAPSHOT_DIR,
+    PORT_DATA_SET_FIELDS,
+    PTP_INSTANCES,
+    TIME_STATUS_FIELDS,
+    apply_config_values,
+    config_domain,
+    dataset_fields,
+    load_ptp_config,
+    managed_units,
+    run_systemctl,
+    snapshot_files,
+    update_config_file,
+)
+from ptp_instances import update_phc2sys_domain as _update_phc2sys_domain
+from netlink_inventory import InterfaceInventory
+from ts_info import TsInfoCache
+from phc_sampler import PhcSampler
+from clock_source import ClockSourceState
+from reload_scheduler import ReloadError, ReloadScheduler
+from unit_env import DEFAULT_ENV_DIR
+from journal_stream import MessageFilter, build_command, parse_priority, parse_time, stream_entries
+from worker_state import LeaderLock, SharedState
+from admission import INTERNAL, AdmissionControl, AdmissionRejected, query_priority
+from serialization import ApiResponse, NegotiationMiddleware, representation_etag, to_columns
+from api_models import (
+    NETWORK_INTERFACE_FIELDS,
+    BootstrapResponse,
+    ClockSource,
+    ClockSourceTransitionsResponse,
+    CurrentDataResponse,
+    HistoryResponse,
+    PhcOffsetsResponse,
+    PortStatusResponse,
+    PtpConfigResponse,
+    ServiceInterfacesResponse,
+    SystemSyncStatusResponse,
+    TimeStatusResponse,
+)
 
 PTP4L_SERVICE_PATH = "/etc/systemd/system/ptp4l.service"
 NETWORK_INFO_PATH = "/etc/linuxptp/interfaces.json"
 PHC2SYS_SERVICE_PATH = "/etc/systemd/system/phc2sys.service"
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# 实例状态缓存有效期（秒），有效期内的请求共享同一次pmc查询
+STATUS_CACHE_TTL = 1.0
+# 历史采样间隔与保留时长（秒）
+SAMPLE_INTERVAL = 1.0
+HISTORY_SECONDS = 24 * 3600
+# PHC与系统时钟偏差的采样间隔（秒，0表示不采样）；PTPCONF_PHC_FALLBACK=1 时没有PHC的实例用CLOCK_MONOTONIC代替（测试用）
+PHC_SAMPLE_INTERVAL = float(os.environ.get("PTPCONF_PHC_SAMPLE_INTERVAL", "1"))
+PHC_SAMPLE_FALLBACK = os.environ.get("PTPCONF_PHC_FALLBACK") == "1"
+# 超过多少秒没有phc2sys同步日志判定为超时，超时后连续多少次同步才恢复
+CLOCK_SOURCE_DEADLINE = float(os.environ.get("PTPCONF_SYNC_DEADLINE", "3"))
+CLOCK_SOURCE_RECOVER_SAMPLES = int(os.environ.get("PTPCONF_SYNC_RECOVER_SAMPLES", "3"))
+# 时钟源事件流的保活间隔（秒）
+EVENT_KEEPALIVE_INTERVAL = 15.0
+# daemon-reload 合并窗口（秒），窗口内的多次请求只执行一次reload
+RELOAD_WINDOW = float(os.environ.get("PTPCONF_RELOAD_WINDOW", "0.5"))
+# drop-in引用的环境文件目录，ptp4l的 -i 和phc2sys的 -z/-n 参数保存在这里
+UNIT_ENV_DIR = os.environ.get("PTPCONF_UNIT_ENV_DIR", DEFAULT_ENV_DIR)
+# 多worker部署时leader锁、共享状态和历史采样映射文件所在的目录（应位于tmpfs）
+STATE_DIR = os.environ.get("PTPCONF_STATE_DIR", "/dev/shm/ptpconfigurator")
+# 非leader worker检查共享状态、尝试接手leader的间隔（秒）
+FOLLOWER_POLL_INTERVAL = 0.2
+# 每个UDS路径的管理查询准入：每秒令牌数（0表示不限制）、令牌桶容量、排队上限和最长等待（秒）
+PMC_RATE = float(os.environ.get("PTPCONF_PMC_RATE", "20"))
+PMC_BURST = int(os.environ.get("PTPCONF_PMC_BURST", "10"))
+PMC_QUEUE = int(os.environ.get("PTPCONF_PMC_QUEUE", "16"))
+PMC_MAX_WAIT = float(os.environ.get("PTPCONF_PMC_MAX_WAIT", "2"))
+# 各worker的准入互相独立，速率和令牌桶容量按worker数平分，使发往同一UDS的总查询不超过配置值；
+# 未设置时取 uvicorn 的 WEB_CONCURRENCY（--workers 的默认值）
+PMC_WORKERS = max(1, int(os.environ.get("PTPCONF_WORKERS", os.environ.get("WEB_CONCURRENCY", "1"))))
+# 拓扑发现: 管理查询的边界跳数（0表示不发现）和刷新间隔（秒）
+DISCOVERY_HOPS = int(os.environ.get("PTPCONF_DISCOVERY_HOPS", "3"))
+DISCOVERY_INTERVAL = float(os.environ.get("PTPCONF_DISCOVERY_INTERVAL", "30"))
+# 守时误差预测: 频率趋势拟合的滑动窗口（秒）和给出预测的守时时长（秒，逗号分隔）
+HOLDOVER_WINDOW = float(os.environ.get("PTPCONF_HOLDOVER_WINDOW", "600"))
+HOLDOVER_HORIZONS = holdover_horizons(os.environ.get("PTPCONF_HOLDOVER_HORIZONS", "1,10,60,300,900,3600,14400,86400"))
+# 告警: 规则文件（不存在时使用默认规则），通知投递的webhook地址和本地文件（为空表示不投递）
+ALERT_RULES_FILE = os.environ.get("PTPCONF_ALERT_RULES", "/etc/linuxptp/alerts.json")
+ALERT_WEBHOOK = os.environ.get("PTPCONF_ALERT_WEBHOOK", "")
+ALERT_FILE = os.environ.get("PTPCONF_ALERT_FILE", "")
+# 受管理配置文件的快照目录
+SNAPSHOT_DIR = os.environ.get("PTPCONF_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+# 历史曲线的指标
+HISTORY_METRICS = ["offsetFromMaster", "meanPathDelay", "phc2sysOffset", "phcOffset", "phcCrossOffset"]
+
+# 启动参数由环境文件管理的unit: service名 -> ManagedUnit（受管理的PTP实例见 ptp_instances.PTP_INSTANCES）
+MANAGED_UNITS = managed_units(UNIT_ENV_DIR)
+
+# 配置快照覆盖的文件: 路径 -> 所属unit
+config_snapshots = SnapshotStore(SNAPSHOT_DIR, snapshot_files(MANAGED_UNITS))
+
+# 配置日志（队列+后台线程输出，级别与格式见 log_config.py）
+setup_logging()
+logger = logging.getLogger("ptpconfigurator")
+# 高频子系统单独命名，便于通过 PTPCONF_LOG_LEVELS 分别设置级别
+config_logger = logger.getChild("config")
+journal_logger = logger.getChild("journal")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -39,59 +140,76 @@ async def lifespan(app: FastAPI):
     check_file_permissions(PTP4L_SERVICE_PATH)
     check_file_permissions(PHC2SYS_SERVICE_PATH)
     
-    # 检查并启动必要的PTP服务
-    logger.info("检查PTP服务状态...")
-    ptp4l_started = start_service_if_not_running("ptp4l.service")
-    ptp4l1_started = start_service_if_not_running("ptp4l1.service")
+    # 订阅netlink事件维护网络接口清单，失败时退回逐次查询
+    interface_inventory.start()
     
-    if ptp4l_started and ptp4l1_started:
-        logger.info("所有PTP服务已启动或已在运行")
-        # 等待PTP服务完全启动并稳定
-        logger.info("等待PTP服务稳定运行...")
-        await asyncio.sleep(5)
+    # 多worker部署时只有leader检查服务、监控日志和采样，其他worker读取共享状态
+    if not acquire_leadership():
+        logger.info("本worker(pid %s)不是leader，从共享状态读取监控数据", os.getpid())
+        clock_source_state.mirrored = True
+        asyncio.create_task(follow_leader())
     else:
-        logger.warning("部分PTP服务启动失败，可能影响功能")
+        logger.info("本worker(pid %s)成为leader", os.getpid())
+        # 检查并启动必要的PTP服务
+        logger.info("检查PTP服务状态...")
+        ptp4l_started = start_service_if_not_running("ptp4l.service")
+        ptp4l1_started = start_service_if_not_running("ptp4l1.service")
     
-    # 检查phc2sys服务状态，如果已启动则重启以获取时钟源信息
-    logger.info("检查phc2sys服务状态...")
-    phc2sys_running = check_phc2sys_service_status()
-    if phc2sys_running:
-        logger.info("phc2sys服务正在运行，重启以获取最新时钟源信息...")
-        try:
-            result = subprocess.run(
-                ["systemctl", "restart", "phc2sys.service"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+        if ptp4l_started and ptp4l1_started:
+            logger.info("所有PTP服务已启动或已在运行")
+            # 等待PTP服务完全启动并稳定
+            logger.info("等待PTP服务稳定运行...")
+            await asyncio.sleep(5)
+        else:
+            logger.warning("部分PTP服务启动失败，可能影响功能")
+    
+        # 检查phc2sys服务状态，如果已启动则重启以获取时钟源信息
+        logger.info("检查phc2sys服务状态...")
+        phc2sys_running = check_phc2sys_service_status()
+        if phc2sys_running:
+            logger.info("phc2sys服务正在运行，重启以获取最新时钟源信息...")
+            try:
+                result = subprocess.run(
+                    ["systemctl", "restart", "phc2sys.service"],
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
             
-            if result.returncode == 0:
-                logger.info("phc2sys服务重启成功")
-                # 等待服务完全启动
-                await asyncio.sleep(3)
-            else:
-                logger.error(f"phc2sys服务重启失败: {result.stderr}")
-        except Exception as e:
-            logger.error(f"重启phc2sys服务时发生异常: {str(e)}")
-    else:
-        logger.info("phc2sys服务未运行，无需重启")
+                if result.returncode == 0:
+                    logger.info("phc2sys服务重启成功")
+                    # 等待服务完全启动
+                    await asyncio.sleep(3)
+                else:
+                    logger.error("phc2sys服务重启失败: %s", result.stderr)
+            except Exception as e:
+                logger.error("重启phc2sys服务时发生异常: %s", e)
+        else:
+            logger.info("phc2sys服务未运行，无需重启")
     
-    # 从历史日志中获取最近的时钟源信息
-    last_clock_info = await get_last_clock_source_from_logs()
-    if last_clock_info:
-        source, is_failed = last_clock_info
-        await clock_source_state.update(source, is_failed)
-        logger.info(f"已从历史日志中恢复时钟源状态: {source}")
+        # 记录启动时的配置（与最近的快照相同时不重复记录）
+        await snapshot_config("启动时")
+        # 接续上一个leader发布的状态，再从历史日志中获取最近的时钟源信息
+        await adopt_shared_state()
+        last_clock_info = await get_last_clock_source_from_logs()
+        if last_clock_info:
+            source, is_failed = last_clock_info
+            await clock_source_state.update(source, is_failed)
+            logger.info("已从历史日志中恢复时钟源状态: %s", source)
     
-    # 启动日志监控任务
-    asyncio.create_task(monitor_phc2sys_logs())
+        start_leader_tasks()
     
     yield
     
     # 关闭时执行
     logger.info("服务正在关闭...")
+    interface_inventory.stop()
+    phc_sampler.close()
+    leader_lock.release()
 
-app = FastAPI(title="PTP Config API", lifespan=lifespan)
+# 默认以 orjson 编码，请求接受 MessagePack 时改用 MessagePack（见 serialization.py）
+app = FastAPI(title="PTP Config API", lifespan=lifespan, default_response_class=ApiResponse)
+app.add_middleware(NegotiationMiddleware)
 
 # 配置 CORS
 app.add_middleware(
@@ -113,43 +231,52 @@ async def root():
     from fastapi.responses import RedirectResponse
     return RedirectResponse(url="/static/index.html")
 
-# 全局状态管理
-class ClockSourceState:
-    def __init__(self):
-        self.current_source: Optional[str] = None
-        self.last_update: Optional[datetime] = None
-        self.is_failed: bool = False
-        self.last_sync_time: Optional[datetime] = None
-        self._lock = asyncio.Lock()
-
-    async def update(self, source: str, is_failed: bool = False):
-        async with self._lock:
-            self.current_source = source
-            self.last_update = datetime.now()
-            self.is_failed = is_failed
-            if not is_failed:
-                self.last_sync_time = datetime.now()
-
-    async def get_state(self) -> Dict:
-        async with self._lock:
-            # 检查是否超时
-            if self.last_sync_time:
-                time_since_last_sync = (datetime.now() - self.last_sync_time).total_seconds()
-                if time_since_last_sync > 3:  # 3秒超时
-                    return {
-                        "current_source": "noClockAvailable",
-                        "last_update": self.last_update.isoformat() if self.last_update else None,
-                        "status": "timeout"
-                    }
+# ETag 与条件请求
+# 很少变化的资源（配置文件、service文件、网卡列表、时钟源状态）返回强ETag，
+# 客户端带 If-None-Match 且匹配时直接返回 304，不再读取和解析文件
+ETAG_HEADERS = {"Cache-Control": "no-cache"}
+# 进程启动标识，拼入基于版本号的ETag，避免重启后版本号从头计数造成误匹配
+ETAG_EPOCH = format(time.time_ns(), "x")
+
+def file_etag(*paths: str) -> str:
+    """根据文件的 inode/大小/修改时间生成ETag，文件不存在时也能得到稳定的值"""
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            digest.update(f"{path}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except FileNotFoundError:
+            digest.update(f"{path}:-;".encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+def content_etag(data) -> str:
+    """根据返回内容生成ETag"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return f'"{hashlib.sha1(payload.encode()).hexdigest()[:20]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """检查请求的 If-None-Match 是否与当前ETag（按本请求的编码区分）匹配"""
+    etag = representation_etag(etag)
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
 
-            return {
-                "current_source": self.current_source,
-                "last_update": self.last_update.isoformat() if self.last_update else None,
-                "status": "failed" if self.is_failed else "normal"
-            }
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": representation_etag(etag), "Vary": "Accept", **ETAG_HEADERS})
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = representation_etag(etag)
+    response.headers.update(ETAG_HEADERS)
+
+# 以路径为键缓存解析结果: {path: (etag, result)}，ETag未变时不再重新解析
+_parsed_file_cache: Dict[str, tuple] = {}
 
 # 创建全局状态实例
-clock_source_state = ClockSourceState()
+clock_source_state = ClockSourceState(CLOCK_SOURCE_DEADLINE, CLOCK_SOURCE_RECOVER_SAMPLES)
 
 def check_phc2sys_service_status() -> bool:
     """检查phc2sys服务是否正在运行"""
@@ -162,7 +289,7 @@ def check_phc2sys_service_status() -> bool:
         )
         return result.returncode == 0 and result.stdout.strip() == "active"
     except Exception as e:
-        logger.error(f"检查phc2sys服务状态失败: {str(e)}")
+        logger.error("检查phc2sys服务状态失败: %s", e)
         return False
 
 def check_service_status(service_name: str) -> bool:
@@ -176,14 +303,14 @@ def check_service_status(service_name: str) -> bool:
         )
         return result.returncode == 0 and result.stdout.strip() == "active"
     except Exception as e:
-        logger.error(f"检查{service_name}服务状态失败: {str(e)}")
+        logger.error("检查%s服务状态失败: %s", service_name, e)
         return False
 
 def start_service_if_not_running(service_name: str) -> bool:
     """如果服务未运行则启动服务"""
     try:
         if not check_service_status(service_name):
-            logger.info(f"启动{service_name}服务...")
+            logger.info("启动%s服务...", service_name)
             result = subprocess.run(
                 ["systemctl", "start", service_name],
                 capture_output=True,
@@ -192,16 +319,16 @@ def start_service_if_not_running(service_name: str) -> bool:
             )
             
             if result.returncode == 0:
-                logger.info(f"{service_name}服务启动成功")
+                logger.info("%s服务启动成功", service_name)
                 return True
             else:
-                logger.error(f"启动{service_name}服务失败: {result.stderr}")
+                logger.error("启动%s服务失败: %s", service_name, result.stderr)
                 return False
         else:
-            logger.info(f"{service_name}服务已在运行")
+            logger.info("%s服务已在运行", service_name)
             return True
     except Exception as e:
-        logger.error(f"启动{service_name}服务时发生异常: {str(e)}")
+        logger.error("启动%s服务时发生异常: %s", service_name, e)
         return False
 
 def get_current_clock_sync_mode() -> str:
@@ -231,11 +358,10 @@ class ConfigUpdate(BaseModel):
             }
         }
 
-class PtpConfigUpdate(BaseModel):
+class PtpConfigFields(BaseModel):
     """
-    PTP完整配置更新请求模型
+    可通过接口修改的PTP配置项，未提供的项保持不变
     """
-    config_file: str = Field(..., description="配置文件路径")
     domainNumber: Optional[int] = Field(None, description="PTP domain")
     priority1: Optional[int] = Field(None, description="Priority1")
     priority2: Optional[int] = Field(None, description="Priority2")
@@ -243,6 +369,12 @@ class PtpConfigUpdate(BaseModel):
     announceReceiptTimeout: Optional[int] = Field(None, description="Announce Receipt Timeout")
     logSyncInterval: Optional[int] = Field(None, description="Log Sync Interval")
     syncReceiptTimeout: Optional[int] = Field(None, description="Sync Receipt Timeout")
+
+class PtpConfigUpdate(PtpConfigFields):
+    """
+    PTP完整配置更新请求模型
+    """
+    config_file: str = Field(..., description="配置文件路径")
     interfaces: Optional[List[str]] = Field(None, description="网络接口列表")
 
     class Config:
@@ -272,6 +404,31 @@ class Ptp4lInterfaceUpdate(BaseModel):
             }
         }
 
+class InstanceConfigChange(PtpConfigFields):
+    """
+    批量应用中单个PTP实例的修改
+    """
+    instance: str = Field(..., description="PTP实例名", example="ptp4l")
+    interfaces: Optional[List[str]] = Field(None, min_items=1, max_items=2, description="要写入service的网卡名，不修改时省略")
+
+class BulkConfigApply(BaseModel):
+    """
+    多实例配置批量应用请求模型
+    """
+    changes: List[InstanceConfigChange] = Field(..., min_items=1, description="各实例的修改，每个实例最多一项")
+    restart: bool = Field(True, description="写入后是否重启受影响的服务")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "changes": [
+                    {"instance": "ptp4l", "domainNumber": 24, "interfaces": ["eth0"]},
+                    {"instance": "ptp4l1", "domainNumber": 24}
+                ],
+                "restart": True
+            }
+        }
+
 class Phc2sysDomainUpdate(BaseModel):
     domain: int = Field(..., description="PTP domain值", example=127)
 
@@ -396,97 +553,10 @@ def check_file_permissions(file_path):
         print(f"检查权限时出错: {str(e)}")
         return False
 
-def parse_ptp_config(content):
-    """
-    解析 PTP 配置文件内容，返回键值对
-    """
-    config_dict = {}
-    current_section = None
-    
-    logger.debug("开始解析配置文件内容")
-    logger.debug(f"原始内容长度: {len(content)} 字节")
-    
-    # 按行分割并处理
-    lines = content.split('\n')
-    logger.debug(f"总行数: {len(lines)}")
-    
-    for i, line in enumerate(lines, 1):
-        line = line.strip()
-        logger.debug(f"处理第 {i} 行: {line}")
-        
-        # 跳过空行和注释
-        if not line or line.startswith('#'):
-            logger.debug(f"跳过第 {i} 行 (空行或注释)")
-            continue
-        
-        # 处理节标题
-        if line.startswith('[') and line.endswith(']'):
-            current_section = line[1:-1]
-            config_dict[current_section] = {}
-            logger.debug(f"发现节: {current_section}")
-            continue
-        
-        # 处理键值对
-        # 使用正则表达式匹配键值对，处理多个空格的情况
-        match = re.match(r'^(\S+)\s+(\S.*)$', line)
-        if match:
-            key = match.group(1).strip()
-            value = match.group(2).strip()
-            logger.debug(f"解析键值对: key='{key}', value='{value}'")
-            
-            # 移除值两端的引号
-            if (value.startswith('"') and value.endswith('"')) or \
-               (value.startswith("'") and value.endswith("'")):
-                value = value[1:-1]
-                logger.debug(f"移除引号后的值: '{value}'")
-            
-            if current_section:
-                config_dict[current_section][key] = value
-                logger.debug(f"在节 {current_section} 中添加: {key}={value}")
-            else:
-                if 'global' not in config_dict:
-                    config_dict['global'] = {}
-                config_dict['global'][key] = value
-                logger.debug(f"添加全局配置: {key}={value}")
-    
-    logger.debug("最终解析结果:")
-    logger.debug(config_dict)
-    return config_dict
-
-def update_config_file(config_path: str, key: str, value: str) -> bool:
-    try:
-        with open(config_path, 'r') as file:
-            lines = file.readlines()
-
-        updated = False
-        for i, line in enumerate(lines):
-            # 跳过注释和空行
-            if not line.strip() or line.strip().startswith('#'):
-                continue
-
-            # 用正则定位键和值，保留所有原始空格
-            match = re.match(r'^(\s*' + re.escape(key) + r')(\s+)(\S.*)$', line)
-            if match:
-                # 保留原有的缩进和键-值间空格，只替换值
-                lines[i] = f"{match.group(1)}{match.group(2)}{value}\n"
-                updated = True
-                break
-
-        if not updated:
-            logger.error(f"未找到要更新的键: {key}")
-            return False
-
-        with open(config_path, 'w') as file:
-            file.writelines(lines)
-
-        return True
-
-    except Exception as e:
-        logger.error(f"更新配置文件时出错: {str(e)}")
-        return False
-
-@app.get("/api/ptp-config")
+@app.get("/api/ptp-config", response_model=PtpConfigResponse)
 async def get_ptp_config(
+    request: Request,
+    response: Response,
     config_path: Optional[str] = Query(None, description="配置文件路径", examples=["/etc/linuxptp/ptp4l.conf"]),
     config_file: Optional[str] = Query(None, description="配置文件路径（兼容参数）", examples=["/etc/linuxptp/ptp4l.conf"])
 ):
@@ -498,7 +568,7 @@ async def get_ptp_config(
         config_file: 可选的配置文件路径（兼容参数），默认为 /etc/linuxptp/ptp4l.conf
     
     Returns:
-        dict: 包含解析后的配置信息
+        dict: 包含解析后的配置信息；带ETag，If-None-Match匹配时返回304
     """
     # 优先使用config_file参数，如果没有则使用config_path，都没有则使用默认路径
     if config_file is not None:
@@ -507,48 +577,65 @@ async def get_ptp_config(
         config_path = "/etc/linuxptp/ptp4l.conf"
     
     try:
-        logger.info(f"开始处理请求，配置文件路径: {config_path}")
+        config_logger.debug("开始处理请求，配置文件路径: %s", config_path)
         
         if not os.path.exists(config_path):
-            logger.error(f"配置文件不存在: {config_path}")
+            logger.error("配置文件不存在: %s", config_path)
             raise HTTPException(status_code=404, detail="PTP configuration file not found")
         
-        # 检查文件权限
-        st = os.stat(config_path)
-        logger.info(f"文件权限: {oct(st.st_mode & 0o777)}")
-        logger.info(f"文件所有者: {st.st_uid} ({pwd.getpwuid(st.st_uid).pw_name})")
-        logger.info(f"文件组: {st.st_gid} ({grp.getgrgid(st.st_gid).gr_name})")
+        # 文件未变化时直接返回304或缓存的解析结果
+        etag = file_etag(config_path)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
+        
+        # 检查文件权限（用户名/组名查询只在调试时进行）
+        if config_logger.isEnabledFor(logging.DEBUG):
+            st = os.stat(config_path)
+            config_logger.debug("文件权限: %s, 所有者: %s (%s), 组: %s (%s)",
+                                oct(st.st_mode & 0o777), st.st_uid, pwd.getpwuid(st.st_uid).pw_name,
+                                st.st_gid, grp.getgrgid(st.st_gid).gr_name)
         
         if not os.access(config_path, os.R_OK):
             logger.error("当前用户没有读取权限")
             raise HTTPException(status_code=403, detail="没有权限读取配置文件")
         
-        try:
-            with open(config_path, 'r') as file:
-                content = file.read()
-                logger.info(f"成功读取文件，内容长度: {len(content)} 字节")
-        except Exception as e:
-            logger.error(f"读取文件时出错: {str(e)}")
-            raise
-        
-        if not content:
-            logger.warning("配置文件为空")
-            return {"success": True, "config": {}}
-        
-        # 解析配置文件内容
-        config_dict = parse_ptp_config(content)
-        logger.info("成功解析配置文件")
-        
         # 返回与前端期望的格式一致的数据
-        return {"success": True, "config": config_dict.get("global", {})}
+        return {"success": True, "config": read_ptp_config(config_path)}
         
+    except HTTPException:
+        raise
     except PermissionError as e:
-        logger.error(f"权限错误: {str(e)}")
+        logger.error("权限错误: %s", e)
         raise HTTPException(status_code=403, detail="没有权限读取配置文件")
     except Exception as e:
-        logger.error(f"发生错误: {str(e)}")
+        logger.error("发生错误: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def read_ptp_config(config_path: str) -> Dict[str, str]:
+    """
+    读取并解析配置文件的全局配置，文件未变化时使用缓存结果
+    """
+    etag = file_etag(config_path)
+    cached = _parsed_file_cache.get(config_path)
+    if cached and cached[0] == etag:
+        return cached[1]
+    
+    config = load_ptp_config(config_path)
+    _parsed_file_cache[config_path] = (etag, config)
+    return config
+
+def apply_ptp_config_fields(config_file: str, fields: PtpConfigFields) -> Tuple[bool, bool]:
+    """
+    把提供了值的配置项逐项写入配置文件
+    
+    Returns:
+        tuple: (是否全部写入成功, domainNumber是否发生变化)
+    """
+    updates = {key: str(value) for key, value in fields.model_dump(include=set(PtpConfigFields.model_fields)).items()
+               if value is not None}
+    return apply_config_values(config_file, read_ptp_config(config_file), updates)
+
 @app.put("/api/ptp-config")
 async def update_config(update: Union[ConfigUpdate, PtpConfigUpdate], config_path: Optional[str] = Query(None, description="配置文件路径", examples=["/etc/linuxptp/ptp4l.conf"])):
     """
@@ -566,62 +653,17 @@ async def update_config(update: Union[ConfigUpdate, PtpConfigUpdate], config_pat
         if isinstance(update, PtpConfigUpdate):
             # 完整配置更新
             config_file = update.config_file
-            logger.info(f"开始完整配置更新，配置文件: {config_file}")
+            logger.info("开始完整配置更新，配置文件: %s", config_file)
             
             if not os.path.exists(config_file):
-                logger.error(f"配置文件不存在: {config_file}")
+                logger.error("配置文件不存在: %s", config_file)
                 raise HTTPException(status_code=404, detail="PTP configuration file not found")
             
             if not os.access(config_file, os.W_OK):
                 logger.error("当前用户没有写入权限")
                 raise HTTPException(status_code=403, detail="没有权限修改配置文件")
             
-            # 读取当前配置
-            with open(config_file, 'r') as f:
-                content = f.read()
-            
-            # 解析当前配置
-            config_data = parse_ptp_config(content)
-            
-            # 更新配置项
-            updates = []
-            domain_changed = False
-            old_domain = None
-            
-            # 获取当前domain值
-            if 'domainNumber' in config_data.get('global', {}):
-                old_domain = int(config_data['global']['domainNumber'])
-            elif 'domainNumber' in config_data:
-                old_domain = int(config_data['domainNumber'])
-            
-            if update.domainNumber is not None:
-                new_domain = update.domainNumber
-                updates.append(("domainNumber", str(new_domain)))
-                
-                # 检查domain是否发生更改
-                if old_domain is not None and old_domain != new_domain:
-                    domain_changed = True
-                    logger.info(f"检测到domain更改: {old_domain} -> {new_domain}")
-            
-            if update.priority1 is not None:
-                updates.append(("priority1", str(update.priority1)))
-            if update.priority2 is not None:
-                updates.append(("priority2", str(update.priority2)))
-            if update.logAnnounceInterval is not None:
-                updates.append(("logAnnounceInterval", str(update.logAnnounceInterval)))
-            if update.announceReceiptTimeout is not None:
-                updates.append(("announceReceiptTimeout", str(update.announceReceiptTimeout)))
-            if update.logSyncInterval is not None:
-                updates.append(("logSyncInterval", str(update.logSyncInterval)))
-            if update.syncReceiptTimeout is not None:
-                updates.append(("syncReceiptTimeout", str(update.syncReceiptTimeout)))
-            
-            # 应用所有更新
-            success = True
-            for key, value in updates:
-                if not update_config_file(config_file, key, value):
-                    success = False
-                    break
+            success, domain_changed = apply_ptp_config_fields(config_file, update)
             
             if success:
                 logger.info("完整配置更新成功")
@@ -631,19 +673,20 @@ async def update_config(update: Union[ConfigUpdate, PtpConfigUpdate], config_pat
                     logger.info("开始同步更新phc2sys.service配置")
                     
                     # 更新phc2sys配置
-                    if update_phc2sys_domain(update.domainNumber, config_file):
+                    try:
+                        needs_reload = update_phc2sys_domain(update.domainNumber, config_file)
+                    except (OSError, ValueError) as e:
+                        logger.error("phc2sys.service配置更新失败: %s", e)
+                    else:
                         logger.info("phc2sys.service配置更新成功")
                         
-                        # 重新加载systemd配置
-                        try:
-                            result = subprocess.run(['systemctl', 'daemon-reload'], 
-                                                  capture_output=True, text=True, timeout=10)
-                            if result.returncode == 0:
+                        # 只有第一次生成drop-in时需要重新加载systemd配置
+                        if needs_reload:
+                            try:
+                                await reload_scheduler.reload("phc2sys.service")
                                 logger.info("systemd配置重新加载成功")
-                            else:
-                                logger.warning(f"systemd配置重新加载失败: {result.stderr}")
-                        except Exception as e:
-                            logger.error(f"重新加载systemd配置失败: {str(e)}")
+                            except ReloadError as e:
+                                logger.warning("systemd配置重新加载失败: %s", e)
                         
                         # 检查phc2sys服务状态，如果在运行则重启
                         try:
@@ -656,14 +699,13 @@ async def update_config(update: Union[ConfigUpdate, PtpConfigUpdate], config_pat
                                 if restart_result.returncode == 0:
                                     logger.info("phc2sys.service重启成功")
                                 else:
-                                    logger.error(f"phc2sys.service重启失败: {restart_result.stderr}")
+                                    logger.error("phc2sys.service重启失败: %s", restart_result.stderr)
                             else:
                                 logger.info("phc2sys.service未运行，仅重新加载配置")
                         except Exception as e:
-                            logger.error(f"检查phc2sys.service状态失败: {str(e)}")
-                    else:
-                        logger.error("phc2sys.service配置更新失败")
+                            logger.error("检查phc2sys.service状态失败: %s", e)
                 
+                await snapshot_config("PUT /api/ptp-config")
                 return {"success": True, "message": "配置已更新", "config_file": config_file}
             else:
                 logger.error("完整配置更新失败")
@@ -676,31 +718,109 @@ async def update_config(update: Union[ConfigUpdate, PtpConfigUpdate], config_pat
                 
             key = update.key
             value = update.value
-            logger.info(f"开始更新配置，配置文件: {config_path}, 键: {key}, 值: {value}")
+            logger.info("开始更新配置，配置文件: %s, 键: %s, 值: %s", config_path, key, value)
             if not os.path.exists(config_path):
-                logger.error(f"配置文件不存在: {config_path}")
+                logger.error("配置文件不存在: %s", config_path)
                 raise HTTPException(status_code=404, detail="PTP configuration file not found")
             if not os.access(config_path, os.W_OK):
                 logger.error("当前用户没有写入权限")
                 raise HTTPException(status_code=403, detail="没有权限修改配置文件")
             if update_config_file(config_path, key, value):
                 logger.info("配置更新成功")
+                await snapshot_config("PUT /api/ptp-config")
                 return {"success": True, "message": "配置已更新", "config_path": config_path}
             else:
                 logger.error("配置更新失败")
                 raise HTTPException(status_code=400, detail="更新配置失败")
                 
     except PermissionError as e:
-        logger.error(f"权限错误: {str(e)}")
+        logger.error("权限错误: %s", e)
         raise HTTPException(status_code=403, detail="没有权限修改配置文件")
     except Exception as e:
-        logger.error(f"发生错误: {str(e)}")
+        logger.error("发生错误: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def validate_ptp_interfaces(interfaces: List[str], service_name: str) -> List[str]:
+    """
+    按网卡的时间戳能力校验要写入ptp4l service的网卡
+    
+    实例配置的 time_stamping（默认hardware）需要网卡具备相应能力，否则ptp4l重启后会直接失败。
+    与其他PTP实例共用同一个PHC时只给出警告（两个实例会争用同一个硬件时钟）。
+    
+    Raises:
+        HTTPException: 网卡不存在或不支持所需的时间戳方式
+    
+    Returns:
+        list: 警告信息
+    """
+    instance = next((name for name, info in PTP_INSTANCES.items() if info["service"] == service_name), None)
+    time_stamping = "hardware"
+    if instance:
+        try:
+            time_stamping = read_ptp_config(PTP_INSTANCES[instance]["config_file"]).get("time_stamping", "hardware")
+        except OSError as e:
+            logger.warning("读取%s配置失败，按硬件时间戳校验: %s", instance, e)
+    
+    by_name = {iface["name"]: iface for iface in get_network_interfaces_info()}
+    phc_indexes = set()
+    for name in interfaces:
+        iface = by_name.get(name)
+        if iface is None:
+            raise HTTPException(status_code=400, detail=f"网卡不存在: {name}")
+        ts_info = iface["timestamping"] or {}
+        # onestep/p2p1step 等模式同样依赖硬件时间戳
+        required = "software" if time_stamping == "software" else "hardware"
+        if not ts_info.get(required):
+            raise HTTPException(
+                status_code=400,
+                detail=f"网卡{name}不支持{'软件' if required == 'software' else '硬件'}时间戳（time_stamping={time_stamping}）"
+            )
+        if iface["phc_index"] >= 0:
+            phc_indexes.add(iface["phc_index"])
+    
+    warnings = []
+    for other_iface, other in interface_index.snapshot().items():
+        if other == instance or other_iface not in by_name:
+            continue
+        phc_index = by_name[other_iface]["phc_index"]
+        if phc_index in phc_indexes:
+            message = f"与{other}（{other_iface}）共用PHC /dev/ptp{phc_index}"
+            logger.warning("%s: %s", service_name, message)
+            warnings.append(message)
+    return warnings
+
+def write_service_interfaces(service_name: str, interfaces: List[str]) -> bool:
+    """
+    把ptp4l service的 -i 参数写入其环境文件，第一次写入时生成drop-in
+    
+    Returns:
+        bool: 是否新生成了drop-in（需要daemon-reload，之后的修改只需重启服务）
+    
+    Raises:
+        HTTPException: service文件不存在、无权限或没有ExecStart行
+    """
+    unit = MANAGED_UNITS[service_name]
+    try:
+        created = unit.write_groups([[iface] for iface in interfaces])
+    except FileNotFoundError:
+        logger.error("Service文件不存在: %s", unit.unit_path)
+        raise HTTPException(status_code=404, detail=f"Service文件不存在: {unit.unit_path}")
+    except PermissionError as e:
+        logger.error("没有权限修改%s的启动参数: %s", service_name, e)
+        raise HTTPException(status_code=403, detail=f"没有权限修改{service_name}的启动参数")
+    except ValueError as e:
+        logger.error("%s", e)
+        raise HTTPException(status_code=400, detail="未找到 ExecStart 行")
+    if created:
+        logger.info("已为%s生成drop-in: %s", service_name, unit.dropin_path)
+    return created
+
 @app.put("/api/ptp4l-service-interface")
 async def update_ptp4l_service_interface(update: Ptp4lInterfaceUpdate):
     """
-    根据传入网卡名修改指定service文件中的ExecStart行
+    修改指定service的网卡（-i 参数）
+    
+    参数写入drop-in引用的环境文件，重启服务即可生效；只有第一次生成drop-in时才执行daemon-reload。
     
     Args:
         update: 包含网络接口列表和服务名称的更新请求
@@ -708,97 +828,361 @@ async def update_ptp4l_service_interface(update: Ptp4lInterfaceUpdate):
     Returns:
         dict: 操作结果
     """
+    if update.service_name not in MANAGED_UNITS or update.service_name == "phc2sys.service":
+        raise HTTPException(status_code=400, detail="不支持的服务名")
     try:
-        # 构造service文件路径
-        service_path = f"/etc/systemd/system/{update.service_name}"
+        service_path = MANAGED_UNITS[update.service_name].unit_path
         
         # 检查文件是否存在
         if not os.path.exists(service_path):
-            logger.error(f"Service文件不存在: {service_path}")
+            logger.error("Service文件不存在: %s", service_path)
             raise HTTPException(status_code=404, detail=f"Service文件不存在: {service_path}")
         
-        logger.info(f"修改service文件: {service_path}, 网卡: {update.interfaces}")
+        warnings = await asyncio.to_thread(validate_ptp_interfaces, update.interfaces, update.service_name)
+        logger.info("修改service文件: %s, 网卡: %s", service_path, update.interfaces)
         
-        try:
-            with open(service_path, 'r') as f:
-                lines = f.readlines()
-        except FileNotFoundError:
-            logger.error(f"Service文件不存在: {service_path}")
-            raise HTTPException(status_code=404, detail=f"Service文件不存在: {service_path}")
-        except PermissionError:
-            logger.error(f"没有权限读取Service文件: {service_path}")
-            raise HTTPException(status_code=403, detail=f"没有权限读取Service文件: {service_path}")
-        new_lines = []
-        updated = False
-        for line in lines:
-            if line.strip().startswith("ExecStart="):
-                # 保留原有的命令结构，只替换 -i 参数
-                # 先去掉所有 -i xxx 参数
-                rest = line.split('ExecStart=', 1)[1]
-                # 确保ptp4l在开头
-                if not rest.strip().startswith('ptp4l'):
-                    rest = 'ptp4l ' + rest.lstrip()
-                # 去掉所有 -i xxx
-                rest = re.sub(r'-i\s+\S+\s*', '', rest)
-                # 在ptp4l后面添加新的 -i 参数
-                parts = rest.split(maxsplit=1)
-                cmd = parts[0]  # 应该是 'ptp4l'
-                remaining = parts[1] if len(parts) > 1 else ''
-                # 构造新的 -i 参数
-                i_args = ' '.join([f'-i {iface}' for iface in update.interfaces])
-                # 合成新行，确保顺序是: ptp4l -i xxx [其他参数]
-                new_line = f"ExecStart={cmd} {i_args} {remaining}"
-                new_lines.append(new_line)
-                updated = True
-            else:
-                new_lines.append(line)
-        if not updated:
-            logger.error("未找到 ExecStart 行")
-            raise HTTPException(status_code=400, detail="未找到 ExecStart 行")
-        with open(service_path, 'w') as f:
-            f.writelines(new_lines)
-        return {"status": "success", "message": "ExecStart已更新", "interfaces": update.interfaces, "service_name": update.service_name}
+        reloaded = await asyncio.to_thread(write_service_interfaces, update.service_name, update.interfaces)
+        await snapshot_config("PUT /api/ptp4l-service-interface")
+        if reloaded:
+            await reload_scheduler.reload(update.service_name)
+        return {"status": "success", "message": "网卡已更新，重启服务后生效", "interfaces": update.interfaces,
+                "service_name": update.service_name, "reloaded": reloaded, "warnings": warnings}
     except HTTPException:
         # 重新抛出HTTPException，不进行包装
         raise
     except Exception as e:
-        logger.error(f"修改{update.service_name}失败: {str(e)}")
+        logger.error("修改%s失败: %s", update.service_name, e)
         raise HTTPException(status_code=500, detail=f"修改{update.service_name}失败")
 
-def get_network_interfaces_info():
+# 所有修改unit文件的接口共用的daemon-reload调度器
+reload_scheduler = ReloadScheduler(lambda: run_systemctl("daemon-reload"), RELOAD_WINDOW)
+
+async def snapshot_config(reason: str) -> Optional[Dict]:
+    """
+    记录受管理文件的快照，与最近的快照相同时不新增
+    
+    快照目录无法写入时只记录警告，不影响配置修改本身。
+    
+    Returns:
+        dict: 最近的快照记录，记录失败时为None
+    """
+    try:
+        record, _ = await asyncio.to_thread(config_snapshots.capture, reason)
+        return record
+    except OSError as e:
+        logger.warning("记录配置快照失败: %s", e)
+        return None
+
+def resolve_snapshot(ref: str) -> str:
+    try:
+        return config_snapshots.resolve(ref)
+    except SnapshotNotFound:
+        raise HTTPException(status_code=404, detail=f"快照不存在或前缀不唯一: {ref}")
+
+@app.get("/api/config-snapshots")
+async def list_config_snapshots(limit: int = Query(50, ge=1, le=1000, description="最多返回的快照数")):
+    """
+    获取配置快照历史（从新到旧）
+    
+    Returns:
+        dict: snapshots 为 [{"seq", "id", "time", "reason", "changed": 与上一个快照相比变化的文件}]
+    """
+    snapshots = await asyncio.to_thread(config_snapshots.history, limit)
+    return {"success": True, "snapshots": snapshots}
+
+@app.get("/api/config-snapshots/{ref}")
+async def get_config_snapshot(ref: str):
+    """
+    获取快照中各文件的内容哈希
+    
+    Args:
+        ref: 快照id或唯一前缀（至少6位）
+    
+    Returns:
+        dict: id 和 files（[{"path", "unit", "hash"}]，hash 为null表示该文件在快照时不存在）
+    """
+    snapshot_id = resolve_snapshot(ref)
+    manifest = await asyncio.to_thread(config_snapshots.manifest, snapshot_id)
+    files = [{"path": path, "unit": config_snapshots.files.get(path), "hash": digest}
+             for path, digest in sorted(manifest.items())]
+    return {"success": True, "id": snapshot_id, "files": files}
+
+@app.get("/api/config-snapshots/{ref}/diff")
+async def diff_config_snapshot(
+    ref: str,
+    against: str = Query("current", description="对比的快照id或前缀，current 表示当前文件"),
+):
+    """
+    获取快照与另一个快照（或当前文件）之间的差异
+    
+    Returns:
+        dict: changes 为 [{"path", "unit", "status": added/removed/modified, "diff": 统一格式差异}]
+    """
+    snapshot_id = resolve_snapshot(ref)
+    other = None if against == "current" else resolve_snapshot(against)
+    changes = await asyncio.to_thread(config_snapshots.diff, snapshot_id, other)
+    return {"success": True, "from": snapshot_id, "to": other or "current", "changes": changes}
+
+@app.post("/api/config-snapshots/{ref}/rollback")
+async def rollback_config_snapshot(
+    ref: str,
+    restart: bool = Query(True, description="是否重启文件有变化的服务（只重启正在运行的）"),
+):
+    """
+    把全部受管理的文件恢复为快照中的内容
+    
+    回滚前先记录当前文件（可以再回滚回来）；文件先全部写好临时文件再统一替换。
+    unit 文件或 drop-in 有变化时执行一次daemon-reload，然后只对文件有变化的服务执行
+    try-restart（ptp4l 服务在同一个事务中，phc2sys 在其后），文件没有变化的服务不受影响。
+    替换中途失败时 partial 为 true，changed 为已经恢复的文件，仍执行daemon-reload并记录快照，但不重启服务。
+    
+    Returns:
+        dict: partial、changed（变化的文件）、units（涉及的服务）、reloaded、restarted、errors
+    """
+    snapshot_id = resolve_snapshot(ref)
+    await snapshot_config("回滚前")
+    errors = []
+    partial = False
+    try:
+        changed = await asyncio.to_thread(config_snapshots.restore, snapshot_id)
+    except PartialRestore as e:
+        # 已替换的文件无法撤回：照常为它们重新加载unit并记录快照，但不重启服务
+        partial = True
+        changed = e.applied
+        errors.append(f"回滚只完成了部分文件，已恢复: {', '.join(changed) or '无'}: {e}")
+    except OSError as e:
+        logger.error("回滚配置快照%s失败: %s", snapshot_id, e)
+        raise HTTPException(status_code=500, detail=f"回滚失败，文件未被修改: {e}")
+    units = config_snapshots.units(changed)
+    unit_files = {path for unit in MANAGED_UNITS.values() for path in (unit.unit_path, unit.dropin_path)}
+    reloaded = False
+    reload_units = config_snapshots.units([path for path in changed if path in unit_files])
+    if reload_units:
+        try:
+            await reload_scheduler.reload(*reload_units)
+            reloaded = True
+        except ReloadError as e:
+            errors.append(str(e))
+    
+    restarted = []
+    if restart and not errors:
+        ptp4l_units = [unit for unit in units if unit != "phc2sys.service"]
+        for group in (ptp4l_units, [unit for unit in units if unit == "phc2sys.service"]):
+            if not group:
+                continue
+            error = await asyncio.to_thread(run_systemctl, "try-restart", *group)
+            if error:
+                errors.append(error)
+                break
+            restarted.extend(group)
+    
+    await snapshot_config(f"{'部分' if partial else ''}回滚到 {snapshot_id[:12]}")
+    for error in errors:
+        logger.error("回滚配置快照: %s", error)
+    return {"success": not errors, "id": snapshot_id, "partial": partial, "changed": changed, "units": units,
+            "reloaded": reloaded, "restarted": restarted, "errors": errors}
+
+def apply_instance_change(change: InstanceConfigChange) -> Dict:
+    """
+    写入单个实例的配置文件和service网卡（在线程中执行，各实例互不影响）
+    
+    先校验网卡再写文件，网卡不可用时该实例的配置文件也不会被修改。
+    
+    Returns:
+        dict: {"instance", "config_changed", "interfaces_changed", "service_changed"（新生成了drop-in）,
+               "domain_changed", "warnings"}
+    """
+    info = PTP_INSTANCES[change.instance]
+    service_path = MANAGED_UNITS[info["service"]].unit_path
+    result = {"instance": change.instance, "config_changed": False, "interfaces_changed": False,
+              "service_changed": False, "domain_changed": False, "warnings": []}
+    
+    if change.interfaces is not None:
+        if not os.path.exists(service_path):
+            raise HTTPException(status_code=404, detail=f"Service文件不存在: {service_path}")
+        result["warnings"] = validate_ptp_interfaces(change.interfaces, info["service"])
+    
+    if change.model_dump(include=set(PtpConfigFields.model_fields), exclude_none=True):
+        if not os.path.exists(info["config_file"]):
+            raise HTTPException(status_code=404, detail="PTP configuration file not found")
+        if not os.access(info["config_file"], os.W_OK):
+            raise HTTPException(status_code=403, detail="没有权限修改配置文件")
+        success, result["domain_changed"] = apply_ptp_config_fields(info["config_file"], change)
+        if not success:
+            raise HTTPException(status_code=400, detail="更新配置失败")
+        result["config_changed"] = True
+    
+    if change.interfaces is not None:
+        result["service_changed"] = write_service_interfaces(info["service"], change.interfaces)
+        result["interfaces_changed"] = True
+    return result
+
+@app.post("/api/ptp-config/bulk")
+async def bulk_apply_config(bulk: BulkConfigApply):
+    """
+    一次应用多个PTP实例的配置修改
+    
+    各实例的文件并行写入；phc2sys.service 由所有实例共用，domain变化在之后依次写入。
+    网卡和domain写在drop-in引用的环境文件中，只有第一次生成drop-in时才需要 daemon-reload
+    （最多一次）；受影响的ptp4l服务在同一个 systemctl restart
+    事务中重启（由systemd按单元依赖排序），phc2sys 在最后只重启一次。
+    某个实例写入失败不影响其他实例，失败的实例不会被重启。
+    
+    Returns:
+        dict: 各实例的结果、是否执行了reload、重启了哪些服务
+    """
+    names = [change.instance for change in bulk.changes]
+    unknown = [name for name in names if name not in PTP_INSTANCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的PTP实例: {', '.join(unknown)}")
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="同一个实例只能出现一次")
+    
+    logger.info("批量应用配置: %s", names)
+    outcomes = await asyncio.gather(*(asyncio.to_thread(apply_instance_change, change) for change in bulk.changes),
+                                    return_exceptions=True)
+    results: Dict[str, Dict] = {}
+    applied = []
+    for change, outcome in zip(bulk.changes, outcomes):
+        if isinstance(outcome, HTTPException):
+            results[change.instance] = {"success": False, "error": outcome.detail}
+        elif isinstance(outcome, Exception):
+            logger.error("应用%s配置失败: %s", change.instance, outcome)
+            results[change.instance] = {"success": False, "error": str(outcome)}
+        else:
+            results[change.instance] = {"success": True, **outcome}
+            applied.append(outcome)
+    
+    errors = []
+    phc2sys_changed = False
+    for outcome in applied:
+        if outcome["domain_changed"]:
+            change = bulk.changes[names.index(outcome["instance"])]
+            try:
+                phc2sys_changed |= update_phc2sys_domain(change.domainNumber, PTP_INSTANCES[outcome["instance"]]["config_file"])
+            except (OSError, ValueError) as e:
+                errors.append(f"更新phc2sys.service中{outcome['instance']}的domain失败: {e}")
+    
+    if applied:
+        await snapshot_config("POST /api/ptp-config/bulk")
+    
+    reloaded = False
+    changed_units = [PTP_INSTANCES[outcome["instance"]]["service"] for outcome in applied if outcome["service_changed"]]
+    if phc2sys_changed:
+        changed_units.append("phc2sys.service")
+    if changed_units:
+        try:
+            await reload_scheduler.reload(*changed_units)
+            reloaded = True
+        except ReloadError as e:
+            errors.append(str(e))
+    
+    restarted = []
+    if bulk.restart and applied and not errors:
+        units = [PTP_INSTANCES[outcome["instance"]]["service"] for outcome in applied]
+        error = await asyncio.to_thread(run_systemctl, "restart", *units)
+        if error:
+            errors.append(error)
+        else:
+            restarted.extend(units)
+            if await asyncio.to_thread(check_phc2sys_service_status):
+                error = await asyncio.to_thread(run_systemctl, "restart", "phc2sys.service")
+                if error:
+                    errors.append(error)
+                else:
+                    restarted.append("phc2sys.service")
+    
+    for error in errors:
+        logger.error("批量应用配置: %s", error)
+    return {
+        "success": len(applied) == len(bulk.changes) and not errors,
+        "results": results,
+        "reloaded": reloaded,
+        "restarted": restarted,
+        "errors": errors,
+    }
+
+# 由rtnetlink事件维护的网络接口清单，在lifespan中启动
+interface_inventory = InterfaceInventory()
+# 网卡时间戳能力与PHC编号，按ifindex只探测一次
+ts_info_cache = TsInfoCache()
+
+def get_network_interfaces_info(include_virtual: bool = True) -> List[Dict]:
+    """
+    获取网络接口列表
+    
+    netlink清单已启动时直接读取内存；否则（非Linux或无权限）退回psutil逐次查询。
+    """
+    if interface_inventory.running:
+        interfaces = interface_inventory.interfaces(include_virtual)
+    else:
+        interfaces = _psutil_interfaces(include_virtual)
+    for iface in interfaces:
+        ts_info = ts_info_cache.get(iface["index"], iface["name"]) if iface["index"] is not None else None
+        iface["phc_index"] = ts_info["phc_index"] if ts_info else -1
+        iface["timestamping"] = ts_info
+    return interfaces
+
+def _psutil_interfaces(include_virtual: bool) -> List[Dict]:
     interfaces = []
     stats = psutil.net_if_stats()
     addrs = psutil.net_if_addrs()
     # 兼容 AF_LINK/AF_PACKET
     af_link = getattr(psutil, 'AF_LINK', None) or getattr(socket, 'AF_PACKET', None)
     for name in stats:
+        # 没有对应物理设备的接口（veth、bridge、lo等）视为虚拟设备
+        virtual = not os.path.exists(f"/sys/class/net/{name}/device")
+        if virtual and not include_virtual:
+            continue
+        try:
+            index = socket.if_nametoindex(name)
+        except OSError:
+            index = None
         iface = {
+            "index": index,
             "name": name,
             "is_up": stats[name].isup,
             "mac": None,
-            "ip": None
+            "ip": None,
+            "kind": None,
+            "virtual": virtual
         }
         for addr in addrs.get(name, []):
             if af_link and addr.family == af_link:
                 iface["mac"] = addr.address
-            elif addr.family == socket.AF_INET:
+            elif addr.family == socket.AF_INET and iface["ip"] is None:
                 iface["ip"] = addr.address
         interfaces.append(iface)
     return interfaces
 
 @app.get("/api/network-interfaces")
-async def get_network_interfaces():
+async def get_network_interfaces(
+    request: Request,
+    response: Response,
+    include_virtual: bool = Query(True, description="是否包含虚拟设备（veth、macvlan、bridge、lo等）")
+):
     """
     获取本地所有网络接口及状态
     
     Returns:
-        dict: 包含所有网络接口信息的列表
+        dict: 包含所有网络接口信息的列表；带ETag，If-None-Match匹配时返回304
     """
     try:
-        interfaces = get_network_interfaces_info()
+        if interface_inventory.running:
+            # 清单版本号即可确定内容，304时无需生成列表
+            etag = f'"ifaces-{ETAG_EPOCH}-{interface_inventory.version}-{int(include_virtual)}"'
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            interfaces = get_network_interfaces_info(include_virtual)
+        else:
+            interfaces = get_network_interfaces_info(include_virtual)
+            etag = content_etag(interfaces)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+        set_etag(response, etag)
         return {"interfaces": interfaces}
     except Exception as e:
-        logger.error(f"获取网络接口信息失败: {str(e)}")
+        logger.error("获取网络接口信息失败: %s", e)
         raise HTTPException(status_code=500, detail="获取网络接口信息失败")
 
 @app.post("/api/network-interfaces/save")
@@ -815,7 +1199,7 @@ async def save_network_interfaces():
             json.dump(interfaces, f, indent=2, ensure_ascii=False)
         return {"status": "success", "message": "已保存", "file": NETWORK_INFO_PATH}
     except Exception as e:
-        logger.error(f"保存网络接口信息失败: {str(e)}")
+        logger.error("保存网络接口信息失败: %s", e)
         raise HTTPException(status_code=500, detail="保存网络接口信息失败")
 
 @app.put("/api/phc2sys/config")
@@ -823,9 +1207,10 @@ async def update_phc2sys_config(config: PHC2SYSParams):
     """
     更新phc2sys.service配置
     
-    - 支持动态替换ExecStart行中的UDS地址(-z)和PTP domain(-n)参数
+    - 替换UDS地址(-z)和PTP domain(-n)参数，写入drop-in引用的环境文件
     - 支持配置多组参数，每组参数包含domain和uds_address
-    - 基础参数(-r -m -a)会自动保留在最后
+    - 其他参数（如 -r -m -a）保持unit中的原样
+    - 只有第一次生成drop-in时执行daemon-reload，之后重启phc2sys即可生效
     
     Args:
         config: 包含多组PHC2SYS参数的配置请求
@@ -834,50 +1219,31 @@ async def update_phc2sys_config(config: PHC2SYSParams):
         dict: 操作结果
     """
     try:
-        # 读取当前配置
-        with open("/etc/systemd/system/phc2sys.service", "r") as f:
-            content = f.read()
-
-        # 构建新的ExecStart行
-        base_params = "-r -m -a"  # 基础参数
-        param_sets = []
-        for param in config.params:
-            param_sets.append(f"-z {param.uds_address} -n {param.domain}")
-        
-        new_exec_start = f"ExecStart=phc2sys {' '.join(param_sets)} {base_params}"
-
-        # 替换ExecStart行
-        new_content = re.sub(
-            r"ExecStart=phc2sys.*",
-            new_exec_start,
-            content
-        )
-
-        # 写入新配置
-        with open("/etc/systemd/system/phc2sys.service", "w") as f:
-            f.write(new_content)
-
-        # 重新加载systemd配置
-        subprocess.run(["systemctl", "daemon-reload"], check=True)
-
-        return {"message": "phc2sys.service配置已更新"}
+        groups = [[param.uds_address, str(param.domain)] for param in config.params]
+        reloaded = await asyncio.to_thread(MANAGED_UNITS["phc2sys.service"].write_groups, groups)
+        await snapshot_config("PUT /api/phc2sys/config")
+        if reloaded:
+            # 重新加载systemd配置（与其他修改合并执行）
+            await reload_scheduler.reload("phc2sys.service")
+
+        return {"message": "phc2sys.service配置已更新", "reloaded": reloaded}
     except Exception as e:
-        logger.error(f"更新phc2sys.service配置失败: {str(e)}")
+        logger.error("更新phc2sys.service配置失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/systemd/reload")
 async def systemd_reload():
     """
-    重新加载systemd配置
+    重新加载systemd配置，合并窗口内的其他reload请求共用同一次执行
     
     Returns:
         dict: 操作结果
     """
     try:
-        subprocess.run(["sudo", "systemctl", "daemon-reload"], check=True)
+        await reload_scheduler.reload()
         return {"success": True, "message": "systemd 配置已重载"}
     except Exception as e:
-        logger.error(f"systemd reload 失败: {str(e)}")
+        logger.error("systemd reload 失败: %s", e)
         return {"success": False, "error": "systemd reload 失败: " + str(e)}
 
 @app.post("/api/systemd/enable-ptp4l")
@@ -892,7 +1258,7 @@ async def systemd_enable_ptp4l():
         subprocess.run(["sudo", "systemctl", "enable", "ptp4l.service"], check=True)
         return {"success": True, "message": "ptp4l.service 已设置为开机自启"}
     except Exception as e:
-        logger.error(f"enable ptp4l 失败: {str(e)}")
+        logger.error("enable ptp4l 失败: %s", e)
         return {"success": False, "error": "enable ptp4l 失败: " + str(e)}
 
 @app.post("/api/systemd/start-service")
@@ -907,17 +1273,17 @@ async def systemd_start_service(action: ServiceAction):
         dict: 操作结果
     """
     try:
-        logger.info(f"启动服务: {action.service_name}")
+        logger.info("启动服务: %s", action.service_name)
         if not action.service_name.endswith('.service'):
             return {"success": False, "error": "服务名称必须以.service结尾"}
         subprocess.run(["sudo", "systemctl", "start", action.service_name], check=True)
-        logger.info(f"服务 {action.service_name} 启动成功")
+        logger.info("服务 %s 启动成功", action.service_name)
         return {"success": True, "message": f"{action.service_name} 已启动", "service_name": action.service_name}
     except subprocess.CalledProcessError as e:
-        logger.error(f"启动服务 {action.service_name} 失败: {str(e)}")
+        logger.error("启动服务 %s 失败: %s", action.service_name, e)
         return {"success": False, "error": f"启动服务 {action.service_name} 失败: {str(e)}"}
     except Exception as e:
-        logger.error(f"启动服务 {action.service_name} 时发生错误: {str(e)}")
+        logger.error("启动服务 %s 时发生错误: %s", action.service_name, e)
         return {"success": False, "error": f"启动服务 {action.service_name} 失败: {str(e)}"}
 
 @app.post("/api/systemd/stop-service")
@@ -932,17 +1298,17 @@ async def systemd_stop_service(action: ServiceAction):
         dict: 操作结果
     """
     try:
-        logger.info(f"停止服务: {action.service_name}")
+        logger.info("停止服务: %s", action.service_name)
         if not action.service_name.endswith('.service'):
             return {"success": False, "error": "服务名称必须以.service结尾"}
         subprocess.run(["sudo", "systemctl", "stop", action.service_name], check=True)
-        logger.info(f"服务 {action.service_name} 停止成功")
+        logger.info("服务 %s 停止成功", action.service_name)
         return {"success": True, "message": f"{action.service_name} 已停止", "service_name": action.service_name}
     except subprocess.CalledProcessError as e:
-        logger.error(f"停止服务 {action.service_name} 失败: {str(e)}")
+        logger.error("停止服务 %s 失败: %s", action.service_name, e)
         return {"success": False, "error": f"停止服务 {action.service_name} 失败: {str(e)}"}
     except Exception as e:
-        logger.error(f"停止服务 {action.service_name} 时发生错误: {str(e)}")
+        logger.error("停止服务 %s 时发生错误: %s", action.service_name, e)
         return {"success": False, "error": f"停止服务 {action.service_name} 失败: {str(e)}"}
 
 @app.post("/api/systemd/restart-service")
@@ -957,17 +1323,17 @@ async def systemd_restart_service(action: ServiceAction):
         dict: 操作结果
     """
     try:
-        logger.info(f"重启服务: {action.service_name}")
+        logger.info("重启服务: %s", action.service_name)
         if not action.service_name.endswith('.service'):
             return {"success": False, "error": "服务名称必须以.service结尾"}
         subprocess.run(["sudo", "systemctl", "restart", action.service_name], check=True)
-        logger.info(f"服务 {action.service_name} 重启成功")
+        logger.info("服务 %s 重启成功", action.service_name)
         return {"success": True, "message": f"{action.service_name} 已重启", "service_name": action.service_name}
     except subprocess.CalledProcessError as e:
-        logger.error(f"重启服务 {action.service_name} 失败: {str(e)}")
+        logger.error("重启服务 %s 失败: %s", action.service_name, e)
         return {"success": False, "error": f"重启服务 {action.service_name} 失败: {str(e)}"}
     except Exception as e:
-        logger.error(f"重启服务 {action.service_name} 时发生错误: {str(e)}")
+        logger.error("重启服务 %s 时发生错误: %s", action.service_name, e)
         return {"success": False, "error": f"重启服务 {action.service_name} 失败: {str(e)}"}
 
 @app.get("/api/systemd/logs/{service}")
@@ -993,9 +1359,56 @@ async def systemd_logs(
         ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8")
         return {"service": service, "logs": result.stdout}
     except Exception as e:
-        logger.error(f"获取日志失败: {str(e)}")
+        logger.error("获取日志失败: %s", e)
         raise HTTPException(status_code=500, detail="获取日志失败")
 
+@app.get("/api/systemd/logs/{service}/stream")
+async def stream_systemd_logs(
+    service: str,
+    before: Optional[str] = Query(None, description="只返回比该游标更早的日志（从新到旧）"),
+    after: Optional[str] = Query(None, description="只返回比该游标更新的日志（从旧到新）"),
+    since: Optional[str] = Query(None, description="起始时间，ISO 8601 或 Unix 秒"),
+    until: Optional[str] = Query(None, description="结束时间，ISO 8601 或 Unix 秒"),
+    priority: Optional[str] = Query(None, description="优先级，如 err、3 或 err..warning"),
+    contains: Optional[str] = Query(None, description="日志内容包含的子串（不区分大小写）"),
+    regex: Optional[str] = Query(None, description="日志内容匹配的正则表达式"),
+    limit: int = Query(100, ge=1, le=10000, description="每页条数，跟随模式下不限"),
+    follow: bool = Query(False, description="持续输出新日志"),
+):
+    """
+    以 NDJSON 流式返回 systemd 服务日志
+    
+    每行一条日志 {"type": "entry", "cursor", "time", "priority", ...}，最后一行为
+    {"type": "end", "cursor", "more", ...}；用结束记录中的 cursor 作为 before/after 继续翻页。
+    日志边读边发送，服务端内存占用与页大小无关。
+    """
+    if service not in ["ptp4l.service", "ptp4l1.service", "phc2sys.service"]:
+        raise HTTPException(status_code=400, detail="不支持的服务名")
+    if before and after:
+        raise HTTPException(status_code=400, detail="before 和 after 不能同时使用")
+    if follow and before:
+        raise HTTPException(status_code=400, detail="跟随模式不能与 before 同时使用")
+    try:
+        message_filter = MessageFilter(contains, regex)
+        command = ["sudo", *build_command(
+            service, before=before, after=after,
+            since=parse_time(since) if since else None,
+            until=parse_time(until) if until else None,
+            priority=parse_priority(priority) if priority else None,
+            follow=follow, lines=limit,
+        )]
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"无效的正则表达式: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def ndjson():
+        async for item in stream_entries(command, None if follow else limit, message_filter):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/api/systemd/status/{service}")
 async def systemd_status(service: str):
     """
@@ -1015,9 +1428,59 @@ async def systemd_status(service: str):
         ], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8")
         return {"service": service, "status": result.stdout}
     except Exception as e:
-        logger.error(f"获取状态失败: {str(e)}")
+        logger.error("获取状态失败: %s", e)
         raise HTTPException(status_code=500, detail="获取状态失败")
 
+pmc_admission = AdmissionControl(PMC_RATE / PMC_WORKERS, max(1, PMC_BURST // PMC_WORKERS), PMC_QUEUE, PMC_MAX_WAIT)
+
+def admission_rejected(e: AdmissionRejected) -> HTTPException:
+    """未被准入的查询返回503，客户端稍后重试"""
+    logger.warning("%s", e)
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+# 数据集 -> 实例快照中的键
+SNAPSHOT_DATASETS = {"TIME_STATUS_NP": "time_status", "PORT_DATA_SET": "port_status", "CURRENT_DATA_SET": "current_data"}
+
+def published_dataset_fields(uds_path: str, domain: int, dataset: str, fields: List[str],
+                             boundary_hops: int = 0) -> Optional[Dict]:
+    """
+    非leader worker: 查询目标是受管理的实例（UDS路径和domain与leader的快照一致、boundary_hops为0）时，
+    返回leader发布的该数据集，不执行pmc；其他情况返回None，由调用方自行查询
+    
+    Raises:
+        PmcCommandError: leader查询该数据集失败
+    """
+    key = SNAPSHOT_DATASETS.get(dataset)
+    name = next((name for name, info in PTP_INSTANCES.items() if info["uds_path"] == uds_path), None)
+    if boundary_hops or key is None or name is None:
+        return None
+    snapshot = leader_published("instances", name)
+    if snapshot is None or snapshot.get("domain") != domain:
+        return None
+    data = snapshot.get(key)
+    if data is None:
+        raise PmcCommandError(snapshot.get("errors", {}).get(key) or f"leader未能获取{dataset}")
+    return {**{field: data.get(field) for field in fields}, "responders": data.get("responders", {})}
+
+def query_dataset_fields(uds_path: str, domain: int, dataset: str, fields: List[str], boundary_hops: int = 0) -> Dict:
+    """
+    查询数据集并整理为接口返回格式
+
+    多worker部署时非leader worker查询受管理的实例直接使用leader发布的快照，
+    只有其他目标才执行pmc；查询前先经过该UDS路径的准入控制。
+
+    Returns:
+        dict: 顶层为第一个应答方的字段，responders 为以端口ID为键的全部应答
+    
+    Raises:
+        AdmissionRejected: 该UDS路径的查询过多，未被准入
+    """
+    published = published_dataset_fields(uds_path, domain, dataset, fields, boundary_hops)
+    if published is not None:
+        return published
+    pmc_admission.admit(uds_path)
+    return dataset_fields(query_dataset(uds_path, domain, dataset, boundary_hops), fields)
+
 @app.post("/ptp/status")
 def get_ptp_status(request: PTPStatusRequest):
     """
@@ -1030,136 +1493,55 @@ def get_ptp_status(request: PTPStatusRequest):
         dict: 包含gmPresent和gmIdentity的状态信息
     """
     try:
-        # Construct the pmc command
-        cmd = [
-            "pmc",
-            "-u",
-            "-b", "0",
-            "GET TIME_STATUS_NP",
-            "-d", str(request.domain),
-            "-s", request.uds_path
-        ]
-        
-        # Execute the command
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to execute pmc command: {result.stderr}"
-            )
-        
-        # Parse the output to extract gmPresent and gmIdentity
-        output = result.stdout
-        
-        # Extract gmPresent
-        gm_present_match = re.search(r'gmPresent\s+(\w+)', output)
-        gm_present = gm_present_match.group(1) if gm_present_match else None
-        
-        # Extract gmIdentity
-        gm_identity_match = re.search(r'gmIdentity\s+([0-9a-f.]+)', output)
-        gm_identity = gm_identity_match.group(1) if gm_identity_match else None
-        
-        if gm_present is None or gm_identity is None:
+        time_status = query_dataset_fields(request.uds_path, request.domain, "TIME_STATUS_NP", ["gmPresent", "gmIdentity"])
+        if time_status["gmPresent"] is None or time_status["gmIdentity"] is None:
             raise HTTPException(
                 status_code=500,
                 detail="Failed to parse pmc command output"
             )
         
         return {
-            "gmPresent": gm_present,
-            "gmIdentity": gm_identity
+            "gmPresent": time_status["gmPresent"],
+            "gmIdentity": time_status["gmIdentity"]
         }
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+    except PmcCommandError as e:
+        raise HTTPException(status_code=500, detail=f"Failed to execute pmc command: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/ptp-timestatus")
+@app.get("/api/ptp-timestatus", response_model=TimeStatusResponse)
 async def get_ptp_timestatus(
     domain: int = Query(127, description="PTP domain值", examples=[127]),
-    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"])
+    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"]),
+    boundary_hops: int = Query(0, ge=0, description="边界跳数，大于0时返回多个应答方", examples=[0])
 ):
     """
     获取PTP时间状态信息
-    通过运行 pmc -u -b 0 'GET TIME_STATUS_NP' -d {domain} -s {uds_path} 命令
+    通过运行 pmc -u -b {boundary_hops} 'GET TIME_STATUS_NP' -d {domain} -s {uds_path} 命令
     
     Args:
         domain: PTP domain值，默认127
         uds_path: UDS地址路径，默认/var/run/ptp4l
+        boundary_hops: 边界跳数，默认0
     
     Returns:
-        dict: 包含PTP时间状态信息
+        dict: 包含PTP时间状态信息，responders为按端口ID分组的全部应答
     """
     try:
-        logger.info(f"获取PTP时间状态，domain: {domain}, uds_path: {uds_path}")
-        
-        # 构造pmc命令
-        cmd = [
-            "pmc",
-            "-u",
-            "-b", "0",
-            "GET TIME_STATUS_NP",
-            "-d", str(domain),
-            "-s", uds_path
-        ]
-        
-        logger.debug(f"执行命令: {' '.join(cmd)}")
-        
-        # 执行命令
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0:
-            logger.error(f"pmc命令执行失败: {result.stderr}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"pmc命令执行失败: {result.stderr}"
-            )
-        
-        # 解析输出
-        output = result.stdout
-        logger.debug(f"pmc命令输出: {output}")
-        
-        # 初始化返回结果
-        time_status = {
-            "master_offset": None,
-            "ingress_time": None,
-            "cumulativeScaledRateOffset": None,
-            "scaledLastGmPhaseChange": None,
-            "gmTimeBaseIndicator": None,
-            "lastGmPhaseChange": None,
-            "gmPresent": None,
-            "gmIdentity": None
-        }
-        
-        # 解析各种状态信息
-        patterns = {
-            "master_offset": r'master_offset\s+([0-9-]+)',
-            "ingress_time": r'ingress_time\s+([0-9]+)',
-            "cumulativeScaledRateOffset": r'cumulativeScaledRateOffset\s+([0-9-]+)',
-            "scaledLastGmPhaseChange": r'scaledLastGmPhaseChange\s+([0-9-]+)',
-            "gmTimeBaseIndicator": r'gmTimeBaseIndicator\s+([0-9]+)',
-            "lastGmPhaseChange": r'lastGmPhaseChange\s+([0-9-]+)',
-            "gmPresent": r'gmPresent\s+(\w+)',
-            "gmIdentity": r'gmIdentity\s+([0-9a-f.]+)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, output)
-            if match:
-                value = match.group(1)
-                # 对于数值类型，尝试转换为整数
-                if key in ["master_offset", "ingress_time", "cumulativeScaledRateOffset", 
-                          "scaledLastGmPhaseChange", "gmTimeBaseIndicator", "lastGmPhaseChange"]:
-                    try:
-                        time_status[key] = int(value)
-                    except ValueError:
-                        time_status[key] = value
-                else:
-                    time_status[key] = value
-        
-        logger.info(f"PTP时间状态解析完成")
+        logger.debug("获取PTP时间状态，domain: %s, uds_path: %s", domain, uds_path)
+        time_status = await asyncio.to_thread(
+            query_dataset_fields, uds_path, domain, "TIME_STATUS_NP", TIME_STATUS_FIELDS, boundary_hops)
+        logger.debug("PTP时间状态解析完成")
         
         return {"success": True, **time_status}
         
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+    except PmcCommandError as e:
+        logger.error("pmc命令执行失败: %s", e)
+        raise HTTPException(status_code=500, detail=f"pmc命令执行失败: {str(e)}")
     except subprocess.TimeoutExpired:
         logger.error("pmc命令执行超时")
         raise HTTPException(status_code=500, detail="pmc命令执行超时")
@@ -1167,100 +1549,40 @@ async def get_ptp_timestatus(
         logger.error("pmc命令未找到")
         raise HTTPException(status_code=500, detail="pmc命令未找到，请确保已安装linuxptp工具包")
     except Exception as e:
-        logger.error(f"获取PTP时间状态失败: {str(e)}")
+        logger.error("获取PTP时间状态失败: %s", e)
         raise HTTPException(status_code=500, detail=f"获取PTP时间状态失败: {str(e)}")
 
-@app.get("/api/ptp-port-status")
+@app.get("/api/ptp-port-status", response_model=PortStatusResponse)
 async def get_ptp_port_status(
     domain: int = Query(127, description="PTP domain值", examples=[127]),
-    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"])
+    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"]),
+    boundary_hops: int = Query(0, ge=0, description="边界跳数，大于0时返回多个应答方", examples=[0])
 ):
     """
     获取PTP端口状态信息
-    通过运行 pmc -u -b 0 'GET PORT_DATA_SET' -d {domain} -s {uds_path} 命令
+    通过运行 pmc -u -b {boundary_hops} 'GET PORT_DATA_SET' -d {domain} -s {uds_path} 命令
     
     Args:
         domain: PTP domain值，默认127
         uds_path: UDS地址路径，默认/var/run/ptp4l
+        boundary_hops: 边界跳数，默认0
     
     Returns:
-        dict: 包含PTP端口状态信息
+        dict: 包含PTP端口状态信息，多端口时responders包含每个端口的应答
     """
     try:
-        logger.info(f"获取PTP端口状态，domain: {domain}, uds_path: {uds_path}")
-        
-        # 构造pmc命令
-        cmd = [
-            "pmc",
-            "-u",
-            "-b", "0",
-            "GET PORT_DATA_SET",
-            "-d", str(domain),
-            "-s", uds_path
-        ]
-        
-        logger.debug(f"执行命令: {' '.join(cmd)}")
-        
-        # 执行命令
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0:
-            logger.error(f"pmc命令执行失败: {result.stderr}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"pmc命令执行失败: {result.stderr}"
-            )
-        
-        # 解析输出
-        output = result.stdout
-        logger.debug(f"pmc命令输出: {output}")
-        
-        # 初始化返回结果
-        port_status = {
-            "portIdentity": None,
-            "portState": None,
-            "logMinDelayReqInterval": None,
-            "peerMeanPathDelay": None,
-            "logAnnounceInterval": None,
-            "announceReceiptTimeout": None,
-            "logSyncInterval": None,
-            "delayMechanism": None,
-            "logMinPdelayReqInterval": None,
-            "versionNumber": None
-        }
-        
-        # 解析各种端口状态信息
-        patterns = {
-            "portIdentity": r'portIdentity\s+([0-9a-f.]+)',
-            "portState": r'portState\s+(\w+)',
-            "logMinDelayReqInterval": r'logMinDelayReqInterval\s+([0-9-]+)',
-            "peerMeanPathDelay": r'peerMeanPathDelay\s+([0-9]+)',
-            "logAnnounceInterval": r'logAnnounceInterval\s+([0-9-]+)',
-            "announceReceiptTimeout": r'announceReceiptTimeout\s+([0-9]+)',
-            "logSyncInterval": r'logSyncInterval\s+([0-9-]+)',
-            "delayMechanism": r'delayMechanism\s+(\w+)',
-            "logMinPdelayReqInterval": r'logMinPdelayReqInterval\s+([0-9-]+)',
-            "versionNumber": r'versionNumber\s+([0-9]+)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, output)
-            if match:
-                value = match.group(1)
-                # 对于数值类型，尝试转换为整数
-                if key in ["logMinDelayReqInterval", "peerMeanPathDelay", "logAnnounceInterval", 
-                          "announceReceiptTimeout", "logSyncInterval", "logMinPdelayReqInterval", "versionNumber"]:
-                    try:
-                        port_status[key] = int(value)
-                    except ValueError:
-                        port_status[key] = value
-                else:
-                    port_status[key] = value
-        
-        logger.info(f"PTP端口状态解析完成")
+        logger.debug("获取PTP端口状态，domain: %s, uds_path: %s", domain, uds_path)
+        port_status = await asyncio.to_thread(
+            query_dataset_fields, uds_path, domain, "PORT_DATA_SET", PORT_DATA_SET_FIELDS, boundary_hops)
+        logger.debug("PTP端口状态解析完成")
         
         return {"success": True, **port_status}
         
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+    except PmcCommandError as e:
+        logger.error("pmc命令执行失败: %s", e)
+        raise HTTPException(status_code=500, detail=f"pmc命令执行失败: {str(e)}")
     except subprocess.TimeoutExpired:
         logger.error("pmc命令执行超时")
         raise HTTPException(status_code=500, detail="pmc命令执行超时")
@@ -1268,82 +1590,40 @@ async def get_ptp_port_status(
         logger.error("pmc命令未找到")
         raise HTTPException(status_code=500, detail="pmc命令未找到，请确保已安装linuxptp工具包")
     except Exception as e:
-        logger.error(f"获取PTP端口状态失败: {str(e)}")
+        logger.error("获取PTP端口状态失败: %s", e)
         raise HTTPException(status_code=500, detail=f"获取PTP端口状态失败: {str(e)}")
 
-@app.get("/api/ptp-currenttimedata")
+@app.get("/api/ptp-currenttimedata", response_model=CurrentDataResponse)
 async def get_ptp_currenttimedata(
     domain: int = Query(127, description="PTP domain值", examples=[127]),
-    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"])
+    uds_path: str = Query("/var/run/ptp4l", description="UDS地址路径", examples=["/var/run/ptp4l"]),
+    boundary_hops: int = Query(0, ge=0, description="边界跳数，大于0时返回多个应答方", examples=[0])
 ):
     """
     获取PTP当前时间数据信息
-    通过运行 pmc -u -b 0 'GET CURRENT_DATA_SET' -d {domain} -s {uds_path} 命令
+    通过运行 pmc -u -b {boundary_hops} 'GET CURRENT_DATA_SET' -d {domain} -s {uds_path} 命令
     
     Args:
         domain: PTP domain值，默认127
         uds_path: UDS地址路径，默认/var/run/ptp4l
+        boundary_hops: 边界跳数，默认0
     
     Returns:
-        dict: 包含PTP当前时间数据信息
+        dict: 包含PTP当前时间数据信息，responders为按端口ID分组的全部应答
     """
     try:
-        logger.info(f"获取PTP当前时间数据，domain: {domain}, uds_path: {uds_path}")
-        
-        # 构造pmc命令
-        cmd = [
-            "pmc",
-            "-u",
-            "-b", "0",
-            "GET CURRENT_DATA_SET",
-            "-d", str(domain),
-            "-s", uds_path
-        ]
-        
-        logger.debug(f"执行命令: {' '.join(cmd)}")
-        
-        # 执行命令
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0:
-            logger.error(f"pmc命令执行失败: {result.stderr}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"pmc命令执行失败: {result.stderr}"
-            )
-        
-        # 解析输出
-        output = result.stdout
-        logger.debug(f"pmc命令输出: {output}")
-        
-        # 初始化返回结果
-        current_data = {
-            "stepsRemoved": None,
-            "offsetFromMaster": None,
-            "meanPathDelay": None
-        }
-        
-        # 解析各种当前数据信息
-        patterns = {
-            "stepsRemoved": r'stepsRemoved\s+([0-9]+)',
-            "offsetFromMaster": r'offsetFromMaster\s+([0-9.-]+)',
-            "meanPathDelay": r'meanPathDelay\s+([0-9.]+)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, output)
-            if match:
-                value = match.group(1)
-                # 对于数值类型，尝试转换为整数
-                try:
-                    current_data[key] = float(value)
-                except ValueError:
-                    current_data[key] = value
-        
-        logger.info(f"PTP当前时间数据解析完成")
+        logger.debug("获取PTP当前时间数据，domain: %s, uds_path: %s", domain, uds_path)
+        current_data = await asyncio.to_thread(
+            query_dataset_fields, uds_path, domain, "CURRENT_DATA_SET", CURRENT_DATA_SET_FIELDS, boundary_hops)
+        logger.debug("PTP当前时间数据解析完成")
         
         return {"success": True, **current_data}
         
+    except AdmissionRejected as e:
+        raise admission_rejected(e)
+    except PmcCommandError as e:
+        logger.error("pmc命令执行失败: %s", e)
+        raise HTTPException(status_code=500, detail=f"pmc命令执行失败: {str(e)}")
     except subprocess.TimeoutExpired:
         logger.error("pmc命令执行超时")
         raise HTTPException(status_code=500, detail="pmc命令执行超时")
@@ -1351,24 +1631,67 @@ async def get_ptp_currenttimedata(
         logger.error("pmc命令未找到")
         raise HTTPException(status_code=500, detail="pmc命令未找到，请确保已安装linuxptp工具包")
     except Exception as e:
-        logger.error(f"获取PTP当前时间数据失败: {str(e)}")
+        logger.error("获取PTP当前时间数据失败: %s", e)
         raise HTTPException(status_code=500, detail=f"获取PTP当前时间数据失败: {str(e)}")
 
-@app.get("/api/clock-source-state")
-async def get_clock_source_state():
+@app.get("/api/clock-source-state", response_model=ClockSource)
+async def get_clock_source_state(request: Request, response: Response):
     """
-    获取当前时钟源状态
+    获取当前时钟源状态，ETag由状态快照版本号和当前状态生成
     
     Returns:
         dict: 包含当前时钟源信息
     """
     try:
         state = await clock_source_state.get_state()
+        etag = f'"clock-source-{ETAG_EPOCH}-{clock_source_state.version}-{state["status"]}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
         return state
     except Exception as e:
-        logger.error(f"获取时钟源状态失败: {str(e)}")
+        logger.error("获取时钟源状态失败: %s", e)
         raise HTTPException(status_code=500, detail="获取时钟源状态失败")
 
+@app.get("/api/clock-source-state/transitions", response_model=ClockSourceTransitionsResponse)
+async def get_clock_source_transitions(since: int = Query(0, ge=0, description="只返回序号大于此值的记录")):
+    """
+    获取最近的时钟源状态转换记录
+    
+    Returns:
+        dict: 转换记录列表，按序号递增
+    """
+    return {"transitions": clock_source_state.get_transitions(since)}
+
+@app.get("/api/clock-source-state/events")
+async def clock_source_events(request: Request):
+    """
+    时钟源状态转换事件流（Server-Sent Events）
+    
+    连接后先发送一次当前状态（event: state），之后每次转换立即发送（event: transition），
+    空闲时定期发送注释行保活。
+    """
+    queue = clock_source_state.subscribe()
+
+    async def stream():
+        try:
+            state = await clock_source_state.get_state()
+            yield f"event: state\ndata: {json.dumps(state, ensure_ascii=False)}\n\n"
+            while True:
+                try:
+                    entry = await asyncio.wait_for(queue.get(), EVENT_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {entry['seq']}\nevent: transition\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+        finally:
+            clock_source_state.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/api/clock-source-state")
 async def update_clock_source_state(update: ClockSourceUpdate):
     """
@@ -1380,11 +1703,13 @@ async def update_clock_source_state(update: ClockSourceUpdate):
     Returns:
         dict: 操作结果
     """
+    if clock_source_state.mirrored:
+        raise HTTPException(status_code=409, detail="时钟源状态由leader worker维护，请求未被leader处理")
     try:
         await clock_source_state.update(update.source)
         return {"status": "success", "message": "时钟源状态已更新"}
     except Exception as e:
-        logger.error(f"更新时钟源状态失败: {str(e)}")
+        logger.error("更新时钟源状态失败: %s", e)
         raise HTTPException(status_code=500, detail="更新时钟源状态失败")
 
 @app.get("/api/clock-sync-mode")
@@ -1398,22 +1723,20 @@ async def get_clock_sync_mode():
         - 否则返回"internal"
     """
     try:
-        current_mode = get_current_clock_sync_mode()
-        phc2sys_running = check_phc2sys_service_status()
+        # 服务状态按 STATUS_CACHE_TTL 缓存（非leader使用leader发布的状态），时钟源取自时钟源状态机
+        # （leader由phc2sys日志维护，其他worker镜像），不再每次扫描历史日志
+        phc2sys_running = await phc2sys_running_status()
+        current_mode = "PTP" if phc2sys_running else "internal"
         result = {
             "success": True,
             "mode": current_mode,
             "phc2sys_running": phc2sys_running
         }
         if current_mode == "PTP":
-            last_clock_info = await get_last_clock_source_from_logs()
-            if last_clock_info:
-                result["current_clock_source"] = last_clock_info[0]
-            else:
-                result["current_clock_source"] = None
+            result["current_clock_source"] = clock_source_state.current_source
         return result
     except Exception as e:
-        logger.error(f"获取锁相方式失败: {str(e)}")
+        logger.error("获取锁相方式失败: %s", e)
         raise HTTPException(status_code=500, detail="获取锁相方式失败")
 
 @app.put("/api/clock-sync-mode")
@@ -1429,11 +1752,11 @@ async def update_clock_sync_mode(sync_mode: ClockSyncMode):
     """
     try:
         mode = sync_mode.mode
-        logger.info(f"设置锁相方式: {mode}")
+        logger.info("设置锁相方式: %s", mode)
         
         # 检查当前phc2sys服务状态
         phc2sys_running = check_phc2sys_service_status()
-        logger.info(f"当前phc2sys服务状态: {'运行中' if phc2sys_running else '未运行'}")
+        logger.info("当前phc2sys服务状态: %s", '运行中' if phc2sys_running else '未运行')
         
         # 根据传入的锁相方式进行操作
         if mode in ["internal", "BB"]:
@@ -1448,7 +1771,7 @@ async def update_clock_sync_mode(sync_mode: ClockSyncMode):
                 )
                 
                 if result.returncode != 0:
-                    logger.error(f"停止phc2sys服务失败: {result.stderr}")
+                    logger.error("停止phc2sys服务失败: %s", result.stderr)
                     raise HTTPException(
                         status_code=500,
                         detail=f"停止phc2sys服务失败: {result.stderr}"
@@ -1470,7 +1793,7 @@ async def update_clock_sync_mode(sync_mode: ClockSyncMode):
                 )
                 
                 if result.returncode != 0:
-                    logger.error(f"启动phc2sys服务失败: {result.stderr}")
+                    logger.error("启动phc2sys服务失败: %s", result.stderr)
                     raise HTTPException(
                         status_code=500,
                         detail=f"启动phc2sys服务失败: {result.stderr}"
@@ -1484,7 +1807,7 @@ async def update_clock_sync_mode(sync_mode: ClockSyncMode):
         current_mode = get_current_clock_sync_mode()
         current_phc2sys_running = check_phc2sys_service_status()
         
-        logger.info(f"锁相方式设置完成，当前模式: {current_mode}")
+        logger.info("锁相方式设置完成，当前模式: %s", current_mode)
         
         result = {
             "success": True,
@@ -1505,7 +1828,7 @@ async def update_clock_sync_mode(sync_mode: ClockSyncMode):
         # 重新抛出HTTPException，不进行包装
         raise
     except Exception as e:
-        logger.error(f"设置锁相方式失败: {str(e)}")
+        logger.error("设置锁相方式失败: %s", e)
         raise HTTPException(status_code=500, detail=f"设置锁相方式失败: {str(e)}")
 
 async def monitor_phc2sys_logs():
@@ -1527,7 +1850,7 @@ async def monitor_phc2sys_logs():
                     break
 
                 line_str = line.decode().strip()
-                logger.debug(f"收到日志: {line_str}")
+                journal_logger.debug("收到日志: %s", line_str)
 
                 # 匹配时钟源选择信息
                 match = re.search(r'selecting (\S+) (?:as out-of-domain source clock|for synchronization)', line_str)
@@ -1539,20 +1862,18 @@ async def monitor_phc2sys_logs():
                     
                     # 检查是否是异常状态
                     is_failed = "for synchronization" in line_str
-                    logger.info(f"检测到时钟源{'异常' if is_failed else '变化'}: {source}")
+                    journal_logger.info("检测到时钟源%s: %s", '异常' if is_failed else '变化', source,
+                                        extra={"clock_source": source, "failed": is_failed})
                     await clock_source_state.update(source, is_failed)
 
                 # 检测同步状态更新
                 elif "CLOCK_REALTIME phc offset" in line_str:
                     # 重置超时计时器
-                    async with clock_source_state._lock:
-                        clock_source_state.last_sync_time = datetime.now()
-                        if clock_source_state.is_failed:
-                            clock_source_state.is_failed = False
-                            logger.info("时钟源恢复正常")
+                    source = await clock_source_state.sync_seen()
+                    record_phc2sys_offset(line_str, source)
 
         except Exception as e:
-            logger.error(f"监控phc2sys日志时发生错误: {str(e)}")
+            journal_logger.error("监控phc2sys日志时发生错误: %s", e)
             await asyncio.sleep(5)  # 发生错误时等待5秒后重试
 
 async def get_last_clock_source_from_logs() -> Optional[tuple[str, bool]]:
@@ -1566,7 +1887,7 @@ async def get_last_clock_source_from_logs() -> Optional[tuple[str, bool]]:
         result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode != 0:
-            logger.error(f"获取历史日志失败: {result.stderr}")
+            logger.error("获取历史日志失败: %s", result.stderr)
             return None
 
         # 按时间倒序处理日志
@@ -1581,17 +1902,32 @@ async def get_last_clock_source_from_logs() -> Optional[tuple[str, bool]]:
                     continue
                 # 检查是否是异常状态
                 is_failed = "for synchronization" in line
-                logger.info(f"从历史日志中找到最近的时钟源: {source}, 状态: {'异常' if is_failed else '正常'}")
+                logger.info("从历史日志中找到最近的时钟源: %s, 状态: %s", source, '异常' if is_failed else '正常')
                 return source, is_failed
 
         logger.info("历史日志中未找到时钟源信息")
         return None
     except Exception as e:
-        logger.error(f"扫描历史日志时发生错误: {str(e)}")
+        logger.error("扫描历史日志时发生错误: %s", e)
         return None
 
-@app.get("/api/systemd/service-interfaces/{service}")
-async def get_service_interfaces(service: str):
+def read_service_interfaces(service: str) -> List[str]:
+    """
+    读取service的 -i 网络接口（已生成drop-in时来自环境文件，否则来自ExecStart行），
+    相关文件未变化时使用缓存结果
+    """
+    unit = MANAGED_UNITS[service]
+    etag = file_etag(*unit.paths)
+    cached = _parsed_file_cache.get(unit.unit_path)
+    if cached and cached[0] == etag:
+        return cached[1]
+    
+    interfaces = [group[0] for group in unit.read_groups()]
+    _parsed_file_cache[unit.unit_path] = (etag, interfaces)
+    return interfaces
+
+@app.get("/api/systemd/service-interfaces/{service}", response_model=ServiceInterfacesResponse)
+async def get_service_interfaces(service: str, request: Request, response: Response):
     """
     获取指定service文件中配置的网络接口
     
@@ -1599,97 +1935,728 @@ async def get_service_interfaces(service: str):
         service: 服务名称，如 ptp4l.service 或 ptp4l1.service
     
     Returns:
-        dict: 包含解析到的网络接口列表
+        dict: 包含解析到的网络接口列表；带ETag，If-None-Match匹配时返回304
     """
     if service not in ["ptp4l.service", "ptp4l1.service"]:
         raise HTTPException(status_code=400, detail="不支持的服务名")
     
     try:
-        service_path = f"/etc/systemd/system/{service}"
-        
-        if not os.path.exists(service_path):
-            logger.error(f"Service文件不存在: {service_path}")
-            raise HTTPException(status_code=404, detail=f"Service文件不存在: {service_path}")
+        unit = MANAGED_UNITS[service]
         
-        with open(service_path, 'r') as f:
-            content = f.read()
+        if not os.path.exists(unit.unit_path):
+            logger.error("Service文件不存在: %s", unit.unit_path)
+            raise HTTPException(status_code=404, detail=f"Service文件不存在: {unit.unit_path}")
         
-        # 解析ExecStart行中的网络接口
-        interfaces = []
-        for line in content.split('\n'):
-            if line.strip().startswith('ExecStart='):
-                # 提取 -i 参数后面的接口名
-                matches = re.findall(r'-i\s+(\S+)', line)
-                interfaces.extend(matches)
-                break
+        etag = file_etag(*unit.paths)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
         
-        logger.info(f"从 {service} 中解析到网络接口: {interfaces}")
+        interfaces = read_service_interfaces(service)
+        logger.debug("从 %s 中解析到网络接口: %s", service, interfaces)
         return {"success": True, "interfaces": interfaces}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取service网络接口失败: {str(e)}")
+        logger.error("获取service网络接口失败: %s", e)
         raise HTTPException(status_code=500, detail=f"获取service网络接口失败: {str(e)}")
 
-def update_phc2sys_domain(new_domain: int, config_file: str) -> bool:
+async def _run_captured(errors: Dict[str, str], key: str, func, *args):
+    """在线程池中执行阻塞函数，失败时把错误记录到errors并返回None"""
+    try:
+        return await asyncio.to_thread(func, *args)
+    except Exception as e:
+        errors[key] = str(e)
+        return None
+
+async def gather_instance_snapshot(name: str) -> Dict:
     """
-    更新phc2sys.service配置中对应PTP时钟的domain参数（健壮分割法）
-    Args:
-        new_domain: 新的domain值
-        config_file: PTP配置文件路径，用于确定要更新哪个时钟的domain
+    并发获取单个PTP实例的配置、网络接口和三类状态数据
+    
+    配置读完后按其中的domain并发查询 TIME_STATUS_NP、PORT_DATA_SET、CURRENT_DATA_SET。
+    """
+    instance = PTP_INSTANCES[name]
+    errors: Dict[str, str] = {}
+    
+    async def config_and_status():
+        config = await _run_captured(errors, "config", read_ptp_config, instance["config_file"])
+        domain = config_domain(config)
+        uds_path = instance["uds_path"]
+        statuses = await asyncio.gather(
+            _run_captured(errors, "time_status", query_dataset_fields, uds_path, domain, "TIME_STATUS_NP", TIME_STATUS_FIELDS),
+            _run_captured(errors, "port_status", query_dataset_fields, uds_path, domain, "PORT_DATA_SET", PORT_DATA_SET_FIELDS),
+            _run_captured(errors, "current_data", query_dataset_fields, uds_path, domain, "CURRENT_DATA_SET", CURRENT_DATA_SET_FIELDS),
+        )
+        return config, domain, statuses
+    
+    (config, domain, statuses), interfaces = await asyncio.gather(
+        config_and_status(),
+        _run_captured(errors, "interfaces", read_service_interfaces, instance["service"]),
+    )
+    time_status, port_status, current_data = statuses
+    return {
+        **instance,
+        "domain": domain,
+        "config": config,
+        "interfaces": interfaces or [],
+        "time_status": time_status,
+        "port_status": port_status,
+        "current_data": current_data,
+        "errors": errors,
+    }
+
+@app.get("/api/bootstrap", response_model=BootstrapResponse)
+async def get_bootstrap():
+    """
+    页面初始加载所需的全部数据
+    
+    在服务端并发获取网卡列表、同步模式、时钟源状态以及每个PTP实例的配置、
+    网络接口和状态，一次返回，前端只需一次往返即可完成渲染。
+    单项获取失败不影响其他数据，错误记录在对应的 errors 字段中。
+    
     Returns:
-        bool: 更新是否成功
+        dict: 包含 network_interfaces（列式，每个字段一个数组）、sync_mode、clock_source、instances
+    """
+    errors: Dict[str, str] = {}
+
+    async def instance_snapshot(name: str) -> Dict:
+        # leader读取最新的配置和状态，其他worker使用leader发布的快照
+        snapshot = leader_published("instances", name)
+        return snapshot if snapshot is not None else await gather_instance_snapshot(name)
+
+    interfaces, phc2sys_running, clock_source, *instances = await asyncio.gather(
+        _run_captured(errors, "network_interfaces", get_network_interfaces_info),
+        phc2sys_running_status(),
+        clock_source_state.get_state(),
+        *(instance_snapshot(name) for name in PTP_INSTANCES),
+    )
+    return {
+        "success": True,
+        "network_interfaces": to_columns(interfaces or [], NETWORK_INTERFACE_FIELDS),
+        "sync_mode": {
+            "mode": "PTP" if phc2sys_running else "internal",
+            "phc2sys_running": bool(phc2sys_running),
+        },
+        "clock_source": clock_source,
+        "instances": dict(zip(PTP_INSTANCES, instances)),
+        "errors": errors,
+    }
+
+class InterfaceIndex:
+    """
+    网络接口 -> PTP实例名 的索引
+    
+    由各实例service的 -i 参数建立，只在相关文件（unit、drop-in、环境文件）变化
+    （按file_etag判断，只需stat）时重建，查找为O(1)。
+    """
+    def __init__(self, instances: Dict[str, Dict]):
+        self._services = [info["service"] for info in instances.values()]
+        self._paths = [path for service in self._services for path in MANAGED_UNITS[service].paths]
+        self._names = list(instances)
+        self._etag: Optional[str] = None
+        self._index: Dict[str, str] = {}
+
+    def _refresh(self):
+        etag = file_etag(*self._paths)
+        if etag == self._etag:
+            return
+        index = {}
+        for name, service in zip(self._names, self._services):
+            try:
+                interfaces = read_service_interfaces(service)
+            except OSError as e:
+                logger.warning("读取%s的网络接口失败: %s", service, e)
+                continue
+            for interface in interfaces:
+                index[interface] = name
+        self._index = index
+        self._etag = etag
+        logger.debug("重建网络接口索引: %s", index)
+
+    def lookup(self, interface: str) -> Optional[str]:
+        self._refresh()
+        return self._index.get(interface)
+
+    def snapshot(self) -> Dict[str, str]:
+        self._refresh()
+        return dict(self._index)
+
+class TtlCache:
     """
-    try:
-        service_path = "/etc/systemd/system/phc2sys.service"
-        if not os.path.exists(service_path):
-            logger.error(f"phc2sys.service文件不存在: {service_path}")
-            return False
-        # 根据配置文件路径确定对应的UDS路径
-        target_uds = None
-        if config_file == "/etc/linuxptp/ptp4l.conf":
-            target_uds = "/var/run/ptp4l"
-        elif config_file == "/etc/linuxptp/ptp4l1.conf":
-            target_uds = "/var/run/ptp4l1"
-        else:
-            logger.error(f"无法确定配置文件 {config_file} 对应的UDS路径")
-            return False
-        logger.info(f"更新phc2sys.service中 {target_uds} 对应的domain参数为: {new_domain}")
-        with open(service_path, 'r') as f:
-            lines = f.readlines()
-        new_lines = []
-        updated = False
-        for line in lines:
-            if line.strip().startswith("ExecStart="):
-                rest = line.split('ExecStart=', 1)[1].strip()
-                parts = rest.split()
-                i = 0
-                while i < len(parts):
-                    if parts[i] == "-z" and i+2 < len(parts) and parts[i+1] == target_uds and parts[i+2] == "-n":
-                        old_domain = parts[i+3] if i+3 < len(parts) else None
-                        logger.info(f"将 {target_uds} 的domain从{old_domain}改为{new_domain}")
-                        parts[i+3] = str(new_domain)
-                        updated = True
-                        i += 4
-                    else:
-                        i += 1
-                new_rest = ' '.join(parts)
-                new_lines.append(f"ExecStart={new_rest}\n")
+    异步TTL缓存
+    
+    未过期时直接返回缓存值；过期后同一个键只有一个协程执行加载，
+    其他并发请求等待并共享其结果。
+    """
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, key: str):
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry
+        return None
+
+    async def get(self, key: str, loader):
+        entry = self._fresh(key)
+        if entry:
+            return entry[1]
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._fresh(key)
+            if entry:
+                return entry[1]
+            value = await loader()
+            self._entries[key] = (time.monotonic(), value)
+            return value
+
+    def peek(self, key: str):
+        """返回最近一次加载的值（不论是否过期），没有时返回None"""
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+interface_index = InterfaceIndex(PTP_INSTANCES)
+status_cache = TtlCache(STATUS_CACHE_TTL)
+
+HISTORY_CAPACITY = int(HISTORY_SECONDS / SAMPLE_INTERVAL)
+leader_lock = LeaderLock(os.path.join(STATE_DIR, "leader.lock"))
+try:
+    shared_state: Optional[SharedState] = SharedState(os.path.join(STATE_DIR, "state"))
+    sample_store: SampleStore = MappedSampleStore(
+        os.path.join(STATE_DIR, "history"), HISTORY_CAPACITY,
+        [(name, metric) for name in PTP_INSTANCES for metric in HISTORY_METRICS],
+    )
+except OSError as e:
+    logger.warning("无法使用共享状态目录%s（%s），按单worker运行", STATE_DIR, e)
+    shared_state = None
+    sample_store = SampleStore(HISTORY_CAPACITY)
+
+def acquire_leadership() -> bool:
+    """尝试成为leader；没有共享状态目录时本进程总是leader"""
+    return shared_state is None or leader_lock.acquire()
+
+def leader_published(key: str, name: Optional[str] = None):
+    """
+    非leader worker读取leader发布的状态中的一项，name给出时取其中一个实例
+    
+    本进程是leader、按单worker运行或leader还没有发布时返回None，由调用方自行获取。
+    """
+    if shared_state is None or leader_lock.is_leader:
+        return None
+    data = shared_state.read()
+    value = data.get(key) if data else None
+    if name is not None and value is not None:
+        value = value.get(name)
+    return value
+
+async def phc2sys_running_status() -> bool:
+    """phc2sys是否在运行，按 STATUS_CACHE_TTL 缓存"""
+    running = leader_published("phc2sys_running")
+    if running is not None:
+        return running
+    return await status_cache.get("phc2sys", lambda: asyncio.to_thread(check_phc2sys_service_status))
+
+async def cached_instance_snapshot(name: str) -> Dict:
+    """PTP实例的状态快照，按 STATUS_CACHE_TTL 缓存"""
+    snapshot = leader_published("instances", name)
+    if snapshot is not None:
+        return snapshot
+    return await status_cache.get(name, lambda: gather_instance_snapshot(name))
+
+def clock_source_lock_status(clock_source: Dict) -> str:
+    """根据phc2sys时钟源状态判断锁定状态: locked / unlocked / unknown"""
+    source = clock_source.get("current_source")
+    status = clock_source.get("status")
+    if status == "normal" and source and source != "noClockAvailable":
+        return "locked"
+    if status in ("failed", "timeout") or source == "noClockAvailable":
+        return "unlocked"
+    return "unknown"
+
+@app.get("/api/system-sync-status", response_model=SystemSyncStatusResponse, response_model_exclude_unset=True)
+async def get_system_sync_status():
+    """
+    系统同步状态面板所需的全部数据
+    
+    把phc2sys当前时钟源（网络接口）经接口索引映射到对应的PTP实例，
+    并合并该实例的缓存状态。锁相方式与实例状态均按 STATUS_CACHE_TTL 缓存，
+    无论多少客户端轮询，每个周期最多执行一次systemctl和pmc；
+    多worker部署时非leader worker直接使用leader发布的状态，不执行任何命令。
+    
+    Returns:
+        dict: 锁相方式、时钟源、锁定状态以及对应实例的GM、偏移和路径延迟
+    """
+    phc2sys_running = await phc2sys_running_status()
+    mode = "PTP" if phc2sys_running else "internal"
+    result = {
+        "success": True,
+        "mode": mode,
+        "phc2sys_running": phc2sys_running,
+        "clock_source": None,
+        "lock_status": None,
+        "instance": None,
+        "mapped": False,
+        "errors": {},
+    }
+    if mode != "PTP":
+        return result
+    
+    clock_source = await clock_source_state.get_state()
+    source = clock_source.get("current_source")
+    instance = interface_index.lookup(source) if source else None
+    result["clock_source"] = clock_source
+    result["lock_status"] = clock_source_lock_status(clock_source)
+    result["mapped"] = instance is not None
+    if instance is None:
+        # 未找到映射时使用第一个实例，与原先前端的默认行为一致
+        if source and source != "noClockAvailable":
+            logger.debug("未找到时钟源%s对应的PTP实例，使用默认实例", source)
+        instance = next(iter(PTP_INSTANCES))
+    
+    snapshot = await cached_instance_snapshot(instance)
+    time_status = snapshot["time_status"] or {}
+    current_data = snapshot["current_data"] or {}
+    port_status = snapshot["port_status"] or {}
+    result.update({
+        "instance": instance,
+        "uds_path": snapshot["uds_path"],
+        "domain": snapshot["domain"],
+        "gmIdentity": time_status.get("gmIdentity"),
+        "gmPresent": time_status.get("gmPresent"),
+        "portState": port_status.get("portState"),
+        "offsetFromMaster": current_data.get("offsetFromMaster"),
+        "meanPathDelay": current_data.get("meanPathDelay"),
+        "errors": snapshot["errors"],
+    })
+    return result
+
+_PHC2SYS_OFFSET_RE = re.compile(r'phc offset\s+(-?\d+)')
+_PHC2SYS_SERVO_RE = re.compile(r'phc offset\s+(-?\d+)\s+s(\d)\s+freq\s+([-+]?\d+)')
+
+# 各实例的守时误差模型: phc2sys（系统时钟跟踪该实例PHC的频率调整）和 ptp4l（PHC相对GM的频率）
+holdover_models = {
+    name: {"phc2sys": HoldoverModel(HOLDOVER_WINDOW), "ptp4l": HoldoverModel(HOLDOVER_WINDOW)}
+    for name in PTP_INSTANCES
+}
+
+def record_phc2sys_offset(line: str, source: Optional[str]):
+    """
+    把phc2sys日志中的 CLOCK_REALTIME phc offset 记录到当前时钟源对应实例的历史中
+    
+    伺服锁定（s2）时的频率调整量加入该实例的phc2sys守时模型，步进（s1）或失锁（s0）时模型重新开始。
+    """
+    match = _PHC2SYS_OFFSET_RE.search(line)
+    instance = interface_index.lookup(source) if source else None
+    if match and instance:
+        sample_store.record(instance, time.time(), {"phc2sysOffset": int(match.group(1))})
+        alert_engine.observe(instance, {"phc2sysOffset": int(match.group(1))})
+        servo = _PHC2SYS_SERVO_RE.search(line)
+        if servo:
+            model = holdover_models[instance]["phc2sys"]
+            if servo.group(2) == "2":
+                model.add(time.monotonic(), int(servo.group(3)), int(servo.group(1)), reference=source)
             else:
-                new_lines.append(line)
-        if not updated:
-            logger.error(f"未找到 {target_uds} 对应的domain参数")
-            return False
-        with open(service_path, 'w') as f:
-            f.writelines(new_lines)
-        logger.info("phc2sys.service配置更新成功")
-        return True
-    except Exception as e:
-        logger.error(f"更新phc2sys.service配置失败: {str(e)}")
-        return False
+                model.reset()
+
+def load_alert_rules() -> List[AlertRule]:
+    """读取告警规则文件，文件不合法时记录错误并使用默认规则"""
+    try:
+        return load_rules(ALERT_RULES_FILE)
+    except (OSError, ValueError) as e:
+        logger.error("告警规则文件%s无法使用（%s），使用默认规则", ALERT_RULES_FILE, e)
+        return [AlertRule.from_dict(rule) for rule in DEFAULT_RULES]
+
+alert_notifier = AlertNotifier([sink for sink in (WebhookSink(ALERT_WEBHOOK) if ALERT_WEBHOOK else None,
+                                                  FileSink(ALERT_FILE) if ALERT_FILE else None) if sink])
+alert_engine = AlertEngine(load_alert_rules(), alert_notifier.submit)
+
+def observe_instance_alerts(name: str, snapshot: Dict):
+    """用实例状态快照评估告警规则，查询失败时端口状态按 UNREACHABLE 评估"""
+    alert_engine.observe(name, instance_alert_values(snapshot))
+
+async def watch_alerts():
+    """leader: 用时钟源状态转换评估告警规则（实例名 phc2sys），并按采样间隔推进规则的持续时间"""
+    queue = clock_source_state.subscribe()
+    state = await clock_source_state.get_state()
+    alert_engine.observe("phc2sys", {"clockSource": state["current_source"], "clockSourceStatus": state["status"]})
+    while True:
+        try:
+            entry = await asyncio.wait_for(queue.get(), SAMPLE_INTERVAL)
+            alert_engine.observe("phc2sys", {"clockSource": entry["source"], "clockSourceStatus": entry["status"]})
+        except asyncio.TimeoutError:
+            pass
+        alert_engine.tick()
+
+def record_ptp4l_frequency(name: str, snapshot: Dict):
+    """从端口处于SLAVE且GM存在时的 cumulativeScaledRateOffset 采样PHC相对GM的频率"""
+    _record_ptp4l_frequency(holdover_models[name]["ptp4l"], time.monotonic(), snapshot)
+
+async def sample_instance_status():
+    """按 SAMPLE_INTERVAL 采样各PTP实例的偏移和路径延迟，与状态接口共用缓存"""
+    logger.info("开始采样PTP实例状态...")
+    # 采样发出的管理查询优先于接口请求准入
+    query_priority.set(INTERNAL)
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        try:
+            for name in PTP_INSTANCES:
+                snapshot = await cached_instance_snapshot(name)
+                current_data = snapshot["current_data"]
+                if current_data:
+                    sample_store.record(name, time.time(), {
+                        "offsetFromMaster": current_data.get("offsetFromMaster"),
+                        "meanPathDelay": current_data.get("meanPathDelay"),
+                    })
+                record_ptp4l_frequency(name, snapshot)
+                observe_instance_alerts(name, snapshot)
+        except Exception as e:
+            logger.error("采样PTP实例状态失败: %s", e)
+        # 按固定节拍采样，落后时跳过错过的节拍
+        next_tick = max(next_tick + SAMPLE_INTERVAL, loop.time())
+        await asyncio.sleep(next_tick - loop.time())
+
+phc_sampler = PhcSampler(fallback=PHC_SAMPLE_FALLBACK)
+
+def instance_phc_devices() -> Dict[str, Optional[str]]:
+    """根据各实例service中的网卡和网卡的PHC编号，得到 实例名 -> /dev/ptpN"""
+    phc_by_name = {iface["name"]: iface["phc_index"] for iface in get_network_interfaces_info()}
+    devices: Dict[str, Optional[str]] = {name: None for name in PTP_INSTANCES}
+    for interface, name in interface_index.snapshot().items():
+        phc_index = phc_by_name.get(interface, -1)
+        if devices[name] is None and phc_index >= 0:
+            devices[name] = f"/dev/ptp{phc_index}"
+    return devices
+
+async def sample_phc_offsets():
+    """
+    按 PHC_SAMPLE_INTERVAL 在进程内测量各实例PHC与CLOCK_REALTIME的偏差，以及与第一个实例PHC的交叉偏差
+    
+    每次测量只有几次clock_gettime，直接在事件循环中执行，不启动子进程。
+    """
+    logger.info("开始采样PHC偏差，间隔%s秒", PHC_SAMPLE_INTERVAL)
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    while True:
+        try:
+            phc_sampler.update_devices(instance_phc_devices())
+            for name, entry in phc_sampler.sample().items():
+                values = {"phcOffset": entry["offset_ns"], "phcCrossOffset": entry.get("cross_offset_ns")}
+                sample_store.record(name, entry["time"], values)
+                alert_engine.observe(name, values)
+        except Exception as e:
+            logger.error("采样PHC偏差失败: %s", e)
+        next_tick = max(next_tick + PHC_SAMPLE_INTERVAL, loop.time())
+        await asyncio.sleep(next_tick - loop.time())
+
+@app.get("/api/phc-offsets", response_model=PhcOffsetsResponse)
+async def get_phc_offsets():
+    """
+    获取最近一次PHC偏差测量结果
+    
+    Returns:
+        dict: 以实例名为键，包含设备、与CLOCK_REALTIME的偏差和夹逼区间，以及与参考实例PHC的交叉偏差
+    """
+    latest = leader_published("phc_offsets")
+    return {"success": True, "interval": PHC_SAMPLE_INTERVAL,
+            "instances": latest if latest is not None else phc_sampler.latest}
+
+@app.get("/api/pmc-admission")
+async def get_pmc_admission():
+    """
+    获取本worker各UDS路径的管理查询准入统计
+    
+    Returns:
+        dict: 准入参数（rate、burst 为按worker数平分后本worker的值），以及以UDS路径为键的令牌数、
+              排队数、准入次数和按原因统计的拒绝次数
+    """
+    return {
+        "success": True,
+        "enabled": pmc_admission.enabled,
+        "workers": PMC_WORKERS,
+        "rate": pmc_admission.rate,
+        "burst": pmc_admission.burst,
+        "queue_size": PMC_QUEUE,
+        "max_wait": PMC_MAX_WAIT,
+        "worker": os.getpid(),
+        "sockets": pmc_admission.stats(),
+    }
+
+async def adopt_shared_state():
+    """成为leader时接续上一个leader发布的时钟源状态和转换记录"""
+    clock_source_state.mirrored = False
+    if shared_state is None:
+        return
+    shared_state.recover()
+    sample_store.recover()
+    data = shared_state.read()
+    if data:
+        try:
+            await clock_source_state.load(data["clock_source"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("共享状态中的时钟源状态无法使用: %s", e)
+
+def start_leader_tasks():
+    """启动只在leader中运行的后台任务"""
+    # 启动日志监控任务
+    asyncio.create_task(monitor_phc2sys_logs())
+    # 启动时钟源超时看门狗
+    asyncio.create_task(clock_source_state.watch())
+    # 启动状态历史采样任务
+    asyncio.create_task(sample_instance_status())
+    if PHC_SAMPLE_INTERVAL > 0:
+        asyncio.create_task(sample_phc_offsets())
+    if DISCOVERY_HOPS > 0:
+        asyncio.create_task(discover_topology())
+    # 告警评估与异步投递
+    asyncio.create_task(watch_alerts())
+    asyncio.create_task(alert_notifier.run())
+    if shared_state is not None:
+        asyncio.create_task(publish_shared_state())
+
+async def publish_shared_state():
+    """leader: 每个采样周期以及每次时钟源状态转换时把监控数据发布到共享状态"""
+    queue = clock_source_state.subscribe()
+    while True:
+        try:
+            await asyncio.wait_for(queue.get(), SAMPLE_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            phc2sys_running = await phc2sys_running_status()
+            shared_state.publish({
+                "leader": os.getpid(),
+                "published": time.time(),
+                "clock_source": clock_source_state.export(),
+                "phc2sys_running": phc2sys_running,
+                "instances": {name: status_cache.peek(name) for name in PTP_INSTANCES
+                              if status_cache.peek(name) is not None},
+                "phc_offsets": phc_sampler.latest,
+                "topology": {name: topology.graph() for name, topology in topologies.items()},
+                "holdover": {name: {source: model.snapshot(HOLDOVER_HORIZONS) for source, model in models.items()}
+                             for name, models in holdover_models.items()},
+                "alerts": alert_status(),
+            })
+        except Exception as e:
+            logger.error("发布共享状态失败: %s", e)
+
+async def follow_leader():
+    """非leader worker: 镜像leader发布的时钟源状态，leader退出（释放锁）后接手"""
+    last = None
+    while True:
+        try:
+            if acquire_leadership():
+                break
+            data = shared_state.read()
+            if data is not None and data is not last:
+                last = data
+                await clock_source_state.load(data["clock_source"])
+        except Exception as e:
+            logger.error("读取共享状态失败: %s", e)
+        await asyncio.sleep(FOLLOWER_POLL_INTERVAL)
+    logger.info("leader已退出，本worker(pid %s)接手日志监控和采样", os.getpid())
+    await adopt_shared_state()
+    start_leader_tasks()
+
+@app.get("/api/history/{instance}", response_model=HistoryResponse)
+async def get_history(
+    instance: str,
+    metrics: Optional[str] = Query(None, description="逗号分隔的指标名，默认全部", examples=["offsetFromMaster,meanPathDelay"]),
+    since: Optional[float] = Query(None, description="只返回该时间（Unix秒）之后的点，用于增量获取"),
+    window: float = Query(HISTORY_SECONDS, gt=0, le=HISTORY_SECONDS, description="未指定since时返回最近多少秒"),
+):
+    """
+    获取PTP实例的历史采样
+    
+    每个指标以列式返回（时间戳数组t与数值数组v），前端可直接转换为Float64Array。
+    首次加载按window获取完整窗口，之后以上次最后一个时间戳作为since增量获取。
+    
+    Returns:
+        dict: {"now": 服务器时间, "series": {指标: {"t": [...], "v": [...]}}}
+    """
+    if instance not in PTP_INSTANCES:
+        raise HTTPException(status_code=404, detail=f"未知的PTP实例: {instance}")
+    names = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else HISTORY_METRICS
+    unknown = [m for m in names if m not in HISTORY_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的指标: {', '.join(unknown)}")
+    
+    now = time.time()
+    start = since if since is not None else now - window
+    series = {}
+    for metric in names:
+        try:
+            times, values = sample_store.query(instance, metric, start)
+        except ReadConflict as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        series[metric] = {"t": times, "v": values}
+    return {"success": True, "instance": instance, "now": now, "series": series}
+
+@app.get("/api/history/{instance}/export")
+async def export_history(
+    instance: str,
+    metrics: Optional[str] = Query(None, description="逗号分隔的指标名，默认全部"),
+    start: Optional[float] = Query(None, description="起始时间（Unix秒，不含），默认为保留的最早的点"),
+    end: Optional[float] = Query(None, description="结束时间（Unix秒，含），默认为当前"),
+    fmt: str = Query("csv", alias="format", description="导出格式: csv 或 arrow（Arrow IPC 流，需要 pyarrow）"),
+    gzip: bool = Query(False, description="是否gzip压缩"),
+):
+    """
+    以流式响应批量导出PTP实例的历史采样
+    
+    直接从采样存储按块读取、编码（和压缩）后发送，内存占用与时间范围无关。
+    CSV 为长表格式 time,metric,value，按指标依次输出。
+    
+    Returns:
+        StreamingResponse: 以附件形式下载的 CSV / Arrow IPC 流（可gzip压缩）
+    """
+    if instance not in PTP_INSTANCES:
+        raise HTTPException(status_code=404, detail=f"未知的PTP实例: {instance}")
+    names = [m.strip() for m in metrics.split(",") if m.strip()] if metrics else HISTORY_METRICS
+    unknown = [m for m in names if m not in HISTORY_METRICS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不支持的指标: {', '.join(unknown)}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {fmt}")
+    end = time.time() if end is None else end
+    start = -math.inf if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start 必须早于 end")
+    try:
+        chunks = export_chunks(sample_store, instance, names, fmt, start, end, compress=gzip)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = FORMATS[fmt]
+    filename = f"{instance}-history-{int(end)}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+    # 同步生成器由 Starlette 在线程池中迭代，读取和编码不占用事件循环
+    return StreamingResponse(chunks, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+def topology_query(name: str):
+    """拓扑发现用的查询函数：按实例当前配置的domain、以 DISCOVERY_HOPS 边界跳数查询"""
+    instance = PTP_INSTANCES[name]
+
+    def query(dataset: str):
+        domain = config_domain(read_ptp_config(instance["config_file"]))
+        pmc_admission.admit(instance["uds_path"])
+        return query_dataset(instance["uds_path"], domain, dataset, DISCOVERY_HOPS)
+    return query
+
+topologies = {name: TopologyDiscovery(topology_query(name)) for name in PTP_INSTANCES}
+
+async def discover_topology():
+    """leader: 按 DISCOVERY_INTERVAL 刷新各PTP实例可达的时钟拓扑"""
+    logger.info("开始发现PTP网络拓扑，边界跳数%s，间隔%s秒", DISCOVERY_HOPS, DISCOVERY_INTERVAL)
+    query_priority.set(INTERNAL)
+    while True:
+        for name, topology in topologies.items():
+            try:
+                if await asyncio.to_thread(topology.refresh):
+                    logger.info("PTP实例%s的拓扑已更新，共%s个时钟", name, len(topology.nodes))
+            except Exception as e:
+                logger.error("发现PTP实例%s的拓扑失败: %s", name, e)
+        await asyncio.sleep(DISCOVERY_INTERVAL)
+
+@app.get("/api/topology/{instance}")
+async def get_topology(instance: str, request: Request, response: Response):
+    """
+    获取PTP实例可达的时钟拓扑（GM -> 边界时钟 -> 从时钟）
+    
+    由后台任务按 DISCOVERY_INTERVAL 以 DISCOVERY_HOPS 边界跳数查询 PARENT_DATA_SET、
+    PORT_DATA_SET 和 DEFAULT_DATA_SET 后增量更新，这里只返回缓存的结果。
+    ETag由拓扑内容生成（不含刷新时间），拓扑不变时返回304。
+    
+    Returns:
+        dict: version、grandmaster、clocks、edges、tree、errors
+    """
+    if instance not in PTP_INSTANCES:
+        raise HTTPException(status_code=404, detail=f"未知的PTP实例: {instance}")
+    graph = leader_published("topology", instance)
+    if graph is None:
+        graph = topologies[instance].graph()
+    etag = content_etag({
+        **graph,
+        "updated": None,
+        "clocks": [{key: value for key, value in clock.items() if key != "lastSeen"} for clock in graph["clocks"]],
+    })
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    return {"success": True, "instance": instance, "enabled": DISCOVERY_HOPS > 0,
+            "boundary_hops": DISCOVERY_HOPS, **graph}
+
+def alert_status() -> Dict:
+    return {"active": alert_engine.active(), "recent": list(alert_engine.recent), "delivery": alert_notifier.stats()}
+
+@app.get("/api/alerts")
+async def get_alerts():
+    """
+    获取告警规则、当前处于 pending / firing 的告警、最近的通知和投递统计
+    
+    规则在leader中对每次采样和时钟源状态转换增量评估，通知异步投递到
+    PTPCONF_ALERT_WEBHOOK 和 PTPCONF_ALERT_FILE。
+    
+    Returns:
+        dict: rules、active、recent、delivery
+    """
+    status = leader_published("alerts")
+    if status is None:
+        status = alert_status()
+    return {"success": True, "rules": [rule.to_dict() for rule in alert_engine.rules], **status}
+
+@app.get("/api/holdover/{instance}")
+async def get_holdover(instance: str):
+    """
+    获取PTP实例的频率趋势与守时误差预测
+    
+    phc2sys: 系统时钟跟踪该实例PHC时的频率调整量（日志中的freq）；ptp4l: PHC相对GM的频率
+    （cumulativeScaledRateOffset）。各自在 HOLDOVER_WINDOW 滑动窗口内拟合频率和漂移率，
+    预测 HOLDOVER_HORIZONS 各守时时长后的时间误差。时钟源已丢失（phc2sys超时/异常，
+    或ptp4l的GM不存在、端口不是SLAVE）时 holdover 为True，current 给出按已守时时长的预测。
+    
+    Returns:
+        dict: 以 phc2sys / ptp4l 为键的拟合结果、预测和当前守时状态
+    """
+    if instance not in PTP_INSTANCES:
+        raise HTTPException(status_code=404, detail=f"未知的PTP实例: {instance}")
+    models = leader_published("holdover", instance)
+    if models is None:
+        models = {source: model.snapshot(HOLDOVER_HORIZONS) for source, model in holdover_models[instance].items()}
+    clock_source = await clock_source_state.get_state()
+    snapshot = await cached_instance_snapshot(instance)
+    time_status = snapshot["time_status"] or {}
+    port_status = snapshot["port_status"] or {}
+    lost = {
+        "phc2sys": clock_source["status"] != "normal"
+                   and models["phc2sys"]["reference"] == clock_source_state.current_source,
+        "ptp4l": time_status.get("gmPresent") is False or port_status.get("portState") not in (None, "SLAVE"),
+    }
+    now = time.monotonic()
+    sources = {}
+    for source, model in models.items():
+        holding = lost[source] and model["last_sample"] is not None
+        elapsed = round(now - model["last_sample"], 3) if holding else None
+        current = predict(model["fit"], model["held_frequency"], model["offset"], elapsed) \
+            if holding and model["fit"] else None
+        sources[source] = {**model, "holdover": holding, "elapsed": elapsed, "current": current}
+    return {"success": True, "instance": instance, "window": HOLDOVER_WINDOW, "sources": sources}
+
+def update_phc2sys_domain(new_domain: int, config_file: str) -> bool:
+    """
+    更新phc2sys.service中对应PTP时钟的domain参数（见 ptp_instances.update_phc2sys_domain）
+    Returns:
+        bool: 是否新生成了drop-in（需要daemon-reload）
+    """
+    return _update_phc2sys_domain(MANAGED_UNITS["phc2sys.service"], new_domain, config_file)
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("=== 服务启动信息 ===")
-    logger.info(f"当前用户: {os.getuid()} ({pwd.getpwuid(os.getuid()).pw_name})")
-    logger.info(f"当前用户组: {os.getgid()} ({grp.getgrgid(os.getgid()).gr_name})")
-    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="debug") 
\ No newline at end of file
+    logger.info("当前用户: %s (%s)", os.getuid(), pwd.getpwuid(os.getuid()).pw_name)
+    logger.info("当前用户组: %s (%s)", os.getgid(), grp.getgrgid(os.getgid()).gr_name)
+    uvicorn.run(app, host="0.0.0.0", port=8001, log_level="debug", log_config=None) 
\ No newline at end of file
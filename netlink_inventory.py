@@ -0,0 +1,261 @@
+"""
+网络接口清单
+
+启动时通过 rtnetlink 一次性获取（dump）全部链路和 IPv4 地址，之后订阅
+RTMGRP_LINK / RTMGRP_IPV4_IFADDR 组播，由事件循环在套接字可读时增量更新，
+查询直接读取内存，不再每次遍历所有网卡（容器主机上可能有数百个 veth/macvlan）。
+
+只依赖标准库的 socket/struct。接收缓冲区溢出（ENOBUFS）时重新 dump 一次。
+"""
+
+import asyncio
+import errno
+import logging
+import socket
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# netlink 消息类型与标志
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+# 属性类型
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+IFF_UP = 0x1
+ARPHRD_LOOPBACK = 772
+
+_NLMSGHDR = struct.Struct("=LHHLL")
+_IFINFOMSG = struct.Struct("=BxHiII")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+RECV_BUFFER_SIZE = 1 << 20
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_attributes(data: bytes, offset: int = 0) -> Dict[int, bytes]:
+    """解析 rtattr 列表，返回 {属性类型: 载荷}"""
+    attrs = {}
+    while offset + _RTATTR.size <= len(data):
+        length, attr_type = _RTATTR.unpack_from(data, offset)
+        if length < _RTATTR.size:
+            break
+        attrs[attr_type & 0x7FFF] = data[offset + _RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def parse_messages(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """把一次 recv 的数据拆分为 (消息类型, 消息体)"""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _flags, _seq, _pid = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            break
+        yield msg_type, data[offset + _NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def _format_mac(raw: bytes) -> Optional[str]:
+    if len(raw) != 6:
+        return None
+    return ":".join(f"{b:02x}" for b in raw)
+
+
+class InterfaceInventory:
+    """
+    由 rtnetlink 维护的网络接口清单
+
+    Attributes:
+        version: 清单内容每次变化时递增，可用于生成ETag
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._links: Dict[int, Dict] = {}
+        # ifindex -> 按出现顺序排列的IPv4地址（dict 作有序集合）
+        self._addrs: Dict[int, Dict[str, None]] = {}
+        self._sock: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None
+
+    def apply(self, msg_type: int, body: bytes) -> bool:
+        """应用一条链路或地址消息，内容有变化时返回 True"""
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+            if len(body) < _IFINFOMSG.size:
+                return False
+            _family, if_type, index, flags, _change = _IFINFOMSG.unpack_from(body)
+            if msg_type == RTM_DELLINK:
+                self._addrs.pop(index, None)
+                return self._links.pop(index, None) is not None
+            attrs = parse_attributes(body, _IFINFOMSG.size)
+            if IFLA_IFNAME not in attrs:
+                return False
+            kind = None
+            if IFLA_LINKINFO in attrs:
+                raw_kind = parse_attributes(attrs[IFLA_LINKINFO]).get(IFLA_INFO_KIND)
+                if raw_kind:
+                    kind = raw_kind.rstrip(b"\0").decode(errors="replace")
+            link = {
+                "name": attrs[IFLA_IFNAME].rstrip(b"\0").decode(errors="replace"),
+                "is_up": bool(flags & IFF_UP),
+                "mac": _format_mac(attrs.get(IFLA_ADDRESS, b"")),
+                "kind": kind,
+                # 软件设备（带 IFLA_INFO_KIND，如 veth/macvlan/bridge）和回环口视为虚拟设备
+                "virtual": kind is not None or if_type == ARPHRD_LOOPBACK,
+            }
+            if self._links.get(index) == link:
+                return False
+            self._links[index] = link
+            return True
+
+        if msg_type in (RTM_NEWADDR, RTM_DELADDR):
+            if len(body) < _IFADDRMSG.size:
+                return False
+            family, _prefix, _flags, _scope, index = _IFADDRMSG.unpack_from(body)
+            if family != socket.AF_INET:
+                return False
+            attrs = parse_attributes(body, _IFADDRMSG.size)
+            raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+            if not raw or len(raw) != 4:
+                return False
+            address = socket.inet_ntoa(raw)
+            addrs = self._addrs.setdefault(index, {})
+            if msg_type == RTM_DELADDR:
+                if address not in addrs:
+                    return False
+                del addrs[address]
+                return True
+            if address in addrs:
+                return False
+            addrs[address] = None
+            return True
+        return False
+
+    def interfaces(self, include_virtual: bool = True) -> List[Dict]:
+        """
+        按 ifindex 顺序返回接口列表
+
+        Returns:
+            list: [{"index", "name", "is_up", "mac", "ip", "kind", "virtual"}, ...]
+        """
+        result = []
+        # sorted() 在一次调用内复制条目，其他线程读取时不受事件回调修改的影响
+        for index, link in sorted(self._links.items()):
+            if link["virtual"] and not include_virtual:
+                continue
+            ip = next(iter(self._addrs.get(index, ())), None)
+            result.append({"index": index, "name": link["name"], "is_up": link["is_up"], "mac": link["mac"],
+                           "ip": ip, "kind": link["kind"], "virtual": link["virtual"]})
+        return result
+
+    def _dump(self):
+        """用独立的套接字同步获取全部链路和地址，替换当前清单"""
+        links, addrs = self._links, self._addrs
+        self._links, self._addrs = {}, {}
+        try:
+            with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+                for seq, (request, family_struct) in enumerate(
+                        ((RTM_GETLINK, _IFINFOMSG), (RTM_GETADDR, _IFADDRMSG)), start=1):
+                    body = bytes(family_struct.size)
+                    header = _NLMSGHDR.pack(_NLMSGHDR.size + len(body), request, NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+                    sock.send(header + body)
+                    done = False
+                    while not done:
+                        for msg_type, msg_body in parse_messages(sock.recv(RECV_BUFFER_SIZE)):
+                            if msg_type == NLMSG_DONE:
+                                done = True
+                                break
+                            if msg_type == NLMSG_ERROR:
+                                code = -struct.unpack_from("=i", msg_body)[0]
+                                raise OSError(code, f"netlink dump失败: {errno.errorcode.get(code, code)}")
+                            self.apply(msg_type, msg_body)
+        except Exception:
+            self._links, self._addrs = links, addrs
+            raise
+        self.version += 1
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+        """
+        订阅链路和地址事件并完成首次 dump
+
+        先绑定订阅套接字再 dump，dump 期间发生的事件在之后重放，不会遗漏。
+
+        Returns:
+            bool: 是否启动成功（非Linux或无权限时返回False，调用方应退回逐次查询）
+        """
+        if self._sock is not None:
+            return True
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_SIZE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+            sock.setblocking(False)
+        except (AttributeError, OSError) as e:
+            logger.warning("无法订阅netlink事件，网络接口将逐次查询: %s", e)
+            return False
+        try:
+            self._dump()
+        except OSError as e:
+            sock.close()
+            logger.warning("netlink获取网络接口失败，网络接口将逐次查询: %s", e)
+            return False
+        self._sock = sock
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+        logger.info("网络接口清单已就绪，共%d个接口", len(self._links))
+        return True
+
+    def stop(self):
+        if self._sock is None:
+            return
+        self._loop.remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+
+    def _on_readable(self):
+        changed = False
+        while True:
+            try:
+                data = self._sock.recv(RECV_BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # 事件过多导致溢出，已无法增量追上，重新获取全量
+                    logger.warning("netlink接收缓冲区溢出，重新获取网络接口")
+                    try:
+                        self._dump()
+                    except OSError as dump_error:
+                        logger.error("重新获取网络接口失败: %s", dump_error)
+                    continue
+                logger.error("读取netlink事件失败: %s", e)
+                break
+            for msg_type, body in parse_messages(data):
+                changed |= self.apply(msg_type, body)
+        if changed:
+            self.version += 1
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+PHC 与系统时钟偏差采样
+
+打开网卡对应的 /dev/ptpN，用动态 POSIX 时钟 ID（FD_TO_CLOCKID）直接调用
+clock_gettime，不启动任何子进程。偏差按 phc_ctl/phc2sys 的夹逼读法测量：
+
+    t1 = CLOCK_REALTIME, tp = PHC, t2 = CLOCK_REALTIME
+    offset = tp - (t1 + t2) / 2, delay = t2 - t1
+
+连续读取若干次，取 delay 最小的一次。两个 PHC 之间也用同样的方法交叉比较。
+没有 PHC 设备时（测试环境）可以退回用 CLOCK_MONOTONIC 代替 PHC。
+
+命令行: python phc_sampler.py /dev/ptp0 [/dev/ptp1] [--count N] [--interval S] [--fallback]
+"""
+
+import argparse
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOCKFD = 3
+DEFAULT_READINGS = 5
+# 没有PHC时用来代替的系统时钟
+FALLBACK_DEVICE = "CLOCK_MONOTONIC"
+
+
+def fd_to_clockid(fd: int) -> int:
+    """与内核 FD_TO_CLOCKID 宏相同: ((~fd) << 3) | CLOCKFD"""
+    return ((~fd) << 3) | CLOCKFD
+
+
+class PhcClock:
+    """
+    一个可读取时间的时钟：PHC 设备，或用于测试的系统时钟
+
+    Attributes:
+        device: 设备路径，如 /dev/ptp0；系统时钟为其名称，如 CLOCK_MONOTONIC
+        clock_id: clock_gettime 使用的时钟ID
+    """
+
+    def __init__(self, device: str, clock_id: int, fd: Optional[int] = None):
+        self.device = device
+        self.clock_id = clock_id
+        self._fd = fd
+
+    @classmethod
+    def open(cls, device: str) -> "PhcClock":
+        """
+        打开 PHC 设备
+
+        Raises:
+            OSError: 设备不存在、无权限或不是 PHC
+        """
+        fd = os.open(device, os.O_RDONLY)
+        clock = cls(device, fd_to_clockid(fd), fd)
+        try:
+            clock.gettime_ns()
+        except OSError:
+            clock.close()
+            raise
+        return clock
+
+    @classmethod
+    def system(cls, clock_id: int = time.CLOCK_MONOTONIC, name: str = FALLBACK_DEVICE) -> "PhcClock":
+        return cls(name, clock_id)
+
+    def gettime_ns(self) -> int:
+        return time.clock_gettime_ns(self.clock_id)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def _realtime_ns() -> int:
+    return time.clock_gettime_ns(time.CLOCK_REALTIME)
+
+
+def compare_clocks(reference: Callable[[], int], target: Callable[[], int],
+                   readings: int = DEFAULT_READINGS) -> Tuple[int, int]:
+    """
+    夹逼读法测量 target 相对 reference 的偏差
+
+    Returns:
+        tuple: (偏差ns, 夹逼区间ns)，取区间最小的一次读数
+    """
+    best_offset, best_delay = 0, None
+    for _ in range(readings):
+        t1 = reference()
+        tp = target()
+        t2 = reference()
+        delay = t2 - t1
+        if best_delay is None or delay < best_delay:
+            best_offset = tp - (t1 + t2) // 2
+            best_delay = delay
+    return best_offset, best_delay
+
+
+class PhcSampler:
+    """
+    采样各PTP实例PHC与CLOCK_REALTIME的偏差，并以第一个实例的PHC为参考交叉比较
+
+    Attributes:
+        latest: 最近一次采样结果 {实例名: {"device", "offset_ns", "delay_ns", "cross_offset_ns", ...}}
+    """
+
+    def __init__(self, readings: int = DEFAULT_READINGS, fallback: bool = False):
+        self.readings = readings
+        self.fallback = fallback
+        self.latest: Dict[str, Dict] = {}
+        self._clocks: Dict[str, PhcClock] = {}
+        self._devices: Dict[str, Optional[str]] = {}
+
+    def _open(self, device: str) -> Optional[PhcClock]:
+        if device == FALLBACK_DEVICE:
+            return PhcClock.system()
+        try:
+            return PhcClock.open(device)
+        except OSError as e:
+            if self.fallback:
+                logger.info("无法打开%s（%s），使用%s代替", device, e, FALLBACK_DEVICE)
+                return PhcClock.system()
+            logger.warning("无法打开PHC设备%s: %s", device, e)
+            return None
+
+    def update_devices(self, devices: Dict[str, Optional[str]]):
+        """
+        设置各实例对应的PHC设备，设备变化时才重新打开，多个实例共用同一设备时只打开一次
+
+        Args:
+            devices: {实例名: "/dev/ptpN" 或 None}；启用fallback时None也用系统时钟代替
+        """
+        if devices == self._devices:
+            return
+        wanted = {name: device or (FALLBACK_DEVICE if self.fallback else None) for name, device in devices.items()}
+        opened = {}
+        for clock in set(self._clocks.values()):
+            if clock.device in wanted.values():
+                opened[clock.device] = clock
+            else:
+                clock.close()
+        clocks = {}
+        complete = True
+        for name, device in wanted.items():
+            if device is None:
+                continue
+            if device not in opened:
+                clock = self._open(device)
+                if clock is None:
+                    complete = False
+                    continue
+                opened[device] = clock
+            clocks[name] = opened[device]
+        self._clocks = clocks
+        # 有设备打开失败时不记录，下次调用时重试
+        self._devices = dict(devices) if complete else {}
+        self.latest = {name: entry for name, entry in self.latest.items() if name in clocks}
+
+    def sample(self) -> Dict[str, Dict]:
+        """测量一次，返回并保存各实例的结果"""
+        results: Dict[str, Dict] = {}
+        reference_name, reference = next(iter(self._clocks.items()), (None, None))
+        for name, clock in self._clocks.items():
+            try:
+                offset, delay = compare_clocks(_realtime_ns, clock.gettime_ns, self.readings)
+            except OSError as e:
+                logger.warning("读取%s失败: %s", clock.device, e)
+                continue
+            entry = {"device": clock.device, "offset_ns": offset, "delay_ns": delay, "time": time.time()}
+            # 与参考实例的PHC交叉比较（共用同一PHC时没有意义）
+            if reference is not None and name != reference_name and clock.device != reference.device:
+                try:
+                    cross, cross_delay = compare_clocks(reference.gettime_ns, clock.gettime_ns, self.readings)
+                    entry.update({"reference": reference_name, "cross_offset_ns": cross, "cross_delay_ns": cross_delay})
+                except OSError as e:
+                    logger.warning("交叉比较%s与%s失败: %s", reference.device, clock.device, e)
+            results[name] = entry
+        self.latest = results
+        return results
+
+    def close(self):
+        for clock in set(self._clocks.values()):
+            clock.close()
+        self._clocks = {}
+        self._devices = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量PHC与CLOCK_REALTIME的偏差（夹逼读法）")
+    parser.add_argument("devices", nargs="+", help="PHC设备，如 /dev/ptp0，第一个作为交叉比较的参考")
+    parser.add_argument("--count", type=int, default=10, help="采样次数")
+    parser.add_argument("--interval", type=float, default=1.0, help="采样间隔（秒）")
+    parser.add_argument("--readings", type=int, default=DEFAULT_READINGS, help="每次采样的读数次数")
+    parser.add_argument("--fallback", action="store_true", help="设备无法打开时用CLOCK_MONOTONIC代替")
+    args = parser.parse_args()
+
+    sampler = PhcSampler(args.readings, args.fallback)
+    sampler.update_devices({device: device for device in args.devices})
+    try:
+        for i in range(args.count):
+            for entry in sampler.sample().values():
+                line = f"{entry['device']}: offset {entry['offset_ns']:>12} ns  delay {entry['delay_ns']:>6} ns"
+                if "cross_offset_ns" in entry:
+                    line += f"  相对{entry['reference']} {entry['cross_offset_ns']:>12} ns"
+                print(line)
+            if i + 1 < args.count:
+                time.sleep(args.interval)
+    finally:
+        sampler.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+pmc 输出解析器
+
+按行单遍扫描 pmc 输出（应答头用一个预编译正则识别），按应答方（端口ID）拆分为多条记录，
+并在同一遍中把字段值转换为 int/float/bool。`-b` 大于 0 时 pmc 会返回多个
+TLV 块（每个端口或时钟一个），这里全部保留。
+
+运行 `python pmc_parser.py --bench` 可以查看与逐字段 re.search 方式的耗时对比。
+"""
+
+import re
+import sys
+import timeit
+from typing import Dict, Optional
+
+# 应答头: "\t507c6f.fffe.1fb1b8-1 seq 0 RESPONSE MANAGEMENT PORT_DATA_SET "
+# 字段行: "\t\tportState               SLAVE"
+_HEADER_RE = re.compile(
+    r"(?P<port>[0-9a-fA-F]{6}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{6}-\d+)"
+    r" seq (?P<seq>\d+) (?P<action>[A-Z_]+) (?P<tlv>[A-Z_]+) (?P<mid>[A-Z_0-9]+)"
+)
+
+# 固定按浮点数返回的字段（pmc 以 %.1f 打印，值为整数时也保持浮点）
+FLOAT_FIELDS = frozenset({"offsetFromMaster", "meanPathDelay", "cumulativeScaledRateOffset"})
+# 保持字符串的字段（如时钟ID全为数字时避免被误转为整数）
+STRING_FIELDS = frozenset({
+    "gmIdentity", "clockIdentity", "grandmasterIdentity", "portIdentity",
+    "parentPortIdentity", "lastGmPhaseChange",
+})
+
+
+def convert_value(key: str, value: str):
+    """按字段名和取值形态把 pmc 打印的字符串转换为合适的类型"""
+    if key in STRING_FIELDS:
+        return value
+    if key in FLOAT_FIELDS:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    # 用字符串方法判断数字形态，比正则和异常都快
+    digits = value[1:] if value[:1] in ("+", "-") else value
+    if digits.isdecimal():
+        return int(value)
+    if "." in digits and digits.replace(".", "", 1).isdecimal():
+        return float(value)
+    return value
+
+
+class PmcRecord:
+    """
+    单个应答方的一条 pmc 应答
+
+    Attributes:
+        port_identity: 应答方端口ID，如 507c6f.fffe.1fb1b8-1
+        sequence_id: 序列号
+        action: RESPONSE 等
+        tlv: MANAGEMENT 或 MANAGEMENT_ERROR_STATUS
+        management_id: 数据集名，如 PORT_DATA_SET
+        fields: 已转换类型的字段字典
+    """
+
+    __slots__ = ("port_identity", "sequence_id", "action", "tlv", "management_id", "fields")
+
+    def __init__(self, port_identity: str, sequence_id: int, action: str, tlv: str, management_id: str):
+        self.port_identity = port_identity
+        self.sequence_id = sequence_id
+        self.action = action
+        self.tlv = tlv
+        self.management_id = management_id
+        self.fields: Dict[str, object] = {}
+
+    @property
+    def clock_identity(self) -> str:
+        return self.port_identity.rsplit("-", 1)[0]
+
+    @property
+    def is_error(self) -> bool:
+        return self.tlv != "MANAGEMENT"
+
+    def to_dict(self) -> Dict:
+        return {"portIdentity": self.port_identity, **self.fields}
+
+    def __repr__(self):
+        return f"PmcRecord({self.port_identity!r}, {self.management_id!r}, {self.fields!r})"
+
+
+def parse_pmc_output(output: str, management_id: Optional[str] = None) -> Dict[str, PmcRecord]:
+    """
+    单遍解析 pmc 输出
+
+    Args:
+        output: pmc 标准输出
+        management_id: 只保留该数据集的应答，None 表示全部保留
+
+    Returns:
+        dict: 以端口ID为键、按出现顺序排列的应答记录
+    """
+    records: Dict[str, PmcRecord] = {}
+    current: Optional[PmcRecord] = None
+    header_match = _HEADER_RE.match
+    for line in output.split("\n"):
+        if line.startswith("\t\t"):
+            # 字段行，仅在当前应答块内有效
+            if current is None:
+                continue
+            key, _, value = line[2:].partition(" ")
+            if not key:
+                continue
+            # 错误应答的字段行形如 "ERROR: ..."
+            if key[-1] == ":":
+                key = key[:-1]
+            current.fields[key] = convert_value(key, value.strip())
+            continue
+        match = header_match(line.strip())
+        if match is None:
+            continue
+        mid = match.group("mid")
+        if management_id is not None and mid != management_id:
+            current = None
+            continue
+        port = match.group("port")
+        current = PmcRecord(port, int(match.group("seq")), match.group("action"), match.group("tlv"), mid)
+        records[port] = current
+    return records
+
+
+def first_record(records: Dict[str, PmcRecord]) -> Optional[PmcRecord]:
+    """返回第一个非错误应答，没有则返回 None"""
+    for record in records.values():
+        if not record.is_error:
+            return record
+    return None
+
+
+# ---- 微基准 ----
+
+_BENCH_FIELDS = {
+    "portIdentity": r'portIdentity\s+([0-9a-f.]+)',
+    "portState": r'portState\s+(\w+)',
+    "logMinDelayReqInterval": r'logMinDelayReqInterval\s+([0-9-]+)',
+    "peerMeanPathDelay": r'peerMeanPathDelay\s+([0-9]+)',
+    "logAnnounceInterval": r'logAnnounceInterval\s+([0-9-]+)',
+    "announceReceiptTimeout": r'announceReceiptTimeout\s+([0-9]+)',
+    "logSyncInterval": r'logSyncInterval\s+([0-9-]+)',
+    "delayMechanism": r'delayMechanism\s+(\w+)',
+    "logMinPdelayReqInterval": r'logMinPdelayReqInterval\s+([0-9-]+)',
+    "versionNumber": r'versionNumber\s+([0-9]+)',
+}
+
+
+def _sample_port_data_set(ports: int) -> str:
+    blocks = ["sending: GET PORT_DATA_SET"]
+    for port in range(1, ports + 1):
+        blocks.append(
+            f"\t001122.fffe.334455-{port} seq 0 RESPONSE MANAGEMENT PORT_DATA_SET \n"
+            f"\t\tportIdentity            001122.fffe.334455-{port}\n"
+            "\t\tportState               SLAVE\n"
+            "\t\tlogMinDelayReqInterval  0\n"
+            "\t\tpeerMeanPathDelay       0\n"
+            "\t\tlogAnnounceInterval     1\n"
+            "\t\tannounceReceiptTimeout  3\n"
+            "\t\tlogSyncInterval         0\n"
+            "\t\tdelayMechanism          1\n"
+            "\t\tlogMinPdelayReqInterval 0\n"
+            "\t\tversionNumber           2"
+        )
+    return "\n".join(blocks) + "\n"
+
+
+def _legacy_parse(output: str) -> Dict:
+    result = {}
+    for key, pattern in _BENCH_FIELDS.items():
+        match = re.search(pattern, output)
+        if match:
+            value = match.group(1)
+            try:
+                result[key] = int(value)
+            except ValueError:
+                result[key] = value
+    return result
+
+
+def benchmark(iterations: int = 5000, ports: int = 1, repeat: int = 5) -> Dict[str, float]:
+    """
+    对比单遍解析与逐字段 re.search 的耗时
+
+    Returns:
+        dict: 两种方式每次解析的耗时（微秒，取多轮中的最小值）
+    """
+    output = _sample_port_data_set(ports)
+    results = {}
+    for name, func in (("single_pass", parse_pmc_output), ("per_field_search", _legacy_parse)):
+        best = min(timeit.repeat(lambda: func(output), number=iterations, repeat=repeat))
+        results[name] = best / iterations * 1e6
+    return results
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        for port_count in (1, 4, 16):
+            timings = benchmark(ports=port_count)
+            print(f"{port_count:>2}个端口: 单遍解析 {timings['single_pass']:.1f}us, "
+                  f"逐字段search {timings['per_field_search']:.1f}us（后者只能取到第一个应答）")
+    else:
+        for record in parse_pmc_output(sys.stdin.read()).values():
+            print(record.to_dict())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+ptpconfigurator 命令行
+
+不经过 HTTP 服务，直接使用与后端相同的实例定义、配置文件读写（ptp_instances）和
+数据集查询（ptp_status），适合脚本和 SSH 会话：
+
+    ptpconfigurator status [--json] [实例...]
+    ptpconfigurator watch [-n 秒] [--json] [实例...]
+    ptpconfigurator config get <实例> [配置项...] [--json]
+    ptpconfigurator config set <实例> 配置项=值... [--restart]
+    ptpconfigurator service {start,stop,restart} <实例或服务名>
+
+只导入标准库和上述轻量模块，不加载 FastAPI、uvicorn 和 psutil；配置快照模块只在修改配置时导入。
+各实例的三类数据集在线程中并发查询，服务状态用一次 systemctl is-active 取得。
+修改配置后与接口一样记录配置快照，domain 变化时同步 phc2sys 的 -n 参数。
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from ptp_instances import (
+    CURRENT_DATA_SET_FIELDS,
+    DEFAULT_SNAPSHOT_DIR,
+    PORT_DATA_SET_FIELDS,
+    PTP_INSTANCES,
+    TIME_STATUS_FIELDS,
+    apply_config_values,
+    config_domain,
+    dataset_fields,
+    load_ptp_config,
+    managed_units,
+    run_systemctl,
+    snapshot_files,
+    update_phc2sys_domain,
+)
+from ptp_status import query_dataset
+from unit_env import DEFAULT_ENV_DIR
+
+logger = logging.getLogger(__name__)
+
+# 与 main.py 相同的环境变量
+UNIT_ENV_DIR = os.environ.get("PTPCONF_UNIT_ENV_DIR", DEFAULT_ENV_DIR)
+SNAPSHOT_DIR = os.environ.get("PTPCONF_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR)
+
+DATASETS = (
+    ("time_status", "TIME_STATUS_NP", TIME_STATUS_FIELDS),
+    ("port_status", "PORT_DATA_SET", PORT_DATA_SET_FIELDS),
+    ("current_data", "CURRENT_DATA_SET", CURRENT_DATA_SET_FIELDS),
+)
+
+STATUS_HEADER = (f"{'INSTANCE':<9}{'SERVICE':<10}{'DOMAIN':>6} {'STATE':<13}{'OFFSET':>9}{'DELAY':>9}"
+                 f"{'STEPS':>6} {'GM':<20}INTERFACES")
+
+
+def unit_states(units: List[str]) -> Dict[str, str]:
+    """一次 systemctl is-active 取得各服务的状态，无法执行时为 unknown"""
+    try:
+        result = subprocess.run(["systemctl", "is-active", *units], capture_output=True, text=True, timeout=10)
+        states = result.stdout.split()
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("查询服务状态失败: %s", e)
+        states = []
+    return {unit: states[index] if index < len(states) else "unknown" for index, unit in enumerate(units)}
+
+
+def _captured(errors: Dict[str, str], key: str, func, *args):
+    """执行函数，失败时把错误记录到errors并返回None"""
+    try:
+        return func(*args)
+    except Exception as e:
+        errors[key] = str(e) or type(e).__name__
+        return None
+
+
+def query_fields(uds_path: str, domain: int, dataset: str, fields: List[str]) -> Dict:
+    """查询数据集并整理为接口返回格式（命令行每次只查询一次，不经过准入控制）"""
+    return dataset_fields(query_dataset(uds_path, domain, dataset), fields)
+
+
+def collect_status(names: List[str], units=None) -> Dict:
+    """
+    读取各实例的配置和网卡，并发查询数据集和服务状态
+
+    Returns:
+        dict: {"time", "instances": {实例名: 与 /api/bootstrap 中相同的实例快照 + "active"}, "services"}
+    """
+    units = units or managed_units(UNIT_ENV_DIR)
+    services = [PTP_INSTANCES[name]["service"] for name in names] + ["phc2sys.service"]
+    snapshots = {}
+    with ThreadPoolExecutor(max_workers=len(DATASETS) * len(names) + 1) as executor:
+        states = executor.submit(unit_states, services)
+        pending = []
+        for name in names:
+            instance = PTP_INSTANCES[name]
+            errors: Dict[str, str] = {}
+            config = _captured(errors, "config", load_ptp_config, instance["config_file"])
+            groups = _captured(errors, "interfaces", units[instance["service"]].read_groups)
+            domain = config_domain(config)
+            snapshots[name] = {**instance, "domain": domain, "config": config,
+                               "interfaces": [group[0] for group in groups or []], "errors": errors}
+            for key, dataset, fields in DATASETS:
+                pending.append((name, key, executor.submit(
+                    _captured, errors, key, query_fields, instance["uds_path"], domain, dataset, fields)))
+        for name, key, future in pending:
+            snapshots[name][key] = future.result()
+        states = states.result()
+    for name, snapshot in snapshots.items():
+        snapshot["active"] = states[snapshot["service"]]
+    return {"time": time.time(), "instances": snapshots, "services": states}
+
+
+def _value(data: Optional[Dict], key: str):
+    value = (data or {}).get(key)
+    return "-" if value is None else value
+
+
+def format_instance(name: str, snapshot: Dict) -> str:
+    """一个实例一行的紧凑显示"""
+    current = snapshot.get("current_data")
+    line = (f"{name:<9}{snapshot['active']:<10}{snapshot['domain']:>6} "
+            f"{_value(snapshot.get('port_status'), 'portState'):<13}"
+            f"{_value(current, 'offsetFromMaster'):>9}{_value(current, 'meanPathDelay'):>9}"
+            f"{_value(current, 'stepsRemoved'):>6} {_value(snapshot.get('time_status'), 'gmIdentity'):<20}"
+            f"{','.join(snapshot['interfaces']) or '-'}")
+    if snapshot["errors"]:
+        line += f"  ! {','.join(sorted(snapshot['errors']))}"
+    return line
+
+
+def format_status(status: Dict) -> List[str]:
+    lines = [STATUS_HEADER]
+    lines.extend(format_instance(name, snapshot) for name, snapshot in status["instances"].items())
+    lines.append(f"phc2sys.service: {status['services']['phc2sys.service']}")
+    return lines
+
+
+def cmd_status(args) -> int:
+    status = collect_status(args.instances)
+    if args.json:
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+    else:
+        print("\n".join(format_status(status)))
+    return 0 if not any(snapshot["errors"] for snapshot in status["instances"].values()) else 1
+
+
+def cmd_watch(args) -> int:
+    """
+    按间隔刷新状态；终端中原地重绘，输出到管道时每次追加（--json 时每次一行JSON）
+    """
+    units = managed_units(UNIT_ENV_DIR)
+    redraw = sys.stdout.isatty() and not args.json
+    iteration = 0
+    try:
+        while True:
+            started = time.monotonic()
+            status = collect_status(args.instances, units)
+            if args.json:
+                print(json.dumps(status, ensure_ascii=False), flush=True)
+            else:
+                stamp = time.strftime("%H:%M:%S", time.localtime(status["time"]))
+                lines = format_status(status)
+                if redraw:
+                    sys.stdout.write("\033[H\033[J" + f"{stamp}  每{args.interval:g}秒刷新，Ctrl-C退出\n")
+                    print("\n".join(lines), flush=True)
+                else:
+                    if iteration == 0:
+                        print(f"{'TIME':<9}{lines[0]}")
+                    print("\n".join(f"{stamp:<9}{line}" for line in lines[1:-1]), flush=True)
+            iteration += 1
+            if args.count and iteration >= args.count:
+                return 0
+            time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        return 0
+
+
+def cmd_config_get(args) -> int:
+    config = load_ptp_config(PTP_INSTANCES[args.instance]["config_file"])
+    if args.keys:
+        missing = [key for key in args.keys if key not in config]
+        if missing:
+            print(f"配置项不存在: {', '.join(missing)}", file=sys.stderr)
+            return 1
+        config = {key: config[key] for key in args.keys}
+    if args.json:
+        print(json.dumps(config, ensure_ascii=False, indent=2))
+    else:
+        for key, value in config.items():
+            print(f"{key} {value}")
+    return 0
+
+
+def parse_assignments(pairs: List[str]) -> Dict[str, str]:
+    """
+    解析 配置项=值 参数
+
+    Raises:
+        ValueError: 格式错误或domainNumber不是整数
+    """
+    values = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or not key or not value.strip():
+            raise ValueError(f"应为 配置项=值: {pair}")
+        values[key] = value.strip()
+    if "domainNumber" in values and not values["domainNumber"].isdigit():
+        raise ValueError(f"domainNumber 应为整数: {values['domainNumber']}")
+    return values
+
+
+def snapshot_config(units, reason: str):
+    """与接口一样记录配置快照，快照目录无法写入时只给出警告"""
+    from config_snapshots import SnapshotStore
+
+    try:
+        SnapshotStore(SNAPSHOT_DIR, snapshot_files(units)).capture(reason)
+    except OSError as e:
+        logger.warning("记录配置快照失败: %s", e)
+
+
+def cmd_config_set(args) -> int:
+    instance = PTP_INSTANCES[args.instance]
+    config_file = instance["config_file"]
+    try:
+        values = parse_assignments(args.assignments)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if not os.access(config_file, os.W_OK):
+        print(f"没有权限修改配置文件: {config_file}", file=sys.stderr)
+        return 1
+    old_config = load_ptp_config(config_file)
+    missing = [key for key in values if key not in old_config]
+    if missing:
+        print(f"配置文件中没有这些配置项: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    units = managed_units(UNIT_ENV_DIR)
+    success, domain_changed = apply_config_values(config_file, old_config, values)
+    errors = [] if success else ["写入配置文件失败"]
+    needs_reload = False
+    if domain_changed:
+        try:
+            needs_reload = update_phc2sys_domain(units["phc2sys.service"], int(values["domainNumber"]), config_file)
+        except (OSError, ValueError) as e:
+            errors.append(f"更新phc2sys.service的domain失败: {e}")
+    snapshot_config(units, "ptpconfigurator config set")
+
+    if needs_reload:
+        error = run_systemctl("daemon-reload")
+        if error:
+            errors.append(error)
+    restarted = []
+    if args.restart and success and not errors:
+        # 与接口相同：ptp4l 先重启，phc2sys 在其后；未运行的服务不启动
+        for unit in [instance["service"]] + (["phc2sys.service"] if domain_changed else []):
+            error = run_systemctl("try-restart", unit)
+            if error:
+                errors.append(error)
+                break
+            restarted.append(unit)
+    for error in errors:
+        print(error, file=sys.stderr)
+    if success:
+        print(f"已更新 {config_file}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+        print(f"已重启: {', '.join(restarted)}" if restarted else "重启服务后生效")
+    return 1 if errors else 0
+
+
+def resolve_unit(name: str) -> str:
+    """实例名或服务名 -> 服务名"""
+    if name in PTP_INSTANCES:
+        return PTP_INSTANCES[name]["service"]
+    unit = name if name.endswith(".service") else f"{name}.service"
+    if unit not in {info["service"] for info in PTP_INSTANCES.values()} | {"phc2sys.service"}:
+        raise argparse.ArgumentTypeError(f"不受管理的服务: {name}")
+    return unit
+
+
+def cmd_service(args) -> int:
+    error = run_systemctl(args.action, args.unit)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ptpconfigurator", description="PTP配置器命令行")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出INFO级别日志")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    instances = dict(nargs="*", metavar="实例", help=f"默认全部（{', '.join(PTP_INSTANCES)}）")
+    status = commands.add_parser("status", help="显示各实例的状态")
+    status.add_argument("instances", **instances)
+    status.add_argument("--json", action="store_true", help="以JSON输出完整状态")
+    status.set_defaults(func=cmd_status)
+
+    watch = commands.add_parser("watch", help="持续刷新状态，每个实例一行")
+    watch.add_argument("instances", **instances)
+    watch.add_argument("-n", "--interval", type=float, default=1.0, help="刷新间隔（秒）")
+    watch.add_argument("--count", type=int, default=0, help="刷新次数后退出，0表示一直运行")
+    watch.add_argument("--json", action="store_true", help="每次输出一行JSON")
+    watch.set_defaults(func=cmd_watch)
+
+    config = commands.add_parser("config", help="读取或修改实例的配置文件")
+    config_commands = config.add_subparsers(dest="config_command", required=True)
+    get = config_commands.add_parser("get", help="读取全局配置")
+    get.add_argument("instance", choices=list(PTP_INSTANCES))
+    get.add_argument("keys", nargs="*", metavar="配置项")
+    get.add_argument("--json", action="store_true", help="以JSON输出")
+    get.set_defaults(func=cmd_config_get)
+    set_ = config_commands.add_parser("set", help="修改配置项（只修改文件中已有的配置项）")
+    set_.add_argument("instance", choices=list(PTP_INSTANCES))
+    set_.add_argument("assignments", nargs="+", metavar="配置项=值")
+    set_.add_argument("--restart", action="store_true", help="修改后重启正在运行的相关服务")
+    set_.set_defaults(func=cmd_config_set)
+
+    service = commands.add_parser("service", help="启动、停止或重启服务")
+    service.add_argument("action", choices=["start", "stop", "restart"])
+    service.add_argument("unit", type=resolve_unit, metavar="实例或服务名")
+    service.set_defaults(func=cmd_service)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    for name in getattr(args, "instances", None) or []:
+        if name not in PTP_INSTANCES:
+            parser.error(f"未知的PTP实例: {name}")
+    if getattr(args, "instances", None) == []:
+        args.instances = list(PTP_INSTANCES)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+    try:
+        return args.func(args)
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
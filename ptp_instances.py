@@ -0,0 +1,279 @@
+"""
+受管理的 PTP 实例与配置文件读写
+
+HTTP 服务（main.py）和命令行（ptp_cli.py）共用的实例定义、配置文件解析与修改、
+数据集字段整理以及 phc2sys domain 同步。只依赖标准库和 unit_env，导入时不加载 FastAPI。
+"""
+
+import logging
+import re
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+from pmc_parser import PmcRecord, first_record
+from unit_env import DEFAULT_ENV_DIR, UNIT_DIR, ManagedUnit
+
+logger = logging.getLogger(__name__)
+# 与 main.py 中的配置解析日志同名，可通过 PTPCONF_LOG_LEVELS 单独设置级别
+config_logger = logging.getLogger("ptpconfigurator.config")
+
+DEFAULT_PTP_DOMAIN = 127
+DEFAULT_SNAPSHOT_DIR = "/var/lib/ptpconfigurator/snapshots"
+
+# 受管理的PTP实例: 实例名 -> service名、配置文件、UDS路径
+PTP_INSTANCES = {
+    "ptp4l": {
+        "service": "ptp4l.service",
+        "config_file": "/etc/linuxptp/ptp4l.conf",
+        "uds_path": "/var/run/ptp4l",
+    },
+    "ptp4l1": {
+        "service": "ptp4l1.service",
+        "config_file": "/etc/linuxptp/ptp4l1.conf",
+        "uds_path": "/var/run/ptp4l1",
+    },
+}
+
+# 各数据集接口返回的顶层字段（取第一个应答方的值），完整的多应答方结果放在 responders 中
+TIME_STATUS_FIELDS = [
+    "master_offset", "ingress_time", "cumulativeScaledRateOffset", "scaledLastGmPhaseChange",
+    "gmTimeBaseIndicator", "lastGmPhaseChange", "gmPresent", "gmIdentity"
+]
+PORT_DATA_SET_FIELDS = [
+    "portIdentity", "portState", "logMinDelayReqInterval", "peerMeanPathDelay", "logAnnounceInterval",
+    "announceReceiptTimeout", "logSyncInterval", "delayMechanism", "logMinPdelayReqInterval", "versionNumber"
+]
+CURRENT_DATA_SET_FIELDS = ["stepsRemoved", "offsetFromMaster", "meanPathDelay"]
+
+
+def managed_units(env_dir: str = DEFAULT_ENV_DIR, unit_dir: str = UNIT_DIR) -> Dict[str, ManagedUnit]:
+    """启动参数由环境文件管理的unit: service名 -> ManagedUnit"""
+    return {
+        **{info["service"]: ManagedUnit(info["service"], "PTP4L_INTERFACE_ARGS", ("-i",), unit_dir, env_dir)
+           for info in PTP_INSTANCES.values()},
+        "phc2sys.service": ManagedUnit("phc2sys.service", "PHC2SYS_DOMAIN_ARGS", ("-z", "-n"), unit_dir, env_dir),
+    }
+
+
+def snapshot_files(units: Dict[str, ManagedUnit]) -> Dict[str, str]:
+    """配置快照覆盖的文件: 路径 -> 所属unit（各实例的配置文件，以及各unit的主文件、drop-in和环境文件）"""
+    return {
+        **{info["config_file"]: info["service"] for info in PTP_INSTANCES.values()},
+        **{path: service for service, unit in units.items() for path in unit.paths},
+    }
+
+
+def parse_ptp_config(content):
+    """
+    解析 PTP 配置文件内容，返回键值对
+    """
+    config_dict = {}
+    current_section = None
+
+    # 逐行调试日志只在开启时输出，避免每行都付出一次日志调用的代价
+    debug = config_logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        config_logger.debug("开始解析配置文件内容，原始内容长度: %s 字节", len(content))
+
+    # 按行分割并处理
+    lines = content.split('\n')
+
+    for i, line in enumerate(lines, 1):
+        line = line.strip()
+        if debug:
+            config_logger.debug("处理第 %s 行: %s", i, line)
+
+        # 跳过空行和注释
+        if not line or line.startswith('#'):
+            if debug:
+                config_logger.debug("跳过第 %s 行 (空行或注释)", i)
+            continue
+
+        # 处理节标题
+        if line.startswith('[') and line.endswith(']'):
+            current_section = line[1:-1]
+            config_dict[current_section] = {}
+            if debug:
+                config_logger.debug("发现节: %s", current_section)
+            continue
+
+        # 处理键值对
+        # 使用正则表达式匹配键值对，处理多个空格的情况
+        match = re.match(r'^(\S+)\s+(\S.*)$', line)
+        if match:
+            key = match.group(1).strip()
+            value = match.group(2).strip()
+            if debug:
+                config_logger.debug("解析键值对: key='%s', value='%s'", key, value)
+
+            # 移除值两端的引号
+            if (value.startswith('"') and value.endswith('"')) or \
+               (value.startswith("'") and value.endswith("'")):
+                value = value[1:-1]
+                if debug:
+                    config_logger.debug("移除引号后的值: '%s'", value)
+
+            if current_section:
+                config_dict[current_section][key] = value
+                if debug:
+                    config_logger.debug("在节 %s 中添加: %s=%s", current_section, key, value)
+            else:
+                if 'global' not in config_dict:
+                    config_dict['global'] = {}
+                config_dict['global'][key] = value
+                if debug:
+                    config_logger.debug("添加全局配置: %s=%s", key, value)
+
+
+    if debug:
+        config_logger.debug("最终解析结果: %s", config_dict)
+    return config_dict
+
+
+def load_ptp_config(config_path: str) -> Dict[str, str]:
+    """
+    读取并解析配置文件的全局配置（不缓存）
+
+    Raises:
+        OSError: 文件无法读取
+    """
+    try:
+        with open(config_path, 'r') as file:
+            content = file.read()
+            config_logger.debug("成功读取文件，内容长度: %s 字节", len(content))
+    except Exception as e:
+        logger.error("读取文件时出错: %s", e)
+        raise
+
+    if not content:
+        logger.warning("配置文件为空")
+        return {}
+    config = parse_ptp_config(content).get("global", {})
+    config_logger.debug("成功解析配置文件")
+    return config
+
+
+def update_config_file(config_path: str, key: str, value: str) -> bool:
+    try:
+        with open(config_path, 'r') as file:
+            lines = file.readlines()
+
+        updated = False
+        for i, line in enumerate(lines):
+            # 跳过注释和空行
+            if not line.strip() or line.strip().startswith('#'):
+                continue
+
+            # 用正则定位键和值，保留所有原始空格
+            match = re.match(r'^(\s*' + re.escape(key) + r')(\s+)(\S.*)$', line)
+            if match:
+                # 保留原有的缩进和键-值间空格，只替换值
+                lines[i] = f"{match.group(1)}{match.group(2)}{value}\n"
+                updated = True
+                break
+
+        if not updated:
+            logger.error("未找到要更新的键: %s", key)
+            return False
+
+        with open(config_path, 'w') as file:
+            file.writelines(lines)
+
+        return True
+
+    except Exception as e:
+        logger.error("更新配置文件时出错: %s", e)
+        return False
+
+
+def apply_config_values(config_file: str, old_config: Dict[str, str], values: Dict[str, str]) -> Tuple[bool, bool]:
+    """
+    把配置项逐项写入配置文件
+
+    Args:
+        old_config: 写入前的全局配置，用于判断domain是否变化
+        values: 要写入的配置项 -> 值
+
+    Returns:
+        tuple: (是否全部写入成功, domainNumber是否发生变化)
+    """
+    old_domain = old_config.get("domainNumber")
+    new_domain = values.get("domainNumber")
+    domain_changed = new_domain is not None and old_domain is not None and int(old_domain) != int(new_domain)
+    if domain_changed:
+        logger.info("检测到domain更改: %s -> %s", old_domain, new_domain)
+
+    for key, value in values.items():
+        if not update_config_file(config_file, key, value):
+            return False, domain_changed
+    return True, domain_changed
+
+
+def config_domain(config: Optional[Dict]) -> int:
+    """从配置中取domainNumber，缺失或非法时返回默认domain"""
+    try:
+        return int((config or {}).get("domainNumber", DEFAULT_PTP_DOMAIN))
+    except (TypeError, ValueError):
+        return DEFAULT_PTP_DOMAIN
+
+
+def dataset_fields(records: Dict[str, PmcRecord], fields: List[str]) -> Dict:
+    """
+    把数据集的应答整理为接口返回格式
+
+    Returns:
+        dict: 顶层为第一个应答方的字段，responders 为以端口ID为键的全部应答
+    """
+    record = first_record(records)
+    values = record.fields if record else {}
+    result = {key: values.get(key) for key in fields}
+    result["responders"] = {port: r.fields for port, r in records.items() if not r.is_error}
+    return result
+
+
+def run_systemctl(*args: str) -> Optional[str]:
+    """
+    执行 sudo systemctl
+
+    Returns:
+        str: 失败时的错误信息，成功时为 None
+    """
+    try:
+        result = subprocess.run(["sudo", "systemctl", *args], capture_output=True, text=True, timeout=30)
+    except Exception as e:
+        return f"systemctl {' '.join(args)} 失败: {e}"
+    if result.returncode != 0:
+        return f"systemctl {' '.join(args)} 失败: {result.stderr.strip()}"
+    return None
+
+
+def update_phc2sys_domain(unit: ManagedUnit, new_domain: int, config_file: str) -> bool:
+    """
+    更新phc2sys.service中对应PTP时钟的domain参数（写入drop-in引用的环境文件）
+    Args:
+        unit: phc2sys.service 的 ManagedUnit
+        new_domain: 新的domain值
+        config_file: PTP配置文件路径，用于确定要更新哪个时钟的domain
+    Returns:
+        bool: 是否新生成了drop-in（需要daemon-reload）
+    Raises:
+        ValueError: 无法确定对应的UDS路径，或phc2sys中没有该时钟的 -z/-n 参数
+        OSError: 文件无法读写
+    """
+    # 根据配置文件路径确定对应的UDS路径
+    target_uds = next((info["uds_path"] for info in PTP_INSTANCES.values() if info["config_file"] == config_file), None)
+    if target_uds is None:
+        raise ValueError(f"无法确定配置文件 {config_file} 对应的UDS路径")
+    logger.info("更新phc2sys.service中 %s 对应的domain参数为: %s", target_uds, new_domain)
+    groups = unit.read_groups()
+    updated = False
+    for group in groups:
+        if group[0] == target_uds:
+            logger.info("将 %s 的domain从%s改为%s", target_uds, group[1], new_domain)
+            group[1] = str(new_domain)
+            updated = True
+    if not updated:
+        raise ValueError(f"未找到 {target_uds} 对应的domain参数")
+    created = unit.write_groups(groups)
+    logger.info("phc2sys.service配置更新成功")
+    return created
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+ptp4l 管理接口模拟器
+
+在本机绑定 Unix 数据报套接字（如 /var/run/ptp4l），按 PTPv2 管理报文格式应答
+pmc 发出的 GET 请求（TIME_STATUS_NP、PORT_DATA_SET、CURRENT_DATA_SET、
+PORT_STATS_NP 等），用于在没有PTP网卡的机器上对状态接口和采样器做压力测试。
+
+还可以模拟网络中的其他时钟（--remote）：边界跳数大于 0 的请求由这些远端时钟按
+DEFAULT_DATA_SET、PARENT_DATA_SET、PORT_DATA_SET 各自应答，用于测试拓扑发现。
+
+用法示例:
+    python ptp_simulator.py --instance /tmp/ptp4l:127 --instance /tmp/ptp4l1:127 \\
+        --offset 50 --jitter 20 --delay-ms 5 --drop-rate 0.01
+    python ptp_simulator.py --instance /tmp/ptp4l:127 --parent 001122.fffe.aaaa01-2 \\
+        --remote aabbcc.fffe.ddeeff:aabbcc.fffe.ddeeff-0:MASTER:2 \\
+        --remote 001122.fffe.aaaa01:aabbcc.fffe.ddeeff-1:SLAVE,MASTER:1
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import socket
+import struct
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 报文类型与TLV常量（IEEE 1588-2008 / linuxptp）
+MESSAGE_TYPE_MANAGEMENT = 0x0D
+CONTROL_FIELD_MANAGEMENT = 0x04
+TLV_MANAGEMENT = 0x0001
+TLV_MANAGEMENT_ERROR_STATUS = 0x0002
+
+ACTION_GET = 0
+ACTION_SET = 1
+ACTION_RESPONSE = 2
+ACTION_COMMAND = 3
+ACTION_ACKNOWLEDGE = 4
+
+ERROR_NOT_SUPPORTED = 0x0006
+
+MID_DEFAULT_DATA_SET = 0x2000
+MID_CURRENT_DATA_SET = 0x2001
+MID_PARENT_DATA_SET = 0x2002
+MID_PORT_DATA_SET = 0x2004
+MID_TIME_STATUS_NP = 0xC000
+MID_PORT_STATS_NP = 0xC005
+
+MANAGEMENT_IDS = {
+    "DEFAULT_DATA_SET": MID_DEFAULT_DATA_SET,
+    "CURRENT_DATA_SET": MID_CURRENT_DATA_SET,
+    "PARENT_DATA_SET": MID_PARENT_DATA_SET,
+    "PORT_DATA_SET": MID_PORT_DATA_SET,
+    "TIME_STATUS_NP": MID_TIME_STATUS_NP,
+    "PORT_STATS_NP": MID_PORT_STATS_NP,
+}
+
+# 按端口应答的管理ID，其余按时钟应答一次
+PORT_SCOPED_IDS = {MID_PORT_DATA_SET, MID_PORT_STATS_NP}
+
+PORT_STATES = {
+    "INITIALIZING": 1, "FAULTY": 2, "DISABLED": 3, "LISTENING": 4,
+    "PRE_MASTER": 5, "MASTER": 6, "PASSIVE": 7, "UNCALIBRATED": 8, "SLAVE": 9,
+}
+
+HEADER_FORMAT = ">BBHBBH8s4s10sHBb"
+HEADER_LENGTH = struct.calcsize(HEADER_FORMAT)
+MANAGEMENT_FORMAT = ">10sBBBB"
+MANAGEMENT_LENGTH = struct.calcsize(MANAGEMENT_FORMAT)
+TLV_HEADER_FORMAT = ">HHH"
+TLV_HEADER_LENGTH = struct.calcsize(TLV_HEADER_FORMAT)
+
+WILDCARD_PORT_IDENTITY = b"\xff" * 10
+
+# rx/tx 统计计数在 linuxptp 中按小端序传输，顺序与 msg.h 中的消息类型一致
+STATS_SYNC = 0
+STATS_DELAY_REQ = 1
+STATS_FOLLOW_UP = 8
+STATS_DELAY_RESP = 9
+STATS_ANNOUNCE = 11
+
+
+def parse_clock_identity(text: str) -> bytes:
+    """把 'aabbcc.fffe.ddeeff' 形式的时钟ID转换为8字节"""
+    raw = bytes.fromhex(text.replace(".", "").replace(":", ""))
+    if len(raw) != 8:
+        raise ValueError(f"无效的时钟ID: {text}")
+    return raw
+
+
+def format_clock_identity(raw: bytes) -> str:
+    """把8字节时钟ID格式化为 pmc 输出形式"""
+    h = raw.hex()
+    return f"{h[0:6]}.{h[6:10]}.{h[10:16]}"
+
+
+def pack_port_identity(clock_identity: bytes, port_number: int) -> bytes:
+    return clock_identity + struct.pack(">H", port_number)
+
+
+def parse_port_identity(text: str) -> bytes:
+    """把 'aabbcc.fffe.ddeeff-1' 形式的端口ID转换为10字节"""
+    clock, _, port = text.rpartition("-")
+    return pack_port_identity(parse_clock_identity(clock), int(port))
+
+
+def encode_default_data_set(clock_identity: bytes, port_count: int, domain: int,
+                            priority1: int = 128, clock_class: int = 248) -> bytes:
+    return (
+        struct.pack(">BBHB", 0x01, 0, port_count, priority1)
+        + struct.pack(">BBH", clock_class, 0xFE, 0xFFFF)
+        + struct.pack(">B", 128)
+        + clock_identity
+        + struct.pack(">BB", domain, 0)
+    )
+
+
+def encode_parent_data_set(parent_port_identity: bytes, gm_identity: bytes) -> bytes:
+    return (
+        parent_port_identity
+        + struct.pack(">BBHi", 0, 0, 0xFFFF, 0x7FFFFFFF)
+        + struct.pack(">BBBHB", 128, 6, 0x21, 0x4E5D, 128)
+        + gm_identity
+    )
+
+
+def encode_port_data_set(clock_identity: bytes, port_number: int, port_state: str) -> bytes:
+    return (
+        pack_port_identity(clock_identity, port_number)
+        + struct.pack(
+            ">BbqbBbBbB",
+            PORT_STATES.get(port_state, PORT_STATES["LISTENING"]),
+            0, 0, 1, 3, 0, 1, 0, 2,
+        )
+    )
+
+
+def build_management_message(
+    management_id: int,
+    action: int = ACTION_GET,
+    domain: int = 0,
+    sequence_id: int = 0,
+    source_port_identity: bytes = b"\x00" * 10,
+    target_port_identity: bytes = WILDCARD_PORT_IDENTITY,
+    starting_boundary_hops: int = 0,
+    boundary_hops: int = 0,
+    data: bytes = b"",
+    tlv_type: int = TLV_MANAGEMENT,
+) -> bytes:
+    """
+    组装一条管理报文
+
+    GET 请求的 data 为空；应答时 data 为对应数据集的二进制内容。
+    """
+    if len(data) % 2:
+        data += b"\x00"
+    tlv = struct.pack(TLV_HEADER_FORMAT, tlv_type, 2 + len(data), management_id) + data
+    body = struct.pack(
+        MANAGEMENT_FORMAT,
+        target_port_identity,
+        starting_boundary_hops,
+        boundary_hops,
+        action & 0x0F,
+        0,
+    )
+    length = HEADER_LENGTH + len(body) + len(tlv)
+    header = struct.pack(
+        HEADER_FORMAT,
+        MESSAGE_TYPE_MANAGEMENT,
+        0x02,
+        length,
+        domain,
+        0,
+        0,
+        b"\x00" * 8,
+        b"\x00" * 4,
+        source_port_identity,
+        sequence_id,
+        CONTROL_FIELD_MANAGEMENT,
+        0x7F,
+    )
+    return header + body + tlv
+
+
+def parse_management_message(datagram: bytes) -> Optional[Dict]:
+    """
+    解析管理报文，格式不合法时返回 None
+
+    Returns:
+        dict: 包含 domain、sequence_id、action、management_id、data 等字段
+    """
+    if len(datagram) < HEADER_LENGTH + MANAGEMENT_LENGTH + TLV_HEADER_LENGTH:
+        return None
+    header = struct.unpack_from(HEADER_FORMAT, datagram, 0)
+    if header[0] & 0x0F != MESSAGE_TYPE_MANAGEMENT:
+        return None
+    target, starting_hops, hops, action, _ = struct.unpack_from(MANAGEMENT_FORMAT, datagram, HEADER_LENGTH)
+    offset = HEADER_LENGTH + MANAGEMENT_LENGTH
+    tlv_type, tlv_length, management_id = struct.unpack_from(TLV_HEADER_FORMAT, datagram, offset)
+    data_start = offset + TLV_HEADER_LENGTH
+    return {
+        "domain": header[3],
+        "source_port_identity": header[8],
+        "sequence_id": header[9],
+        "target_port_identity": target,
+        "starting_boundary_hops": starting_hops,
+        "boundary_hops": hops,
+        "action": action & 0x0F,
+        "tlv_type": tlv_type,
+        "management_id": management_id,
+        "data": datagram[data_start:data_start + max(tlv_length - 2, 0)],
+    }
+
+
+class OffsetTrace:
+    """
+    合成的偏差/路径延时轨迹
+
+    offset(t) = 基准偏差 + 正弦漂移 + 随机游走 + 高斯抖动，单位均为纳秒。
+    若给定 trace 列表，则按 1 秒一个点循环回放，并在其上叠加抖动。
+    """
+
+    def __init__(
+        self,
+        offset_ns: float = 0.0,
+        jitter_ns: float = 20.0,
+        wander_ns: float = 0.0,
+        period_s: float = 60.0,
+        path_delay_ns: float = 1500.0,
+        path_delay_jitter_ns: float = 5.0,
+        trace: Optional[List[float]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.offset_ns = offset_ns
+        self.jitter_ns = jitter_ns
+        self.wander_ns = wander_ns
+        self.period_s = period_s
+        self.path_delay_ns = path_delay_ns
+        self.path_delay_jitter_ns = path_delay_jitter_ns
+        self.trace = trace or []
+        self._rng = random.Random(seed)
+        self._walk = 0.0
+
+    def sample(self, t: float) -> Tuple[float, float]:
+        """返回 t 时刻的 (offsetFromMaster, meanPathDelay)"""
+        if self.trace:
+            base = self.trace[int(t) % len(self.trace)]
+        else:
+            base = self.offset_ns
+            if self.wander_ns and self.period_s > 0:
+                base += self.wander_ns * math.sin(2 * math.pi * t / self.period_s)
+            if self.wander_ns:
+                self._walk += self._rng.gauss(0.0, self.wander_ns * 0.01)
+                base += self._walk
+        offset = base + self._rng.gauss(0.0, self.jitter_ns) if self.jitter_ns else base
+        delay = self.path_delay_ns
+        if self.path_delay_jitter_ns:
+            delay += self._rng.gauss(0.0, self.path_delay_jitter_ns)
+        return offset, max(delay, 0.0)
+
+
+class RemoteClock:
+    """
+    网络中的一个远端时钟，应答经本地实例转发的管理请求
+
+    Args:
+        clock_identity: 时钟ID
+        parent_port_identity: 父端口ID，端口号为0且时钟ID等于自身时表示自己是GM
+        port_states: 各端口的状态，按端口号1、2……排列
+        hops: 与本地实例相隔的边界时钟数，请求的边界跳数不小于它时才应答
+        gm_identity: GM时钟ID，默认取父端口所在的时钟
+    """
+
+    MANAGEMENT_IDS = {MID_DEFAULT_DATA_SET, MID_PARENT_DATA_SET, MID_PORT_DATA_SET}
+
+    def __init__(self, clock_identity: str, parent_port_identity: str, port_states: List[str],
+                 hops: int = 1, gm_identity: Optional[str] = None, priority1: int = 128, clock_class: int = 248):
+        self.clock_identity = parse_clock_identity(clock_identity)
+        self.parent_port_identity = parse_port_identity(parent_port_identity)
+        self.port_states = port_states or ["SLAVE"]
+        self.hops = max(1, hops)
+        self.gm_identity = parse_clock_identity(gm_identity) if gm_identity else self.parent_port_identity[:8]
+        self.priority1 = priority1
+        self.clock_class = clock_class
+
+    @classmethod
+    def from_spec(cls, spec: str) -> "RemoteClock":
+        """解析 '时钟ID:父端口ID:端口状态[,端口状态...][:跳数]' 形式的命令行参数"""
+        parts = spec.split(":")
+        if len(parts) not in (3, 4):
+            raise ValueError(f"无效的远端时钟: {spec}")
+        hops = int(parts[3]) if len(parts) == 4 else 1
+        return cls(parts[0], parts[1], parts[2].split(","), hops)
+
+    def responses(self, management_id: int, domain: int, common: Dict) -> List[bytes]:
+        if management_id not in self.MANAGEMENT_IDS:
+            return []
+        common = {**common, "boundary_hops": max(common["starting_boundary_hops"] - self.hops, 0)}
+        if management_id == MID_PORT_DATA_SET:
+            return [build_management_message(
+                management_id, action=ACTION_RESPONSE,
+                source_port_identity=pack_port_identity(self.clock_identity, port_number),
+                data=encode_port_data_set(self.clock_identity, port_number, state), **common,
+            ) for port_number, state in enumerate(self.port_states, 1)]
+        if management_id == MID_DEFAULT_DATA_SET:
+            data = encode_default_data_set(self.clock_identity, len(self.port_states), domain,
+                                           self.priority1, self.clock_class)
+        else:
+            data = encode_parent_data_set(self.parent_port_identity, self.gm_identity)
+        return [build_management_message(
+            management_id, action=ACTION_RESPONSE,
+            source_port_identity=pack_port_identity(self.clock_identity, 0), data=data, **common,
+        )]
+
+
+class SimulatedInstance:
+    """
+    单个模拟的 ptp4l 实例
+
+    Args:
+        uds_path: 绑定的UDS路径
+        domain: 只应答该 domain 的请求，与真实 ptp4l 行为一致
+        clock_identity: 本地时钟ID
+        gm_identity: 模拟的GM时钟ID
+        port_count: 端口数量，PORT_DATA_SET 等按端口逐个应答
+        port_state: 端口状态
+        trace: 偏差轨迹
+        delay_ms: 应答前注入的延时
+        drop_rate: 丢弃请求的概率（0~1）
+        parent_port_identity: 父端口ID，默认为GM的1号端口
+        remote_clocks: 边界跳数大于0的请求可以到达的远端时钟
+    """
+
+    def __init__(
+        self,
+        uds_path: str,
+        domain: int = 127,
+        clock_identity: str = "001122.fffe.334455",
+        gm_identity: str = "aabbcc.fffe.ddeeff",
+        port_count: int = 1,
+        port_state: str = "SLAVE",
+        trace: Optional[OffsetTrace] = None,
+        delay_ms: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: Optional[int] = None,
+        parent_port_identity: Optional[str] = None,
+        remote_clocks: Optional[List[RemoteClock]] = None,
+    ):
+        self.uds_path = uds_path
+        self.domain = domain
+        self.clock_identity = parse_clock_identity(clock_identity)
+        self.gm_identity = parse_clock_identity(gm_identity)
+        self.port_count = max(1, port_count)
+        self.port_state = port_state
+        self.trace = trace or OffsetTrace(seed=seed)
+        self.delay_ms = delay_ms
+        self.drop_rate = drop_rate
+        self.parent_port_identity = (parse_port_identity(parent_port_identity) if parent_port_identity
+                                     else pack_port_identity(self.gm_identity, 1))
+        self.remote_clocks = remote_clocks or []
+        self.started = time.monotonic()
+        self.stats = {"received": 0, "answered": 0, "dropped": 0, "ignored": 0}
+        self._rng = random.Random(seed)
+        self._transport = None
+
+    # ---- 数据集编码 ----
+
+    def _current_data_set(self, t: float) -> bytes:
+        offset, delay = self.trace.sample(t)
+        return struct.pack(">Hqq", 1, int(offset * 65536), int(delay * 65536))
+
+    def _time_status_np(self, t: float) -> bytes:
+        offset, _ = self.trace.sample(t)
+        ingress = time.time_ns()
+        gm_present = 1 if self.port_state == "SLAVE" else 0
+        return (
+            struct.pack(">qqiiH", int(offset), ingress, 0, 0, 0)
+            + b"\x00" * 12
+            + struct.pack(">i", gm_present)
+            + (self.gm_identity if gm_present else self.clock_identity)
+        )
+
+    def _port_data_set(self, port_number: int) -> bytes:
+        return encode_port_data_set(self.clock_identity, port_number, self.port_state)
+
+    def _port_stats_np(self, port_number: int, t: float) -> bytes:
+        rx = [0] * 16
+        tx = [0] * 16
+        elapsed = int(t)
+        rx[STATS_SYNC] = elapsed
+        rx[STATS_FOLLOW_UP] = elapsed
+        rx[STATS_DELAY_RESP] = elapsed
+        rx[STATS_ANNOUNCE] = elapsed // 2
+        tx[STATS_DELAY_REQ] = elapsed
+        return (
+            pack_port_identity(self.clock_identity, port_number)
+            + struct.pack("<16Q", *rx)
+            + struct.pack("<16Q", *tx)
+        )
+
+    def _default_data_set(self) -> bytes:
+        return encode_default_data_set(self.clock_identity, self.port_count, self.domain)
+
+    def _parent_data_set(self) -> bytes:
+        return encode_parent_data_set(self.parent_port_identity, self.gm_identity)
+
+    # ---- 请求处理 ----
+
+    def handle_request(self, datagram: bytes) -> List[bytes]:
+        """
+        处理一条请求报文，返回需要发送的应答报文列表
+
+        domain 不匹配或报文不合法时返回空列表（pmc 侧表现为超时）。
+        """
+        self.stats["received"] += 1
+        request = parse_management_message(datagram)
+        if request is None or request["domain"] != self.domain:
+            self.stats["ignored"] += 1
+            return []
+
+        t = time.monotonic() - self.started
+        management_id = request["management_id"]
+        target_port = struct.unpack(">H", request["target_port_identity"][8:])[0]
+        common = {
+            "domain": self.domain,
+            "sequence_id": request["sequence_id"],
+            "target_port_identity": request["source_port_identity"],
+            "starting_boundary_hops": max(request["starting_boundary_hops"] - request["boundary_hops"], 0),
+            "boundary_hops": 0,
+        }
+
+        if request["action"] != ACTION_GET or management_id not in MANAGEMENT_IDS.values():
+            error = struct.pack(">HH4s", ERROR_NOT_SUPPORTED, management_id, b"\x00" * 4)
+            return [build_management_message(
+                ERROR_NOT_SUPPORTED, action=ACTION_RESPONSE, tlv_type=TLV_MANAGEMENT_ERROR_STATUS,
+                source_port_identity=pack_port_identity(self.clock_identity, 0),
+                data=error[2:], **common,
+            )]
+
+        responses = []
+        if management_id in PORT_SCOPED_IDS:
+            ports = range(1, self.port_count + 1)
+            if target_port not in (0xFFFF, 0):
+                ports = [target_port] if target_port <= self.port_count else []
+            for port_number in ports:
+                if management_id == MID_PORT_DATA_SET:
+                    data = self._port_data_set(port_number)
+                else:
+                    data = self._port_stats_np(port_number, t)
+                responses.append(build_management_message(
+                    management_id, action=ACTION_RESPONSE,
+                    source_port_identity=pack_port_identity(self.clock_identity, port_number),
+                    data=data, **common,
+                ))
+        else:
+            if management_id == MID_CURRENT_DATA_SET:
+                data = self._current_data_set(t)
+            elif management_id == MID_TIME_STATUS_NP:
+                data = self._time_status_np(t)
+            elif management_id == MID_DEFAULT_DATA_SET:
+                data = self._default_data_set()
+            else:
+                data = self._parent_data_set()
+            responses.append(build_management_message(
+                management_id, action=ACTION_RESPONSE,
+                source_port_identity=pack_port_identity(self.clock_identity, 0),
+                data=data, **common,
+            ))
+        # 边界跳数大于0时 ptp4l 把请求转发到网络，可达的远端时钟各自应答
+        for remote in self.remote_clocks:
+            if request["boundary_hops"] >= remote.hops:
+                responses.extend(remote.responses(management_id, self.domain, common))
+        return responses
+
+    # ---- asyncio 协议接口 ----
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr):
+        if self.drop_rate and self._rng.random() < self.drop_rate:
+            self.stats["dropped"] += 1
+            return
+        responses = self.handle_request(data)
+        if not responses or not addr:
+            return
+        if self.delay_ms > 0:
+            asyncio.get_running_loop().call_later(self.delay_ms / 1000.0, self._send, responses, addr)
+        else:
+            self._send(responses, addr)
+
+    def _send(self, responses: List[bytes], addr):
+        for response in responses:
+            try:
+                self._transport.sendto(response, addr)
+                self.stats["answered"] += 1
+            except OSError as e:
+                logger.debug("模拟器 %s 发送应答失败: %s", self.uds_path, e)
+
+    def error_received(self, exc):
+        logger.debug("模拟器 %s 收到错误: %s", self.uds_path, exc)
+
+    def connection_lost(self, exc):
+        self._transport = None
+
+    async def start(self):
+        """绑定UDS路径并开始应答"""
+        if os.path.exists(self.uds_path):
+            os.unlink(self.uds_path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.uds_path)
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, sock=sock)
+        logger.info("模拟ptp4l实例已启动: %s (domain %s, %s个端口)", self.uds_path, self.domain, self.port_count)
+
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+        if os.path.exists(self.uds_path):
+            os.unlink(self.uds_path)
+
+
+def load_trace_file(path: str) -> List[float]:
+    """读取偏差轨迹文件，每行一个纳秒值，# 开头为注释"""
+    values = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                values.append(float(line.split(",")[-1]))
+    return values
+
+
+async def run_simulators(instances: List[SimulatedInstance]):
+    """启动所有模拟实例并一直运行"""
+    for instance in instances:
+        await instance.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for instance in instances:
+            instance.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="ptp4l 管理接口模拟器")
+    parser.add_argument("--instance", action="append", default=[],
+                        help="UDS路径[:domain]，可重复指定多个实例，默认 /var/run/ptp4l:127")
+    parser.add_argument("--ports", type=int, default=1, help="每个实例的端口数量")
+    parser.add_argument("--port-state", default="SLAVE", choices=sorted(PORT_STATES), help="端口状态")
+    parser.add_argument("--gm-identity", default="aabbcc.fffe.ddeeff", help="模拟的GM时钟ID")
+    parser.add_argument("--parent", help="本地实例的父端口ID，默认为GM的1号端口")
+    parser.add_argument("--remote", action="append", default=[],
+                        help="远端时钟 时钟ID:父端口ID:端口状态[,端口状态...][:跳数]，可重复指定")
+    parser.add_argument("--offset", type=float, default=0.0, help="基准偏差(ns)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="偏差抖动标准差(ns)")
+    parser.add_argument("--wander", type=float, default=0.0, help="正弦漂移幅度(ns)")
+    parser.add_argument("--period", type=float, default=60.0, help="漂移周期(s)")
+    parser.add_argument("--path-delay", type=float, default=1500.0, help="路径延时(ns)")
+    parser.add_argument("--trace-file", help="偏差轨迹文件，每行一个纳秒值")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="应答前注入的延时(ms)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="丢弃请求的概率(0~1)")
+    parser.add_argument("--seed", type=int, help="随机数种子")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    trace_values = load_trace_file(args.trace_file) if args.trace_file else None
+    remote_clocks = [RemoteClock.from_spec(spec) for spec in args.remote]
+    specs = args.instance or ["/var/run/ptp4l:127"]
+    instances = []
+    for index, spec in enumerate(specs):
+        path, _, domain = spec.partition(":")
+        seed = None if args.seed is None else args.seed + index
+        trace = OffsetTrace(
+            offset_ns=args.offset, jitter_ns=args.jitter, wander_ns=args.wander,
+            period_s=args.period, path_delay_ns=args.path_delay, trace=trace_values, seed=seed,
+        )
+        instances.append(SimulatedInstance(
+            path,
+            domain=int(domain) if domain else 127,
+            clock_identity=f"001122.fffe.3344{index:02x}",
+            gm_identity=args.gm_identity,
+            port_count=args.ports,
+            port_state=args.port_state,
+            trace=trace,
+            delay_ms=args.delay_ms,
+            drop_rate=args.drop_rate,
+            seed=seed,
+            parent_port_identity=args.parent,
+            remote_clocks=remote_clocks,
+        ))
+
+    try:
+        asyncio.run(run_simulators(instances))
+    except KeyboardInterrupt:
+        logger.info("模拟器已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+PTP 数据集查询
+
+封装 pmc 命令的执行与输出解析，供各个状态接口共用。
+"""
+
+import logging
+import subprocess
+from typing import Dict
+
+from pmc_parser import PmcRecord, parse_pmc_output
+
+logger = logging.getLogger(__name__)
+
+PMC_TIMEOUT = 10
+
+
+class PmcCommandError(RuntimeError):
+    """pmc 命令返回非零退出码"""
+
+
+def run_pmc(uds_path: str, domain: int, command: str, boundary_hops: int = 0, timeout: float = PMC_TIMEOUT) -> str:
+    """
+    执行 pmc -u -b {boundary_hops} '{command}' -d {domain} -s {uds_path}
+
+    Raises:
+        PmcCommandError: pmc 返回非零退出码
+        subprocess.TimeoutExpired: 执行超时
+        FileNotFoundError: 未安装 pmc
+    """
+    cmd = [
+        "pmc",
+        "-u",
+        "-b", str(boundary_hops),
+        command,
+        "-d", str(domain),
+        "-s", uds_path
+    ]
+    logger.debug("执行命令: %s", cmd)
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise PmcCommandError(result.stderr)
+    return result.stdout
+
+
+def query_dataset(uds_path: str, domain: int, dataset: str, boundary_hops: int = 0) -> Dict[str, PmcRecord]:
+    """
+    GET 指定数据集并解析为按端口ID分组的应答记录
+
+    Args:
+        uds_path: ptp4l 的 UDS 路径
+        domain: PTP domain
+        dataset: 数据集名，如 TIME_STATUS_NP、PORT_DATA_SET
+        boundary_hops: 边界跳数，大于 0 时可能返回多个应答方
+
+    Returns:
+        dict: 以端口ID为键的应答记录
+    """
+    output = run_pmc(uds_path, domain, f"GET {dataset}", boundary_hops)
+    return parse_pmc_output(output, dataset)
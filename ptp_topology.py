@@ -0,0 +1,225 @@
+"""
+PTP 网络时钟发现与拓扑
+
+用大于 0 的边界跳数（`pmc -b N`）向同一 domain 内的全部时钟发送管理 GET，ptp4l 会把请求
+转发到各端口，每个可达的时钟各自应答。根据应答构建拓扑图：
+
+- PARENT_DATA_SET: 每个时钟的父端口和 GM，父端口所在的时钟即拓扑中的上一级
+- PORT_DATA_SET: 每个端口的状态，用于区分 GM / 边界时钟 / 从时钟
+- DEFAULT_DATA_SET: 时钟ID、端口数、priority1、clockClass 等基本不变的属性
+
+每次刷新只查询会变化的 PARENT_DATA_SET 和 PORT_DATA_SET，DEFAULT_DATA_SET 只在发现
+新时钟时或每 static_every 次刷新查询一次；连续 expire_after 次没有应答的时钟被移除。
+拓扑有变化时 version 递增，接口据此生成 ETag。
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from pmc_parser import PmcRecord
+
+logger = logging.getLogger(__name__)
+
+# query(数据集名) -> 以端口ID为键的应答记录
+QueryFunc = Callable[[str], Dict[str, PmcRecord]]
+
+DEFAULT_FIELDS = ["numberPorts", "priority1", "clockClass", "clockAccuracy", "priority2", "domainNumber", "slaveOnly"]
+
+
+def port_clock(port_identity: Optional[str]) -> Optional[str]:
+    """端口ID（xxxxxx.xxxx.xxxxxx-N）所属的时钟ID"""
+    return port_identity.rsplit("-", 1)[0] if port_identity else None
+
+
+class ClockNode:
+    """
+    拓扑中的一个时钟
+
+    Attributes:
+        parent_port: 父端口ID，等于本时钟的端口时表示本时钟没有上级
+        ports: 端口ID -> 端口状态
+        default: DEFAULT_DATA_SET 中的属性
+        missed: 连续未应答的刷新次数
+    """
+
+    def __init__(self, clock_identity: str):
+        self.clock_identity = clock_identity
+        self.parent_port: Optional[str] = None
+        self.grandmaster: Optional[str] = None
+        self.ports: Dict[str, str] = {}
+        self.default: Dict = {}
+        self.last_seen: Optional[float] = None
+        self.missed = 0
+
+    @property
+    def parent(self) -> Optional[str]:
+        parent = port_clock(self.parent_port)
+        return None if parent == self.clock_identity else parent
+
+    @property
+    def role(self) -> str:
+        states = set(self.ports.values())
+        # 还没有 PARENT_DATA_SET 应答时只能根据端口状态判断
+        if self.parent_port is not None and self.parent is None:
+            return "grandmaster" if self.grandmaster in (None, self.clock_identity) else "master"
+        if "SLAVE" in states or "UNCALIBRATED" in states:
+            return "boundary" if "MASTER" in states else "slave"
+        return "unknown"
+
+    def fingerprint(self):
+        return self.parent_port, self.grandmaster, tuple(sorted(self.ports.items())), tuple(sorted(self.default.items()))
+
+
+class TopologyDiscovery:
+    """
+    一个 PTP 实例（UDS路径 + domain）可达的时钟拓扑
+
+    Attributes:
+        version: 拓扑版本号，节点增删或属性变化时递增
+        refreshes: 已完成的刷新次数
+    """
+
+    def __init__(self, query: QueryFunc, static_every: int = 10, expire_after: int = 3):
+        self.query = query
+        self.static_every = static_every
+        self.expire_after = expire_after
+        self.nodes: Dict[str, ClockNode] = {}
+        self.version = 0
+        self.refreshes = 0
+        self.updated: Optional[float] = None
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _query(self, dataset: str) -> Dict[str, PmcRecord]:
+        try:
+            records = self.query(dataset)
+        except Exception as e:
+            self.errors[dataset] = str(e)
+            return {}
+        self.errors.pop(dataset, None)
+        return {port: record for port, record in records.items() if not record.is_error}
+
+    def refresh(self) -> bool:
+        """
+        查询一轮并合并到拓扑（阻塞，在线程池中调用）
+
+        Returns:
+            bool: 拓扑是否有变化
+        """
+        parents = self._query("PARENT_DATA_SET")
+        ports = self._query("PORT_DATA_SET")
+        seen = {record.clock_identity for record in parents.values()}
+        seen.update(record.clock_identity for record in ports.values())
+        with self._lock:
+            need_static = self.refreshes % self.static_every == 0 or bool(seen - self.nodes.keys())
+        defaults = self._query("DEFAULT_DATA_SET") if need_static else {}
+        if not seen and self.errors:
+            # 本轮查询全部失败，不把已知的时钟当作消失
+            return False
+
+        now = time.time()
+        with self._lock:
+            before = {clock: node.fingerprint() for clock, node in self.nodes.items()}
+            for clock in seen:
+                node = self.nodes.setdefault(clock, ClockNode(clock))
+                node.last_seen = now
+                node.missed = 0
+            for record in parents.values():
+                node = self.nodes[record.clock_identity]
+                node.parent_port = record.fields.get("parentPortIdentity")
+                node.grandmaster = record.fields.get("grandmasterIdentity")
+            # 端口状态按本轮应答整体替换，已不存在的端口随之消失
+            port_states: Dict[str, Dict[str, str]] = {}
+            for port, record in ports.items():
+                port_states.setdefault(record.clock_identity, {})[record.fields.get("portIdentity", port)] = \
+                    record.fields.get("portState")
+            for clock, states in port_states.items():
+                self.nodes[clock].ports = states
+            for record in defaults.values():
+                node = self.nodes.get(record.fields.get("clockIdentity", record.clock_identity))
+                if node is not None:
+                    node.default = {key: record.fields[key] for key in DEFAULT_FIELDS if key in record.fields}
+            for clock in list(self.nodes):
+                if clock not in seen:
+                    self.nodes[clock].missed += 1
+                    if self.nodes[clock].missed >= self.expire_after:
+                        logger.info("时钟 %s 连续%s次未应答，从拓扑中移除", clock, self.expire_after)
+                        del self.nodes[clock]
+            after = {clock: node.fingerprint() for clock, node in self.nodes.items()}
+            changed = before != after
+            if changed:
+                self.version += 1
+            self.refreshes += 1
+            self.updated = now
+            return changed
+
+    def graph(self) -> Dict:
+        """
+        拓扑图
+
+        未应答但被其他时钟引用为父时钟或GM的时钟也作为节点给出（responded 为 False）。
+
+        Returns:
+            dict: version、grandmaster、clocks（节点列表）、edges（父 -> 子）和以GM为根的 tree
+        """
+        with self._lock:
+            clocks: Dict[str, Dict] = {}
+            for clock, node in self.nodes.items():
+                clocks[clock] = {
+                    "clockIdentity": clock,
+                    "role": node.role,
+                    "parent": node.parent,
+                    "parentPortIdentity": node.parent_port,
+                    "grandmasterIdentity": node.grandmaster,
+                    "ports": [{"portIdentity": port, "portState": state} for port, state in sorted(node.ports.items())],
+                    **node.default,
+                    "responded": True,
+                    "lastSeen": node.last_seen,
+                }
+            grandmasters = [node.grandmaster for node in self.nodes.values() if node.grandmaster]
+            version, updated, errors = self.version, self.updated, dict(self.errors)
+
+        for entry in list(clocks.values()):
+            for clock, role in ((entry["parent"], "unknown"), (entry["grandmasterIdentity"], "grandmaster")):
+                if clock and clock not in clocks:
+                    clocks[clock] = {"clockIdentity": clock, "role": role, "parent": None, "ports": [], "responded": False}
+        grandmaster = max(set(grandmasters), key=grandmasters.count) if grandmasters else None
+        if grandmaster in clocks and clocks[grandmaster]["role"] == "unknown":
+            clocks[grandmaster]["role"] = "grandmaster"
+        edges = [{"from": entry["parent"], "to": clock, "port": entry.get("parentPortIdentity")}
+                 for clock, entry in clocks.items() if entry["parent"]]
+        return {
+            "version": version,
+            "updated": updated,
+            "grandmaster": grandmaster,
+            "clocks": sorted(clocks.values(), key=lambda entry: entry["clockIdentity"]),
+            "edges": edges,
+            "tree": build_tree(clocks),
+            "errors": errors,
+        }
+
+
+def build_tree(clocks: Dict[str, Dict]) -> List[Dict]:
+    """按父子关系把节点组织成树，根为没有上级（或上级不在图中）的时钟"""
+    children: Dict[Optional[str], List[str]] = {}
+    for clock, entry in clocks.items():
+        parent = entry["parent"] if entry["parent"] in clocks else None
+        children.setdefault(parent, []).append(clock)
+
+    def subtree(clock: str, depth: int, visited: set) -> Dict:
+        visited.add(clock)
+        return {
+            "clockIdentity": clock,
+            "role": clocks[clock]["role"],
+            "hops": depth,
+            "children": [subtree(child, depth + 1, visited)
+                         for child in sorted(children.get(clock, [])) if child not in visited],
+        }
+
+    visited: set = set()
+    roots = [subtree(clock, 0, visited) for clock in sorted(children.get(None, []))]
+    # 父子关系成环时（拓扑切换的瞬间可能出现）环上的节点没有根，单独列出
+    roots.extend(subtree(clock, 0, visited) for clock in sorted(clocks) if clock not in visited)
+    return roots
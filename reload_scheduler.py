@@ -0,0 +1,84 @@
+"""
+systemd daemon-reload 合并调度
+
+修改 unit 文件的接口不再各自同步执行 daemon-reload，而是把 unit 标记为脏并请求一次
+reload。第一个请求开启一个短暂的合并窗口，窗口内的所有请求共用同一个完成 future；
+窗口结束后只执行一次 reload。reload 开始执行后到达的请求进入下一批（它们写入的文件
+可能没有被本次 reload 读到），批次之间串行执行，不会重叠。
+"""
+
+import asyncio
+import logging
+from typing import Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadError(RuntimeError):
+    """daemon-reload 执行失败"""
+
+
+class ReloadScheduler:
+    """
+    合并 daemon-reload 请求
+
+    Attributes:
+        window: 合并窗口（秒）
+        runs: 已执行的 reload 次数
+    """
+
+    def __init__(self, runner: Callable[[], Optional[str]], window: float = 0.5):
+        """
+        Args:
+            runner: 执行一次 reload 的阻塞函数（在线程中调用），失败时返回错误信息
+            window: 合并窗口（秒）
+        """
+        self.window = window
+        self.runs = 0
+        self._runner = runner
+        self._pending: Optional[asyncio.Future] = None
+        self._dirty: Set[str] = set()
+        self._lock = asyncio.Lock()
+
+    def request(self, *units: str) -> asyncio.Future:
+        """
+        标记 unit 为脏并登记一次 reload，返回本批次的完成 future
+
+        future 的结果为本批次覆盖的 unit 列表，reload 失败时为 ReloadError。
+        """
+        self._dirty.update(units)
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            self._pending = loop.create_future()
+            loop.create_task(self._run(self._pending))
+        return self._pending
+
+    async def reload(self, *units: str) -> List[str]:
+        """
+        请求 reload 并等待本批次完成
+
+        Raises:
+            ReloadError: reload 失败
+        """
+        # 一个调用方被取消时不能取消其他调用方共用的 future
+        return await asyncio.shield(self.request(*units))
+
+    async def _run(self, future: asyncio.Future):
+        await asyncio.sleep(self.window)
+        async with self._lock:
+            # 从这里开始的请求进入下一批
+            self._pending = None
+            units, self._dirty = sorted(self._dirty), set()
+            try:
+                error = await asyncio.to_thread(self._runner)
+            except Exception as e:
+                error = str(e)
+            self.runs += 1
+        if error:
+            logger.error("daemon-reload失败: %s", error)
+            future.set_exception(ReloadError(error))
+            # 所有调用方都已取消时避免 "exception was never retrieved" 警告
+            future.exception()
+        else:
+            logger.info("daemon-reload完成（%s）", ", ".join(units) or "无指定unit")
+            future.set_result(units)
@@ -0,0 +1,253 @@
+"""
+状态历史采样存储
+
+按 (来源, 指标) 保存定长环形缓冲区，时间戳和数值分别存放在连续的 float64 数组中，
+24 小时 1Hz（86400 点）的一条序列约占 1.4MB。查询按时间范围二分定位，
+返回按时间排序的两列数据，便于前端直接转换为 Float64Array。
+
+MappedSampleStore 把全部序列放在一个共享映射文件中（如 /dev/shm 下），
+多个 worker 进程映射同一文件：只有 leader 写入，其他 worker 直接查询，
+读写之间用顺序锁（seqlock）保证读到的是完整的一次写入。
+"""
+
+import fcntl
+import logging
+import math
+import mmap
+import os
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 映射文件头: 顺序号、容量、序列数（各8字节）
+_STORE_HEADER = 24
+# 读者在写入进行中时的最大重试次数
+_READ_RETRIES = 100
+
+
+class ReadConflict(RuntimeError):
+    """多次重试后读取仍与写入冲突，没有得到一致的结果"""
+
+
+class SeriesBuffer:
+    """
+    单条时间序列的环形缓冲区
+
+    查询按时间戳二分，缓冲区内的时间戳始终单调不减：早于最新的点的样本（系统时钟被 phc2sys
+    或 NTP 向回步进）不写入，直到系统时间追上最新的点，已有的历史保持不变。超过容量时覆盖最旧的点。
+    起点、点数和两列数据都保存在 buffer 中（布局见 nbytes），buffer 可以是共享映射的一段。
+    """
+
+    def __init__(self, capacity: int, buffer: Optional[memoryview] = None):
+        self.capacity = capacity
+        if buffer is None:
+            buffer = memoryview(bytearray(self.nbytes(capacity)))
+        self._state = buffer[:16].cast("q")
+        self._t = buffer[16:16 + 8 * capacity].cast("d")
+        self._v = buffer[16 + 8 * capacity:self.nbytes(capacity)].cast("d")
+
+    @staticmethod
+    def nbytes(capacity: int) -> int:
+        """占用的字节数: 起点和点数（各8字节），然后是时间戳列和数值列"""
+        return 16 + 16 * capacity
+
+    def __len__(self) -> int:
+        return self._state[1]
+
+    def append(self, t: float, value: float) -> bool:
+        """
+        追加一个点
+
+        Returns:
+            bool: 是否写入（时间戳早于最新的点时丢弃）
+        """
+        start, size = self._state[0], self._state[1]
+        if size > 0 and t < self._t[(start + size - 1) % self.capacity]:
+            return False
+        index = (start + size) % self.capacity
+        self._t[index] = t
+        self._v[index] = value
+        if size < self.capacity:
+            self._state[1] = size + 1
+        else:
+            self._state[0] = (start + 1) % self.capacity
+        return True
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        """按时间顺序返回环形缓冲区中的连续区间 [(begin, end), ...]"""
+        start, size = self._state[0], self._state[1]
+        end = start + size
+        if end <= self.capacity:
+            return [(start, end)]
+        return [(start, self.capacity), (0, end - self.capacity)]
+
+    def query(self, since: float = -math.inf, until: float = math.inf,
+              limit: Optional[int] = None) -> Tuple[List[float], List[float]]:
+        """
+        返回 since < t <= until 的点
+
+        Args:
+            limit: 最多返回的点数（从最早的开始），分块读取时以最后一个时间戳作为下一块的 since
+
+        Returns:
+            tuple: (时间戳列表, 数值列表)
+        """
+        times: List[float] = []
+        values: List[float] = []
+        for begin, end in self._segments():
+            lo = bisect_right(self._t, since, begin, end)
+            hi = bisect_right(self._t, until, lo, end)
+            if limit is not None:
+                hi = min(hi, lo + limit - len(times))
+            times.extend(self._t[lo:hi])
+            values.extend(self._v[lo:hi])
+        return times, values
+
+
+class SampleStore:
+    """
+    按 (来源, 指标) 组织的历史采样
+
+    来源一般为PTP实例名，指标如 offsetFromMaster、meanPathDelay、phc2sysOffset。
+    写入来自事件循环中的采样任务，查询来自请求处理线程，用一把锁保护。
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._series: Dict[Tuple[str, str], SeriesBuffer] = {}
+        # 时间戳回退后正在丢弃样本的序列 -> 已丢弃的样本数
+        self._stepped: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def _append(self, key: Tuple[str, str], series: SeriesBuffer, t: float, value: float):
+        """写入一个点；时间戳回退时丢弃样本，开始和恢复时各记录一次日志（调用方持有锁）"""
+        if series.append(t, value):
+            dropped = self._stepped.pop(key, 0)
+            if dropped:
+                logger.info("%s/%s 的采样时间已追上回退前的点，恢复记录（期间丢弃 %s 个样本）", *key, dropped)
+        elif key in self._stepped:
+            self._stepped[key] += 1
+        else:
+            self._stepped[key] = 1
+            logger.warning("%s/%s 的采样时间戳回退到 %.3f（系统时钟被步进），追上最新的点之前不记录",
+                           *key, t)
+
+    def record(self, source: str, t: float, values: Dict[str, Optional[float]]):
+        """记录同一时刻的一组指标，值为None或非数字的指标跳过"""
+        with self._lock:
+            for metric, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                series = self._series.get((source, metric))
+                if series is None:
+                    series = self._series[(source, metric)] = SeriesBuffer(self.capacity)
+                self._append((source, metric), series, t, float(value))
+
+    def query(self, source: str, metric: str, since: float = -math.inf,
+              until: float = math.inf, limit: Optional[int] = None) -> Tuple[List[float], List[float]]:
+        with self._lock:
+            series = self._series.get((source, metric))
+            if series is None:
+                return [], []
+            return series.query(since, until, limit)
+
+    def metrics(self, source: str) -> List[str]:
+        with self._lock:
+            return [metric for (name, metric) in self._series if name == source]
+
+
+class MappedSampleStore(SampleStore):
+    """
+    序列保存在共享映射文件中的 SampleStore
+
+    序列集合在创建时固定（keys），按顺序排布在文件中，所有进程用相同的 keys 映射得到
+    相同的布局；不在 keys 中的指标不记录。文件大小或布局与当前配置不一致时（如修改了
+    历史时长）清空重建。
+
+    文件头的顺序号在写入期间为奇数：读者在写入前后读到相同的偶数顺序号才采用结果，
+    否则重试，因此不需要跨进程的锁，写入方也不会被读者阻塞。
+    """
+
+    def __init__(self, path: str, capacity: int, keys: Sequence[Tuple[str, str]]):
+        super().__init__(capacity)
+        size = _STORE_HEADER + len(keys) * SeriesBuffer.nbytes(capacity)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # 多个进程同时启动时串行化检查和重建，避免截断其他进程已映射的文件
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._map = mmap.mmap(fd, size) if self._layout_matches(fd, size, capacity, len(keys)) \
+                else self._initialize(fd, size, capacity, len(keys))
+        finally:
+            # mmap 持有文件描述符的副本，锁要显式释放
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        view = memoryview(self._map)
+        self._header = view[:_STORE_HEADER].cast("q")
+        offset = _STORE_HEADER
+        for key in keys:
+            self._series[key] = SeriesBuffer(capacity, view[offset:offset + SeriesBuffer.nbytes(capacity)])
+            offset += SeriesBuffer.nbytes(capacity)
+
+    @staticmethod
+    def _layout_matches(fd: int, size: int, capacity: int, count: int) -> bool:
+        if os.fstat(fd).st_size != size:
+            return False
+        header = memoryview(os.pread(fd, _STORE_HEADER, 0)).cast("q")
+        return header[1] == capacity and header[2] == count
+
+    @staticmethod
+    def _initialize(fd: int, size: int, capacity: int, count: int) -> mmap.mmap:
+        logger.info("初始化历史采样映射文件: %s 条序列，每条 %s 点", count, capacity)
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, size)
+        mapped = mmap.mmap(fd, size)
+        header = memoryview(mapped)[:_STORE_HEADER].cast("q")
+        header[1], header[2] = capacity, count
+        header.release()
+        return mapped
+
+    def recover(self):
+        """上一个写入者在写入中途退出时顺序号停在奇数，接手写入前把它恢复为偶数"""
+        with self._lock:
+            if self._header[0] % 2:
+                self._header[0] += 1
+
+    def record(self, source: str, t: float, values: Dict[str, Optional[float]]):
+        with self._lock:
+            self._header[0] += 1
+            try:
+                for metric, value in values.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    series = self._series.get((source, metric))
+                    if series is not None:
+                        self._append((source, metric), series, t, float(value))
+            finally:
+                self._header[0] += 1
+
+    def query(self, source: str, metric: str, since: float = -math.inf,
+              until: float = math.inf, limit: Optional[int] = None) -> Tuple[List[float], List[float]]:
+        """
+        Raises:
+            ReadConflict: 重试 _READ_RETRIES 次仍与写入冲突
+        """
+        series = self._series.get((source, metric))
+        if series is None:
+            return [], []
+        for _ in range(_READ_RETRIES):
+            seq = self._header[0]
+            if seq % 2:
+                os.sched_yield()
+                continue
+            result = series.query(since, until, limit)
+            if self._header[0] == seq:
+                return result
+        # 写入者一直在写（或在写入中途退出且尚未被接手），读到的数据可能不完整，不返回
+        logger.warning("读取历史采样 %s/%s 时 %s 次均与写入冲突", source, metric, _READ_RETRIES)
+        raise ReadConflict(f"读取历史采样 {source}/{metric} 时与写入冲突，请稍后重试")
+
+    def metrics(self, source: str) -> List[str]:
+        return [metric for (name, metric), series in self._series.items() if name == source and len(series)]
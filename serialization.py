@@ -0,0 +1,115 @@
+"""
+接口响应的编码与内容协商
+
+ApiResponse 作为应用的默认响应类：
+- JSON: 安装了 orjson 时用它编码（直接输出UTF-8字节，比标准库快数倍），否则退回标准库 json
+- MessagePack: 请求的 Accept 接受 application/msgpack（或 application/x-msgpack）且安装了 msgpack 时使用，
+  数值按二进制编码，客户端不需要解析文本
+
+响应类本身拿不到请求，NegotiationMiddleware 在每个请求开始时把协商结果放入上下文变量，
+同一请求内构造的 ApiResponse 据此选择编码。两种编码都带 Vary: Accept；
+基于内容版本的 ETag 经 representation_etag 区分编码，缓存不会把一种编码当作另一种返回。
+"""
+
+import contextvars
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"})
+
+_use_msgpack: contextvars.ContextVar[bool] = contextvars.ContextVar("use_msgpack", default=False)
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """Accept 中 MessagePack 的权重是否高于 JSON（q=0 表示不接受）"""
+    if not accept or msgpack is None:
+        return False
+    best_msgpack = best_json = 0.0
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            best_msgpack = max(best_msgpack, quality)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            best_json = max(best_json, quality)
+    return best_msgpack > 0 and best_msgpack >= best_json
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+def msgpack_negotiated() -> bool:
+    """当前请求是否使用 MessagePack"""
+    return _use_msgpack.get()
+
+
+def representation_etag(etag: str) -> str:
+    """按当前请求的编码区分ETag（MessagePack 在引号内加 -mp 后缀）"""
+    return f"{etag[:-1]}-mp\"" if _use_msgpack.get() and etag.endswith('"') else etag
+
+
+class ApiResponse(JSONResponse):
+    """默认响应类：按协商结果以 orjson 或 MessagePack 编码"""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self.headers["Vary"] = "Accept"
+
+    def render(self, content: Any) -> bytes:
+        if _use_msgpack.get():
+            # 在 init_headers 之前调用，Content-Type 随之改变
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return dumps_msgpack(content)
+        return dumps_json(content)
+
+
+class NegotiationMiddleware:
+    """按请求的 Accept 头设置本请求的响应编码（纯ASGI中间件，不改变请求和流式响应）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), None)
+        token = _use_msgpack.set(accepts_msgpack(accept))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _use_msgpack.reset(token)
+
+
+def to_columns(rows: Iterable[Dict], fields: List[str]) -> Dict[str, List]:
+    """对象数组 -> 每个字段一个数组（缺失的字段为None）"""
+    rows = list(rows)
+    return {field: [row.get(field) for row in rows] for field in fields}
@@ -4,7 +4,6 @@ const API_BASE_URL = 'http://localhost:8001';
 // 全局变量
 let networkInterfaces = [];
 let currentConfig = {};
-let statusUpdateInterval;
 let originalPtp1Config = {};
 let originalPtp2Config = {};
 
@@ -13,10 +12,199 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeApp();
 });
 
+// 各PTP实例在页面上对应的元素ID
+const INSTANCE_VIEWS = {
+    ptp4l: {
+        label: 'PTP时钟1',
+        configFile: '/etc/linuxptp/ptp4l.conf',
+        udsPath: '/var/run/ptp4l',
+        networkPorts: 'networkPorts',
+        domainNumber: 'ptpDomain',
+        priority1: 'priority1',
+        priority2: 'priority2',
+        logAnnounceInterval: 'logAnnounceInterval',
+        announceReceiptTimeout: 'announceReceiptTimeout',
+        logSyncInterval: 'logSyncInterval',
+        syncReceiptTimeout: 'syncReceiptTimeout',
+        portState: 'portState',
+        lockStatus: 'ptpLockStatus',
+        currentPorts: 'currentPorts',
+        gmIdentity: 'ptpGmIdentity',
+        meanPathDelay: 'ptpMeanPathDelay',
+        offsetFromMaster: 'ptpOffsetFromMaster'
+    },
+    ptp4l1: {
+        label: 'PTP时钟2',
+        configFile: '/etc/linuxptp/ptp4l1.conf',
+        udsPath: '/var/run/ptp4l1',
+        networkPorts: 'networkPorts2',
+        domainNumber: 'ptpDomain2',
+        priority1: 'priority1_2',
+        priority2: 'priority2_2',
+        logAnnounceInterval: 'logAnnounceInterval2',
+        announceReceiptTimeout: 'announceReceiptTimeout2',
+        logSyncInterval: 'logSyncInterval2',
+        syncReceiptTimeout: 'syncReceiptTimeout2',
+        portState: 'portState2',
+        lockStatus: 'ptpLockStatus2',
+        currentPorts: 'currentPorts2',
+        gmIdentity: 'ptpGmIdentity2',
+        meanPathDelay: 'ptpMeanPathDelay2',
+        offsetFromMaster: 'ptpOffsetFromMaster2'
+    }
+};
+
+// 配置表单字段及其默认值
+const CONFIG_FIELD_DEFAULTS = {
+    domainNumber: 127,
+    priority1: 128,
+    priority2: 128,
+    logAnnounceInterval: 0,
+    announceReceiptTimeout: 6,
+    logSyncInterval: -3,
+    syncReceiptTimeout: 6
+};
+
 // 初始化应用
 async function initializeApp() {
     showLoading();
     
+    try {
+        // 一次请求获取初始加载所需的全部数据，服务端并发收集
+        const response = await fetch('/api/bootstrap');
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        renderBootstrap(await response.json());
+    } catch (error) {
+        // 旧版本后端没有 /api/bootstrap，退回逐项加载
+        console.warn('bootstrap加载失败，改为逐项加载:', error);
+        await loadAllSequentially();
+    }
+    
+    try {
+        // 绑定事件监听器
+        bindEventListeners();
+        
+        // 开始状态更新
+        startStatusUpdates();
+        
+        hideLoading();
+    } catch (error) {
+        console.error('初始化失败:', error);
+        hideLoading();
+        showMessage('初始化失败: ' + error.message, 'error');
+    }
+}
+
+// 列式数据（每个字段一个数组）还原为对象数组；旧版本后端直接返回对象数组
+function rowsFromColumns(columns) {
+    if (!columns || Array.isArray(columns)) {
+        return columns || [];
+    }
+    const fields = Object.keys(columns);
+    const count = fields.length ? columns[fields[0]].length : 0;
+    const rows = [];
+    for (let i = 0; i < count; i++) {
+        const row = {};
+        for (const field of fields) {
+            row[field] = columns[field][i];
+        }
+        rows.push(row);
+    }
+    return rows;
+}
+
+// 根据 /api/bootstrap 返回的数据渲染整个页面
+function renderBootstrap(data) {
+    networkInterfaces = rowsFromColumns(data.network_interfaces);
+    updateNetworkPortsSelect();
+    
+    document.getElementById('syncMode').value = data.sync_mode.mode;
+    togglePtpStatusVisibility(data.sync_mode.mode);
+    
+    for (const [name, snapshot] of Object.entries(data.instances || {})) {
+        if (!INSTANCE_VIEWS[name]) {
+            continue;
+        }
+        if (snapshot.config) {
+            renderInstanceConfig(name, snapshot.config, snapshot.interfaces || []);
+        } else {
+            showNotification(`加载${INSTANCE_VIEWS[name].label}配置失败: ${(snapshot.errors || {}).config || '未知错误'}`, 'error');
+        }
+        renderInstanceStatus(name, snapshot);
+    }
+}
+
+// 填充实例的配置表单并记录原始配置
+function renderInstanceConfig(name, config, interfaces) {
+    const view = INSTANCE_VIEWS[name];
+    const original = JSON.parse(JSON.stringify({ ...config, interfaces: interfaces }));
+    if (name === 'ptp4l') {
+        originalPtp1Config = original;
+    } else {
+        originalPtp2Config = original;
+    }
+    
+    for (const [field, defaultValue] of Object.entries(CONFIG_FIELD_DEFAULTS)) {
+        document.getElementById(view[field]).value = config[field] || defaultValue;
+    }
+    
+    // 设置选中的网络端口（单选）
+    if (interfaces.length > 0) {
+        document.getElementById(view.networkPorts).value = interfaces[0];
+    }
+}
+
+// 显示实例的状态信息
+function renderInstanceStatus(name, snapshot) {
+    const view = INSTANCE_VIEWS[name];
+    const timeStatus = snapshot.time_status;
+    const portStatus = snapshot.port_status;
+    const currentData = snapshot.current_data;
+    
+    if (timeStatus) {
+        document.getElementById(view.gmIdentity).textContent = timeStatus.gmIdentity || 'Unknown';
+        const isLocked = timeStatus.gmPresent === true;
+        const lockElement = document.getElementById(view.lockStatus);
+        lockElement.textContent = isLocked ? '已锁定' : '未锁定';
+        lockElement.className = 'status-value ' + (isLocked ? 'status-locked' : 'status-unlocked');
+    }
+    
+    if (portStatus) {
+        const portState = portStatus.portState || 'Unknown';
+        const portStateElement = document.getElementById(view.portState);
+        portStateElement.textContent = portState;
+        portStateElement.className = 'status-value ' + portStateClass(portState);
+    }
+    
+    if (currentData) {
+        document.getElementById(view.offsetFromMaster).textContent = formatStatusNumber(currentData.offsetFromMaster);
+        document.getElementById(view.meanPathDelay).textContent = formatStatusNumber(currentData.meanPathDelay);
+    }
+    
+    if (snapshot.interfaces !== undefined) {
+        const interfaces = snapshot.interfaces || [];
+        document.getElementById(view.currentPorts).textContent = interfaces.length > 0 ? interfaces.join(', ') : 'Unknown';
+    }
+}
+
+function portStateClass(portState) {
+    if (portState === 'SLAVE' || portState === 'MASTER') {
+        return 'status-locked';
+    }
+    if (portState === 'FAULTY' || portState === 'LISTENING' || portState === 'UNCALIBRATED') {
+        return 'status-unlocked';
+    }
+    return '';
+}
+
+function formatStatusNumber(value) {
+    return (value !== undefined && value !== null) ? value : 'Unknown';
+}
+
+// 逐项加载（兼容没有 /api/bootstrap 的后端）
+async function loadAllSequentially() {
     try {
         // 加载网络接口
         await loadNetworkInterfaces();
@@ -38,18 +226,8 @@ async function initializeApp() {
         // 加载PTP状态
         await loadPtpStatus();
         await loadPtpStatus2();
-        
-        // 绑定事件监听器
-        bindEventListeners();
-        
-        // 开始状态更新
-        startStatusUpdates();
-        
-        hideLoading();
     } catch (error) {
-        console.error('初始化失败:', error);
-        hideLoading();
-        showMessage('初始化失败: ' + error.message, 'error');
+        console.error('逐项加载失败:', error);
     }
 }
 
@@ -64,6 +242,9 @@ function bindEventListeners() {
     // PTP时钟2配置
     document.getElementById('submitPtpConfig2').addEventListener('click', submitPtpConfig2);
     
+    // 同时提交两个时钟的配置
+    document.getElementById('submitAllPtpConfig').addEventListener('click', () => submitInstanceConfigs(Object.keys(INSTANCE_VIEWS)));
+    
     // PTP时钟1服务控制
     document.getElementById('startPtp1Service').addEventListener('click', () => controlPtpService('ptp4l.service', 'start'));
     document.getElementById('stopPtp1Service').addEventListener('click', () => controlPtpService('ptp4l.service', 'stop'));
@@ -129,11 +310,167 @@ async function apiCall(endpoint, options = {}) {
     }
 }
 
+// 按URL缓存带ETag的响应，再次请求时发送If-None-Match，服务器返回304时直接使用缓存
+const validatorCache = new Map();
+
+function fetchWithValidators(url) {
+    return dedupeRequest('validated:' + url, signal => fetchValidated(url, signal));
+}
+
+async function fetchValidated(url, signal) {
+    const cached = validatorCache.get(url);
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+    const response = await fetch(url, { headers, cache: 'no-store', signal });
+    
+    if (response.status === 304 && cached) {
+        return cached.data;
+    }
+    
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        validatorCache.set(url, { etag, data });
+    } else {
+        validatorCache.delete(url);
+    }
+    return data;
+}
+
+// ---- 请求调度 ----
+// 同一资源同一时刻最多一个在途请求；页面隐藏时暂停轮询并取消在途请求；
+// 轮询出错时按指数退避延长间隔；配置等变化很慢的资源在客户端缓存一段时间
+
+const POLL_INTERVAL = 1000;        // 正常轮询间隔（毫秒）
+const POLL_MAX_INTERVAL = 30000;   // 出错退避的最大间隔
+const REQUEST_TIMEOUT = 10000;     // 单个请求的超时
+const CONFIG_CACHE_TTL = 30000;    // 配置文件的客户端缓存时间
+
+const inflightRequests = new Map();  // 资源键 -> { promise, controller }
+const resourceCache = new Map();     // URL -> { time, data }
+const pollTasks = new Map();         // 任务名 -> 轮询任务
+
+// 同一资源已有在途请求时直接复用，不再发出新请求
+function dedupeRequest(key, factory) {
+    const existing = inflightRequests.get(key);
+    if (existing) {
+        return existing.promise;
+    }
+    
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), REQUEST_TIMEOUT);
+    const entry = { controller };
+    entry.promise = factory(controller.signal).finally(() => {
+        clearTimeout(timer);
+        if (inflightRequests.get(key) === entry) {
+            inflightRequests.delete(key);
+        }
+    });
+    inflightRequests.set(key, entry);
+    return entry.promise;
+}
+
+// GET并解析JSON，HTTP错误时抛出异常以便轮询退避
+function fetchJson(url) {
+    return dedupeRequest(url, async signal => {
+        const response = await fetch(url, { signal });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json();
+    });
+}
+
+function abortInflightRequests() {
+    for (const entry of inflightRequests.values()) {
+        entry.controller.abort();
+    }
+    inflightRequests.clear();
+}
+
+// 在ttl毫秒内直接使用上次的结果，过期后按ETag重新验证
+async function fetchCached(url, ttl) {
+    const cached = resourceCache.get(url);
+    if (cached && Date.now() - cached.time < ttl) {
+        return cached.data;
+    }
+    const data = await fetchWithValidators(url);
+    resourceCache.set(url, { time: Date.now(), data });
+    return data;
+}
+
+function invalidateCachedResource(url) {
+    resourceCache.delete(url);
+}
+
+// 注册轮询任务：上一次执行结束后才安排下一次，因此同一任务不会重叠
+function addPollTask(name, run, interval = POLL_INTERVAL) {
+    const task = { name, run, interval, delay: interval, timer: null, running: false, rerun: false };
+    pollTasks.set(name, task);
+    runPollTask(task);
+}
+
+async function runPollTask(task) {
+    task.timer = null;
+    if (document.hidden) {
+        return;
+    }
+    
+    task.running = true;
+    task.rerun = false;
+    try {
+        await task.run();
+        task.delay = task.interval;
+    } catch (error) {
+        task.delay = Math.min(task.delay * 2, POLL_MAX_INTERVAL);
+        if (error.name !== 'AbortError') {
+            console.error(`${task.name}失败，${task.delay}ms后重试:`, error);
+        }
+    } finally {
+        task.running = false;
+    }
+    
+    if (!document.hidden && task.timer === null) {
+        task.timer = setTimeout(() => runPollTask(task), task.rerun ? 0 : task.delay);
+    }
+}
+
+// 立即执行一次轮询任务（如用户操作后刷新），正在执行时在结束后马上再执行一次
+function pollNow(name) {
+    const task = pollTasks.get(name);
+    if (!task) {
+        return;
+    }
+    if (task.running) {
+        task.rerun = true;
+        return;
+    }
+    clearTimeout(task.timer);
+    task.delay = task.interval;
+    runPollTask(task);
+}
+
+// 页面隐藏时暂停所有轮询并取消在途请求，重新可见时立即恢复
+document.addEventListener('visibilitychange', () => {
+    for (const task of pollTasks.values()) {
+        clearTimeout(task.timer);
+        task.timer = null;
+    }
+    if (document.hidden) {
+        abortInflightRequests();
+        return;
+    }
+    for (const task of pollTasks.values()) {
+        task.delay = task.interval;
+        if (!task.running) {
+            runPollTask(task);
+        }
+    }
+});
+
 // 加载网络接口
 async function loadNetworkInterfaces() {
     try {
-        const response = await fetch('/api/network-interfaces');
-        const data = await response.json();
+        const data = await fetchWithValidators('/api/network-interfaces');
         
         if (data.interfaces) {
             networkInterfaces = data.interfaces;
@@ -154,8 +491,7 @@ async function loadNetworkInterfaces() {
 // 加载PTP时钟1的当前网络接口
 async function loadPtp1CurrentInterface() {
     try {
-        const response = await fetch('/api/systemd/service-interfaces/ptp4l.service');
-        const data = await response.json();
+        const data = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l.service');
         
         if (data.success && data.interfaces.length > 0) {
             // 设置当前配置的网络接口
@@ -170,8 +506,7 @@ async function loadPtp1CurrentInterface() {
 // 加载PTP时钟2的当前网络接口
 async function loadPtp2CurrentInterface() {
     try {
-        const response = await fetch('/api/systemd/service-interfaces/ptp4l1.service');
-        const data = await response.json();
+        const data = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l1.service');
         
         if (data.success && data.interfaces.length > 0) {
             // 设置当前配置的网络接口
@@ -192,16 +527,24 @@ function updateNetworkPortsSelect() {
     select1.innerHTML = '';
     select2.innerHTML = '';
     
-    // 添加网络接口选项
+    // 添加网络接口选项，标出没有硬件时间戳的网卡和PHC编号
     networkInterfaces.forEach(iface => {
+        const timestamping = iface.timestamping;
+        let label = `${iface.name} (${iface.ip || '无IP'})`;
+        if (timestamping && timestamping.hardware) {
+            label += ` [PHC ${iface.phc_index}]`;
+        } else if (timestamping !== undefined) {
+            label += ' [无硬件时间戳]';
+        }
+        
         const option1 = document.createElement('option');
         option1.value = iface.name; // 使用接口名称
-        option1.textContent = `${iface.name} (${iface.ip || '无IP'})`;
+        option1.textContent = label;
         select1.appendChild(option1);
         
         const option2 = document.createElement('option');
         option2.value = iface.name; // 使用接口名称
-        option2.textContent = `${iface.name} (${iface.ip || '无IP'})`;
+        option2.textContent = label;
         select2.appendChild(option2);
     });
 }
@@ -241,7 +584,7 @@ async function submitSyncMode() {
             showNotification('同步模式设置成功', 'success');
             // 根据新的同步模式控制PTP状态项的显示/隐藏
             togglePtpStatusVisibility(mode);
-            updateSystemStatus();
+            pollNow('systemStatus');
         } else {
             showNotification('同步模式设置失败: ' + data.error, 'error');
         }
@@ -253,15 +596,13 @@ async function submitSyncMode() {
 // 加载PTP时钟1配置
 async function loadPtpConfig() {
     try {
-        const response = await fetch('/api/ptp-config?config_file=/etc/linuxptp/ptp4l.conf');
-        const data = await response.json();
+        const data = await fetchWithValidators('/api/ptp-config?config_file=/etc/linuxptp/ptp4l.conf');
         
         if (data.success) {
             const config = data.config;
             
             // 获取网络接口信息
-            const interfaceResponse = await fetch('/api/systemd/service-interfaces/ptp4l.service');
-            const interfaceData = await interfaceResponse.json();
+            const interfaceData = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l.service');
             
             const interfaces = interfaceData.success ? interfaceData.interfaces : [];
             
@@ -295,15 +636,13 @@ async function loadPtpConfig() {
 // 加载PTP时钟2配置
 async function loadPtpConfig2() {
     try {
-        const response = await fetch('/api/ptp-config?config_file=/etc/linuxptp/ptp4l1.conf');
-        const data = await response.json();
+        const data = await fetchWithValidators('/api/ptp-config?config_file=/etc/linuxptp/ptp4l1.conf');
         
         if (data.success) {
             const config = data.config;
             
             // 获取网络接口信息
-            const interfaceResponse = await fetch('/api/systemd/service-interfaces/ptp4l1.service');
-            const interfaceData = await interfaceResponse.json();
+            const interfaceData = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l1.service');
             
             const interfaces = interfaceData.success ? interfaceData.interfaces : [];
             
@@ -345,7 +684,7 @@ async function loadPtpStatus() {
             document.getElementById('ptpGmIdentity').textContent = timeStatusData.gmIdentity || 'Unknown';
             
             // 根据GM状态设置锁定状态
-            const isLocked = timeStatusData.gmPresent === 'true';
+            const isLocked = timeStatusData.gmPresent === true;
             const lockStatus = isLocked ? '已锁定' : '未锁定';
             const lockClass = isLocked ? 'status-locked' : 'status-unlocked';
             
@@ -385,8 +724,7 @@ async function loadPtpStatus() {
         }
         
         // 获取当前配置的网络端口（从systemd服务文件获取）
-        const interfaceResponse = await fetch('/api/systemd/service-interfaces/ptp4l.service');
-        const interfaceData = await interfaceResponse.json();
+        const interfaceData = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l.service');
         
         if (interfaceData.success && interfaceData.interfaces && interfaceData.interfaces.length > 0) {
             document.getElementById('currentPorts').textContent = interfaceData.interfaces.join(', ');
@@ -410,7 +748,7 @@ async function loadPtpStatus2() {
             document.getElementById('ptpGmIdentity2').textContent = timeStatusData.gmIdentity || 'Unknown';
             
             // 根据GM状态设置锁定状态
-            const isLocked = timeStatusData.gmPresent === 'true';
+            const isLocked = timeStatusData.gmPresent === true;
             const lockStatus = isLocked ? '已锁定' : '未锁定';
             const lockClass = isLocked ? 'status-locked' : 'status-unlocked';
             
@@ -450,8 +788,7 @@ async function loadPtpStatus2() {
         }
         
         // 获取当前配置的网络端口（从systemd服务文件获取）
-        const interfaceResponse = await fetch('/api/systemd/service-interfaces/ptp4l1.service');
-        const interfaceData = await interfaceResponse.json();
+        const interfaceData = await fetchWithValidators('/api/systemd/service-interfaces/ptp4l1.service');
         
         if (interfaceData.success && interfaceData.interfaces && interfaceData.interfaces.length > 0) {
             document.getElementById('currentPorts2').textContent = interfaceData.interfaces.join(', ');
@@ -464,253 +801,280 @@ async function loadPtpStatus2() {
     }
 }
 
-// 检查配置是否有变化
-function hasConfigChanged(originalConfig, newConfig) {
-    const keysToCheck = ['domainNumber', 'priority1', 'priority2', 'logAnnounceInterval', 
-                        'announceReceiptTimeout', 'logSyncInterval', 'syncReceiptTimeout', 'interfaces'];
+// 收集实例表单中有变化的配置项和网卡，没有变化时返回 null
+function collectInstanceChange(name) {
+    const view = INSTANCE_VIEWS[name];
+    const original = name === 'ptp4l' ? originalPtp1Config : originalPtp2Config;
+    const change = { instance: name };
+    let changed = false;
     
-    for (const key of keysToCheck) {
-        if (key === 'interfaces') {
-            const originalInterfaces = originalConfig[key] || [];
-            const newInterfaces = newConfig[key] || [];
-            if (JSON.stringify(originalInterfaces.sort()) !== JSON.stringify(newInterfaces.sort())) {
-                return true;
-            }
-        } else {
-            if (originalConfig[key] !== newConfig[key]) {
-                return true;
-            }
+    for (const field of Object.keys(CONFIG_FIELD_DEFAULTS)) {
+        const value = parseInt(document.getElementById(view[field]).value);
+        if (String(original[field]) !== String(value)) {
+            change[field] = value;
+            changed = true;
         }
     }
-    return false;
+    
+    const newInterfaces = [document.getElementById(view.networkPorts).value]; // 单选，转换为数组
+    if (JSON.stringify(original.interfaces || []) !== JSON.stringify(newInterfaces)) {
+        change.interfaces = newInterfaces;
+        changed = true;
+    }
+    return changed ? change : null;
 }
 
-// 提交PTP时钟1配置
-async function submitPtpConfig() {
-    const newConfig = {
-        config_file: '/etc/linuxptp/ptp4l.conf',
-        domainNumber: parseInt(document.getElementById('ptpDomain').value),
-        priority1: parseInt(document.getElementById('priority1').value),
-        priority2: parseInt(document.getElementById('priority2').value),
-        logAnnounceInterval: parseInt(document.getElementById('logAnnounceInterval').value),
-        announceReceiptTimeout: parseInt(document.getElementById('announceReceiptTimeout').value),
-        logSyncInterval: parseInt(document.getElementById('logSyncInterval').value),
-        syncReceiptTimeout: parseInt(document.getElementById('syncReceiptTimeout').value)
-    };
-    
-    const newInterfaces = [document.getElementById('networkPorts').value]; // 单选，转换为数组
+// 一次请求提交多个实例的配置，服务端只reload一次并合并重启
+async function submitInstanceConfigs(names) {
+    const labels = names.map(name => INSTANCE_VIEWS[name].label).join('、');
+    const changes = names.map(collectInstanceChange).filter(change => change !== null);
+    if (changes.length === 0) {
+        showNotification(`${labels}配置未发生变化`, 'info');
+        return;
+    }
     
     try {
-        // 检查配置是否有变化
-        const configChanged = hasConfigChanged(originalPtp1Config, newConfig);
-        const interfacesChanged = JSON.stringify(originalPtp1Config.interfaces || []) !== JSON.stringify(newInterfaces);
-        
-        if (!configChanged && !interfacesChanged) {
-            showNotification('PTP时钟1配置未发生变化', 'info');
+        const response = await fetch('/api/ptp-config/bulk', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ changes: changes })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            showNotification(`${labels}配置更新失败: ${data.detail}`, 'error');
             return;
         }
         
-        let success = true;
-        
-        // 更新配置文件
-        if (configChanged) {
-            const response = await fetch('/api/ptp-config', {
-                method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(newConfig)
-            });
-            
-            const data = await response.json();
-            
-            if (!data.success) {
-                showNotification('PTP时钟1配置文件更新失败: ' + data.error, 'error');
-                return;
+        for (const [name, result] of Object.entries(data.results)) {
+            const label = INSTANCE_VIEWS[name].label;
+            if (!result.success) {
+                showNotification(`${label}配置更新失败: ${result.error}`, 'error');
+                continue;
             }
-        }
-        
-        // 更新网络接口
-        if (interfacesChanged) {
-            const interfaceResponse = await fetch('/api/ptp4l-service-interface', {
-                method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    interfaces: newInterfaces,
-                    service_name: 'ptp4l.service'
-                })
+            (result.warnings || []).forEach(warning => {
+                showNotification(`${label}: ${warning}`, 'warning');
             });
-            
-            const interfaceData = await interfaceResponse.json();
-            
-            if (interfaceData.status !== 'success') {
-                showNotification('PTP时钟1网络接口更新失败: ' + interfaceData.message, 'error');
-                return;
-            }
-        }
-        
-        // 检查是否需要reload systemd
-        const needsReload = configChanged || interfacesChanged;
-        
-        if (needsReload) {
-            // 先reload systemd
-            const reloadResponse = await fetch('/api/systemd/reload', { method: 'POST' });
-            const reloadData = await reloadResponse.json();
-            
-            if (!reloadData.success) {
-                showNotification('Systemd reload失败: ' + reloadData.error, 'error');
-                return;
+            // 更新原始配置
+            const change = changes.find(item => item.instance === name);
+            const original = name === 'ptp4l' ? originalPtp1Config : originalPtp2Config;
+            for (const [field, value] of Object.entries(change)) {
+                if (field !== 'instance') {
+                    original[field] = field === 'interfaces' ? [...value] : String(value);
+                }
             }
+            invalidateCachedResource(configUrl(name));
+            pollNow(name);
         }
+        (data.errors || []).forEach(error => showNotification(error, 'error'));
         
-        // 重启ptp4l.service
-        const restartResponse = await fetch('/api/systemd/restart-service', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ service_name: 'ptp4l.service' })
-        });
-        
-        const restartData = await restartResponse.json();
-        
-        if (restartData.success) {
-            showNotification('PTP时钟1配置更新成功，服务已重启', 'success');
-            // 更新原始配置
-            originalPtp1Config = JSON.parse(JSON.stringify({...newConfig, interfaces: newInterfaces}));
-            // 重新加载状态
-            setTimeout(() => {
-                loadPtpStatus();
-            }, 2000);
-        } else {
-            showNotification('PTP时钟1服务重启失败: ' + restartData.error, 'error');
+        if (data.success) {
+            showNotification(`${labels}配置更新成功，服务已重启`, 'success');
+            pollNow('systemStatus');
         }
     } catch (error) {
-        showNotification('PTP时钟1配置更新失败: ' + error.message, 'error');
+        showNotification(`${labels}配置更新失败: ` + error.message, 'error');
     }
 }
 
+// 提交PTP时钟1配置
+function submitPtpConfig() {
+    return submitInstanceConfigs(['ptp4l']);
+}
+
 // 提交PTP时钟2配置
-async function submitPtpConfig2() {
-    const newConfig = {
-        config_file: '/etc/linuxptp/ptp4l1.conf',
-        domainNumber: parseInt(document.getElementById('ptpDomain2').value),
-        priority1: parseInt(document.getElementById('priority1_2').value),
-        priority2: parseInt(document.getElementById('priority2_2').value),
-        logAnnounceInterval: parseInt(document.getElementById('logAnnounceInterval2').value),
-        announceReceiptTimeout: parseInt(document.getElementById('announceReceiptTimeout2').value),
-        logSyncInterval: parseInt(document.getElementById('logSyncInterval2').value),
-        syncReceiptTimeout: parseInt(document.getElementById('syncReceiptTimeout2').value)
-    };
+function submitPtpConfig2() {
+    return submitInstanceConfigs(['ptp4l1']);
+}
+
+// 开始状态更新
+function startStatusUpdates() {
+    // 每1秒更新一次状态，页面隐藏时暂停，出错时退避
+    addPollTask('systemStatus', updateSystemStatus);
+    addPollTask('ptp4l', () => updateInstanceStatus('ptp4l'));
+    addPollTask('ptp4l1', () => updateInstanceStatus('ptp4l1'));
+    openClockSourceEvents();
     
-    const newInterfaces = [document.getElementById('networkPorts2').value]; // 单选，转换为数组
+    initHistoryCharts();
+}
+
+// ---- 时钟源事件 ----
+// 服务端看门狗检测到时钟源变化/异常/超时/恢复时立即推送，收到后马上刷新系统状态，
+// 不必等下一次轮询；页面隐藏时关闭连接，与轮询一起暂停
+
+let clockSourceEvents = null;
+
+function openClockSourceEvents() {
+    if (clockSourceEvents || typeof EventSource === 'undefined') {
+        return;
+    }
+    clockSourceEvents = new EventSource('/api/clock-source-state/events');
+    clockSourceEvents.addEventListener('transition', () => pollNow('systemStatus'));
+}
+
+function closeClockSourceEvents() {
+    if (clockSourceEvents) {
+        clockSourceEvents.close();
+        clockSourceEvents = null;
+    }
+}
+
+document.addEventListener('visibilitychange', () => {
+    if (document.hidden) {
+        closeClockSourceEvents();
+    } else if (pollTasks.has('systemStatus')) {
+        openClockSourceEvents();
+    }
+});
+
+// ---- 历史曲线 ----
+// 历史数据的获取、保存和按像素列抽稀都在 chart-worker.js 中完成，
+// 主线程只把每列的 min/max 画成竖线，24小时1Hz（86400点）也不会阻塞页面
+
+const HISTORY_WINDOW = 24 * 3600;  // 首次加载的历史长度（秒）
+const CHART_COLOR = '#3498db';
+
+let chartWorker = null;
+let workerRequestId = 0;
+const workerRequests = new Map();  // 请求ID -> { resolve, reject }
+const chartStates = new Map();     // 实例名 -> { since, serverOffset, window, canvases }
+const pendingRenders = new Map();  // 序列键 -> 是否需要在当前绘制完成后重绘
+
+function workerRequest(message) {
+    return new Promise((resolve, reject) => {
+        const id = ++workerRequestId;
+        workerRequests.set(id, { resolve, reject });
+        chartWorker.postMessage({ ...message, id });
+    });
+}
+
+function initHistoryCharts() {
+    const cards = document.querySelectorAll('.chart-card');
+    if (cards.length === 0 || !window.Worker) {
+        return;
+    }
     
-    try {
-        // 检查配置是否有变化
-        const configChanged = hasConfigChanged(originalPtp2Config, newConfig);
-        const interfacesChanged = JSON.stringify(originalPtp2Config.interfaces || []) !== JSON.stringify(newInterfaces);
-        
-        if (!configChanged && !interfacesChanged) {
-            showNotification('PTP时钟2配置未发生变化', 'info');
+    chartWorker = new Worker('js/chart-worker.js');
+    chartWorker.onmessage = event => {
+        const message = event.data;
+        if (message.type === 'rendered') {
+            drawChart(message);
             return;
         }
-        
-        let success = true;
-        
-        // 更新配置文件
-        if (configChanged) {
-            const response = await fetch('/api/ptp-config', {
-                method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(newConfig)
-            });
-            
-            const data = await response.json();
-            
-            if (!data.success) {
-                showNotification('PTP时钟2配置文件更新失败: ' + data.error, 'error');
-                return;
-            }
-        }
-        
-        // 更新网络接口
-        if (interfacesChanged) {
-            const interfaceResponse = await fetch('/api/ptp4l-service-interface', {
-                method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    interfaces: newInterfaces,
-                    service_name: 'ptp4l1.service'
-                })
-            });
-            
-            const interfaceData = await interfaceResponse.json();
-            
-            if (interfaceData.status !== 'success') {
-                showNotification('PTP时钟2网络接口更新失败: ' + interfaceData.message, 'error');
-                return;
-            }
+        const request = workerRequests.get(message.id);
+        if (!request) {
+            return;
         }
-        
-        // 检查是否需要reload systemd
-        const needsReload = configChanged || interfacesChanged;
-        
-        if (needsReload) {
-            // 先reload systemd
-            const reloadResponse = await fetch('/api/systemd/reload', { method: 'POST' });
-            const reloadData = await reloadResponse.json();
-            
-            if (!reloadData.success) {
-                showNotification('Systemd reload失败: ' + reloadData.error, 'error');
-                return;
-            }
+        workerRequests.delete(message.id);
+        if (message.error) {
+            request.reject(new Error(message.error));
+        } else {
+            request.resolve(message);
         }
-        
-        // 重启ptp4l1.service
-        const restartResponse = await fetch('/api/systemd/restart-service', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ service_name: 'ptp4l1.service' })
+    };
+    
+    cards.forEach(card => {
+        const name = card.dataset.instance;
+        const select = card.querySelector('.chart-window');
+        const canvases = {};
+        card.querySelectorAll('.chart-canvas').forEach(canvas => {
+            canvases[canvas.dataset.metric] = canvas;
         });
+        chartStates.set(name, { since: null, serverOffset: 0, window: parseInt(select.value), canvases });
         
-        const restartData = await restartResponse.json();
-        
-        if (restartData.success) {
-            showNotification('PTP时钟2配置更新成功，服务已重启', 'success');
-            // 更新原始配置
-            originalPtp2Config = JSON.parse(JSON.stringify({...newConfig, interfaces: newInterfaces}));
-            // 重新加载状态
-            setTimeout(() => {
-                loadPtpStatus2();
-            }, 2000);
-        } else {
-            showNotification('PTP时钟2服务重启失败: ' + restartData.error, 'error');
+        select.addEventListener('change', () => {
+            chartStates.get(name).window = parseInt(select.value);
+            renderCharts(name);
+        });
+        addPollTask(`history:${name}`, () => updateHistory(name));
+    });
+    
+    window.addEventListener('resize', () => {
+        chartStates.forEach((state, name) => renderCharts(name));
+    });
+}
+
+// 首次获取完整历史，之后只获取上次最后一个点之后的增量
+async function updateHistory(name) {
+    const state = chartStates.get(name);
+    const query = state.since === null ? `window=${HISTORY_WINDOW}` : `since=${state.since}`;
+    const result = await workerRequest({ type: 'fetch', instance: name, url: `/api/history/${name}?${query}` });
+    
+    state.serverOffset = result.now - Date.now() / 1000;
+    if (result.lastTime !== null) {
+        state.since = result.lastTime;
+    } else if (state.since === null) {
+        state.since = result.now;
+    }
+    renderCharts(name);
+}
+
+function renderCharts(name) {
+    const state = chartStates.get(name);
+    const to = Date.now() / 1000 + state.serverOffset;
+    const from = to - state.window;
+    
+    for (const [metric, canvas] of Object.entries(state.canvases)) {
+        const key = `${name}:${metric}`;
+        // 上一次绘制还没完成时只做标记，完成后再画一次
+        if (pendingRenders.has(key)) {
+            pendingRenders.set(key, true);
+            continue;
         }
-    } catch (error) {
-        showNotification('PTP时钟2配置更新失败: ' + error.message, 'error');
+        const columns = Math.max(1, Math.floor(canvas.clientWidth * (window.devicePixelRatio || 1)));
+        pendingRenders.set(key, false);
+        chartWorker.postMessage({ type: 'render', key, from, to, columns });
     }
 }
 
-// 开始状态更新
-function startStatusUpdates() {
-    updateSystemStatus();
-    updatePtpStatus();
-    updatePtpStatus2();
+function drawChart(result) {
+    const [name, metric] = result.key.split(':');
+    const canvas = chartStates.get(name).canvases[metric];
+    const rerender = pendingRenders.get(result.key);
+    pendingRenders.delete(result.key);
+    
+    const ratio = window.devicePixelRatio || 1;
+    const width = result.mins.length;
+    const height = Math.max(1, Math.floor(canvas.clientHeight * ratio));
+    canvas.width = width;
+    canvas.height = height;
+    const ctx = canvas.getContext('2d');
+    ctx.clearRect(0, 0, width, height);
+    
+    ctx.font = `${11 * ratio}px sans-serif`;
+    ctx.fillStyle = '#6c757d';
+    if (result.count === 0) {
+        ctx.fillText('暂无数据', 8 * ratio, 16 * ratio);
+    } else {
+        // 上下留白，值恒定时也保持一定的范围
+        const span = Math.max(result.max - result.min, 1);
+        const top = result.max + span * 0.1;
+        const bottom = result.min - span * 0.1;
+        const y = value => (top - value) / (top - bottom) * height;
+        
+        if (top > 0 && bottom < 0) {
+            ctx.fillStyle = '#dee2e6';
+            ctx.fillRect(0, Math.round(y(0)), width, Math.max(1, ratio));
+        }
+        
+        ctx.fillStyle = CHART_COLOR;
+        for (let column = 0; column < width; column++) {
+            const min = result.mins[column];
+            if (Number.isNaN(min)) {
+                continue;
+            }
+            const yTop = y(result.maxs[column]);
+            ctx.fillRect(column, yTop, 1, Math.max(ratio, y(min) - yTop));
+        }
+        
+        ctx.fillStyle = '#495057';
+        ctx.fillText(`最大 ${result.max}  最小 ${result.min}  当前 ${result.last}`, 8 * ratio, 14 * ratio);
+    }
     
-    // 每1秒更新一次状态
-    statusUpdateInterval = setInterval(() => {
-        updateSystemStatus();
-        updatePtpStatus();
-        updatePtpStatus2();
-    }, 1000);
+    if (rerender) {
+        renderCharts(name);
+    }
 }
 
 // 根据同步模式控制PTP状态项的显示/隐藏
@@ -735,330 +1099,132 @@ function togglePtpStatusVisibility(syncMode) {
     });
 }
 
-// 获取PTP时钟1的当前配置
-async function getPtp1Config() {
-    try {
-        const response = await fetch('/api/ptp-config?config_file=/etc/linuxptp/ptp4l.conf');
-        const data = await response.json();
-        return data.success ? data.config : null;
-    } catch (error) {
-        console.error('获取PTP时钟1配置失败:', error);
-        return null;
-    }
+function configUrl(name) {
+    return `/api/ptp-config?config_file=${INSTANCE_VIEWS[name].configFile}`;
 }
 
-// 获取PTP时钟2的当前配置
-async function getPtp2Config() {
+// 获取PTP实例的当前配置（客户端缓存 CONFIG_CACHE_TTL，状态轮询只需要其中的domain）
+async function getInstanceConfig(name) {
     try {
-        const response = await fetch('/api/ptp-config?config_file=/etc/linuxptp/ptp4l1.conf');
-        const data = await response.json();
+        const data = await fetchCached(configUrl(name), CONFIG_CACHE_TTL);
         return data.success ? data.config : null;
     } catch (error) {
-        console.error('获取PTP时钟2配置失败:', error);
+        console.error(`获取${INSTANCE_VIEWS[name].label}配置失败:`, error);
         return null;
     }
 }
 
-// 获取时钟源对应的PTP时钟映射
-async function getClockSourceMapping() {
-    try {
-        // 获取PTP时钟1的网络接口
-        const ptp1Response = await fetch('/api/systemd/service-interfaces/ptp4l.service');
-        const ptp1Data = await ptp1Response.json();
-        
-        // 获取PTP时钟2的网络接口
-        const ptp2Response = await fetch('/api/systemd/service-interfaces/ptp4l1.service');
-        const ptp2Data = await ptp2Response.json();
-        
-        const mapping = {};
-        
-        // 建立映射关系
-        if (ptp1Data.success && ptp1Data.interfaces) {
-            ptp1Data.interfaces.forEach(iface => {
-                mapping[iface] = '/var/run/ptp4l'; // PTP时钟1
-            });
+// 更新系统状态
+async function updateSystemStatus() {
+    // 服务端已完成 时钟源 -> PTP实例 的映射并合并该实例的状态，一次请求即可
+    const data = await fetchJson('/api/system-sync-status');
+    
+    if (data.success) {
+        const statusElement = document.getElementById('currentSyncMode');
+        const mode = data.mode;
+        
+        let statusText = '';
+        let statusClass = '';
+        
+        switch (mode) {
+            case 'internal':
+                statusText = '内部时钟同步';
+                statusClass = 'status-internal';
+                break;
+            case 'BB':
+                statusText = 'BB时钟同步';
+                statusClass = 'status-bb';
+                break;
+            case 'PTP':
+                statusText = 'PTP时钟同步';
+                statusClass = 'status-ptp';
+                break;
+            default:
+                statusText = '未知状态';
+                statusClass = 'status-unknown';
         }
         
-        if (ptp2Data.success && ptp2Data.interfaces) {
-            ptp2Data.interfaces.forEach(iface => {
-                mapping[iface] = '/var/run/ptp4l1'; // PTP时钟2
-            });
-        }
+        statusElement.textContent = statusText;
+        statusElement.className = 'status-value ' + statusClass;
         
-        return mapping;
-    } catch (error) {
-        console.error('获取时钟源映射失败:', error);
-        // 返回默认映射
-        return {
-            'ens102': '/var/run/ptp4l1', // PTP时钟2
-            'ens104': '/var/run/ptp4l'   // PTP时钟1
-        };
-    }
-}
-
-// 更新系统状态
-async function updateSystemStatus() {
-    try {
-        const response = await fetch('/api/clock-sync-mode');
-        const data = await response.json();
+        // 根据同步模式控制PTP状态项的显示/隐藏
+        togglePtpStatusVisibility(mode);
         
-        if (data.success) {
-            const statusElement = document.getElementById('currentSyncMode');
-            const mode = data.mode;
-            
-            let statusText = '';
-            let statusClass = '';
-            
-            switch (mode) {
-                case 'internal':
-                    statusText = '内部时钟同步';
-                    statusClass = 'status-internal';
-                    break;
-                case 'BB':
-                    statusText = 'BB时钟同步';
-                    statusClass = 'status-bb';
-                    break;
-                case 'PTP':
-                    statusText = 'PTP时钟同步';
-                    statusClass = 'status-ptp';
-                    break;
-                default:
-                    statusText = '未知状态';
-                    statusClass = 'status-unknown';
-            }
-            
-            statusElement.textContent = statusText;
-            statusElement.className = 'status-value ' + statusClass;
-            
-            // 根据同步模式控制PTP状态项的显示/隐藏
-            togglePtpStatusVisibility(mode);
+        // 根据同步模式设置当前系统时钟源和PTP状态信息
+        const clockSourceElement = document.getElementById('currentClockSource');
+        if (clockSourceElement) {
+            const gmIdentityElement = document.getElementById('gmIdentity');
+            const lockStatusElement = document.getElementById('lockStatus');
+            const offsetElement = document.getElementById('offsetFromMaster');
+            const delayElement = document.getElementById('meanPathDelay');
             
-            // 根据同步模式设置当前系统时钟源和PTP状态信息
-            const clockSourceElement = document.getElementById('currentClockSource');
-            if (clockSourceElement) {
-                if (mode === 'PTP') {
-                    // PTP模式：获取实际的时钟源信息
-                    const clockSourceResponse = await fetch('/api/clock-source-state');
-                    const clockSourceData = await clockSourceResponse.json();
-                    
-                    if (clockSourceData.current_source) {
-                        clockSourceElement.textContent = clockSourceData.current_source;
-                    }
-                    
-                    // 根据时钟源状态设置锁定状态
-                    const lockStatusElement = document.getElementById('lockStatus');
-                    if (lockStatusElement) {
-                        if (clockSourceData.status === 'normal' && clockSourceData.current_source && clockSourceData.current_source !== 'noClockAvailable') {
-                            // phc2sys正在使用PTP时钟源，显示已锁定
-                            lockStatusElement.textContent = '已锁定';
-                            lockStatusElement.className = 'status-value status-locked';
-                        } else if (clockSourceData.status === 'failed' || clockSourceData.status === 'timeout' || clockSourceData.current_source === 'noClockAvailable') {
-                            // phc2sys无法找到PTP时钟源，自动转入内同步
-                            lockStatusElement.textContent = '未锁定（自动转入内同步）';
-                            lockStatusElement.className = 'status-value status-unlocked';
-                        } else {
-                            // 其他情况
-                            lockStatusElement.textContent = '未知';
-                            lockStatusElement.className = 'status-value';
-                        }
-                    }
-                    
-                    // 根据当前时钟源确定对应的PTP时钟
-                    let targetUdsPath = '/var/run/ptp4l'; // 默认PTP时钟1
-                    if (clockSourceData.current_source) {
-                        // 获取时钟源映射关系
-                        const clockSourceMapping = await getClockSourceMapping();
-                        
-                        // 根据当前时钟源确定对应的PTP时钟
-                        if (clockSourceMapping[clockSourceData.current_source]) {
-                            targetUdsPath = clockSourceMapping[clockSourceData.current_source];
-                        } else {
-                            // 如果没有找到映射，使用默认值
-                            console.warn(`未找到时钟源 ${clockSourceData.current_source} 的映射，使用默认PTP时钟1`);
-                        }
-                    }
-                    
-                    // 获取对应PTP时钟的状态信息并更新系统同步状态区域
-                    try {
-                        // 根据当前时钟源确定对应的PTP时钟配置
-                        let targetConfig = null;
-                        if (targetUdsPath === '/var/run/ptp4l') {
-                            targetConfig = await getPtp1Config();
-                        } else if (targetUdsPath === '/var/run/ptp4l1') {
-                            targetConfig = await getPtp2Config();
-                        }
-                        
-                        const domain = targetConfig ? parseInt(targetConfig.domainNumber) : 127; // 默认使用127
-                        
-                        // 获取时间状态（包含GM Identity）
-                        const timeStatusResponse = await fetch(`/api/ptp-timestatus?uds_path=${targetUdsPath}&domain=${domain}`);
-                        const timeStatusData = await timeStatusResponse.json();
-                        
-                        if (timeStatusData.success) {
-                            const gmIdentityElement = document.getElementById('gmIdentity');
-                            if (gmIdentityElement) {
-                                gmIdentityElement.textContent = timeStatusData.gmIdentity || 'Unknown';
-                            }
-                        }
-                        
-                        // 获取当前时间数据
-                        const timeResponse = await fetch(`/api/ptp-currenttimedata?uds_path=${targetUdsPath}&domain=${domain}`);
-                        const timeData = await timeResponse.json();
-                        
-                        if (timeData.success) {
-                            const offsetElement = document.getElementById('offsetFromMaster');
-                            const delayElement = document.getElementById('meanPathDelay');
-                            
-                            if (offsetElement) {
-                                offsetElement.textContent = (timeData.offsetFromMaster !== undefined && timeData.offsetFromMaster !== null) ? timeData.offsetFromMaster : 'Unknown';
-                            }
-                            if (delayElement) {
-                                delayElement.textContent = (timeData.meanPathDelay !== undefined && timeData.meanPathDelay !== null) ? timeData.meanPathDelay : 'Unknown';
-                            }
-                        }
-                    } catch (error) {
-                        console.error('获取PTP状态信息失败:', error);
-                    }
-                } else {
-                    // BB或内部模式：显示本地内部时钟
-                    clockSourceElement.textContent = '本地内部时钟';
-                    
-                    // 清空PTP相关状态
-                    const gmIdentityElement = document.getElementById('gmIdentity');
-                    const lockStatusElement = document.getElementById('lockStatus');
-                    const offsetElement = document.getElementById('offsetFromMaster');
-                    const delayElement = document.getElementById('meanPathDelay');
-                    
-                    if (gmIdentityElement) gmIdentityElement.textContent = '-';
-                    if (lockStatusElement) {
-                        lockStatusElement.textContent = '-';
+            if (mode === 'PTP') {
+                const clockSource = data.clock_source || {};
+                if (clockSource.current_source) {
+                    clockSourceElement.textContent = clockSource.current_source;
+                }
+                if (!data.mapped && clockSource.current_source) {
+                    console.warn(`未找到时钟源 ${clockSource.current_source} 的映射，使用默认PTP时钟1`);
+                }
+                
+                if (lockStatusElement) {
+                    if (data.lock_status === 'locked') {
+                        // phc2sys正在使用PTP时钟源，显示已锁定
+                        lockStatusElement.textContent = '已锁定';
+                        lockStatusElement.className = 'status-value status-locked';
+                    } else if (data.lock_status === 'unlocked') {
+                        // phc2sys无法找到PTP时钟源，自动转入内同步
+                        lockStatusElement.textContent = '未锁定（自动转入内同步）';
+                        lockStatusElement.className = 'status-value status-unlocked';
+                    } else {
+                        lockStatusElement.textContent = '未知';
                         lockStatusElement.className = 'status-value';
                     }
-                    if (offsetElement) offsetElement.textContent = '-';
-                    if (delayElement) delayElement.textContent = '-';
                 }
-            }
-        }
-    } catch (error) {
-        console.error('更新系统状态失败:', error);
-    }
-}
-
-// 更新PTP时钟1状态
-async function updatePtpStatus() {
-    try {
-        // 获取PTP时钟1的当前配置
-        const ptp1Config = await getPtp1Config();
-        const domain = ptp1Config ? parseInt(ptp1Config.domainNumber) : 127; // 默认使用127
-        
-        // 获取时间状态（包含GM Identity）
-        const timeStatusResponse = await fetch(`/api/ptp-timestatus?uds_path=/var/run/ptp4l&domain=${domain}`);
-        const timeStatusData = await timeStatusResponse.json();
-        
-        if (timeStatusData.success) {
-            const gmIdentity = timeStatusData.gmIdentity || 'Unknown';
-            document.getElementById('ptpGmIdentity').textContent = gmIdentity;
-            
-            // 根据GM状态设置锁定状态
-            const isLocked = timeStatusData.gmPresent === 'true';
-            const lockStatus = isLocked ? '已锁定' : '未锁定';
-            const lockClass = isLocked ? 'status-locked' : 'status-unlocked';
-            
-            document.getElementById('ptpLockStatus').textContent = lockStatus;
-            document.getElementById('ptpLockStatus').className = 'status-value ' + lockClass;
-        }
-        
-        // 获取端口状态
-        const portResponse = await fetch(`/api/ptp-port-status?uds_path=/var/run/ptp4l&domain=${domain}`);
-        const portData = await portResponse.json();
-        
-        if (portData.success) {
-            const portState = portData.portState || 'Unknown';
-            const portStateElement = document.getElementById('portState');
-            portStateElement.textContent = portState;
-            
-            // 根据端口状态设置颜色
-            if (portState === 'SLAVE' || portState === 'MASTER') {
-                portStateElement.className = 'status-value status-locked';
-            } else if (portState === 'FAULTY' || portState === 'LISTENING' || portState === 'UNCALIBRATED') {
-                portStateElement.className = 'status-value status-unlocked';
+                
+                if (gmIdentityElement) gmIdentityElement.textContent = data.gmIdentity || 'Unknown';
+                if (offsetElement) offsetElement.textContent = formatStatusNumber(data.offsetFromMaster);
+                if (delayElement) delayElement.textContent = formatStatusNumber(data.meanPathDelay);
             } else {
-                portStateElement.className = 'status-value';
+                // BB或内部模式：显示本地内部时钟
+                clockSourceElement.textContent = '本地内部时钟';
+                
+                // 清空PTP相关状态
+                if (gmIdentityElement) gmIdentityElement.textContent = '-';
+                if (lockStatusElement) {
+                    lockStatusElement.textContent = '-';
+                    lockStatusElement.className = 'status-value';
+                }
+                if (offsetElement) offsetElement.textContent = '-';
+                if (delayElement) delayElement.textContent = '-';
             }
         }
-        
-        // 获取当前时间数据
-        const timeResponse = await fetch(`/api/ptp-currenttimedata?uds_path=/var/run/ptp4l&domain=${domain}`);
-        const timeData = await timeResponse.json();
-        
-        if (timeData.success) {
-            const offset = (timeData.offsetFromMaster !== undefined && timeData.offsetFromMaster !== null) ? timeData.offsetFromMaster : 'Unknown';
-            const delay = (timeData.meanPathDelay !== undefined && timeData.meanPathDelay !== null) ? timeData.meanPathDelay : 'Unknown';
-            
-            document.getElementById('ptpOffsetFromMaster').textContent = offset;
-            document.getElementById('ptpMeanPathDelay').textContent = delay;
-        }
-    } catch (error) {
-        console.error('更新PTP时钟1状态失败:', error);
     }
 }
 
-// 更新PTP时钟2状态
-async function updatePtpStatus2() {
-    try {
-        // 获取PTP时钟2的当前配置
-        const ptp2Config = await getPtp2Config();
-        const domain = ptp2Config ? parseInt(ptp2Config.domainNumber) : 127; // 默认使用127
-        
-        // 获取时间状态（包含GM Identity）
-        const timeStatusResponse = await fetch(`/api/ptp-timestatus?uds_path=/var/run/ptp4l1&domain=${domain}`);
-        const timeStatusData = await timeStatusResponse.json();
-        
-        if (timeStatusData.success) {
-            const gmIdentity = timeStatusData.gmIdentity || 'Unknown';
-            document.getElementById('ptpGmIdentity2').textContent = gmIdentity;
-            
-            // 根据GM状态设置锁定状态
-            const isLocked = timeStatusData.gmPresent === 'true';
-            const lockStatus = isLocked ? '已锁定' : '未锁定';
-            const lockClass = isLocked ? 'status-locked' : 'status-unlocked';
-            
-            document.getElementById('ptpLockStatus2').textContent = lockStatus;
-            document.getElementById('ptpLockStatus2').className = 'status-value ' + lockClass;
-        }
-        
-        // 获取端口状态
-        const portResponse = await fetch(`/api/ptp-port-status?uds_path=/var/run/ptp4l1&domain=${domain}`);
-        const portData = await portResponse.json();
-        
-        if (portData.success) {
-            const portState = portData.portState || 'Unknown';
-            const portStateElement = document.getElementById('portState2');
-            portStateElement.textContent = portState;
-            
-            // 根据端口状态设置颜色
-            if (portState === 'SLAVE' || portState === 'MASTER') {
-                portStateElement.className = 'status-value status-locked';
-            } else if (portState === 'FAULTY' || portState === 'LISTENING' || portState === 'UNCALIBRATED') {
-                portStateElement.className = 'status-value status-unlocked';
-            } else {
-                portStateElement.className = 'status-value';
-            }
-        }
-        
-        // 获取当前时间数据
-        const timeResponse = await fetch(`/api/ptp-currenttimedata?uds_path=/var/run/ptp4l1&domain=${domain}`);
-        const timeData = await timeResponse.json();
-        
-        if (timeData.success) {
-            const offset = (timeData.offsetFromMaster !== undefined && timeData.offsetFromMaster !== null) ? timeData.offsetFromMaster : 'Unknown';
-            const delay = (timeData.meanPathDelay !== undefined && timeData.meanPathDelay !== null) ? timeData.meanPathDelay : 'Unknown';
-            
-            document.getElementById('ptpOffsetFromMaster2').textContent = offset;
-            document.getElementById('ptpMeanPathDelay2').textContent = delay;
-        }
-    } catch (error) {
-        console.error('更新PTP时钟2状态失败:', error);
+// 更新PTP实例状态，三个数据集并发获取
+async function updateInstanceStatus(name) {
+    const view = INSTANCE_VIEWS[name];
+    const config = await getInstanceConfig(name);
+    const domain = config ? parseInt(config.domainNumber) : 127; // 默认使用127
+    const query = `uds_path=${view.udsPath}&domain=${domain}`;
+    
+    const [timeStatus, portStatus, currentData] = await Promise.allSettled([
+        fetchJson(`/api/ptp-timestatus?${query}`),
+        fetchJson(`/api/ptp-port-status?${query}`),
+        fetchJson(`/api/ptp-currenttimedata?${query}`)
+    ]);
+    const value = result => (result.status === 'fulfilled' && result.value.success) ? result.value : null;
+    renderInstanceStatus(name, {
+        time_status: value(timeStatus),
+        port_status: value(portStatus),
+        current_data: value(currentData)
+    });
+    
+    // 任一请求失败时抛出，由调度器退避
+    const failed = [timeStatus, portStatus, currentData].find(result => result.status === 'rejected');
+    if (failed) {
+        throw failed.reason;
     }
 }
 
@@ -1084,11 +1250,7 @@ async function controlPtpService(serviceName, action) {
             
             // 延迟更新状态，给服务一些启动/停止的时间
             setTimeout(() => {
-                if (serviceName === 'ptp4l.service') {
-                    updatePtpStatus();
-                } else if (serviceName === 'ptp4l1.service') {
-                    updatePtpStatus2();
-                }
+                pollNow(serviceName.replace('.service', ''));
             }, 2000);
         } else {
             const actionText = action === 'start' ? '启动' : '停止';
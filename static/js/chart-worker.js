@@ -0,0 +1,129 @@
+// 历史曲线 Worker
+// 在后台线程中获取并保存历史采样，按像素列做 min/max 抽稀，
+// 主线程只负责把每列的最小值和最大值画到 canvas 上
+
+const MAX_AGE = 24 * 3600;  // 保留时长（秒），与服务端 HISTORY_SECONDS 一致
+
+// 序列键（实例名:指标）-> { t, v, start, end }，t/v 为可增长的 Float64Array
+const seriesStore = new Map();
+
+function lowerBound(array, lo, hi, value) {
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (array[mid] < value) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo;
+}
+
+function appendSeries(key, times, values) {
+    let series = seriesStore.get(key);
+    if (!series) {
+        series = { t: new Float64Array(1024), v: new Float64Array(1024), start: 0, end: 0 };
+        seriesStore.set(key, series);
+    }
+
+    // 跳过已有的点（增量获取的边界可能重叠）
+    const last = series.end > series.start ? series.t[series.end - 1] : -Infinity;
+    let first = 0;
+    while (first < times.length && times[first] <= last) {
+        first++;
+    }
+    const count = times.length - first;
+    if (count === 0) {
+        return;
+    }
+
+    if (series.end + count > series.t.length) {
+        // 先丢弃头部已淘汰的空间，不够时再扩容
+        const live = series.end - series.start;
+        const capacity = Math.max(series.t.length, (live + count) * 2);
+        const t = new Float64Array(capacity);
+        const v = new Float64Array(capacity);
+        t.set(series.t.subarray(series.start, series.end));
+        v.set(series.v.subarray(series.start, series.end));
+        series.t = t;
+        series.v = v;
+        series.start = 0;
+        series.end = live;
+    }
+    for (let i = first; i < times.length; i++) {
+        series.t[series.end] = times[i];
+        series.v[series.end] = values[i];
+        series.end++;
+    }
+
+    const cutoff = series.t[series.end - 1] - MAX_AGE;
+    series.start = lowerBound(series.t, series.start, series.end, cutoff);
+}
+
+// 把 [from, to] 内的点按列分桶，每列保留最小值和最大值（没有点的列为 NaN）
+function decimate(key, from, to, columns) {
+    const mins = new Float64Array(columns).fill(NaN);
+    const maxs = new Float64Array(columns).fill(NaN);
+    const result = { key, mins, maxs, min: NaN, max: NaN, last: NaN, count: 0 };
+    const series = seriesStore.get(key);
+    if (!series || to <= from || columns <= 0) {
+        return result;
+    }
+
+    const scale = columns / (to - from);
+    let min = Infinity;
+    let max = -Infinity;
+    let i = lowerBound(series.t, series.start, series.end, from);
+    const begin = i;
+    for (; i < series.end && series.t[i] <= to; i++) {
+        const column = Math.min(columns - 1, Math.floor((series.t[i] - from) * scale));
+        const value = series.v[i];
+        if (!(mins[column] <= value)) {
+            mins[column] = value;
+        }
+        if (!(maxs[column] >= value)) {
+            maxs[column] = value;
+        }
+        if (value < min) min = value;
+        if (value > max) max = value;
+    }
+
+    result.count = i - begin;
+    if (result.count > 0) {
+        result.min = min;
+        result.max = max;
+        result.last = series.v[i - 1];
+    }
+    return result;
+}
+
+async function fetchHistory(instance, url) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    let lastTime = null;
+    for (const [metric, series] of Object.entries(data.series || {})) {
+        appendSeries(`${instance}:${metric}`, series.t, series.v);
+        if (series.t.length > 0) {
+            lastTime = Math.max(lastTime ?? -Infinity, series.t[series.t.length - 1]);
+        }
+    }
+    return { now: data.now, lastTime };
+}
+
+self.onmessage = async event => {
+    const message = event.data;
+    if (message.type === 'fetch') {
+        try {
+            const result = await fetchHistory(message.instance, message.url);
+            self.postMessage({ type: 'fetched', id: message.id, ...result });
+        } catch (error) {
+            self.postMessage({ type: 'fetched', id: message.id, error: error.message });
+        }
+    } else if (message.type === 'render') {
+        const result = decimate(message.key, message.from, message.to, message.columns);
+        self.postMessage({ type: 'rendered', id: message.id, ...result }, [result.mins.buffer, result.maxs.buffer]);
+    }
+};
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+管理查询准入控制测试脚本
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import API, INTERNAL, AdmissionControl, AdmissionGate, AdmissionRejected, query_priority
+
+
+def start_waiter(gate, priority, results):
+    """在线程中等待准入，结果（等待秒数或拒绝原因）追加到results"""
+    def run():
+        try:
+            results.append((priority, gate.acquire(priority)))
+        except AdmissionRejected as e:
+            results.append((priority, e.reason))
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_queued(gate, count):
+    deadline = time.monotonic() + 2
+    while gate.stats()["queued"] != count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_burst_then_paced_by_rate():
+    """桶内令牌立即准入，用完后按速率排队"""
+    gate = AdmissionGate("/var/run/ptp4l", rate=50, burst=2, queue_size=4, max_wait=1)
+    assert gate.acquire(API) == 0.0 and gate.acquire(API) == 0.0
+    waited = gate.acquire(API)
+    assert 0.005 < waited < 0.2
+    stats = gate.stats()
+    assert stats["admitted"] == 3 and stats["queued_total"] == 1 and stats["queued"] == 0
+
+
+def test_rejects_when_estimated_wait_exceeds_deadline():
+    """预计等待超过截止时间的请求立即被拒绝，不进入队列"""
+    gate = AdmissionGate("/var/run/ptp4l", rate=1, burst=1, queue_size=4, max_wait=0.5)
+    gate.acquire(API)
+    started = time.monotonic()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        gate.acquire(API)
+    assert excinfo.value.reason == "deadline"
+    assert time.monotonic() - started < 0.1
+    assert gate.stats()["rejected"]["deadline"] == 1 and gate.stats()["queued_total"] == 0
+
+
+def test_internal_queries_go_first_and_evict_api_requests():
+    """内部采样排在接口请求之前，队列满时挤掉排在最后的接口请求，同优先级则拒绝新请求"""
+    gate = AdmissionGate("/var/run/ptp4l", rate=5, burst=1, queue_size=2, max_wait=1)
+    gate.acquire(API)
+    results = []
+    threads = [start_waiter(gate, API, results)]
+    wait_queued(gate, 1)
+    threads.append(start_waiter(gate, API, results))
+    wait_queued(gate, 2)
+    with pytest.raises(AdmissionRejected, match="queue_full"):
+        gate.acquire(API)
+    threads.append(start_waiter(gate, INTERNAL, results))
+    for thread in threads:
+        thread.join()
+    assert [result for result in results if result[1] == "evicted"] == [(API, "evicted")]
+    admitted = [priority for priority, result in results if result != "evicted"]
+    assert admitted == [INTERNAL, API]
+    assert gate.stats()["rejected"] == {"queue_full": 1, "deadline": 0, "evicted": 1}
+
+
+def test_priority_follows_context_into_threads():
+    """采样任务设置的优先级经 asyncio.to_thread 传递给查询线程，rate为0时不限制"""
+    control = AdmissionControl(rate=0)
+    assert control.admit("/var/run/ptp4l") == 0.0 and control.stats() == {}
+
+    async def sampler():
+        query_priority.set(INTERNAL)
+        return await asyncio.to_thread(query_priority.get)
+
+    assert asyncio.run(sampler()) == INTERNAL
+    assert query_priority.get() == API
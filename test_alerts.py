@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+告警规则引擎测试脚本
+"""
+
+import asyncio
+import json
+import random
+
+import pytest
+
+from alerts import (
+    DEFAULT_RULES, PORT_UNREACHABLE, AlertEngine, AlertNotifier, AlertRule, FileSink, SlidingAggregate,
+    instance_alert_values, load_rules,
+)
+
+
+def engine_with(*rules):
+    notifications = []
+    engine = AlertEngine([AlertRule.from_dict(rule) for rule in rules], notifications.append, clock=lambda: 0.0)
+    return engine, notifications
+
+
+def test_threshold_for_duration_hysteresis_and_rearm():
+    """超过阈值持续for秒才触发，触发后只通知一次，低于clear才恢复，恢复后可再次触发"""
+    engine, notifications = engine_with(
+        {"name": "offset-high", "metric": "offsetFromMaster", "abs": True, "op": ">", "value": 1000,
+         "clear": 500, "for": 3})
+    for t, offset in enumerate([100, -1500, 2000, 1800, 1900, 1200, 800, 400, 1600, 1700, 1800, 1900]):
+        engine.observe("ptp4l", {"offsetFromMaster": offset, "meanPathDelay": 10}, now=float(t))
+    assert [(n["status"], n["value"]) for n in notifications] == [
+        ("firing", 1900), ("resolved", 400), ("firing", 1900)]
+    assert notifications[1]["duration"] == 3.0
+    [active] = engine.active()
+    assert (active["rule"], active["instance"], active["status"]) == ("offset-high", "ptp4l", "firing")
+
+
+def test_state_change_rules_and_tick():
+    """状态离开允许集合时靠tick推进持续时间，repeat周期重复通知；字段变化立即通知"""
+    engine, notifications = engine_with(
+        {"name": "port-not-slave", "kind": "state", "metric": "portState", "in": ["SLAVE"], "for": 5, "repeat": 10},
+        {"name": "gm-changed", "kind": "change", "metric": "gmIdentity", "instances": ["ptp4l"]})
+    engine.observe("ptp4l", {"portState": "SLAVE", "gmIdentity": "aa"}, now=0)
+    engine.observe("ptp4l1", {"portState": "SLAVE", "gmIdentity": "bb"}, now=0)
+    engine.observe("ptp4l", {"portState": "LISTENING", "gmIdentity": "cc"}, now=1)
+    assert [(n["rule"], n["status"], n.get("previous")) for n in notifications] == [("gm-changed", "changed", "aa")]
+    assert engine.tick(now=5.9) == []
+    assert [n["rule"] for n in engine.tick(now=6)] == ["port-not-slave"]
+    assert engine.tick(now=15) == []
+    assert engine.tick(now=16)[0]["repeated"] is True
+    engine.observe("ptp4l", {"portState": "SLAVE", "gmIdentity": None}, now=17)
+    assert notifications[-1]["status"] == "resolved" and engine.active() == []
+
+
+def test_unreachable_instance_fires_port_rule():
+    """ptp4l停止应答（数据集全部查询失败或无应答）时portState按UNREACHABLE评估，默认规则照常触发"""
+    notifications = []
+    engine = AlertEngine([AlertRule.from_dict(rule) for rule in DEFAULT_RULES], notifications.append, clock=lambda: 0.0)
+    healthy = {"time_status": {"gmPresent": True, "gmIdentity": "aa"}, "port_status": {"portState": "SLAVE"},
+               "current_data": {"offsetFromMaster": -12.0, "meanPathDelay": 800.0, "stepsRemoved": 1}}
+    engine.observe("ptp4l", instance_alert_values(healthy), now=0)
+    failed = {"time_status": None, "port_status": None, "current_data": None}
+    assert instance_alert_values(failed) == {"stepsRemoved": None, "offsetFromMaster": None, "meanPathDelay": None,
+                                             "portState": PORT_UNREACHABLE, "gmIdentity": None, "gmPresent": False}
+    silent = {"time_status": {"gmPresent": None}, "port_status": {"portState": None, "responders": {}}, "current_data": {}}
+    assert instance_alert_values(silent)["portState"] == PORT_UNREACHABLE
+    for t in range(1, 30):
+        engine.observe("ptp4l", instance_alert_values(failed), now=float(t))
+    [active] = engine.active()
+    assert (active["rule"], active["value"]) == ("port-not-slave", PORT_UNREACHABLE)
+    assert [n["rule"] for n in notifications] == ["port-not-slave"]
+    engine.observe("ptp4l", instance_alert_values(healthy), now=30.0)
+    assert engine.active() == [] and notifications[-1]["status"] == "resolved"
+
+
+def test_sliding_aggregate_matches_brute_force():
+    """滑动窗口的平均/最大/最小值与直接计算一致"""
+    rng = random.Random(7)
+    samples = [(i * 0.5, rng.uniform(-100, 100)) for i in range(400)]
+    for aggregate, reduce in (("avg", lambda v: sum(v) / len(v)), ("max", max), ("min", min)):
+        window = SlidingAggregate(10, aggregate)
+        for t, value in samples:
+            expected = reduce([v for st, v in samples if t - 10 < st <= t])
+            assert window.add(t, value) == pytest.approx(expected)
+
+
+def test_load_rules_validation(tmp_path):
+    """规则文件不存在时使用默认规则，不合法的规则给出明确错误"""
+    assert [rule.name for rule in load_rules(str(tmp_path / "missing.json"))] == \
+        ["offset-high", "port-not-slave", "gm-changed"]
+    path = tmp_path / "alerts.json"
+    for rules, message in (
+        ({"name": "x"}, "JSON列表"),
+        ([{"name": "x"}], "metric"),
+        ([{"name": "x", "metric": "m", "op": "!=", "value": 1}], "比较运算"),
+        ([{"name": "x", "kind": "state", "metric": "m"}], "not_in"),
+        ([{"name": "x", "metric": "m", "value": 1, "severity": "page"}], "级别"),
+        ([{"name": "x", "metric": "m", "value": 1}, {"name": "x", "kind": "change", "metric": "n"}], "重复"),
+    ):
+        path.write_text(json.dumps(rules))
+        with pytest.raises(ValueError, match=message):
+            load_rules(str(path))
+
+
+def test_notifier_delivers_without_blocking(tmp_path):
+    """submit只入队不等待，后台任务写入文件；目标失败时重试后计为失败，队列满时丢弃最旧的通知"""
+    class FailingSink:
+        def send(self, notification):
+            raise OSError("connection refused")
+
+    path = tmp_path / "alerts" / "alerts.jsonl"
+    notifier = AlertNotifier([FileSink(str(path)), FailingSink()], queue_size=2, retries=1, retry_delay=0)
+
+    async def scenario():
+        for i in range(3):
+            notifier.submit({"rule": "r", "seq": i})
+        task = asyncio.create_task(notifier.run())
+        while notifier.queue.qsize() or notifier.failed < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert [json.loads(line)["seq"] for line in path.read_text().splitlines()] == [1, 2]
+    assert notifier.stats()["delivered"] == 2 and notifier.failed == 2 and notifier.dropped == 1
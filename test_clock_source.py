@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+时钟源状态测试脚本（替换单调时钟）
+"""
+
+import asyncio
+
+import clock_source
+from clock_source import NO_CLOCK_AVAILABLE, ClockSourceState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_timeout_and_hysteresis(monkeypatch):
+    """超过截止时间判定超时，连续多次同步后才恢复"""
+    clock = FakeClock()
+    monkeypatch.setattr(clock_source.time, "monotonic", clock)
+    state = ClockSourceState(deadline=3, recover_samples=2)
+
+    async def scenario():
+        await state.update("ens102")
+        clock.now += 2
+        assert (await state.get_state())["status"] == "normal"
+        clock.now += 2
+        timed_out = await state.get_state()
+        assert timed_out["status"] == "timeout"
+        assert timed_out["current_source"] == NO_CLOCK_AVAILABLE
+        await state.sync_seen()
+        assert (await state.get_state())["status"] == "timeout"
+        clock.now += 1
+        await state.sync_seen()
+        recovered = await state.get_state()
+        assert recovered["status"] == "normal"
+        assert recovered["current_source"] == "ens102"
+
+    run(scenario())
+    assert [entry["event"] for entry in state.transitions] == ["source_changed", "timeout", "recovered"]
+
+
+def test_interrupted_recovery_restarts_count(monkeypatch):
+    """恢复过程中同步再次中断，重新计数"""
+    clock = FakeClock()
+    monkeypatch.setattr(clock_source.time, "monotonic", clock)
+    state = ClockSourceState(deadline=3, recover_samples=2)
+
+    async def scenario():
+        await state.update("ens102")
+        clock.now += 4
+        await state.get_state()
+        await state.sync_seen()
+        clock.now += 4
+        await state.sync_seen()
+        assert state.status == "timeout"
+        clock.now += 1
+        await state.sync_seen()
+        assert state.status == "normal"
+
+    run(scenario())
+
+
+def test_transitions_pushed_to_subscribers():
+    """状态转换立即推送给订阅者，队列满时丢弃最旧的一条"""
+    state = ClockSourceState()
+
+    async def scenario():
+        queue = state.subscribe(maxsize=2)
+        await state.update("ens102")
+        await state.update("ens102", is_failed=True)
+        await state.sync_seen()
+        assert [queue.get_nowait()["event"] for _ in range(queue.qsize())] == ["failed", "recovered"]
+        state.unsubscribe(queue)
+        await state.update("ens103")
+        assert queue.empty()
+
+    run(scenario())
+    assert [entry["seq"] for entry in state.get_transitions(since=2)] == [3, 4]
+
+
+def test_mirror_follows_exported_state(monkeypatch):
+    """镜像端采用导出的状态且不自行判定超时，只推送新的转换记录"""
+    clock = FakeClock()
+    monkeypatch.setattr(clock_source.time, "monotonic", clock)
+    leader = ClockSourceState(deadline=3)
+    mirror = ClockSourceState(deadline=3)
+    mirror.mirrored = True
+
+    async def scenario():
+        queue = mirror.subscribe()
+        await leader.update("ens102")
+        await mirror.load(leader.export())
+        clock.now += 10
+        assert (await mirror.get_state())["status"] == "normal"
+        assert (await leader.get_state())["status"] == "timeout"
+        await mirror.load(leader.export())
+        await mirror.load(leader.export())
+        state = await mirror.get_state()
+        assert state["current_source"] == NO_CLOCK_AVAILABLE and state["last_sync_age"] == 10
+        return [queue.get_nowait()["event"] for _ in range(queue.qsize())]
+
+    assert run(scenario()) == ["source_changed", "timeout"]
+    assert mirror.version == leader.version
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+配置快照测试脚本（受管理的文件放在临时目录中）
+"""
+
+import os
+
+import pytest
+
+import config_snapshots
+from config_snapshots import PartialRestore, SnapshotNotFound, SnapshotStore
+
+
+def managed_files(tmp_path):
+    conf = tmp_path / "linuxptp" / "ptp4l.conf"
+    unit = tmp_path / "system" / "ptp4l.service"
+    dropin = tmp_path / "system" / "ptp4l.service.d" / "ptpconfigurator.conf"
+    phc2sys = tmp_path / "system" / "phc2sys.service"
+    conf.parent.mkdir()
+    unit.parent.mkdir()
+    conf.write_text("[global]\ndomainNumber 127\n")
+    unit.write_text("[Service]\nExecStart=/usr/sbin/ptp4l -i eth0\n")
+    phc2sys.write_text("[Service]\nExecStart=/usr/sbin/phc2sys -a -r\n")
+    store = SnapshotStore(str(tmp_path / "snapshots"), {
+        str(conf): "ptp4l.service", str(unit): "ptp4l.service", str(dropin): "ptp4l.service",
+        str(phc2sys): "phc2sys.service",
+    })
+    return store, conf, dropin
+
+
+def test_capture_deduplicates_by_content(tmp_path):
+    """内容不变时不新增快照，相同的文件内容只存一份"""
+    store, conf, _ = managed_files(tmp_path)
+    first, created = store.capture("启动时")
+    assert created and first["seq"] == 1
+    assert store.capture("PUT /api/ptp-config") == (first, False)
+    conf.write_text("[global]\ndomainNumber 24\n")
+    second, created = store.capture("PUT /api/ptp-config")
+    assert created and second["seq"] == 2 and second["id"] != first["id"]
+    # 3个文件 + 1个修改后的配置文件
+    assert len(os.listdir(tmp_path / "snapshots" / "objects")) == 4
+    assert [(record["seq"], record["changed"]) for record in store.history()] == [(2, [str(conf)]), (1, sorted(
+        path for path, unit in store.files.items() if not path.endswith("ptpconfigurator.conf")))]
+    assert store.resolve(second["id"][:8]) == second["id"]
+    with pytest.raises(SnapshotNotFound):
+        store.resolve(second["id"][:3])
+
+
+def test_diff_against_snapshot_and_current(tmp_path):
+    """两个快照之间以及快照与当前文件之间的差异，新出现的文件为added"""
+    store, conf, dropin = managed_files(tmp_path)
+    first, _ = store.capture("启动时")
+    conf.write_text("[global]\ndomainNumber 24\n")
+    dropin.parent.mkdir()
+    dropin.write_text("[Service]\nEnvironmentFile=/etc/linuxptp/env/ptp4l.service.env\n")
+    second, _ = store.capture("PUT /api/ptp4l-service-interface")
+    changes = {change["path"]: change for change in store.diff(first["id"], second["id"])}
+    assert changes[str(conf)]["status"] == "modified"
+    assert "-domainNumber 127\n+domainNumber 24\n" in changes[str(conf)]["diff"]
+    assert changes[str(dropin)]["status"] == "added" and changes[str(dropin)]["unit"] == "ptp4l.service"
+    assert store.diff(second["id"]) == []
+    conf.write_text("[global]\ndomainNumber 0\n")
+    assert [change["path"] for change in store.diff(second["id"])] == [str(conf)]
+
+
+def test_restore_rewrites_and_removes_files(tmp_path):
+    """回滚恢复修改过的文件、删除快照时不存在的文件，只返回变化的文件"""
+    store, conf, dropin = managed_files(tmp_path)
+    first, _ = store.capture("启动时")
+    os.chmod(conf, 0o640)
+    conf.write_text("[global]\ndomainNumber 24\n")
+    dropin.parent.mkdir()
+    dropin.write_text("[Service]\n")
+    store.capture("PUT /api/ptp-config")
+    changed = store.restore(first["id"])
+    assert changed == sorted([str(conf), str(dropin)])
+    assert conf.read_text() == "[global]\ndomainNumber 127\n" and os.stat(conf).st_mode & 0o777 == 0o640
+    assert not dropin.exists()
+    assert store.units(changed) == ["ptp4l.service"]
+    assert store.restore(first["id"]) == []
+
+
+def test_failed_restore_leaves_files_untouched(tmp_path, monkeypatch):
+    """准备阶段有一个文件失败时不修改任何文件，也不留下临时文件"""
+    store, conf, dropin = managed_files(tmp_path)
+    first, _ = store.capture("启动时")
+    conf.write_text("changed\n")
+    unit = next(path for path in store.files if path.endswith("ptp4l.service"))
+    with open(unit, "a") as f:
+        f.write("# changed\n")
+    original_stage = SnapshotStore._stage
+
+    def stage(path, data):
+        if path == unit:
+            raise OSError("No space left on device")
+        return original_stage(path, data)
+
+    monkeypatch.setattr(SnapshotStore, "_stage", staticmethod(stage))
+    with pytest.raises(OSError) as excinfo:
+        store.restore(first["id"])
+    assert not isinstance(excinfo.value, PartialRestore)
+    assert conf.read_text() == "changed\n"
+    assert not [name for name in os.listdir(conf.parent) if name.endswith(".tmp")]
+
+
+def test_partial_restore_reports_applied_files(tmp_path, monkeypatch):
+    """替换阶段中途失败时抛出 PartialRestore，列出已恢复的文件，清理其余临时文件"""
+    store, conf, dropin = managed_files(tmp_path)
+    first, _ = store.capture("启动时")
+    conf.write_text("changed\n")
+    unit = next(path for path in store.files if path.endswith("ptp4l.service"))
+    with open(unit, "a") as f:
+        f.write("# changed\n")
+    original_replace = os.replace
+
+    def replace(src, dst):
+        if dst == unit:
+            raise OSError(5, "Input/output error")
+        return original_replace(src, dst)
+
+    monkeypatch.setattr(config_snapshots.os, "replace", replace)
+    with pytest.raises(PartialRestore) as excinfo:
+        store.restore(first["id"])
+    assert excinfo.value.applied == [str(conf)] and excinfo.value.errno == 5
+    assert conf.read_text() == "[global]\ndomainNumber 127\n"
+    assert open(unit).read().endswith("# changed\n")
+    assert not [name for name in os.listdir(os.path.dirname(unit)) if name.endswith(".tmp")]
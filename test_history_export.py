@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+历史采样批量导出测试脚本
+"""
+
+import csv
+import gzip
+import io
+
+import pytest
+
+import history_export
+from history_export import csv_chunks, export_chunks, iter_chunks
+from sample_store import ReadConflict, SampleStore, SeriesBuffer
+
+
+def filled_store(points=100, capacity=1000):
+    store = SampleStore(capacity)
+    for i in range(points):
+        store.record("ptp4l", 1000.0 + i, {"offsetFromMaster": i - 50, "meanPathDelay": 500.25})
+    return store
+
+
+def test_query_limit_and_chunk_cursor():
+    """limit 跨越环形缓冲区的两段，分块以上一块最后的时间戳继续，不重复不遗漏"""
+    series = SeriesBuffer(8)
+    for t in range(12):
+        series.append(float(t), float(t))
+    assert series.query(limit=5) == ([4.0, 5.0, 6.0, 7.0, 8.0], [4.0, 5.0, 6.0, 7.0, 8.0])
+    store = filled_store()
+    chunks = list(iter_chunks(store, "ptp4l", "offsetFromMaster", start=1009.0, end=1050.0, chunk_points=16))
+    assert [len(times) for times, _ in chunks] == [16, 16, 9]
+    assert [t for times, _ in chunks for t in times] == [1010.0 + i for i in range(41)]
+
+
+def test_chunks_keep_points_sharing_boundary_timestamp():
+    """块边界上时间戳相同的点不丢失也不重复，同一时间戳的点多于一块时仍能继续"""
+    store = SampleStore(64)
+    for i, t in enumerate([1, 2, 3, 3, 4]):
+        store.record("ptp4l", float(t), {"offsetFromMaster": i})
+    chunks = list(iter_chunks(store, "ptp4l", "offsetFromMaster", chunk_points=3))
+    assert [v for _, values in chunks for v in values] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    store = SampleStore(64)
+    for i, t in enumerate([1] + [5] * 7 + [6, 7]):
+        store.record("ptp4l", float(t), {"offsetFromMaster": i})
+    for chunk_points in (1, 2, 3, 4, 20):
+        chunks = list(iter_chunks(store, "ptp4l", "offsetFromMaster", chunk_points=chunk_points))
+        assert max(len(times) for times, _ in chunks) <= chunk_points
+        assert [v for _, values in chunks for v in values] == [float(i) for i in range(10)]
+
+
+def test_read_conflict_retries_then_fails_loudly(monkeypatch):
+    """读取与写入冲突时重试，持续冲突时抛出ReadConflict而不是当作数据结束"""
+    store = filled_store(points=10)
+    original_query = SampleStore.query
+    conflicts = iter([True, False] + [True] * 100)
+
+    def query(self, *args):
+        if next(conflicts):
+            raise ReadConflict("冲突")
+        return original_query(self, *args)
+
+    monkeypatch.setattr(SampleStore, "query", query)
+    monkeypatch.setattr(history_export, "CONFLICT_BACKOFF", 0)
+    chunks = csv_chunks(store, "ptp4l", ["offsetFromMaster"], chunk_points=4)
+    assert next(chunks) == b"time,metric,value\n"
+    assert next(chunks).count(b"\n") == 4
+    with pytest.raises(ReadConflict):
+        list(chunks)
+
+
+def test_csv_export_streams_in_bounded_chunks():
+    """CSV按指标依次输出，每块不超过 chunk_points 行"""
+    chunks = list(csv_chunks(filled_store(), "ptp4l", ["offsetFromMaster", "meanPathDelay"], chunk_points=32))
+    assert chunks[0] == b"time,metric,value\n"
+    assert max(chunk.count(b"\n") for chunk in chunks) == 32
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert len(rows) == 200
+    assert rows[0] == {"time": "1000.000000", "metric": "offsetFromMaster", "value": "-50"}
+    assert rows[-1] == {"time": "1099.000000", "metric": "meanPathDelay", "value": "500.25"}
+
+
+def test_gzip_export_roundtrip():
+    """gzip压缩的输出解压后与未压缩的一致"""
+    store = filled_store(points=5000, capacity=5000)
+    plain = b"".join(export_chunks(store, "ptp4l", ["offsetFromMaster"], "csv", chunk_points=256))
+    compressed = b"".join(export_chunks(store, "ptp4l", ["offsetFromMaster"], "csv", compress=True, chunk_points=256))
+    assert gzip.decompress(compressed) == plain and len(compressed) < len(plain) / 3
+
+
+def test_unsupported_format_and_missing_pyarrow(monkeypatch):
+    """不支持的格式和没有pyarrow时在开始输出前报错"""
+    with pytest.raises(ValueError):
+        export_chunks(filled_store(), "ptp4l", ["offsetFromMaster"], "parquet")
+    monkeypatch.setattr(history_export, "pyarrow", None)
+    with pytest.raises(RuntimeError):
+        export_chunks(filled_store(), "ptp4l", ["offsetFromMaster"], "arrow")
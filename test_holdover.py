@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+频率趋势拟合与守时误差预测测试脚本
+"""
+
+import math
+import random
+
+import pytest
+
+from holdover import FrequencyTrend, HoldoverModel, holdover_horizons, predict, rate_offset_to_ppb, record_ptp4l_frequency
+from pmc_parser import parse_pmc_output
+from ptp_instances import CURRENT_DATA_SET_FIELDS, PORT_DATA_SET_FIELDS, TIME_STATUS_FIELDS, dataset_fields
+
+# pmc 以 %+.9f 打印 cumulativeScaledRateOffset（已除以 2^41），+0.000001234 即 1234 ppb
+TIME_STATUS_NP_OUTPUT = """sending: GET TIME_STATUS_NP
+	507c6f.fffe.1fb1b8-0 seq 0 RESPONSE MANAGEMENT TIME_STATUS_NP
+		master_offset              -23
+		ingress_time               1595252994573466848
+		cumulativeScaledRateOffset +0.000001234
+		scaledLastGmPhaseChange    0
+		gmTimeBaseIndicator        0
+		lastGmPhaseChange          0x0000'0000000000000000.0000
+		gmPresent                  true
+		gmIdentity                 001b21.fffe.6f1a2c
+"""
+
+PORT_DATA_SET_OUTPUT = """sending: GET PORT_DATA_SET
+	507c6f.fffe.1fb1b8-1 seq 0 RESPONSE MANAGEMENT PORT_DATA_SET
+		portIdentity            507c6f.fffe.1fb1b8-1
+		portState               SLAVE
+		logMinDelayReqInterval  0
+		peerMeanPathDelay       812
+		logAnnounceInterval     1
+		announceReceiptTimeout  3
+		logSyncInterval         0
+		delayMechanism          2
+		logMinPdelayReqInterval 0
+		versionNumber           2
+"""
+
+CURRENT_DATA_SET_OUTPUT = """sending: GET CURRENT_DATA_SET
+	507c6f.fffe.1fb1b8-0 seq 0 RESPONSE MANAGEMENT CURRENT_DATA_SET
+		stepsRemoved     1
+		offsetFromMaster -12.0
+		meanPathDelay    1502.0
+"""
+
+
+
+def batch_fit(samples):
+    """对全部样本直接做最小二乘，作为增量结果的对照"""
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    stt = sum((t - mean_t) ** 2 for t, _ in samples)
+    slope = sum((t - mean_t) * (y - mean_y) for t, y in samples) / stt
+    intercept = mean_y - slope * mean_t
+    sse = sum((y - intercept - slope * t) ** 2 for t, y in samples)
+    return intercept + slope * samples[-1][0], slope, math.sqrt(sse / (n - 2))
+
+
+def test_fit_recovers_linear_drift():
+    """无噪声的线性频率变化拟合出准确的频率和漂移率，残差为0"""
+    trend = FrequencyTrend(window=100)
+    assert trend.fit() is None
+    for i in range(50):
+        trend.add(5000.0 + i, 1200.0 + 0.5 * i)
+    fit = trend.fit()
+    assert fit["frequency"] == pytest.approx(1200.0 + 0.5 * 49)
+    assert fit["drift"] == pytest.approx(0.5)
+    assert fit["residual"] == pytest.approx(0.0, abs=1e-6)
+    assert (fit["samples"], fit["span"]) == (50, 49.0)
+
+
+def test_sliding_window_matches_batch_fit():
+    """样本移出窗口、长时间运行重新选取原点后，增量拟合与对窗口内样本直接拟合一致"""
+    rng = random.Random(1)
+    trend = FrequencyTrend(window=60, max_samples=1000)
+    samples = []
+    t = 1.0e6
+    for _ in range(2000):
+        t += rng.uniform(0.5, 1.5)
+        y = -8000.0 + 0.02 * (t - 1.0e6) + rng.gauss(0, 3)
+        trend.add(t, y)
+        samples.append((t, y))
+    window = [(st, sy) for st, sy in samples if st >= t - 60]
+    frequency, drift, residual = batch_fit(window)
+    fit = trend.fit()
+    assert fit["samples"] == len(window)
+    assert fit["frequency"] == pytest.approx(frequency, abs=1e-6)
+    assert fit["drift"] == pytest.approx(drift, rel=1e-6)
+    assert fit["residual"] == pytest.approx(residual, rel=1e-6)
+
+
+def test_holdover_prediction_grows_with_drift():
+    """预测误差 = 初始偏差 + 频率偏差·τ + ½漂移·τ²，误差界随时长单调增大"""
+    model = HoldoverModel(window=600)
+    for i in range(20):
+        model.add(float(i), 100.0 + 0.01 * i, offset=-5, reference="eth0")
+    snapshot = model.snapshot([10, 100, 1000])
+    fit = snapshot["fit"]
+    assert snapshot["held_frequency"] == pytest.approx(100.19)
+    errors = [p["error"] for p in snapshot["predictions"]]
+    assert errors == [round(-5 + 0.5 * 0.01 * tau * tau, 1) for tau in (10, 100, 1000)]
+    bounds = [p["bound"] for p in snapshot["predictions"]]
+    assert bounds == sorted(bounds) and bounds[0] >= 5
+    assert predict(fit, 100.19, None, 0) == {"holdover": 0, "error": 0.0, "bound": 0.0}
+
+
+def test_reference_change_and_reset():
+    """频率参考（时钟源或GM）变化时重新拟合，时间跨度不足时不拟合，参数换算与解析"""
+    trend = FrequencyTrend(min_span=10)
+    for i in range(100):
+        trend.add(i * 0.01, float(i))
+    assert trend.fit() is None
+    model = HoldoverModel()
+    for i in range(5):
+        model.add(float(i), 10.0, reference="eth0")
+    model.add(5.0, 20.0, reference="eth1")
+    assert model.reference == "eth1" and len(model.trend) == 1 and model.snapshot()["predictions"] == []
+    model.reset()
+    assert model.snapshot()["fit"] is None and model.reference is None
+    assert rate_offset_to_ppb(-0.000000512) == pytest.approx(-512.0)
+    assert rate_offset_to_ppb(0) == 0.0 and rate_offset_to_ppb(True) is None and rate_offset_to_ppb("x") is None
+    assert holdover_horizons("60, 1,3600") == [1, 60, 3600]
+    with pytest.raises(ValueError):
+        holdover_horizons("0,10")
+
+
+def test_ptp4l_frequency_from_pmc_output():
+    """解析录制的pmc数据集输出并加入ptp4l频率模型，换算为ppb且只换算一次"""
+    snapshot = {
+        "time_status": dataset_fields(parse_pmc_output(TIME_STATUS_NP_OUTPUT), TIME_STATUS_FIELDS),
+        "port_status": dataset_fields(parse_pmc_output(PORT_DATA_SET_OUTPUT), PORT_DATA_SET_FIELDS),
+        "current_data": dataset_fields(parse_pmc_output(CURRENT_DATA_SET_OUTPUT), CURRENT_DATA_SET_FIELDS),
+    }
+    model = HoldoverModel()
+    for i in range(3):
+        assert record_ptp4l_frequency(model, i * 10.0, snapshot)
+    assert model.reference == "001b21.fffe.6f1a2c" and len(model.trend) == 3
+    assert model.trend.fit()["frequency"] == pytest.approx(1234.0)
+    snapshot["port_status"] = {**snapshot["port_status"], "portState": "MASTER"}
+    assert not record_ptp4l_frequency(model, 30.0, snapshot)
+    assert not record_ptp4l_frequency(HoldoverModel(), 0.0, {"time_status": None, "port_status": None, "current_data": None})
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+服务日志流式读取测试脚本（用子进程模拟journalctl的JSON输出）
+"""
+
+import asyncio
+import json
+import sys
+
+import pytest
+
+from journal_stream import MessageFilter, build_command, parse_entry, parse_priority, parse_time, stream_entries
+
+
+def fake_journal(count):
+    """输出count条JSON日志的命令"""
+    script = (
+        "import json\n"
+        f"for i in range({count}):\n"
+        "    print(json.dumps({'__CURSOR': f's=1;i={i}', '__REALTIME_TIMESTAMP': str(1700000000000000 + i),"
+        " 'PRIORITY': '6', 'SYSLOG_IDENTIFIER': 'ptp4l', 'MESSAGE': f'port 1: message {i}'}), flush=True)\n"
+    )
+    return [sys.executable, "-c", script]
+
+
+async def collect(command, limit, matches=lambda entry: True):
+    return [item async for item in stream_entries(command, limit, matches)]
+
+
+def test_build_command_cursor_directions():
+    """before 反向读取并跳过游标本身，after 正向读取，默认读取最新一页"""
+    assert build_command("ptp4l.service", before="c1")[-2:] == ["--after-cursor=c1", "--reverse"]
+    assert build_command("ptp4l.service", after="c1")[-1] == "--after-cursor=c1"
+    assert build_command("ptp4l.service")[-1] == "--reverse"
+    command = build_command("ptp4l.service", since="@1.000000", priority="err", follow=True)
+    assert command[-3:] == ["--since=@1.000000", "--priority=err", "--follow"]
+    assert parse_time("1700000000") == "@1700000000.000000"
+    assert parse_time("2023-11-14T22:13:20+00:00") == "@1700000000.000000"
+    assert parse_priority("err..warning") == "err..warning"
+    with pytest.raises(ValueError):
+        parse_priority("8")
+    with pytest.raises(ValueError):
+        parse_time("yesterday-ish")
+
+
+def test_parse_entry_decodes_binary_message():
+    """非UTF-8字段以字节数组给出时解码，非JSON行被忽略"""
+    line = json.dumps({"__CURSOR": "c", "MESSAGE": list(b"caf\xe9"), "PRIORITY": "3"}).encode()
+    entry = parse_entry(line)
+    assert entry["message"] == "caf�" and entry["priority"] == 3 and entry["time"] is None
+    assert parse_entry(b"-- No entries --") is None
+
+
+def test_stream_stops_after_page_and_reports_cursor():
+    """读够一页后结束进程，结束记录给出继续翻页的游标"""
+    items = asyncio.run(collect(fake_journal(1000), 3))
+    assert [item["message"] for item in items[:-1]] == ["port 1: message 0", "port 1: message 1", "port 1: message 2"]
+    assert items[-1] == {"type": "end", "count": 3, "cursor": "s=1;i=2", "more": True, "error": None}
+
+
+def test_stream_filters_and_reaches_end():
+    """过滤条件在服务端生效，游标指向最后一条被检查的日志"""
+    matches = MessageFilter(contains="MESSAGE", regex=r"message [13]$")
+    items = asyncio.run(collect(fake_journal(5), 10, matches))
+    assert [item["message"] for item in items[:-1]] == ["port 1: message 1", "port 1: message 3"]
+    assert items[-1] == {"type": "end", "count": 2, "cursor": "s=1;i=4", "more": False, "error": None}
+
+
+def test_stream_reports_journalctl_failure():
+    """journalctl 出错时在结束记录中给出错误信息"""
+    command = [sys.executable, "-c", "import sys; sys.stderr.write('Failed to add match'); sys.exit(1)"]
+    items = asyncio.run(collect(command, 10))
+    assert items == [{"type": "end", "count": 0, "cursor": None, "more": False, "error": "Failed to add match"}]
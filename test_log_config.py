@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+日志管道测试脚本
+"""
+
+import json
+import logging
+
+from log_config import JsonFormatter, RateLimitFilter, TextFormatter, parse_levels
+
+
+def make_record(msg, *args, name="ptpconfigurator", level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_groups_by_template():
+    """同一消息模板在窗口内只放行burst条，参数不同也归为一类"""
+    limiter = RateLimitFilter(window=60, burst=2)
+    passed = [limiter.filter(make_record("pmc命令执行失败: %s", i)) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(make_record("其他日志"))
+
+
+def test_warnings_keyed_by_formatted_message():
+    """WARNING及以上按格式化后的消息限速，同一调用点的不同事件不互相抑制；rate_limit=False 的记录不限速"""
+    limiter = RateLimitFilter(window=60, burst=2)
+    for level in (logging.WARNING, logging.ERROR, logging.CRITICAL):
+        passed = [limiter.filter(make_record("告警 %s %s", "offset", f"ptp4l{i}", level=level)) for i in range(5)]
+        assert passed == [True] * 5
+        passed = [limiter.filter(make_record("告警 %s %s", "offset", "ptp4l", level=level)) for _ in range(3)]
+        assert passed == [True, True, False]
+    exempt = [limiter.filter(logging.makeLogRecord({"msg": "时钟源状态转换: %s", "args": ("lost",), "rate_limit": False}))
+              for _ in range(5)]
+    assert exempt == [True] * 5
+
+
+def test_suppressed_count_reported_after_window():
+    """窗口结束后放行的第一条记录带有被抑制的条数"""
+    limiter = RateLimitFilter(window=60, burst=1)
+    limiter.filter(make_record("重复日志"))
+    limiter.filter(make_record("重复日志"))
+    limiter.filter(make_record("重复日志"))
+    # 模拟窗口到期
+    for state in limiter._state.values():
+        state[0] -= 61
+    record = make_record("重复日志")
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+    assert TextFormatter("%(message)s").format(record) == "重复日志 [已抑制2条重复日志]"
+
+
+def test_json_formatter_includes_extra_fields():
+    """JSON格式输出子系统名和extra字段"""
+    record = make_record("检测到时钟源%s: %s", "变化", "ens102", name="ptpconfigurator.journal")
+    record.clock_source = "ens102"
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["subsystem"] == "ptpconfigurator.journal"
+    assert entry["message"] == "检测到时钟源变化: ens102"
+    assert entry["clock_source"] == "ens102"
+
+
+def test_parse_levels():
+    """解析按子系统设置的日志级别"""
+    levels = parse_levels("ptpconfigurator.journal=warning, ptp_status=DEBUG,invalid")
+    assert levels == {"ptpconfigurator.journal": logging.WARNING, "ptp_status": logging.DEBUG}
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+netlink网络接口清单测试脚本（使用构造的rtnetlink消息）
+"""
+
+import socket
+import struct
+
+from netlink_inventory import (
+    IFA_LOCAL, IFLA_ADDRESS, IFLA_IFNAME, IFLA_INFO_KIND, IFLA_LINKINFO, IFF_UP,
+    RTM_DELADDR, RTM_DELLINK, RTM_NEWADDR, RTM_NEWLINK, InterfaceInventory, parse_messages,
+)
+
+
+def rtattr(attr_type, payload):
+    length = 4 + len(payload)
+    return struct.pack("=HH", length, attr_type) + payload + bytes((4 - length % 4) % 4)
+
+
+def link_body(index, name, mac=b"\x00\x11\x22\x33\x44\x55", flags=IFF_UP, kind=None):
+    body = struct.pack("=BxHiII", socket.AF_UNSPEC, 1, index, flags, 0)
+    body += rtattr(IFLA_IFNAME, name.encode() + b"\0") + rtattr(IFLA_ADDRESS, mac)
+    if kind:
+        body += rtattr(IFLA_LINKINFO, rtattr(IFLA_INFO_KIND, kind.encode() + b"\0"))
+    return body
+
+
+def addr_body(index, address):
+    return struct.pack("=BBBBI", socket.AF_INET, 24, 0, 0, index) + rtattr(IFA_LOCAL, socket.inet_aton(address))
+
+
+def test_links_and_addresses():
+    """链路和地址消息合并为接口列表，软件设备标记为虚拟"""
+    inventory = InterfaceInventory()
+    assert inventory.apply(RTM_NEWLINK, link_body(2, "ens102"))
+    assert inventory.apply(RTM_NEWLINK, link_body(7, "veth1a2b", kind="veth", flags=0))
+    assert inventory.apply(RTM_NEWADDR, addr_body(2, "192.168.1.100"))
+    assert inventory.interfaces() == [
+        {"index": 2, "name": "ens102", "is_up": True, "mac": "00:11:22:33:44:55", "ip": "192.168.1.100",
+         "kind": None, "virtual": False},
+        {"index": 7, "name": "veth1a2b", "is_up": False, "mac": "00:11:22:33:44:55", "ip": None,
+         "kind": "veth", "virtual": True},
+    ]
+    assert [i["name"] for i in inventory.interfaces(include_virtual=False)] == ["ens102"]
+
+
+def test_repeated_and_delete_events():
+    """重复事件不算变化，删除链路时同时删除其地址"""
+    inventory = InterfaceInventory()
+    inventory.apply(RTM_NEWLINK, link_body(2, "ens102"))
+    inventory.apply(RTM_NEWADDR, addr_body(2, "192.168.1.100"))
+    assert not inventory.apply(RTM_NEWLINK, link_body(2, "ens102"))
+    assert inventory.apply(RTM_NEWLINK, link_body(2, "ens102", flags=0))
+    assert inventory.apply(RTM_DELADDR, addr_body(2, "192.168.1.100"))
+    assert inventory.interfaces()[0]["ip"] is None
+    assert inventory.apply(RTM_DELLINK, link_body(2, "ens102"))
+    assert inventory.interfaces() == []
+
+
+def test_parse_messages_splits_batch():
+    """一次recv中的多条消息按长度拆分"""
+    bodies = [link_body(2, "ens102"), addr_body(2, "10.0.0.1")]
+    data = b""
+    for msg_type, body in zip((RTM_NEWLINK, RTM_NEWADDR), bodies):
+        data += struct.pack("=LHHLL", 16 + len(body), msg_type, 0, 0, 0) + body
+    assert list(parse_messages(data)) == [(RTM_NEWLINK, bodies[0]), (RTM_NEWADDR, bodies[1])]
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+PHC偏差采样测试脚本（使用系统时钟代替PHC）
+"""
+
+import itertools
+
+from phc_sampler import FALLBACK_DEVICE, PhcSampler, compare_clocks, fd_to_clockid
+
+
+def test_fd_to_clockid_matches_kernel_macro():
+    """与内核 FD_TO_CLOCKID 相同，结果为负数"""
+    assert fd_to_clockid(3) == -29
+    assert fd_to_clockid(0) == -5
+
+
+def test_compare_clocks_uses_narrowest_bracket():
+    """取夹逼区间最小的一次读数，偏差相对区间中点计算"""
+    # 每次读数: 参考时钟 t1, 目标时钟, 参考时钟 t2
+    readings = iter([
+        100, 1150, 140,   # 区间40，偏差 1150-120=1030
+        200, 1210, 210,   # 区间10，偏差 1210-205=1005
+        300, 1400, 330,   # 区间30
+    ])
+    offset, delay = compare_clocks(lambda: next(readings), lambda: next(readings), readings=3)
+    assert (offset, delay) == (1005, 10)
+
+
+def test_counter_clocks_have_zero_offset():
+    """同一个单调计数器作为两个时钟时偏差为0"""
+    counter = itertools.count()
+    offset, delay = compare_clocks(lambda: next(counter), lambda: next(counter), readings=1)
+    assert (offset, delay) == (0, 2)
+
+
+def test_fallback_sampler():
+    """没有PHC设备时用CLOCK_MONOTONIC代替，共用同一时钟的实例不做交叉比较"""
+    sampler = PhcSampler(fallback=True)
+    sampler.update_devices({"ptp4l": None, "ptp4l1": "/dev/ptp-missing"})
+    results = sampler.sample()
+    assert set(results) == {"ptp4l", "ptp4l1"}
+    assert results["ptp4l"]["device"] == FALLBACK_DEVICE
+    assert results["ptp4l"]["delay_ns"] >= 0
+    assert "cross_offset_ns" not in results["ptp4l1"]
+    sampler.close()
+
+
+def test_missing_device_without_fallback():
+    """未启用fallback时打不开的设备被跳过"""
+    sampler = PhcSampler()
+    sampler.update_devices({"ptp4l": "/dev/ptp-missing", "ptp4l1": None})
+    assert sampler.sample() == {}
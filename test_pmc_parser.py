@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+pmc输出解析器测试脚本（使用录制的pmc输出）
+"""
+
+from pmc_parser import first_record, parse_pmc_output
+
+TIME_STATUS_NP_OUTPUT = """sending: GET TIME_STATUS_NP
+	507c6f.fffe.1fb1b8-0 seq 0 RESPONSE MANAGEMENT TIME_STATUS_NP
+		master_offset              -23
+		ingress_time               1595252994573466848
+		cumulativeScaledRateOffset +0.000000000
+		scaledLastGmPhaseChange    0
+		gmTimeBaseIndicator        0
+		lastGmPhaseChange          0x0000'0000000000000000.0000
+		gmPresent                  true
+		gmIdentity                 001b21.fffe.6f1a2c
+"""
+
+PORT_DATA_SET_TWO_PORTS_OUTPUT = """sending: GET PORT_DATA_SET
+	507c6f.fffe.1fb1b8-1 seq 0 RESPONSE MANAGEMENT PORT_DATA_SET
+		portIdentity            507c6f.fffe.1fb1b8-1
+		portState               SLAVE
+		logMinDelayReqInterval  -3
+		peerMeanPathDelay       0
+		logAnnounceInterval     1
+		announceReceiptTimeout  3
+		logSyncInterval         -3
+		delayMechanism          1
+		logMinPdelayReqInterval 0
+		versionNumber           2
+	507c6f.fffe.1fb1b8-2 seq 0 RESPONSE MANAGEMENT PORT_DATA_SET
+		portIdentity            507c6f.fffe.1fb1b8-2
+		portState               MASTER
+		logMinDelayReqInterval  -3
+		peerMeanPathDelay       0
+		logAnnounceInterval     1
+		announceReceiptTimeout  3
+		logSyncInterval         -3
+		delayMechanism          1
+		logMinPdelayReqInterval 0
+		versionNumber           2
+"""
+
+CURRENT_DATA_SET_MULTI_CLOCK_OUTPUT = """sending: GET CURRENT_DATA_SET
+	507c6f.fffe.1fb1b8-0 seq 0 RESPONSE MANAGEMENT CURRENT_DATA_SET
+		stepsRemoved     1
+		offsetFromMaster -12.0
+		meanPathDelay    1502.0
+	001b21.fffe.6f1a2c-1 seq 0 RESPONSE MANAGEMENT CURRENT_DATA_SET
+		stepsRemoved     0
+		offsetFromMaster 0.0
+		meanPathDelay    0.0
+"""
+
+ERROR_OUTPUT = """sending: GET TIME_STATUS_NP
+	507c6f.fffe.1fb1b8-0 seq 0 RESPONSE MANAGEMENT_ERROR_STATUS TIME_STATUS_NP
+		ERROR: NOT_SUPPORTED
+"""
+
+
+def test_time_status_fields_are_typed():
+    """TIME_STATUS_NP字段被转换为int/float/bool，时钟ID保持字符串"""
+    records = parse_pmc_output(TIME_STATUS_NP_OUTPUT)
+    fields = records["507c6f.fffe.1fb1b8-0"].fields
+    assert fields["master_offset"] == -23
+    assert fields["ingress_time"] == 1595252994573466848
+    assert fields["cumulativeScaledRateOffset"] == 0.0
+    assert fields["gmPresent"] is True
+    assert fields["gmIdentity"] == "001b21.fffe.6f1a2c"
+    assert fields["lastGmPhaseChange"] == "0x0000'0000000000000000.0000"
+
+
+def test_multiple_ports_are_split_by_identity():
+    """多个端口的应答按端口ID拆分"""
+    records = parse_pmc_output(PORT_DATA_SET_TWO_PORTS_OUTPUT)
+    assert list(records) == ["507c6f.fffe.1fb1b8-1", "507c6f.fffe.1fb1b8-2"]
+    assert records["507c6f.fffe.1fb1b8-1"].fields["portState"] == "SLAVE"
+    assert records["507c6f.fffe.1fb1b8-2"].fields["portState"] == "MASTER"
+    assert records["507c6f.fffe.1fb1b8-2"].fields["logSyncInterval"] == -3
+
+
+def test_multiple_clocks_with_boundary_hops():
+    """-b大于0时多个时钟的应答都被保留"""
+    records = parse_pmc_output(CURRENT_DATA_SET_MULTI_CLOCK_OUTPUT, "CURRENT_DATA_SET")
+    assert len(records) == 2
+    local = first_record(records)
+    assert local.clock_identity == "507c6f.fffe.1fb1b8"
+    assert local.fields["offsetFromMaster"] == -12.0
+    assert isinstance(records["001b21.fffe.6f1a2c-1"].fields["meanPathDelay"], float)
+
+
+def test_error_status_is_flagged():
+    """MANAGEMENT_ERROR_STATUS应答被标记为错误"""
+    records = parse_pmc_output(ERROR_OUTPUT)
+    record = records["507c6f.fffe.1fb1b8-0"]
+    assert record.is_error
+    assert record.fields["ERROR"] == "NOT_SUPPORTED"
+    assert first_record(records) is None
+
+
+def test_filter_by_management_id():
+    """按数据集名过滤应答"""
+    assert parse_pmc_output(TIME_STATUS_NP_OUTPUT, "PORT_DATA_SET") == {}
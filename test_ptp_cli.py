@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+命令行测试脚本（受管理的文件放在临时目录中）
+"""
+
+import functools
+import json
+import os
+import subprocess
+import sys
+
+import ptp_cli
+from ptp_instances import managed_units
+
+
+def test_status_json_without_server_dependencies(tmp_path):
+    """status --json 不加载FastAPI、uvicorn和psutil，pmc不可用时错误记录在各实例的errors中"""
+    code = ("import sys, ptp_cli; ptp_cli.main(['status', '--json']); "
+            "print([m for m in ('fastapi', 'uvicorn', 'psutil', 'pydantic') if m in sys.modules])")
+    env = {**os.environ, "PATH": str(tmp_path), "PYTHONPATH": os.path.dirname(os.path.abspath(ptp_cli.__file__))}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, timeout=30)
+    output, loaded = result.stdout.rsplit("\n", 2)[:2]
+    assert loaded == "[]"
+    status = json.loads(output)
+    assert list(status["instances"]) == ["ptp4l", "ptp4l1"]
+    assert "pmc" in status["instances"]["ptp4l"]["errors"]["current_data"]
+    assert status["services"]["phc2sys.service"] == "unknown"
+
+
+def test_format_instance_one_line():
+    """每个实例一行，缺失的值显示为-，查询失败的数据集列在行尾"""
+    snapshot = {"active": "active", "domain": 24, "interfaces": ["eth0", "eth1"],
+                "port_status": {"portState": "SLAVE"}, "time_status": None,
+                "current_data": {"offsetFromMaster": -12, "meanPathDelay": 345, "stepsRemoved": 1},
+                "errors": {"time_status": "timeout"}}
+    line = ptp_cli.format_instance("ptp4l", snapshot)
+    assert line.split() == ["ptp4l", "active", "24", "SLAVE", "-12", "345", "1", "-", "eth0,eth1", "!", "time_status"]
+    assert line.index("-12") + 3 == ptp_cli.STATUS_HEADER.index("OFFSET") + 6
+    assert line.index("eth0") == ptp_cli.STATUS_HEADER.index("INTERFACES")
+
+
+def test_config_set_syncs_phc2sys_and_records_snapshot(tmp_path, monkeypatch, capsys):
+    """修改domain时同步phc2sys的 -n 参数、记录配置快照，--restart只重启相关服务"""
+    conf = tmp_path / "ptp4l.conf"
+    conf.write_text("[global]\ndomainNumber\t\t127\npriority1 128\n")
+    unit_dir = tmp_path / "system"
+    unit_dir.mkdir()
+    (unit_dir / "phc2sys.service").write_text(
+        "[Service]\nExecStart=/usr/sbin/phc2sys -a -r -z /var/run/ptp4l -n 127 -z /var/run/ptp4l1 -n 127\n")
+    calls = []
+    monkeypatch.setitem(ptp_cli.PTP_INSTANCES["ptp4l"], "config_file", str(conf))
+    monkeypatch.setattr(ptp_cli, "managed_units", functools.partial(managed_units, unit_dir=str(unit_dir)))
+    monkeypatch.setattr(ptp_cli, "UNIT_ENV_DIR", str(tmp_path / "env"))
+    monkeypatch.setattr(ptp_cli, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(ptp_cli, "run_systemctl", lambda *args: calls.append(args))
+
+    assert ptp_cli.main(["config", "set", "ptp4l", "domainNumber=24", "priority1=100", "--restart"]) == 0
+    assert conf.read_text() == "[global]\ndomainNumber\t\t24\npriority1 100\n"
+    assert 'PHC2SYS_DOMAIN_ARGS="-z /var/run/ptp4l -n 24 -z /var/run/ptp4l1 -n 127"' in \
+        (tmp_path / "env" / "phc2sys.service.env").read_text()
+    assert calls == [("daemon-reload",), ("try-restart", "ptp4l.service"), ("try-restart", "phc2sys.service")]
+    [record] = [json.loads(line) for line in (tmp_path / "snapshots" / "index.jsonl").read_text().splitlines()]
+    assert record["reason"] == "ptpconfigurator config set"
+
+    capsys.readouterr()
+    assert ptp_cli.main(["config", "get", "ptp4l", "domainNumber", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"domainNumber": "24"}
+    assert ptp_cli.main(["config", "set", "ptp4l", "clockClass=6"]) == 1
+    assert ptp_cli.main(["config", "set", "ptp4l", "domainNumber=x"]) == 2
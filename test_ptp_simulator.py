@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+ptp4l管理接口模拟器测试脚本
+"""
+
+import asyncio
+import socket
+import struct
+
+from ptp_simulator import (
+    ACTION_RESPONSE,
+    MID_CURRENT_DATA_SET,
+    MID_PORT_DATA_SET,
+    MID_PORT_STATS_NP,
+    MID_TIME_STATUS_NP,
+    OffsetTrace,
+    SimulatedInstance,
+    TLV_MANAGEMENT_ERROR_STATUS,
+    build_management_message,
+    parse_management_message,
+)
+
+
+def make_instance(**kwargs):
+    trace = OffsetTrace(offset_ns=100.0, jitter_ns=0.0, path_delay_ns=2000.0, path_delay_jitter_ns=0.0)
+    return SimulatedInstance("/tmp/unused-ptp4l", domain=127, trace=trace, **kwargs)
+
+
+def test_current_data_set_response():
+    """CURRENT_DATA_SET应答中的偏差和路径延时按TimeInterval编码"""
+    instance = make_instance()
+    request = build_management_message(MID_CURRENT_DATA_SET, domain=127, sequence_id=7)
+    responses = instance.handle_request(request)
+    assert len(responses) == 1
+
+    message = parse_management_message(responses[0])
+    assert message["action"] == ACTION_RESPONSE
+    assert message["sequence_id"] == 7
+    steps, offset, delay = struct.unpack(">Hqq", message["data"])
+    assert steps == 1
+    assert offset / 65536 == 100.0
+    assert delay / 65536 == 2000.0
+
+
+def test_domain_mismatch_is_ignored():
+    """domain不匹配时不应答"""
+    instance = make_instance()
+    request = build_management_message(MID_TIME_STATUS_NP, domain=0)
+    assert instance.handle_request(request) == []
+    assert instance.stats["ignored"] == 1
+
+
+def test_port_scoped_ids_answer_per_port():
+    """PORT_DATA_SET和PORT_STATS_NP按端口逐个应答"""
+    instance = make_instance(port_count=3)
+    for management_id in (MID_PORT_DATA_SET, MID_PORT_STATS_NP):
+        responses = instance.handle_request(build_management_message(management_id, domain=127))
+        ports = [struct.unpack(">H", parse_management_message(r)["source_port_identity"][8:])[0] for r in responses]
+        assert ports == [1, 2, 3]
+
+
+def test_unsupported_id_returns_error_status():
+    """不支持的管理ID返回MANAGEMENT_ERROR_STATUS"""
+    instance = make_instance()
+    responses = instance.handle_request(build_management_message(0x2003, domain=127))
+    assert parse_management_message(responses[0])["tlv_type"] == TLV_MANAGEMENT_ERROR_STATUS
+
+
+def test_socket_round_trip(tmp_path):
+    """通过真实的UDS套接字收发请求"""
+    server_path = str(tmp_path / "ptp4l")
+    client_path = str(tmp_path / "pmc")
+
+    async def scenario():
+        instance = make_instance()
+        instance.uds_path = server_path
+        await instance.start()
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        client.bind(client_path)
+        client.setblocking(False)
+        try:
+            client.sendto(build_management_message(MID_TIME_STATUS_NP, domain=127), server_path)
+            loop = asyncio.get_running_loop()
+            return await asyncio.wait_for(loop.sock_recv(client, 1024), timeout=2)
+        finally:
+            client.close()
+            instance.close()
+
+    message = parse_management_message(asyncio.run(scenario()))
+    assert message["management_id"] == MID_TIME_STATUS_NP
+    gm_present = struct.unpack_from(">i", message["data"], 38)[0]
+    assert gm_present == 1
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+PTP拓扑发现测试脚本（由模拟器中的远端时钟应答）
+"""
+
+import struct
+
+from pmc_parser import PmcRecord
+from ptp_simulator import (
+    ACTION_RESPONSE,
+    MANAGEMENT_IDS,
+    MID_PARENT_DATA_SET,
+    MID_PORT_DATA_SET,
+    RemoteClock,
+    SimulatedInstance,
+    build_management_message,
+    format_clock_identity,
+    parse_management_message,
+)
+from ptp_topology import TopologyDiscovery
+
+GM = "aabbcc.fffe.ddeeff"
+BC = "001122.fffe.aaaa01"
+LOCAL = "001122.fffe.334400"
+
+STATE_NAMES = {1: "INITIALIZING", 2: "FAULTY", 3: "DISABLED", 4: "LISTENING", 5: "PRE_MASTER",
+               6: "MASTER", 7: "PASSIVE", 8: "UNCALIBRATED", 9: "SLAVE"}
+
+
+def port_identity(raw: bytes) -> str:
+    return f"{format_clock_identity(raw[:8])}-{struct.unpack('>H', raw[8:10])[0]}"
+
+
+def to_record(datagram: bytes) -> PmcRecord:
+    """把模拟器的二进制应答转换为与pmc输出解析结果相同的记录"""
+    message = parse_management_message(datagram)
+    assert message["action"] == ACTION_RESPONSE
+    data = message["data"]
+    name = {value: key for key, value in MANAGEMENT_IDS.items()}[message["management_id"]]
+    record = PmcRecord(port_identity(message["source_port_identity"]), message["sequence_id"],
+                       "RESPONSE", "MANAGEMENT", name)
+    if message["management_id"] == MID_PARENT_DATA_SET:
+        record.fields = {"parentPortIdentity": port_identity(data[:10]),
+                         "grandmasterIdentity": format_clock_identity(data[24:32])}
+    elif message["management_id"] == MID_PORT_DATA_SET:
+        record.fields = {"portIdentity": port_identity(data[:10]), "portState": STATE_NAMES[data[10]]}
+    else:
+        record.fields = {"numberPorts": struct.unpack_from(">H", data, 2)[0], "priority1": data[4],
+                         "clockClass": data[5], "clockIdentity": format_clock_identity(data[10:18]),
+                         "domainNumber": data[18]}
+    return record
+
+
+def simulated_network(boundary_hops):
+    """本地从时钟经边界时钟BC连到GM，GM距本地两跳"""
+    instance = SimulatedInstance(
+        "/tmp/unused-ptp4l", domain=24, clock_identity=LOCAL, gm_identity=GM,
+        parent_port_identity=f"{BC}-2",
+        remote_clocks=[
+            RemoteClock(BC, f"{GM}-1", ["SLAVE", "MASTER"], hops=1),
+            RemoteClock(GM, f"{GM}-0", ["MASTER"], hops=2),
+        ],
+    )
+    calls = []
+
+    def query(dataset):
+        calls.append(dataset)
+        request = build_management_message(MANAGEMENT_IDS[dataset], domain=24,
+                                            starting_boundary_hops=boundary_hops, boundary_hops=boundary_hops)
+        records = (to_record(response) for response in instance.handle_request(request))
+        return {record.port_identity: record for record in records}
+
+    return instance, query, calls
+
+
+def test_topology_from_simulated_responders():
+    """通过边界跳数发现全部时钟，按父端口构建GM -> 边界时钟 -> 从时钟的树"""
+    _, query, _ = simulated_network(boundary_hops=2)
+    topology = TopologyDiscovery(query)
+    assert topology.refresh() is True
+    graph = topology.graph()
+    assert graph["grandmaster"] == GM
+    roles = {clock["clockIdentity"]: clock["role"] for clock in graph["clocks"]}
+    assert roles == {GM: "grandmaster", BC: "boundary", LOCAL: "slave"}
+    assert {(edge["from"], edge["to"]) for edge in graph["edges"]} == {(GM, BC), (BC, LOCAL)}
+    [root] = graph["tree"]
+    assert (root["clockIdentity"], root["children"][0]["clockIdentity"]) == (GM, BC)
+    assert root["children"][0]["children"][0] == {"clockIdentity": LOCAL, "role": "slave", "hops": 2, "children": []}
+    bc = next(clock for clock in graph["clocks"] if clock["clockIdentity"] == BC)
+    assert bc["numberPorts"] == 2 and bc["domainNumber"] == 24
+
+
+def test_unreachable_parent_shown_as_placeholder():
+    """边界跳数不够时只看到本地时钟，父时钟和GM作为未应答的节点给出"""
+    _, query, _ = simulated_network(boundary_hops=0)
+    topology = TopologyDiscovery(query)
+    topology.refresh()
+    clocks = {clock["clockIdentity"]: clock for clock in topology.graph()["clocks"]}
+    assert clocks[LOCAL]["responded"] and clocks[LOCAL]["parent"] == BC
+    assert not clocks[BC]["responded"] and clocks[BC]["role"] == "unknown"
+    assert not clocks[GM]["responded"] and clocks[GM]["role"] == "grandmaster"
+
+
+def test_incremental_refresh_and_expiry():
+    """静态数据集只在有新时钟或按周期查询，无变化时版本不变，多次未应答的时钟被移除"""
+    instance, query, calls = simulated_network(boundary_hops=2)
+    topology = TopologyDiscovery(query, static_every=10, expire_after=2)
+    topology.refresh()
+    calls.clear()
+    assert topology.refresh() is False and topology.version == 1
+    assert calls == ["PARENT_DATA_SET", "PORT_DATA_SET"]
+
+    instance.remote_clocks[0].port_states = ["SLAVE", "PASSIVE"]
+    assert topology.refresh() is True and topology.version == 2
+
+    instance.remote_clocks.pop()
+    topology.refresh()
+    assert GM in topology.nodes
+    topology.refresh()
+    assert GM not in topology.nodes and topology.version == 3
+    # GM仍被引用为父时钟，以未应答的节点出现
+    assert {clock["clockIdentity"]: clock["responded"] for clock in topology.graph()["clocks"]}[GM] is False
+
+
+def test_failed_round_keeps_known_clocks():
+    """查询全部失败时保留已知的拓扑并记录错误"""
+    _, query, _ = simulated_network(boundary_hops=2)
+    failing = {"on": False}
+
+    def flaky(dataset):
+        if failing["on"]:
+            raise RuntimeError("pmc timeout")
+        return query(dataset)
+
+    topology = TopologyDiscovery(flaky, expire_after=1)
+    topology.refresh()
+    failing["on"] = True
+    assert topology.refresh() is False
+    graph = topology.graph()
+    assert len(graph["clocks"]) == 3 and graph["errors"]["PARENT_DATA_SET"] == "pmc timeout"
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+daemon-reload合并调度测试脚本
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from reload_scheduler import ReloadError, ReloadScheduler
+
+
+def test_requests_in_window_share_one_reload():
+    """合并窗口内的请求只执行一次reload，所有调用方得到同一结果"""
+    calls = []
+    scheduler = ReloadScheduler(lambda: calls.append(1), window=0.05)
+
+    async def scenario():
+        return await asyncio.gather(
+            scheduler.reload("ptp4l.service"),
+            scheduler.reload("ptp4l1.service"),
+            scheduler.reload("phc2sys.service", "ptp4l.service"),
+        )
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [["phc2sys.service", "ptp4l.service", "ptp4l1.service"]] * 3
+
+
+def test_request_during_reload_starts_next_batch():
+    """reload执行期间到达的请求进入下一批，两次reload不重叠"""
+    started = threading.Event()
+    release = threading.Event()
+    running = []
+
+    def runner():
+        running.append(1)
+        assert len(running) == 1
+        started.set()
+        release.wait(5)
+        running.pop()
+
+    scheduler = ReloadScheduler(runner, window=0.01)
+
+    async def scenario():
+        first = scheduler.request("ptp4l.service")
+        await asyncio.to_thread(started.wait, 5)
+        second = scheduler.request("ptp4l1.service")
+        third = scheduler.request("phc2sys.service")
+        assert second is third and second is not first
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == (["ptp4l.service"], ["phc2sys.service", "ptp4l1.service"])
+    assert scheduler.runs == 2
+
+
+def test_failure_propagates_to_all_callers():
+    """reload失败时所有等待的调用方都收到ReloadError"""
+    scheduler = ReloadScheduler(lambda: "Access denied", window=0.01)
+
+    async def scenario():
+        return await asyncio.gather(scheduler.reload(), scheduler.reload(), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert all(isinstance(error, ReloadError) for error in errors)
+    with pytest.raises(ReloadError, match="Access denied"):
+        asyncio.run(ReloadScheduler(lambda: "Access denied", window=0).reload())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+状态历史采样存储测试脚本
+"""
+
+from sample_store import SampleStore, SeriesBuffer
+
+
+def test_query_by_time_range():
+    """按 since < t <= until 返回点"""
+    series = SeriesBuffer(10)
+    for t in range(5):
+        series.append(float(t), t * 10.0)
+    assert series.query() == ([0.0, 1.0, 2.0, 3.0, 4.0], [0.0, 10.0, 20.0, 30.0, 40.0])
+    assert series.query(since=1.0, until=3.0) == ([2.0, 3.0], [20.0, 30.0])
+    assert series.query(since=4.0) == ([], [])
+
+
+def test_ring_buffer_wraps_in_time_order():
+    """超过容量后覆盖最旧的点，查询结果仍按时间排序"""
+    series = SeriesBuffer(4)
+    for t in range(7):
+        series.append(float(t), float(t))
+    assert len(series) == 4
+    assert series.query()[0] == [3.0, 4.0, 5.0, 6.0]
+    assert series.query(since=4.5)[0] == [5.0, 6.0]
+    assert series.query(since=2.0, until=5.0)[0] == [3.0, 4.0, 5.0]
+
+
+def test_store_skips_missing_values():
+    """None 和布尔值不记录，各指标分别保存"""
+    store = SampleStore(8)
+    store.record("ptp4l", 1.0, {"offsetFromMaster": -12.0, "meanPathDelay": None, "gmPresent": True})
+    store.record("ptp4l", 2.0, {"offsetFromMaster": 3, "meanPathDelay": 1502.0})
+    assert store.query("ptp4l", "offsetFromMaster") == ([1.0, 2.0], [-12.0, 3.0])
+    assert store.query("ptp4l", "meanPathDelay") == ([2.0], [1502.0])
+    assert store.query("ptp4l1", "offsetFromMaster") == ([], [])
+    assert sorted(store.metrics("ptp4l")) == ["meanPathDelay", "offsetFromMaster"]
+
+
+def test_clock_step_back_keeps_history():
+    """时间戳回退（系统时钟向回步进）时保留已有的点，丢弃回退的样本直到时间追上最新的点"""
+    series = SeriesBuffer(8)
+    for t in (100.0, 101.0, 102.0, 103.0):
+        assert series.append(t, t)
+    assert not series.append(50.0, 50.0)
+    assert not series.append(102.5, 102.5)
+    assert series.append(103.0, 103.5)
+    assert series.append(104.0, 104.0)
+    assert series.query() == ([100.0, 101.0, 102.0, 103.0, 103.0, 104.0], [100.0, 101.0, 102.0, 103.0, 103.5, 104.0])
+    assert series.query(since=100.5)[0] == [101.0, 102.0, 103.0, 103.0, 104.0]
+    store = SampleStore(8)
+    store.record("ptp4l", 100.0, {"offsetFromMaster": 1.0})
+    store.record("ptp4l", 99.5, {"offsetFromMaster": 2.0})
+    store.record("ptp4l", 100.5, {"offsetFromMaster": 3.0})
+    assert store.query("ptp4l", "offsetFromMaster") == ([100.0, 100.5], [1.0, 3.0])
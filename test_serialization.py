@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+响应编码与内容协商测试脚本
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+
+from api_models import NETWORK_INTERFACE_FIELDS, HistoryResponse, NetworkInterfaceColumns
+from serialization import ApiResponse, NegotiationMiddleware, accepts_msgpack, representation_etag, to_columns
+
+
+def make_app():
+    app = FastAPI(default_response_class=ApiResponse)
+    app.add_middleware(NegotiationMiddleware)
+
+    @app.get("/history", response_model=HistoryResponse)
+    async def history(response: Response):
+        response.headers["ETag"] = representation_etag('"v1"')
+        return {"instance": "ptp4l", "now": 2.5, "extra": 1,
+                "series": {"offsetFromMaster": {"t": [1.0, 2.0], "v": [-12, 8.5]}}}
+
+    return app
+
+
+def request(app, headers=None):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            return await client.get("/history", headers=headers or {})
+    return asyncio.run(scenario())
+
+
+def test_accept_negotiation():
+    """MessagePack 的权重不低于 JSON 时才使用，q=0 表示不接受"""
+    pytest.importorskip("msgpack")
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/x-msgpack, application/json;q=0.9")
+    assert not accepts_msgpack("application/msgpack;q=0.5, application/json")
+    assert not accepts_msgpack("application/msgpack;q=0")
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack(None)
+
+
+def test_json_and_msgpack_bodies_match():
+    """同一个响应模型按Accept编码为JSON或MessagePack，内容相同，未声明的字段被去掉，ETag按编码区分"""
+    msgpack = pytest.importorskip("msgpack")
+    app = make_app()
+    as_json = request(app)
+    as_msgpack = request(app, {"Accept": "application/msgpack"})
+    assert as_json.headers["content-type"] == "application/json"
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    assert as_json.headers["vary"] == as_msgpack.headers["vary"] == "Accept"
+    assert as_json.headers["etag"] == '"v1"' and as_msgpack.headers["etag"] == '"v1-mp"'
+    expected = {"success": True, "instance": "ptp4l", "now": 2.5,
+                "series": {"offsetFromMaster": {"t": [1.0, 2.0], "v": [-12.0, 8.5]}}}
+    assert json.loads(as_json.content) == msgpack.unpackb(as_msgpack.content) == expected
+    assert len(as_msgpack.content) < len(as_json.content)
+
+
+def test_network_interfaces_as_columns():
+    """对象数组转为每个字段一个数组，缺失的字段为None"""
+    rows = [{"index": 1, "name": "lo", "is_up": True, "mac": None, "ip": "127.0.0.1", "kind": None, "virtual": True,
+             "phc_index": -1, "timestamping": None},
+            {"index": 2, "name": "eth0", "is_up": True, "mac": "02:00:00:00:00:01", "ip": None, "virtual": False,
+             "phc_index": 0, "timestamping": {"hardware": True}}]
+    columns = to_columns(rows, NETWORK_INTERFACE_FIELDS)
+    assert columns["name"] == ["lo", "eth0"] and columns["kind"] == [None, None]
+    assert NetworkInterfaceColumns.model_validate(columns).phc_index == [-1, 0]
+    assert to_columns([], ["name"]) == {"name": []}
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+网卡时间戳能力解析测试脚本
+"""
+
+import struct
+
+from ts_info import (
+    ETHTOOL_GET_TS_INFO, HARDWARE_TIMESTAMPING, SOFTWARE_TIMESTAMPING, TsInfoCache, parse_ts_info,
+)
+
+
+def ts_info_bytes(so_timestamping, phc_index):
+    return struct.pack("=IIiI12xI12x", ETHTOOL_GET_TS_INFO, so_timestamping, phc_index, 0x3, 0x1)
+
+
+def test_hardware_capable_interface():
+    """具备硬件收发和raw时钟时间戳且有PHC时判定为支持硬件时间戳"""
+    info = parse_ts_info(ts_info_bytes(HARDWARE_TIMESTAMPING | SOFTWARE_TIMESTAMPING, 2))
+    assert info["phc_index"] == 2
+    assert info["hardware"] and info["software"]
+    assert "hardware-raw-clock" in info["capabilities"]
+
+
+def test_software_only_interface():
+    """只有软件时间戳、没有PHC的网卡"""
+    info = parse_ts_info(ts_info_bytes(SOFTWARE_TIMESTAMPING, -1))
+    assert info["phc_index"] == -1
+    assert not info["hardware"]
+    assert info["software"]
+
+
+def test_cache_probes_once_per_ifindex():
+    """同一ifindex只探测一次，接口重建（新ifindex）时重新探测"""
+    calls = []
+    cache = TsInfoCache(probe=lambda name: calls.append(name) or {"phc_index": 0})
+    cache.get(3, "ens102")
+    cache.get(3, "ens102")
+    cache.get(9, "ens102")
+    assert calls == ["ens102", "ens102"]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+drop-in与环境文件管理测试脚本（使用临时目录）
+"""
+
+import os
+
+from unit_env import ManagedUnit, exec_start, extract_groups, parse_env_file
+
+
+def make_unit(tmp_path, unit, command, variable, options):
+    unit_dir = tmp_path / "system"
+    unit_dir.mkdir(exist_ok=True)
+    (unit_dir / unit).write_text(f"[Unit]\nDescription=test\n\n[Service]\nExecStart={command}\n")
+    return ManagedUnit(unit, variable, options, unit_dir=str(unit_dir), env_dir=str(tmp_path / "env"))
+
+
+def test_extract_groups_keeps_other_arguments():
+    """只取出完整的选项组，其他参数保持原有顺序"""
+    tokens = "/usr/sbin/phc2sys -z /var/run/ptp4l -n 127 -a -r -z /var/run/ptp4l1 -n 24 -m".split()
+    remaining, groups = extract_groups(tokens, ("-z", "-n"))
+    assert remaining == ["/usr/sbin/phc2sys", "-a", "-r", "-m"]
+    assert groups == [["/var/run/ptp4l", "127"], ["/var/run/ptp4l1", "24"]]
+    assert exec_start("ExecStart=/bin/a\n[Service]\nExecStart=\nExecStart=/bin/b -x\n") == "/bin/b -x"
+
+
+def test_first_write_generates_dropin_then_only_env_file(tmp_path):
+    """第一次写入生成drop-in并返回True，之后只替换环境文件，主unit不被改写"""
+    unit = make_unit(tmp_path, "ptp4l.service", "/usr/sbin/ptp4l -i eth0 -f /etc/linuxptp/ptp4l.conf",
+                     "PTP4L_INTERFACE_ARGS", ("-i",))
+    original = open(unit.unit_path).read()
+    assert not unit.managed
+    assert unit.read_groups() == [["eth0"]]
+
+    assert unit.write_groups([["eth1"], ["eth2"]]) is True
+    dropin = open(unit.dropin_path).read()
+    assert f"EnvironmentFile={unit.env_path}\n" in dropin
+    assert dropin.endswith("ExecStart=\nExecStart=/usr/sbin/ptp4l $PTP4L_INTERFACE_ARGS -f /etc/linuxptp/ptp4l.conf\n")
+    assert unit.read_groups() == [["eth1"], ["eth2"]]
+
+    dropin_mtime = os.stat(unit.dropin_path).st_mtime_ns
+    assert unit.write_groups([["eth3"]]) is False
+    assert os.stat(unit.dropin_path).st_mtime_ns == dropin_mtime
+    assert parse_env_file(open(unit.env_path).read()) == {"PTP4L_INTERFACE_ARGS": "-i eth3"}
+    assert open(unit.unit_path).read() == original
+    # 原子替换不留下临时文件
+    assert os.listdir(os.path.dirname(unit.env_path)) == ["ptp4l.service.env"]
+
+
+def test_env_file_preserves_other_variables(tmp_path):
+    """环境文件中的其他变量在替换时保留"""
+    unit = make_unit(tmp_path, "phc2sys.service", "/usr/sbin/phc2sys -a -r -z /var/run/ptp4l -n 127",
+                     "PHC2SYS_DOMAIN_ARGS", ("-z", "-n"))
+    os.makedirs(os.path.dirname(unit.env_path))
+    with open(unit.env_path, "w") as f:
+        f.write("# comment\nOTHER='keep me'\n")
+    unit.write_groups([["/var/run/ptp4l", "24"]])
+    assert parse_env_file(open(unit.env_path).read()) == {
+        "OTHER": "keep me", "PHC2SYS_DOMAIN_ARGS": "-z /var/run/ptp4l -n 24",
+    }
+    assert "ExecStart=/usr/sbin/phc2sys $PHC2SYS_DOMAIN_ARGS -a -r\n" in open(unit.dropin_path).read()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+多worker leader选举与共享状态测试脚本（使用临时目录）
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from sample_store import MappedSampleStore, ReadConflict, SeriesBuffer
+from worker_state import LeaderLock, SharedState
+
+
+def test_only_one_leader_until_released(tmp_path):
+    """同一时刻只有一个持有者，持有者释放后其他竞争者接手"""
+    path = str(tmp_path / "leader.lock")
+    first, second = LeaderLock(path), LeaderLock(path)
+    assert first.acquire() and first.is_leader
+    assert not second.acquire() and not second.is_leader
+    # 另一个进程同样拿不到锁
+    probe = ("import fcntl, os, sys; fd = os.open(sys.argv[1], os.O_RDWR)\n"
+             "try:\n    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)\nexcept BlockingIOError:\n    sys.exit(3)")
+    assert subprocess.run([sys.executable, "-c", probe, path]).returncode == 3
+    first.release()
+    assert second.acquire()
+
+
+def test_shared_state_visible_to_other_mapping(tmp_path):
+    """发布的状态在另一处映射中可读，未发布新内容时返回同一个缓存对象"""
+    path = str(tmp_path / "state")
+    writer, reader = SharedState(path, size=4096), SharedState(path, size=4096)
+    assert reader.read() is None
+    writer.publish({"leader": 1, "clock_source": {"current_source": "ens102"}})
+    data = reader.read()
+    assert data["clock_source"]["current_source"] == "ens102"
+    assert reader.read() is data
+    writer.publish({"leader": 2})
+    assert reader.read() == {"leader": 2}
+    with pytest.raises(ValueError):
+        writer.publish({"blob": "x" * 5000})
+    assert reader.read() == {"leader": 2}
+
+
+def test_interrupted_publish_is_not_read(tmp_path):
+    """写入中途（顺序号为奇数）时读者不采用内容，接手者恢复顺序号后可以继续发布"""
+    path = str(tmp_path / "state")
+    writer, reader = SharedState(path, size=4096), SharedState(path, size=4096)
+    writer.publish({"leader": 1})
+    assert reader.read() == {"leader": 1}
+    writer._map[0] += 1
+    writer._map[16:20] = b"XXXX"
+    assert reader.read() == {"leader": 1}
+    writer.recover()
+    writer.publish({"leader": 2})
+    assert reader.read() == {"leader": 2}
+
+
+def test_mapped_history_shared_between_stores(tmp_path):
+    """一个映射写入的历史在另一个映射中可查询，布局变化时重建"""
+    path = str(tmp_path / "history")
+    keys = [("ptp4l", "offsetFromMaster"), ("ptp4l", "meanPathDelay")]
+    writer = MappedSampleStore(path, 4, keys)
+    reader = MappedSampleStore(path, 4, keys)
+    for t in range(6):
+        writer.record("ptp4l", float(t), {"offsetFromMaster": t, "phcOffset": 1.0})
+    assert reader.query("ptp4l", "offsetFromMaster") == ([2.0, 3.0, 4.0, 5.0], [2.0, 3.0, 4.0, 5.0])
+    assert reader.query("ptp4l", "phcOffset") == ([], [])
+    assert reader.metrics("ptp4l") == ["offsetFromMaster"]
+    assert MappedSampleStore(path, 4, keys).query("ptp4l", "offsetFromMaster", since=4.0)[0] == [5.0]
+    assert MappedSampleStore(path, 8, keys).query("ptp4l", "offsetFromMaster") == ([], [])
+
+
+def test_mapped_history_never_returns_unvalidated_reads(tmp_path, monkeypatch):
+    """每次读取都与写入冲突、或写入者停在写入中途时抛出ReadConflict，不返回可能不完整的数据"""
+    path = str(tmp_path / "history")
+    keys = [("ptp4l", "offsetFromMaster")]
+    writer = MappedSampleStore(path, 4, keys)
+    reader = MappedSampleStore(path, 4, keys)
+    writer.record("ptp4l", 1.0, {"offsetFromMaster": 1.0})
+    unlocked_query = SeriesBuffer.query
+    writes = iter(range(2, 1000))
+
+    def racing_query(self, *args):
+        # 每次读取期间写入者都完成一次写入
+        writer.record("ptp4l", float(next(writes)), {"offsetFromMaster": 0.0})
+        return unlocked_query(self, *args)
+
+    monkeypatch.setattr(SeriesBuffer, "query", racing_query)
+    with pytest.raises(ReadConflict):
+        reader.query("ptp4l", "offsetFromMaster")
+    monkeypatch.setattr(SeriesBuffer, "query", unlocked_query)
+    assert len(reader.query("ptp4l", "offsetFromMaster")[0]) == 4
+    writer._header[0] += 1
+    with pytest.raises(ReadConflict):
+        reader.query("ptp4l", "offsetFromMaster")
+    reader.recover()
+    assert len(reader.query("ptp4l", "offsetFromMaster")[0]) == 4
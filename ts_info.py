@@ -0,0 +1,104 @@
+"""
+网卡时间戳能力探测
+
+通过 SIOCETHTOOL / ETHTOOL_GET_TS_INFO ioctl（与 `ethtool -T` 相同）获取网卡的
+时间戳能力和 PHC 编号。结果按 ifindex 缓存，同一个网卡只探测一次；接口被删除后
+重建会得到新的 ifindex，不会用到旧结果。
+"""
+
+import ctypes
+import errno
+import fcntl
+import logging
+import socket
+import struct
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SIOCETHTOOL = 0x8946
+ETHTOOL_GET_TS_INFO = 0x41
+IFNAMSIZ = 16
+
+# SOF_TIMESTAMPING_* 能力位
+SOF_TIMESTAMPING_TX_HARDWARE = 1 << 0
+SOF_TIMESTAMPING_TX_SOFTWARE = 1 << 1
+SOF_TIMESTAMPING_RX_HARDWARE = 1 << 2
+SOF_TIMESTAMPING_RX_SOFTWARE = 1 << 3
+SOF_TIMESTAMPING_SOFTWARE = 1 << 4
+SOF_TIMESTAMPING_RAW_HARDWARE = 1 << 6
+
+# ptp4l time_stamping=hardware / software 分别需要的能力
+HARDWARE_TIMESTAMPING = SOF_TIMESTAMPING_TX_HARDWARE | SOF_TIMESTAMPING_RX_HARDWARE | SOF_TIMESTAMPING_RAW_HARDWARE
+SOFTWARE_TIMESTAMPING = SOF_TIMESTAMPING_TX_SOFTWARE | SOF_TIMESTAMPING_RX_SOFTWARE | SOF_TIMESTAMPING_SOFTWARE
+
+_CAPABILITY_NAMES = {
+    SOF_TIMESTAMPING_TX_HARDWARE: "hardware-transmit",
+    SOF_TIMESTAMPING_TX_SOFTWARE: "software-transmit",
+    SOF_TIMESTAMPING_RX_HARDWARE: "hardware-receive",
+    SOF_TIMESTAMPING_RX_SOFTWARE: "software-receive",
+    SOF_TIMESTAMPING_SOFTWARE: "software-system-clock",
+    SOF_TIMESTAMPING_RAW_HARDWARE: "hardware-raw-clock",
+}
+
+# struct ethtool_ts_info: cmd, so_timestamping, phc_index, tx_types, tx_reserved[3], rx_filters, rx_reserved[3]
+_TS_INFO = struct.Struct("=IIiI12xI12x")
+# struct ifreq: char ifr_name[16] + union（这里只用到 ifr_data 指针），总长 40 字节
+_IFREQ_SIZE = 40
+
+
+def parse_ts_info(raw: bytes) -> Dict:
+    """
+    解析 ethtool_ts_info
+
+    Returns:
+        dict: phc_index（无PHC时为-1）、hardware/software 是否满足ptp4l要求、能力名列表
+    """
+    _cmd, so_timestamping, phc_index, _tx_types, _rx_filters = _TS_INFO.unpack_from(raw)
+    return {
+        "phc_index": phc_index,
+        "hardware": so_timestamping & HARDWARE_TIMESTAMPING == HARDWARE_TIMESTAMPING and phc_index >= 0,
+        "software": so_timestamping & SOFTWARE_TIMESTAMPING == SOFTWARE_TIMESTAMPING,
+        "capabilities": [name for bit, name in _CAPABILITY_NAMES.items() if so_timestamping & bit],
+    }
+
+
+def probe_ts_info(ifname: str) -> Optional[Dict]:
+    """
+    执行 ETHTOOL_GET_TS_INFO
+
+    Returns:
+        dict: 见 parse_ts_info；驱动不支持该ioctl或接口不存在时返回 None
+    """
+    buffer = ctypes.create_string_buffer(struct.pack("=I", ETHTOOL_GET_TS_INFO), _TS_INFO.size)
+    ifreq = bytearray(_IFREQ_SIZE)
+    ifreq[:IFNAMSIZ] = ifname.encode()[:IFNAMSIZ - 1].ljust(IFNAMSIZ, b"\0")
+    struct.pack_into("P", ifreq, IFNAMSIZ, ctypes.addressof(buffer))
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            fcntl.ioctl(sock.fileno(), SIOCETHTOOL, ifreq)
+    except OSError as e:
+        if e.errno not in (errno.EOPNOTSUPP, errno.ENODEV, errno.EINVAL):
+            logger.warning("探测%s的时间戳能力失败: %s", ifname, e)
+        return None
+    return parse_ts_info(buffer.raw)
+
+
+class TsInfoCache:
+    """按 (ifindex, 接口名) 缓存探测结果，每个网卡只探测一次"""
+
+    def __init__(self, probe=probe_ts_info):
+        self._probe = probe
+        self._cache: Dict[Tuple[int, str], Optional[Dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ifindex: int, ifname: str) -> Optional[Dict]:
+        key = (ifindex, ifname)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        info = self._probe(ifname)
+        with self._lock:
+            self._cache[key] = info
+        return info
@@ -0,0 +1,191 @@
+"""
+通过 drop-in + EnvironmentFile 管理 unit 的启动参数
+
+第一次修改某个 unit 的网卡或 domain 时，根据主 unit 文件的 ExecStart 生成一个 drop-in，
+把被管理的参数（ptp4l 的 -i，phc2sys 的 -z/-n）移到环境文件中：
+
+    # /etc/systemd/system/ptp4l.service.d/ptpconfigurator.conf
+    [Service]
+    EnvironmentFile=/etc/linuxptp/env/ptp4l.service.env
+    ExecStart=
+    ExecStart=/usr/sbin/ptp4l $PTP4L_INTERFACE_ARGS -f /etc/linuxptp/ptp4l.conf
+
+之后只替换环境文件。systemd 每次启动服务时重新读取 EnvironmentFile，重启服务即可生效，
+不需要 daemon-reload，主 unit 文件也不再被改写；只有生成 drop-in 的那一次需要 reload。
+环境文件以"写临时文件、fsync、rename"的方式原子替换，服务启动时不会读到写了一半的内容。
+"""
+
+import contextlib
+import os
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+UNIT_DIR = "/etc/systemd/system"
+DEFAULT_ENV_DIR = "/etc/linuxptp/env"
+DROPIN_NAME = "ptpconfigurator.conf"
+
+
+def parse_env_file(content: str) -> Dict[str, str]:
+    """解析 KEY=value / KEY="value" 形式的环境文件"""
+    values = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")) or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        values[key.strip()] = value
+    return values
+
+
+def format_env_file(values: Dict[str, str]) -> str:
+    lines = ["# 由ptpconfigurator管理，修改后重启服务生效"]
+    lines.extend(f'{key}="{value}"' for key, value in values.items())
+    return "\n".join(lines) + "\n"
+
+
+def atomic_write(path: str, content: str, mode: int = 0o644):
+    """写入同目录下的临时文件并 fsync 后 rename 覆盖目标文件"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def exec_start(unit_content: str) -> Optional[str]:
+    """返回最终生效的 ExecStart 命令行（空的 ExecStart= 会清除之前的值）"""
+    command = None
+    for line in unit_content.splitlines():
+        line = line.strip()
+        if line.startswith("ExecStart="):
+            command = line[len("ExecStart="):].strip() or None
+    return command
+
+
+def extract_groups(tokens: Sequence[str], options: Sequence[str]) -> Tuple[List[str], List[List[str]]]:
+    """
+    从命令行中取出按 options 顺序连续出现的选项组
+
+    例如 options=("-z", "-n") 时取出每个 "-z X -n Y"，得到 [X, Y]。
+
+    Returns:
+        tuple: (剩余的参数, 各组选项值)
+    """
+    width = 2 * len(options)
+    remaining, groups = [], []
+    i = 0
+    while i < len(tokens):
+        window = tokens[i:i + width]
+        if len(window) == width and all(window[2 * k] == option for k, option in enumerate(options)):
+            groups.append(list(window[1::2]))
+            i += width
+        else:
+            remaining.append(tokens[i])
+            i += 1
+    return remaining, groups
+
+
+def join_groups(groups: Sequence[Sequence[str]], options: Sequence[str]) -> str:
+    return " ".join(f"{option} {value}" for group in groups for option, value in zip(options, group))
+
+
+class ManagedUnit:
+    """
+    一个启动参数由环境文件管理的 unit
+
+    Attributes:
+        variable: 环境文件中保存被管理参数的变量名
+        options: 被管理的选项组，如 ("-i",) 或 ("-z", "-n")
+    """
+
+    def __init__(self, unit: str, variable: str, options: Sequence[str],
+                 unit_dir: str = UNIT_DIR, env_dir: str = DEFAULT_ENV_DIR):
+        self.unit = unit
+        self.variable = variable
+        self.options = tuple(options)
+        self.unit_path = os.path.join(unit_dir, unit)
+        self.dropin_path = os.path.join(unit_dir, f"{unit}.d", DROPIN_NAME)
+        self.env_path = os.path.join(env_dir, f"{unit}.env")
+
+    @property
+    def paths(self) -> List[str]:
+        """决定参数取值的全部文件，用于生成ETag"""
+        return [self.unit_path, self.dropin_path, self.env_path]
+
+    @property
+    def managed(self) -> bool:
+        return os.path.exists(self.dropin_path)
+
+    def read_groups(self) -> List[List[str]]:
+        """
+        读取当前的选项组：已生成 drop-in 时读环境文件，否则解析主 unit 的 ExecStart
+
+        Raises:
+            OSError: 主 unit 文件无法读取
+        """
+        if self.managed:
+            try:
+                with open(self.env_path) as f:
+                    args = parse_env_file(f.read()).get(self.variable, "")
+            except FileNotFoundError:
+                return []
+        else:
+            with open(self.unit_path) as f:
+                args = exec_start(f.read()) or ""
+        return extract_groups(args.split(), self.options)[1]
+
+    def write_groups(self, groups: Sequence[Sequence[str]]) -> bool:
+        """
+        写入选项组，第一次写入时生成 drop-in
+
+        Returns:
+            bool: 是否新生成了 drop-in（需要 daemon-reload）
+
+        Raises:
+            OSError: 文件无法读写
+            ValueError: 主 unit 中没有 ExecStart
+        """
+        created = not self.managed
+        dropin = self._render_dropin() if created else None
+        values = {}
+        with contextlib.suppress(FileNotFoundError):
+            with open(self.env_path) as f:
+                values = parse_env_file(f.read())
+        values[self.variable] = join_groups(groups, self.options)
+        # 先写环境文件再写 drop-in，drop-in 引用的文件总是存在
+        atomic_write(self.env_path, format_env_file(values))
+        if dropin is not None:
+            atomic_write(self.dropin_path, dropin)
+        return created
+
+    def _render_dropin(self) -> str:
+        with open(self.unit_path) as f:
+            command = exec_start(f.read())
+        if command is None:
+            raise ValueError(f"{self.unit} 中未找到 ExecStart 行")
+        remaining = extract_groups(command.split(), self.options)[0]
+        new_command = " ".join([remaining[0], f"${self.variable}", *remaining[1:]])
+        return (
+            f"# 由ptpconfigurator生成：{' / '.join(self.options)} 参数从 {self.env_path} 读取，修改后重启服务即可生效\n"
+            "[Service]\n"
+            f"EnvironmentFile={self.env_path}\n"
+            "ExecStart=\n"
+            f"ExecStart={new_command}\n"
+        )
@@ -0,0 +1,140 @@
+"""
+多 worker 部署（uvicorn --workers N）的 leader 选举与共享状态
+
+同一台机器上的全部 worker 竞争一个文件锁（flock），持有锁的 worker 为 leader：
+只有它运行 phc2sys 日志监控、时钟源看门狗和各采样任务，并把结果发布到共享映射文件；
+其他 worker 只读这个文件响应请求，不再执行 journalctl、pmc 或 systemctl。
+leader 进程退出时内核自动释放锁，其他 worker 在下一次尝试时接手。
+
+共享状态是一段 JSON，用顺序锁（seqlock）发布：写入前后各把顺序号加一（写入期间为奇数），
+读者在读取前后看到相同的偶数顺序号才采用结果。读者按顺序号缓存解析结果，
+没有新发布时读取只是一次8字节的比较。
+"""
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 文件头: 顺序号(u64)、JSON长度(u32)
+_HEADER = struct.Struct("<QI")
+_HEADER_SIZE = 16
+_READ_RETRIES = 100
+
+
+class LeaderLock:
+    """
+    基于 flock 的 leader 锁
+
+    Attributes:
+        is_leader: 本进程是否持有锁
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.is_leader = False
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """
+        非阻塞地尝试获取锁，已持有时直接返回True
+
+        Raises:
+            OSError: 锁文件无法创建
+        """
+        if self.is_leader:
+            return True
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.is_leader = True
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, f"{os.getpid()}\n".encode(), 0)
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
+
+
+class SharedState:
+    """
+    映射文件中的一段以顺序锁发布的 JSON
+
+    Attributes:
+        size: 映射大小，JSON 不能超过 size - 16 字节
+    """
+
+    def __init__(self, path: str, size: int = 1 << 20):
+        self.path = path
+        self.size = size
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            # mmap 持有文件描述符的副本，锁要显式释放
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        self._cached_seq: Optional[int] = None
+        self._cached: Optional[Dict] = None
+
+    def recover(self):
+        """上一个发布者在写入中途退出时顺序号停在奇数，接手发布前把它恢复为偶数"""
+        seq, length = _HEADER.unpack_from(self._map, 0)
+        if seq % 2:
+            _HEADER.pack_into(self._map, 0, seq + 1, length)
+
+    def publish(self, data: Dict):
+        """
+        发布新的状态
+
+        Raises:
+            ValueError: 序列化后超过映射大小
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        if len(payload) > self.size - _HEADER_SIZE:
+            raise ValueError(f"共享状态过大: {len(payload)} 字节")
+        seq, length = _HEADER.unpack_from(self._map, 0)
+        _HEADER.pack_into(self._map, 0, seq + 1, length)
+        self._map[_HEADER_SIZE:_HEADER_SIZE + len(payload)] = payload
+        _HEADER.pack_into(self._map, 0, seq + 2, len(payload))
+
+    def read(self) -> Optional[Dict]:
+        """
+        读取最近一次发布的状态，还没有发布过或一直读不到完整内容时返回None
+
+        顺序号未变化时返回同一个缓存对象，调用方可以用 `is` 判断是否有新发布。
+        """
+        for _ in range(_READ_RETRIES):
+            seq, length = _HEADER.unpack_from(self._map, 0)
+            if seq == self._cached_seq:
+                return self._cached
+            if seq % 2:
+                os.sched_yield()
+                continue
+            payload = self._map[_HEADER_SIZE:_HEADER_SIZE + length]
+            if _HEADER.unpack_from(self._map, 0)[0] != seq:
+                continue
+            try:
+                data = json.loads(payload) if length else None
+            except ValueError:
+                logger.warning("共享状态内容无法解析，忽略")
+                data = None
+            self._cached_seq, self._cached = seq, data
+            return data
+        return self._cached